@@ -5,7 +5,10 @@
 #include "chrome/browser/ui/views/toolbar/toolbar_view.h"
 
 #include <algorithm>
+#include <atomic>
+#include <cstring>
 #include <memory>
+#include <optional>
 #include <utility>
 #include <windows.h> // Neural Chromium Shared Memory
 
@@ -15,9 +18,12 @@
 #include "base/functional/bind.h"
 #include "base/i18n/number_formatting.h"
 #include "base/i18n/rtl.h"
+#include "base/json/json_reader.h"
+#include "base/json/string_escape.h"
 #include "base/metrics/histogram_macros.h"
 #include "base/metrics/user_metrics.h"
 #include "base/metrics/user_metrics_action.h"
+#include "base/strings/string_number_conversions.h"
 #include "base/strings/utf_string_conversions.h"
 #include "base/trace_event/trace_event.h"
 #include "build/build_config.h"
@@ -25,6 +31,8 @@
 #include "chrome/browser/command_updater.h"
 #include "chrome/browser/media/router/media_router_feature.h"
 #include "chrome/browser/performance_manager/public/user_tuning/user_tuning_utils.h"
+#include "chrome/browser/predictors/loading_predictor.h"
+#include "chrome/browser/predictors/loading_predictor_factory.h"
 #include "chrome/browser/profiles/profile.h"
 #include "chrome/browser/profiles/profiles_state.h"
 #include "chrome/browser/themes/theme_properties.h"
@@ -44,6 +52,7 @@
 #include "chrome/browser/ui/layout_constants.h"
 #include "chrome/browser/ui/omnibox/omnibox_view.h"
 #include "chrome/browser/ui/tabs/public/tab_features.h"
+#include "chrome/browser/ui/tabs/tab_strip_model.h"
 #include "chrome/browser/ui/tabs/tab_strip_prefs.h"
 #include "chrome/browser/ui/toolbar/chrome_labs/chrome_labs_prefs.h"
 #include "chrome/browser/ui/toolbar/chrome_labs/chrome_labs_utils.h"
@@ -87,6 +96,7 @@
 #include "chrome/browser/ui/web_applications/app_browser_controller.h"
 #include "chrome/browser/web_applications/link_capturing_features.h"
 #include "chrome/common/chrome_features.h"
+#include "chrome/common/chrome_isolated_world_ids.h"
 #include "chrome/common/pref_names.h"
 #include "chrome/common/webui_url_constants.h"
 #include "chrome/grit/branded_strings.h"
@@ -99,6 +109,7 @@
 #include "components/send_tab_to_self/features.h"
 #include "components/signin/public/base/signin_buildflags.h"
 #include "components/strings/grit/components_strings.h"
+#include "content/public/browser/render_frame_host.h"
 #include "content/public/browser/render_view_host.h"
 #include "content/public/browser/web_contents.h"
 #include "media/base/media_switches.h"
@@ -129,6 +140,7 @@
 #include "ui/views/view_class_properties.h"
 #include "ui/views/widget/tooltip_manager.h"
 #include "ui/views/widget/widget.h"
+#include "url/gurl.h"
 #include "components/vector_icons/vector_icons.h"
 
 #if BUILDFLAG(ENABLE_WEBUI_TAB_STRIP)
@@ -1221,17 +1233,105 @@ void ToolbarView::OnTouchUiChanged() {
   }
 }
 
+namespace {
+
+// Neural-Chromium text return queue. Must match glazyr/text_channel.py.
+constexpr uint32_t kNeuralTextQueueMagic = 0x4E435451;  // "NCTQ"
+constexpr uint32_t kNeuralTextQueueVersion = 1;
+constexpr uint32_t kNeuralTextQueueHeaderSize = 64;
+constexpr uint32_t kNeuralTextQueueCapacity = 64 * 1024;  // Power of two
+constexpr uint32_t kNeuralTextShmSize =
+    kNeuralTextQueueHeaderSize + kNeuralTextQueueCapacity;
+constexpr uint16_t kNeuralTextFlagPad = 0x1;
+constexpr uint16_t kNeuralTextKindOmniboxText = 1;
+constexpr uint16_t kNeuralTextKindPreconnect = 2;
+constexpr uint16_t kNeuralTextKindInsertText = 3;
+
+// Fills a page field in one go (glazyr/text_entry.py). The element is the
+// index-th querySelectorAll(selector) match, or the focused element when the
+// selector is empty. insertText goes through the editing pipeline (input
+// events, undo stack) like typing would; if the element rejects it, the value
+// setter plus an input event is the fallback. Submit sends a synthetic Enter
+// and, unless a handler consumed it, submits the owning form.
+constexpr char kNeuralInsertTextScript[] = R"JS(
+(function(sel, index, text, submit) {
+  var el = sel ? document.querySelectorAll(sel)[index] : document.activeElement;
+  if (!el) return false;
+  el.focus();
+  if (text && !document.execCommand('insertText', false, text)) {
+    var desc = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), 'value');
+    if (!desc || !desc.set) return false;
+    desc.set.call(el, el.value + text);
+    el.dispatchEvent(new InputEvent('input', {bubbles: true, inputType: 'insertText', data: text}));
+  }
+  if (text) el.dispatchEvent(new Event('change', {bubbles: true}));
+  if (submit) {
+    var handled = false;
+    ['keydown', 'keypress', 'keyup'].forEach(function(type) {
+      var ev = new KeyboardEvent(type, {key: 'Enter', code: 'Enter', bubbles: true, cancelable: true});
+      Object.defineProperty(ev, 'keyCode', {get: function() { return 13; }});
+      Object.defineProperty(ev, 'which', {get: function() { return 13; }});
+      if (!el.dispatchEvent(ev)) handled = true;
+    });
+    if (!handled && el.form) el.form.requestSubmit();
+  }
+  return true;
+})
+)JS";
+
+void InsertNeuralText(Browser* browser, const std::string& payload) {
+  std::optional<base::Value::Dict> request = base::JSONReader::ReadDict(payload);
+  if (!request) {
+    LOG(WARNING) << "Neural insert-text payload is not a JSON object";
+    return;
+  }
+  content::WebContents* contents =
+      browser->tab_strip_model()->GetActiveWebContents();
+  if (!contents) return;
+
+  const std::string* selector = request->FindString("selector");
+  const std::string* text = request->FindString("text");
+  std::string script = kNeuralInsertTextScript;
+  script += "(" + base::GetQuotedJSONString(selector ? *selector : "") + ", " +
+            base::NumberToString(request->FindInt("index").value_or(0)) + ", " +
+            base::GetQuotedJSONString(text ? *text : "") + ", " +
+            (request->FindBool("submit").value_or(false) ? "true" : "false") +
+            ");";
+  // Isolated world: page scripts can't observe or tamper with the helper.
+  contents->GetPrimaryMainFrame()->ExecuteJavaScriptInIsolatedWorld(
+      base::UTF8ToUTF16(script), base::NullCallback(),
+      ISOLATED_WORLD_ID_CHROME_INTERNAL);
+}
+
+struct NeuralTextQueueHeader {
+  uint32_t magic;
+  uint32_t version;
+  uint32_t capacity;
+  uint32_t overflow_count;  // Written by the agent
+  uint32_t write_cursor;    // Written by the agent
+  uint32_t read_cursor;     // Written by us (ack)
+  uint32_t write_seq;
+  uint32_t read_seq;
+};
+
+struct NeuralTextRecord {
+  uint32_t length;
+  uint16_t kind;
+  uint16_t flags;
+};
+
+}  // namespace
+
 void ToolbarView::InitNeuralInput() {
   if (input_shm_handle_) return; // Already initialized
 
   // Create/Open Shared Memory "NeuralChromium_Input_Text"
-  // 4KB size
   HANDLE hMapFile = CreateFileMappingW(
       INVALID_HANDLE_VALUE,    // use paging file
       NULL,                    // default security
       PAGE_READWRITE,          // read/write access
       0,                       // maximum object size (high-order DWORD)
-      4096,                    // maximum object size (low-order DWORD)
+      kNeuralTextShmSize,      // maximum object size (low-order DWORD)
       L"NeuralChromium_Input_Text"); // name of mapping object
 
   if (hMapFile == NULL) {
@@ -1240,42 +1340,98 @@ void ToolbarView::InitNeuralInput() {
   }
 
   input_shm_handle_ = hMapFile;
-  input_shm_view_ = MapViewOfFile(hMapFile, FILE_MAP_ALL_ACCESS, 0, 0, 4096);
+  input_shm_view_ = MapViewOfFile(hMapFile, FILE_MAP_ALL_ACCESS, 0, 0, kNeuralTextShmSize);
   
   if (input_shm_view_) {
-     // Clear it initially
-     memset(input_shm_view_, 0, 4096);
+     // Clear it initially and publish an empty queue.
+     memset(input_shm_view_, 0, kNeuralTextShmSize);
+     auto* header = static_cast<NeuralTextQueueHeader*>(input_shm_view_);
+     header->version = kNeuralTextQueueVersion;
+     header->capacity = kNeuralTextQueueCapacity;
+     std::atomic_thread_fence(std::memory_order_release);
+     header->magic = kNeuralTextQueueMagic;
   }
 }
 
 void ToolbarView::OnNeuralInputTimer() {
    if (!input_shm_view_ || !location_bar_) return;
-   
-   // Protocol:
-   // Byte 0-3: Revision (uint32)
-   // Byte 4-7: Length (uint32)
-   // Byte 8...: UTF-8 Text
-   
-   uint32_t* revision_ptr = static_cast<uint32_t*>(input_shm_view_);
-   static uint32_t last_revision = 0;
-   
-   uint32_t current_revision = *revision_ptr;
-   if (current_revision != last_revision && current_revision > 0) {
-       last_revision = current_revision;
-       
-       uint32_t length = *(revision_ptr + 1);
-       if (length > 0 && length < 1000) {
-           // Only update if Omnibox is NOT being edited (user is not typing)
-           OmniboxView* omnibox = location_bar_->GetOmniboxView();
-           if (omnibox && !omnibox->IsEditingOrEmpty()) {
-               char* text_ptr = reinterpret_cast<char*>(revision_ptr + 2);
-               std::string utf8_text(text_ptr, length);
-               std::u16string utf16_text = base::UTF8ToUTF16(utf8_text);
-               
-               omnibox->SetUserText(utf16_text);
-           }
+
+   // Drain every message the agent queued since the last tick.
+   // Protocol: see glazyr/text_channel.py (SPSC ring, length-prefixed records).
+   auto* header = static_cast<volatile NeuralTextQueueHeader*>(input_shm_view_);
+   if (header->magic != kNeuralTextQueueMagic ||
+       header->capacity != kNeuralTextQueueCapacity) {
+     return;
+   }
+   const char* ring =
+       static_cast<const char*>(input_shm_view_) + kNeuralTextQueueHeaderSize;
+   const uint32_t mask = kNeuralTextQueueCapacity - 1;
+
+   uint32_t read = header->read_cursor;
+   const uint32_t write = header->write_cursor;
+   std::atomic_thread_fence(std::memory_order_acquire);  // Records before cursor
+
+   uint32_t pending = write - read;
+   if (pending == 0) return;
+   if (pending > kNeuralTextQueueCapacity) {
+     // Corrupt cursors (agent restarted mid-write). Resync to the writer.
+     LOG(WARNING) << "Neural text queue out of sync, dropping " << pending << " bytes";
+     header->read_cursor = write;
+     return;
+   }
+
+   uint32_t consumed = 0;
+   while (read != write) {
+     const uint32_t pos = read & mask;
+     NeuralTextRecord record;
+     memcpy(&record, ring + pos, sizeof(record));
+     const uint32_t record_size = (sizeof(record) + record.length + 7) & ~7u;
+     if (record_size > kNeuralTextQueueCapacity - pos) {
+       LOG(WARNING) << "Neural text queue record overruns ring, resyncing";
+       read = write;
+       break;
+     }
+
+     if (!(record.flags & kNeuralTextFlagPad) &&
+         record.kind == kNeuralTextKindOmniboxText && record.length > 0) {
+       // Only update if Omnibox is NOT being edited (user is not typing)
+       OmniboxView* omnibox = location_bar_->GetOmniboxView();
+       if (omnibox && !omnibox->IsEditingOrEmpty()) {
+         std::string utf8_text(ring + pos + sizeof(record), record.length);
+         omnibox->SetUserText(base::UTF8ToUTF16(utf8_text));
        }
+       ++consumed;
+     } else if (!(record.flags & kNeuralTextFlagPad) &&
+                record.kind == kNeuralTextKindPreconnect && record.length > 0) {
+       // Speculative voice navigation: warm the connection the omnibox text
+       // will most likely hit, same hint the omnibox gives while typing.
+       std::string spec(ring + pos + sizeof(record), record.length);
+       if (spec.find("://") == std::string::npos) {
+         spec = "https://" + spec;
+       }
+       GURL url(spec);
+       auto* predictor =
+           predictors::LoadingPredictorFactory::GetForProfile(browser_->profile());
+       if (predictor && url.is_valid()) {
+         predictor->PrepareForPageLoad(/*initiator_origin=*/std::nullopt, url,
+                                       predictors::HintOrigin::OMNIBOX,
+                                       /*preconnectable=*/true);
+       }
+       ++consumed;
+     } else if (!(record.flags & kNeuralTextFlagPad) &&
+                record.kind == kNeuralTextKindInsertText && record.length > 0) {
+       // Bulk text entry into a page field: one message per field instead of
+       // one OS key event per character.
+       InsertNeuralText(browser_,
+                        std::string(ring + pos + sizeof(record), record.length));
+       ++consumed;
+     }
+     read += record_size;
    }
+
+   std::atomic_thread_fence(std::memory_order_release);
+   header->read_cursor = read;  // Ack: frees ring space for the agent
+   header->read_seq = header->read_seq + consumed;
 }
 
 BEGIN_METADATA(ToolbarView)
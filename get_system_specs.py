@@ -1,18 +1,28 @@
 """
 System Specification Detection Script
-Detects CPU, RAM, and GPU specs for VLM model selection
+Detects CPU, RAM, and GPU specs and shows the models glazyr/autotune.py
+measured on this machine (model choice is benchmarked, not guessed from specs)
 """
 
+import os
 import platform
 import subprocess
-import psutil
+import sys
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "glazyr"))
+from autotune import DEFAULT_PROFILE, PROFILE_ENV, load_profile
 
 def get_cpu_info():
     """Get CPU information"""
     try:
         cpu_name = platform.processor()
-        cpu_cores = psutil.cpu_count(logical=False)
-        cpu_threads = psutil.cpu_count(logical=True)
+        cpu_cores = psutil.cpu_count(logical=False) if psutil else None
+        cpu_threads = psutil.cpu_count(logical=True) if psutil else os.cpu_count()
         return {
             "name": cpu_name,
             "physical_cores": cpu_cores,
@@ -23,6 +33,8 @@ def get_cpu_info():
 
 def get_ram_info():
     """Get RAM information in GB"""
+    if psutil is None:
+        return {"error": "psutil not installed"}
     try:
         ram = psutil.virtual_memory()
         return {
@@ -32,8 +44,30 @@ def get_ram_info():
     except Exception as e:
         return {"error": str(e)}
 
+def get_nvidia_gpus():
+    """Get GPU information from nvidia-smi (Linux/macOS, or Windows without wmic)"""
+    result = subprocess.run(
+        ["nvidia-smi", "--query-gpu=name,memory.total", "--format=csv,noheader,nounits"],
+        capture_output=True,
+        text=True,
+        timeout=5
+    )
+    gpus = []
+    for line in result.stdout.strip().splitlines():
+        name, _, vram_mb = line.rpartition(",")
+        try:
+            gpus.append({"name": name.strip(), "vram_gb": round(int(vram_mb) / 1024, 2)})
+        except ValueError:
+            continue
+    return gpus
+
 def get_gpu_info():
-    """Get GPU information using wmic on Windows"""
+    """Get GPU information using wmic on Windows, nvidia-smi elsewhere"""
+    if platform.system() != "Windows":
+        try:
+            return get_nvidia_gpus() or [{"name": "No GPU detected", "vram_gb": 0}]
+        except Exception as e:
+            return [{"error": str(e)}]
     try:
         # Try to get GPU info via wmic
         result = subprocess.run(
@@ -93,35 +127,21 @@ def print_specs():
             print(f"    VRAM: {gpu.get('vram_gb', 'Unknown')} GB")
     
     print("\n" + "=" * 60)
-    print("\nVLM MODEL RECOMMENDATIONS:")
+    print("\nMODEL PROFILE (measured by glazyr/autotune.py):")
     print("=" * 60)
     
-    # Provide recommendations based on specs
-    total_ram = ram.get('total_gb', 0)
-    gpu_vram = max([g.get('vram_gb', 0) for g in gpus if isinstance(g.get('vram_gb'), (int, float))], default=0)
-    
-    print("\nBased on your hardware:")
-    print(f"  Total RAM: {total_ram} GB")
-    print(f"  GPU VRAM: {gpu_vram} GB")
+    path = os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE
+    if not os.path.exists(path):
+        print("\n⚠️ No autotune profile yet; the agent uses its defaults:")
+    profile = load_profile(path)
     print()
-    
-    if gpu_vram >= 8:
-        print("✅ You can run:")
-        print("  - Llama 3.2 Vision 11B (recommended for better accuracy)")
-        print("  - Moondream (current, lightweight)")
-        print("  - Qwen2-VL 7B")
-    elif gpu_vram >= 4:
-        print("✅ You can run:")
-        print("  - Moondream (current)")
-        print("  - Qwen2-VL 2B")
-        print("  - MiniCPM-V 2.6")
-    elif total_ram >= 16:
-        print("⚠️ Limited GPU VRAM, but sufficient RAM for CPU inference:")
-        print("  - Moondream (current, CPU mode)")
-        print("  - Qwen2-VL 2B (CPU mode, slow)")
-    else:
-        print("⚠️ Limited resources. Stick with:")
-        print("  - Moondream (current, most lightweight)")
+    print(f"  Whisper: {profile['whisper_model']}")
+    print(f"  VLM:     {profile['vlm_model']} ({profile['vlm_thumbnail']}px, JPEG q{profile['jpeg_quality']}, "
+          f"{profile['vlm_max_in_flight']} in flight)")
+    print(f"  LLM:     {profile['llm_model']}")
+    if not os.path.exists(path):
+        print("\nBenchmark the candidates on this machine with:")
+        print("  python glazyr/autotune.py")
     
     print("\n" + "=" * 60)
 
@@ -0,0 +1,164 @@
+"""
+Action Injector
+Executes neural_chromium.Action protos (proto/action.proto) on the local browser.
+
+Navigation and text go through the Text Return Path (shared memory -> Omnibox),
+as do preconnect hints; pointer and keyboard interactions go through pyautogui.
+
+InputActions that carry a selector (text_entry.py) are inserted in bulk: one
+insertText message per field, see KIND_INSERT_TEXT in text_channel.py. Fields
+marked key_events get a focus-only message and are typed in KEY_CHUNK-character
+chunks. Without a selector (plan TYPE steps) the text is typed with pyautogui
+into whatever has focus: the omnibox, an iframe or a native dialog.
+"""
+
+import time
+
+try:
+    import pyautogui
+except ImportError:
+    pyautogui = None
+
+try:
+    import action_pb2
+except ImportError:
+    action_pb2 = None  # Run `make protos` to generate bindings
+
+# CDP-style key names (InteractionAction.key_code) -> pyautogui key names
+KEY_NAMES = {
+    "enter": "enter",
+    "return": "enter",
+    "tab": "tab",
+    "escape": "esc",
+    "esc": "esc",
+    "backspace": "backspace",
+    "delete": "delete",
+    "space": "space",
+    "arrowup": "up",
+    "arrowdown": "down",
+    "arrowleft": "left",
+    "arrowright": "right",
+    "up": "up",
+    "down": "down",
+    "left": "left",
+    "right": "right",
+    "pageup": "pageup",
+    "pagedown": "pagedown",
+    "home": "home",
+    "end": "end",
+}
+
+BULK_CHUNK = 8192  # Characters per insertText message (stays well under the queue's max payload)
+KEY_CHUNK = 64     # Characters per pyautogui.write call on the key-event path
+FOCUS_DELAY = 0.15  # Chrome drains the text queue every 100ms: let a focus-only message land first
+
+
+class ActionInjector:
+    """
+    text_writer: callable(str) -> bool (queued) used for navigation (NeuralAgent.write_text_to_browser).
+    gui: pyautogui-compatible module (injectable for tests).
+    preconnect_writer: optional callable(str) for PreconnectAction (NeuralAgent.preconnect_browser).
+    listener: optional callable(action) run after each dispatched action (trajectory recording).
+    insert_writer: optional callable(selector, text, submit, index) -> bool (queued) for bulk
+                   entry into selector-targeted fields (NeuralAgent.insert_text_browser).
+    """
+
+    def __init__(self, text_writer, gui=None, move_duration=0.0, preconnect_writer=None, listener=None,
+                 insert_writer=None, sleep=time.sleep):
+        self.text_writer = text_writer
+        self.preconnect_writer = preconnect_writer
+        self.listener = listener
+        self.insert_writer = insert_writer
+        self.gui = gui if gui is not None else pyautogui
+        self.move_duration = move_duration
+        self.sleep = sleep
+
+    def execute(self, action):
+        """Runs a single Action. Returns True if it was dispatched."""
+        ok = self._dispatch(action)
+        if ok and self.listener:
+            self.listener(action)
+        return ok
+
+    def _dispatch(self, action):
+        kind = action.WhichOneof('action')
+        if kind == 'navigate':
+            return self._navigate(action.navigate)
+        if kind == 'input':
+            return self._input(action.input)
+        if kind == 'interaction':
+            return self._interaction(action.interaction)
+        if kind == 'preconnect':
+            return self._preconnect(action.preconnect)
+        print(f"⚠️ Injector: unsupported action '{kind}'")
+        return False
+
+    def _navigate(self, nav):
+        if not nav.url:
+            return False
+        return bool(self.text_writer(nav.url))
+
+    def _preconnect(self, pre):
+        if not pre.url or not self.preconnect_writer:
+            return False
+        return bool(self.preconnect_writer(pre.url))
+
+    def _input(self, inp):
+        if inp.selector and self.insert_writer and not inp.key_events:
+            return self._insert(inp)
+        if not self.gui:
+            print("⚠️ Skipping Type (pyautogui missing)")
+            return False
+        if inp.selector and self.insert_writer:
+            # Focus-only message, so the keystrokes land in the resolved field
+            if not self.insert_writer(inp.selector, "", False, inp.selector_index):
+                return False
+            self.sleep(FOCUS_DELAY)
+        for i in range(0, len(inp.text), KEY_CHUNK):
+            self.gui.write(inp.text[i:i + KEY_CHUNK])
+        if inp.submit:
+            self.gui.press("enter")
+        return True
+
+    def _insert(self, inp):
+        """
+        True once every chunk is queued. Chrome doesn't acknowledge inserts, so
+        there is nothing to fall back on: a chunk that can't be queued fails the
+        action (typing instead would land wherever focus happens to be).
+        """
+        text = inp.text
+        chunks = [text[i:i + BULK_CHUNK] for i in range(0, len(text), BULK_CHUNK)] or [""]
+        for n, chunk in enumerate(chunks):
+            # Later chunks re-focus the same field; the caret is already after the previous chunk
+            submit = inp.submit and n == len(chunks) - 1
+            if not self.insert_writer(inp.selector, chunk, submit, inp.selector_index):
+                if n:
+                    print("⚠️ Bulk text entry failed part-way; not retyping over it")
+                return False
+        return True
+
+    def _interaction(self, it):
+        if not self.gui:
+            print("⚠️ Skipping Interaction (pyautogui missing)")
+            return False
+        T = action_pb2.InteractionAction
+        if it.type in (T.CLICK_LEFT, T.CLICK_RIGHT, T.CLICK_MIDDLE, T.DCLICK_LEFT):
+            button = {T.CLICK_RIGHT: "right", T.CLICK_MIDDLE: "middle"}.get(it.type, "left")
+            clicks = 2 if it.type == T.DCLICK_LEFT else 1
+            self.gui.moveTo(it.x, it.y, duration=self.move_duration)
+            self.gui.click(clicks=clicks, button=button)
+            return True
+        if it.type == T.HOVER:
+            self.gui.moveTo(it.x, it.y, duration=self.move_duration)
+            return True
+        if it.type == T.SCROLL:
+            # Proto deltas follow DOM convention (positive = down), pyautogui is the opposite.
+            self.gui.scroll(-it.scroll_dy)
+            if it.scroll_dx:
+                self.gui.hscroll(it.scroll_dx)
+            return True
+        if it.type == T.KEY_PRESS:
+            key = KEY_NAMES.get(it.key_code.lower(), it.key_code.lower())
+            self.gui.press(key)
+            return True
+        return False
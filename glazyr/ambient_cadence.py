@@ -0,0 +1,83 @@
+"""
+Ambient Cadence
+Decides when the agent's background "describe the screen" VLM request is worth
+sending, instead of a fixed one per second.
+
+  scene change   fingerprint distance (frame_delta) from the last captioned
+                 frame >= change_threshold: query after min_interval and reset
+                 the backoff
+  static screen  interval doubles after every caption, up to max_interval
+  load           skip while the VLM scheduler already has max_queue requests
+                 waiting; never query faster than latency_factor x the recent
+                 round trip (EMA), so a slow model isn't fed a backlog
+
+A caption that was due but skipped for load counts once per interval in
+ambient_vlm_skipped_total (not once per frame while the queue stays busy).
+
+rate() is the effective ambient rate (Hz) the agent exports as a gauge.
+"""
+
+import time
+
+from frame_delta import fingerprint_distance
+
+
+class AmbientCadence:
+    def __init__(self, min_interval=1.0, max_interval=30.0, backoff=2.0, change_threshold=0.02,
+                 max_queue=1, latency_factor=2.0, latency_alpha=0.3, metrics=None, clock=time.monotonic):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.change_threshold = change_threshold
+        self.max_queue = max_queue
+        self.latency_factor = latency_factor
+        self.latency_alpha = latency_alpha
+        self.clock = clock
+        self.interval = min_interval   # Static-screen interval (grows with backoff)
+        self.latency = None            # EMA of ambient round trips, seconds
+        self.last_query = None
+        self.last_fingerprint = None
+        self.last_skip = None
+        self.m_skipped = None
+        if metrics is not None:
+            self.m_skipped = metrics.counter("ambient_vlm_skipped_total",
+                                             "Due ambient captions skipped while the VLM queue was busy")
+
+    def effective_interval(self):
+        interval = self.interval
+        if self.latency is not None:
+            interval = max(interval, self.latency_factor * self.latency)
+        return min(interval, self.max_interval)
+
+    def rate(self):
+        return 1.0 / self.effective_interval()
+
+    def observe_latency(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.latency_alpha * (seconds - self.latency)
+
+    def should_query(self, fingerprint, queue_depth=0):
+        """
+        Call on every new frame. Returns True (and records the query) when an
+        ambient caption should be requested for this frame.
+        """
+        now = self.clock()
+        changed = fingerprint_distance(fingerprint, self.last_fingerprint) >= self.change_threshold
+        if changed:
+            self.interval = self.min_interval  # Fresh page: get back to full speed
+        interval = self.effective_interval()
+        if self.last_query is not None and now - self.last_query < interval:
+            return False
+        if queue_depth >= self.max_queue:
+            if self.last_skip is None or now - self.last_skip >= interval:
+                self.last_skip = now
+                if self.m_skipped is not None:
+                    self.m_skipped.inc()
+            return False
+        if not changed and self.last_query is not None:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+        self.last_query = now
+        self.last_fingerprint = fingerprint
+        return True
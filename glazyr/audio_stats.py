@@ -0,0 +1,96 @@
+"""
+Audio Stats
+Per-chunk gain/VAD and per-utterance level statistics without extra passes.
+
+  chunk_rms        one dot product (no squared temporary)
+  agc_gain         the chunk AGC; boosted RMS is rms * gain, not a second pass
+  AudioStats       running sum of squares, peak and a log-spaced histogram of
+                   |x|, updated as chunks are buffered. quantile() reads p95 off
+                   the histogram (bins are ~6% wide, plenty for a gain target).
+  normalize        one in-place multiply + clip of the utterance buffer, gain
+                   taken from the running p95
+
+Usage:
+    stats = AudioStats()
+    stats.add(chunk)                           # as each chunk is buffered
+    gain = normalize(audio, stats)             # audio: writable float32 buffer
+"""
+
+import numpy as np
+
+AGC_TARGET = 0.1    # Chunk RMS the AGC aims for
+AGC_FLOOR = 0.0001  # Below this a chunk is silence: no boost
+AGC_MAX_GAIN = 30.0  # Cap to avoid noise explosion
+
+NORM_TARGET = 0.5   # Utterance p95 maps to 50% amplitude
+NORM_QUIET = 0.0001  # p95 below this: "very quiet", fixed QUIET_GAIN
+QUIET_GAIN = 1000.0
+
+# |x| histogram: 240 log bins over 1e-6..1 (+ underflow/overflow), ~5.9% per bin
+HIST_MIN_EXP, HIST_MAX_EXP, HIST_BINS = -6, 0, 240
+HIST_EDGES = np.logspace(HIST_MIN_EXP, HIST_MAX_EXP, HIST_BINS + 1).astype(np.float32)
+
+
+def chunk_rms(x):
+    if len(x) == 0:
+        return 0.0
+    return float(np.sqrt(np.dot(x, x) / len(x)))
+
+
+def agc_gain(rms, target=AGC_TARGET, floor=AGC_FLOOR, max_gain=AGC_MAX_GAIN):
+    if floor < rms < target:
+        return min(target / rms, max_gain)
+    return 1.0
+
+
+class AudioStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.sum_sq = 0.0
+        self.peak = 0.0
+        self.hist = np.zeros(HIST_BINS + 2, dtype=np.int64)  # [underflow, bins..., overflow]
+
+    def add(self, chunk, sum_sq=None):
+        """chunk: float32 samples. sum_sq: pass np.dot(chunk, chunk) if already computed."""
+        n = len(chunk)
+        if n == 0:
+            return
+        mag = np.abs(chunk)
+        self.count += n
+        self.sum_sq += float(np.dot(chunk, chunk)) if sum_sq is None else sum_sq
+        self.peak = max(self.peak, float(mag.max()))
+        self.hist += np.bincount(np.searchsorted(HIST_EDGES, mag, side="right"), minlength=HIST_BINS + 2)
+
+    @property
+    def rms(self):
+        return float(np.sqrt(self.sum_sq / self.count)) if self.count else 0.0
+
+    def quantile(self, q):
+        """Approximate quantile of |x| (geometric midpoint of the bin it falls in)."""
+        if not self.count:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.hist), q * self.count, side="left"))
+        if i == 0:
+            return 0.0  # Below 1e-6, the histogram floor (not necessarily silence: see peak)
+        if i > HIST_BINS:
+            return self.peak
+        return min(float(np.sqrt(HIST_EDGES[i - 1] * HIST_EDGES[i])), self.peak)
+
+
+def normalize(audio, stats, target=NORM_TARGET, quiet=NORM_QUIET, quiet_gain=QUIET_GAIN):
+    """
+    Scales `audio` (writable float32) in place so its p95 sits at `target`, clipped
+    to -1..1. Returns the gain, or 0.0 for absolute silence (audio untouched).
+    Silence is decided by the exact peak: a p95 under the histogram floor still
+    gets the quiet boost.
+    """
+    if stats.peak == 0:
+        return 0.0
+    p95 = stats.quantile(0.95)
+    gain = target / p95 if p95 > quiet else quiet_gain
+    np.multiply(audio, np.float32(gain), out=audio)
+    np.clip(audio, -1.0, 1.0, out=audio)
+    return gain
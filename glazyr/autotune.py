@@ -0,0 +1,342 @@
+"""
+Model Autotuner
+Micro-benchmarks the candidate models on this machine and writes a profile
+that NeuralAgent loads at startup, instead of hard-coded model names.
+
+Measured per candidate:
+  whisper   load time and real-time factor on recorded or synthetic audio
+  vlm       grounding latency (p50/p95) and valid-reply rate per thumbnail
+            size x JPEG quality, then throughput at 1..N requests in flight
+  llm       plan latency and whether the reply parses into steps
+
+Choice: the fastest candidate whose valid-reply rate is >= min_valid and
+whose p95 fits the budget; if none fits, the most reliable then fastest one.
+The largest thumbnail/quality that still fits the budget wins (grounding
+accuracy grows with resolution). Concurrency is raised only while throughput
+improves by >= 20% without pushing p95 past the budget.
+
+Profile (JSON, default glazyr/autotune_profile.json or $NEURAL_AUTOTUNE_PROFILE):
+  {"whisper_model", "vlm_model", "llm_model", "vlm_thumbnail", "jpeg_quality",
+   "vlm_max_in_flight", "host": {...}, "measurements": {...}}
+
+Usage:
+    python autotune.py                          # real Ollama at $OLLAMA_URL
+    python autotune.py --stub --stub-latency-ms 40   # pipeline check without a GPU
+    python autotune.py --frame debug_captures/<session>/000001_frame.png --audio utterance.wav
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+PROFILE_ENV = "NEURAL_AUTOTUNE_PROFILE"
+DEFAULT_PROFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "autotune_profile.json")
+
+WHISPER_CANDIDATES = ("tiny.en", "base.en", "small.en")
+VLM_CANDIDATES = ("moondream", "qwen2.5vl:3b", "llava-phi3")
+LLM_CANDIDATES = ("llama3", "qwen2.5-coder:1.5b", "mistral")
+THUMBNAILS = (384, 512, 768)
+JPEG_QUALITIES = (50, 70)
+
+# Agent defaults when there is no profile (or a key is missing)
+DEFAULTS = {
+    "whisper_model": "small.en",
+    "vlm_model": "moondream",
+    "llm_model": "llama3",
+    "vlm_thumbnail": 512,
+    "jpeg_quality": 50,
+    "vlm_max_in_flight": 1,
+    "vlm_fallback_model": None,  # Grounding ladder's alt_model rung (grounding.py)
+}
+
+
+def load_profile(path=None):
+    """DEFAULTS overlaid with the saved profile (missing/corrupt file -> DEFAULTS)."""
+    path = path or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE
+    profile = dict(DEFAULTS)
+    try:
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return profile
+    profile.update({k: saved[k] for k in DEFAULTS if k in saved})
+    return profile
+
+
+def host_info():
+    info = {"platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count()}
+    try:
+        import psutil
+        info["ram_gb"] = round(psutil.virtual_memory().total / (1024 ** 3), 1)
+    except ImportError:
+        pass
+    return info
+
+
+def percentile(samples, q):
+    return float(np.percentile(samples, q)) if samples else None
+
+
+def summarize(latencies, valid, failures=0):
+    runs = len(latencies) + failures
+    return {
+        "runs": runs,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "valid_rate": valid / runs if runs else 0.0,
+        "failures": failures,
+    }
+
+
+# --- Inputs ---
+
+def load_frame(path=None, width=1280, height=720):
+    """PIL RGB screenshot: a capture from disk, or the synthetic test pattern."""
+    from PIL import Image
+    if path:
+        return Image.open(path).convert("RGB")
+    from synthetic_producer import pattern_frame
+    bgra = pattern_frame(width, height, 0.5)
+    return Image.fromarray(bgra[:, :, [2, 1, 0]], "RGB")
+
+
+def load_audio(path=None, seconds=3.0, rate=16000):
+    """16kHz float32: a WAV (16-bit mono at 16kHz, e.g. a debug capture) or a synthetic tone."""
+    if path:
+        with wave.open(path) as w:
+            if w.getframerate() != rate or w.getnchannels() != 1 or w.getsampwidth() != 2:
+                raise ValueError("autotune audio must be 16-bit mono 16kHz WAV")
+            return np.frombuffer(w.readframes(w.getnframes()), dtype='<i2').astype(np.float32) / 32767
+    from synthetic_producer import tone
+    return tone(int(seconds * rate), rate, 0.0, amplitude=0.1)
+
+
+def encode_jpeg(image, size, quality):
+    img = image.copy()
+    img.thumbnail((size, size))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+
+# --- Benchmarks ---
+
+def _generate(url, payload, timeout):
+    import requests
+    start = time.perf_counter()
+    response = requests.post(url, json=payload, timeout=timeout)
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return response.json().get("response", ""), elapsed
+
+
+def bench_vlm(url, model, image, sizes=THUMBNAILS, qualities=JPEG_QUALITIES, runs=3, timeout=60.0):
+    """{(size, quality) label: summary} for grounding prompts."""
+    from grounding import GROUNDING_PROMPT, parse_grounding
+    prompt = GROUNDING_PROMPT.format(target="search box")
+    results = {}
+    for size in sizes:
+        for quality in qualities:
+            img_b64 = encode_jpeg(image, size, quality)
+            latencies, valid, failures = [], 0, 0
+            for _ in range(runs):
+                try:
+                    text, elapsed = _generate(url, {"model": model, "prompt": prompt, "images": [img_b64],
+                                                    "stream": False}, timeout)
+                except Exception:
+                    failures += 1
+                    continue
+                latencies.append(elapsed)
+                valid += parse_grounding(text, 1000, 1000) is not None
+            results[f"{size}q{quality}"] = dict(summarize(latencies, valid, failures), size=size, quality=quality)
+    return results
+
+
+def bench_concurrency(url, model, image, size, quality, levels=(1, 2, 4), requests_per_level=4, timeout=60.0):
+    """{in_flight: {"throughput", "p95"}} with `in_flight` requests sent at once."""
+    from grounding import GROUNDING_PROMPT
+    payload = {"model": model, "prompt": GROUNDING_PROMPT.format(target="search box"),
+               "images": [encode_jpeg(image, size, quality)], "stream": False}
+    results = {}
+    for level in levels:
+        n = max(level, requests_per_level)
+        latencies = []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            for future in [pool.submit(_generate, url, payload, timeout) for _ in range(n)]:
+                try:
+                    latencies.append(future.result()[1])
+                except Exception:
+                    pass
+        wall = time.perf_counter() - start
+        results[level] = {"throughput": len(latencies) / wall if wall > 0 else 0.0, "p95": percentile(latencies, 95)}
+    return results
+
+
+def bench_llm(url, model, runs=2, timeout=120.0):
+    from plan_executor import PLAN_PROMPT, parse_plan
+    prompt = PLAN_PROMPT.format(command="search for neural chromium on github")
+    latencies, valid, failures = [], 0, 0
+    for _ in range(runs):
+        try:
+            text, elapsed = _generate(url, {"model": model, "prompt": prompt, "stream": False}, timeout)
+        except Exception:
+            failures += 1
+            continue
+        latencies.append(elapsed)
+        valid += bool(parse_plan(text))
+    return summarize(latencies, valid, failures)
+
+
+def bench_whisper(name, audio, runs=2):
+    try:
+        import whisper
+    except ImportError:
+        return {"error": "openai-whisper not installed"}
+    start = time.perf_counter()
+    model = whisper.load_model(name)
+    load = time.perf_counter() - start
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.transcribe(audio, language="en", fp16=False, condition_on_previous_text=False)
+        latencies.append(time.perf_counter() - start)
+    result = summarize(latencies, len(latencies))
+    result["load_s"] = load
+    result["rtf"] = result["p50"] / (len(audio) / 16000)  # < 1.0: faster than real time
+    return result
+
+
+# --- Selection ---
+
+def pick(candidates, budget, min_valid=0.8):
+    """candidates: {name: summary}. Returns the chosen name (or None)."""
+    usable = {k: v for k, v in candidates.items() if v.get("p50") is not None}
+    if not usable:
+        return None
+    fits = [k for k, v in usable.items() if v["valid_rate"] >= min_valid and v["p95"] <= budget]
+    if fits:
+        return min(fits, key=lambda k: usable[k]["p50"])
+    return min(usable, key=lambda k: (-usable[k]["valid_rate"], usable[k]["p50"]))
+
+
+def pick_variant(variants, budget, min_valid=0.8):
+    """Largest thumbnail (then quality) that fits; else the fastest valid one."""
+    usable = {k: v for k, v in variants.items() if v.get("p50") is not None}
+    fits = [k for k, v in usable.items() if v["valid_rate"] >= min_valid and v["p95"] <= budget]
+    if fits:
+        return max(fits, key=lambda k: (usable[k]["size"], usable[k]["quality"]))
+    return pick(usable, budget, min_valid)
+
+
+def pick_concurrency(levels, budget, gain=1.2):
+    best = 1
+    for level in sorted(levels):
+        stats, current = levels[level], levels[best]
+        if level == 1 or stats["p95"] is None or stats["p95"] > budget:
+            continue
+        if stats["throughput"] >= current["throughput"] * gain:
+            best = level
+    return best
+
+
+def autotune(url, vlm_models=VLM_CANDIDATES, llm_models=LLM_CANDIDATES, whisper_models=WHISPER_CANDIDATES,
+             image=None, audio=None, vlm_budget=3.0, llm_budget=10.0, whisper_rtf=0.5, runs=3,
+             sizes=THUMBNAILS, qualities=JPEG_QUALITIES, levels=(1, 2, 4), log=print):
+    image = image if image is not None else load_frame()
+    audio = audio if audio is not None else load_audio()
+    profile = dict(DEFAULTS)
+    measurements = {"vlm": {}, "llm": {}, "whisper": {}}
+
+    for model in vlm_models:
+        log(f"👁️ VLM {model}...")
+        measurements["vlm"][model] = bench_vlm(url, model, image, sizes, qualities, runs)
+    # Rank models on their best variant
+    best_variant = {m: pick_variant(v, vlm_budget) for m, v in measurements["vlm"].items()}
+    vlm = pick({m: measurements["vlm"][m][best_variant[m]] for m in vlm_models if best_variant[m]}, vlm_budget)
+    if vlm:
+        variant = measurements["vlm"][vlm][best_variant[vlm]]
+        profile.update(vlm_model=vlm, vlm_thumbnail=variant["size"], jpeg_quality=variant["quality"])
+        log(f"⚡ VLM {vlm}: concurrency sweep...")
+        conc = bench_concurrency(url, vlm, image, variant["size"], variant["quality"], levels)
+        measurements["vlm_concurrency"] = {str(k): v for k, v in conc.items()}
+        profile["vlm_max_in_flight"] = pick_concurrency(conc, vlm_budget)
+        # Runner-up: a different model to retry degenerate grounding replies with
+        profile["vlm_fallback_model"] = pick({m: measurements["vlm"][m][best_variant[m]]
+                                              for m in vlm_models if best_variant[m] and m != vlm}, vlm_budget)
+
+    for model in llm_models:
+        log(f"🧠 LLM {model}...")
+        measurements["llm"][model] = bench_llm(url, model, runs=max(1, runs - 1))
+    llm = pick(measurements["llm"], llm_budget)
+    if llm:
+        profile["llm_model"] = llm
+
+    for name in whisper_models:
+        log(f"🎙️ Whisper {name}...")
+        measurements["whisper"][name] = bench_whisper(name, audio, runs=max(1, runs - 1))
+    # Whisper: the largest model that is still comfortably faster than real time
+    fast = [n for n in whisper_models if measurements["whisper"][n].get("rtf") is not None
+            and measurements["whisper"][n]["rtf"] <= whisper_rtf]
+    if fast:
+        profile["whisper_model"] = fast[-1]
+
+    profile["host"] = host_info()
+    profile["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    profile["budgets"] = {"vlm_p95_s": vlm_budget, "llm_p95_s": llm_budget, "whisper_rtf": whisper_rtf}
+    profile["measurements"] = measurements
+    return profile
+
+
+def save_profile(profile, path=None):
+    path = path or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark candidate models and write the agent's model profile")
+    parser.add_argument("--url", default=os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate"))
+    parser.add_argument("--vlm", nargs="*", default=list(VLM_CANDIDATES))
+    parser.add_argument("--llm", nargs="*", default=list(LLM_CANDIDATES))
+    parser.add_argument("--whisper", nargs="*", default=list(WHISPER_CANDIDATES))
+    parser.add_argument("--frame", help="screenshot to ground on (default: synthetic pattern)")
+    parser.add_argument("--audio", help="16kHz mono WAV for Whisper (default: synthetic tone)")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--vlm-budget", type=float, default=3.0, help="p95 seconds per grounding call")
+    parser.add_argument("--llm-budget", type=float, default=10.0, help="p95 seconds per plan")
+    parser.add_argument("--stub", action="store_true", help="benchmark against stub_vlm_server (pipeline check)")
+    parser.add_argument("--stub-latency-ms", type=float, default=40.0)
+    parser.add_argument("--output", default=None, help=f"profile path (default: ${PROFILE_ENV} or {DEFAULT_PROFILE})")
+    args = parser.parse_args()
+
+    stub = None
+    url = args.url
+    if args.stub:
+        from stub_vlm_server import StubVlmServer
+        stub = StubVlmServer(latency_ms=args.stub_latency_ms).start()
+        url = stub.url
+    try:
+        profile = autotune(url, args.vlm, args.llm, args.whisper, image=load_frame(args.frame),
+                           audio=load_audio(args.audio), vlm_budget=args.vlm_budget, llm_budget=args.llm_budget,
+                           runs=args.runs)
+    finally:
+        if stub:
+            stub.stop()
+    path = save_profile(profile, args.output)
+    print(f"\n✅ Profile -> {path}")
+    for key in DEFAULTS:
+        print(f"  {key}: {profile[key]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""
+CDP Pool
+Persistent Chrome DevTools Protocol sessions: one WebSocket per target, kept
+open across calls, with any number of commands in flight on it.
+
+  CDPSession    multiplexes commands by id (a reader task resolves each
+                response's future), so N independent commands cost ~1 round
+                trip instead of N. batch() writes a whole list of commands
+                before awaiting any reply. Events go to subscribers by method
+                (on / wait_for).
+  CDPPool       target id -> CDPSession; targets come from /json/list. A
+                session that dropped is reconnected on next use.
+  BlockingCDP   the same from synchronous code: the pool runs on its own
+                event loop thread (the agent is threaded, not async).
+
+Transport: the `websockets` package when installed, else a small RFC 6455
+client on asyncio streams (text frames, ping/pong, fragmentation: all CDP
+needs). stub_cdp_server.py speaks the same framing for tests.
+
+Usage:
+    cdp = BlockingCDP(port=9222)
+    focus, _ = cdp.batch([("Runtime.evaluate", {"expression": "document.querySelector('#q').focus()"}),
+                          ("Input.insertText", {"text": "neural chromium"})])
+    cdp.call("Page.navigate", url="https://example.com")
+"""
+
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+try:
+    import websockets
+except ImportError:
+    websockets = None  # Built-in transport below
+
+DEFAULT_PORT = 9222
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MAX_MESSAGE = 256 * 1024 * 1024  # DOM snapshots and screenshots are large
+
+
+class CDPError(Exception):
+    """Error reply from the browser ({"error": {"code", "message"}})."""
+
+    def __init__(self, method, code, message):
+        super().__init__(f"{method}: {message} ({code})")
+        self.method = method
+        self.code = code
+
+
+class ConnectionClosed(Exception):
+    """The WebSocket went away (browser closed the target, or we did)."""
+
+
+# --- Minimal WebSocket framing (RFC 6455) ---
+
+def _mask(payload, key):
+    n = len(payload)
+    if not n:
+        return payload
+    stream = (key * (n // 4 + 1))[:n]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(stream, "big")).to_bytes(n, "big")
+
+
+def encode_frame(opcode, payload, mask):
+    """One FIN frame. Clients must mask (mask=True), servers must not."""
+    head = bytearray([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    n = len(payload)
+    if n < 126:
+        head.append(bit | n)
+    elif n < 1 << 16:
+        head.append(bit | 126)
+        head += struct.pack("!H", n)
+    else:
+        head.append(bit | 127)
+        head += struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        return bytes(head) + key + _mask(payload, key)
+    return bytes(head) + payload
+
+
+async def read_frame(reader):
+    """-> (fin, opcode, payload), unmasking if the peer masked."""
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if n > MAX_MESSAGE:
+        raise ConnectionClosed(f"frame of {n} bytes")
+    key = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(n)
+    return bool(b0 & 0x80), b0 & 0x0F, _mask(payload, key) if key else payload
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+
+class FramedSocket:
+    """Message-level send/recv over read_frame/encode_frame (either side)."""
+
+    def __init__(self, reader, writer, client=True):
+        self.reader = reader
+        self.writer = writer
+        self.client = client
+        self.closed = False
+
+    async def send(self, text):
+        if self.closed:
+            raise ConnectionClosed("send on closed socket")
+        data = text.encode("utf-8") if isinstance(text, str) else text
+        self.writer.write(encode_frame(OP_TEXT if isinstance(text, str) else OP_BINARY, data, self.client))
+        await self.writer.drain()
+
+    async def recv(self):
+        parts = []
+        while True:
+            try:
+                fin, opcode, payload = await read_frame(self.reader)
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                self.closed = True
+                raise ConnectionClosed(str(e) or "connection lost")
+            if opcode == OP_PING:
+                self.writer.write(encode_frame(OP_PONG, payload, self.client))
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                if not self.closed:
+                    self.closed = True
+                    self.writer.write(encode_frame(OP_CLOSE, payload[:2], self.client))
+                raise ConnectionClosed("closed by peer")
+            parts.append(payload)
+            if fin:
+                data = b"".join(parts)
+                return data.decode("utf-8") if opcode in (OP_TEXT, OP_CONT) else data
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                self.writer.write(encode_frame(OP_CLOSE, struct.pack("!H", 1000), self.client))
+                await self.writer.drain()
+            except ConnectionError:
+                pass
+        self.writer.close()
+
+
+async def open_websocket(url, timeout=5.0):
+    """ws:// URL -> object with send/recv/close coroutines."""
+    if websockets is not None:
+        return await asyncio.wait_for(websockets.connect(url, max_size=MAX_MESSAGE, ping_interval=None), timeout)
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != "ws":
+        raise ValueError(f"built-in transport only speaks ws:// (got {url}); install websockets for wss")
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, parts.port or 80, limit=MAX_MESSAGE), timeout)
+    key = base64.b64encode(os.urandom(16)).decode()
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    writer.write((f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    head = (await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout)).decode("latin-1")
+    status, *lines = head.split("\r\n")
+    headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines if line)}
+    if status.split()[1:2] != ["101"] or headers.get("sec-websocket-accept") != accept_key(key):
+        writer.close()
+        raise ConnectionClosed(f"handshake rejected: {status}")
+    return FramedSocket(reader, writer, client=True)
+
+
+# --- Sessions ---
+
+class CDPSession:
+    """
+    One WebSocket to one target.
+    connect: coroutine(url) -> socket (open_websocket; injectable for tests).
+    """
+
+    def __init__(self, url, connect=open_websocket, timeout=30.0, metrics=None):
+        self.url = url
+        self.connect = connect
+        self.timeout = timeout
+        self.ws = None
+        self._ids = itertools.count(1)
+        self._pending = {}      # id -> (future, method, start)
+        self._subscribers = {}  # method -> [callback]
+        self._reader = None
+
+        self.m_commands = self.m_errors = self.m_seconds = self.m_in_flight = self.m_events = None
+        if metrics is not None:
+            self.m_commands = metrics.counter("cdp_commands_total", "CDP commands sent")
+            self.m_errors = metrics.counter("cdp_errors_total", "CDP commands that failed (error reply, timeout, disconnect)")
+            self.m_seconds = metrics.histogram("cdp_command_seconds", "CDP command round trip")
+            self.m_in_flight = metrics.gauge("cdp_in_flight", "CDP commands awaiting a reply")
+            self.m_events = metrics.counter("cdp_events_total", "CDP events received")
+
+    @property
+    def connected(self):
+        return self._reader is not None and not self._reader.done()
+
+    async def open(self):
+        if not self.connected:
+            self.ws = await self.connect(self.url)
+            self._reader = asyncio.get_running_loop().create_task(self._read_loop())
+        return self
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._fail_pending(ConnectionClosed("session closed"))
+
+    # --- Commands ---
+
+    async def _start(self, method, params, session_id):
+        """Writes one command; returns its future (the reply resolves it)."""
+        await self.open()
+        msg_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = (future, method, time.monotonic())
+        message = {"id": msg_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id  # Flattened child session (Target.attachToTarget)
+        if self.m_commands is not None:
+            self.m_commands.inc()
+            self.m_in_flight.set(len(self._pending))
+        try:
+            await self.ws.send(json.dumps(message))
+        except Exception as e:
+            self._pending.pop(msg_id, None)
+            raise ConnectionClosed(f"{method}: {e}")
+        return msg_id, future
+
+    async def _finish(self, msg_id, future, timeout):
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except Exception:
+            if self.m_errors is not None:
+                self.m_errors.inc()
+            raise
+        finally:
+            self._pending.pop(msg_id, None)
+
+    async def send(self, method, params=None, session_id=None, timeout=None):
+        """One command -> its result dict. Raises CDPError on an error reply."""
+        msg_id, future = await self._start(method, params, session_id)
+        return await self._finish(msg_id, future, timeout)
+
+    async def batch(self, commands, session_id=None, timeout=None, return_exceptions=False):
+        """
+        commands: [(method, params)]. All are written before any reply is awaited,
+        so the batch costs one round trip plus the browser's processing time.
+        CDP runs a target's commands in order, so later commands see earlier effects.
+        Results come back in order; with return_exceptions, failures are returned
+        in place instead of raised.
+        """
+        started = [await self._start(method, params, session_id) for method, params in commands]
+        return await asyncio.gather(*(self._finish(msg_id, future, timeout) for msg_id, future in started),
+                                    return_exceptions=return_exceptions)
+
+    # --- Events ---
+
+    def on(self, method, callback):
+        """callback(params) for every `method` event (plain function or coroutine). Returns an unsubscribe callable."""
+        callbacks = self._subscribers.setdefault(method, [])
+        callbacks.append(callback)
+
+        def unsubscribe():
+            if callback in callbacks:
+                callbacks.remove(callback)
+        return unsubscribe
+
+    async def wait_for(self, method, predicate=None, timeout=None):
+        """Params of the next `method` event (matching predicate)."""
+        future = asyncio.get_running_loop().create_future()
+
+        def callback(params):
+            if not future.done() and (predicate is None or predicate(params)):
+                future.set_result(params)
+
+        unsubscribe = self.on(method, callback)
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        finally:
+            unsubscribe()
+
+    # --- Reader ---
+
+    async def _read_loop(self):
+        try:
+            while True:
+                message = json.loads(await self.ws.recv())
+                if "id" in message:
+                    self._resolve(message)
+                elif "method" in message:
+                    self._dispatch(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail_pending(e if isinstance(e, ConnectionClosed) else ConnectionClosed(str(e)))
+
+    def _resolve(self, message):
+        entry = self._pending.get(message["id"])
+        if entry is None:
+            return  # Timed out already
+        future, method, start = entry
+        if self.m_seconds is not None:
+            self.m_seconds.observe(time.monotonic() - start)
+            self.m_in_flight.set(len(self._pending) - 1)
+        if future.done():
+            return
+        if "error" in message:
+            error = message["error"]
+            future.set_exception(CDPError(method, error.get("code"), error.get("message", "")))
+        else:
+            future.set_result(message.get("result", {}))
+
+    def _dispatch(self, message):
+        if self.m_events is not None:
+            self.m_events.inc()
+        params = message.get("params", {})
+        for callback in list(self._subscribers.get(message["method"], ())):
+            try:
+                result = callback(params)
+                if asyncio.iscoroutine(result):
+                    asyncio.get_running_loop().create_task(result)
+            except Exception as e:
+                print(f"⚠️ CDP event handler for {message['method']} failed: {e}")
+
+    def _fail_pending(self, error):
+        for future, _, _ in list(self._pending.values()):
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        if self.m_in_flight is not None:
+            self.m_in_flight.set(0)
+
+
+class CDPPool:
+    """
+    Persistent sessions keyed by target id (or page websocket URL).
+    fetch_json: callable(url) -> parsed JSON (injectable for tests).
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, connect=open_websocket, fetch_json=None,
+                 timeout=30.0, metrics=None):
+        self.host = host
+        self.port = port
+        self.connect = connect
+        self.fetch_json = fetch_json or _fetch_json
+        self.timeout = timeout
+        self.metrics = metrics
+        self.sessions = {}
+        self._lock = None
+        self.m_reconnects = metrics.counter("cdp_reconnects_total", "CDP sessions re-opened after a drop") if metrics else None
+
+    async def targets(self, type="page"):
+        url = f"http://{self.host}:{self.port}/json/list"
+        listing = await asyncio.get_running_loop().run_in_executor(None, self.fetch_json, url)
+        return [t for t in listing if type is None or t.get("type") == type]
+
+    async def session(self, target=None):
+        """
+        target: target id, a ws:// URL, or None for the first page target.
+        Returns an open CDPSession, reusing (or reconnecting) the pooled one;
+        /json/list is only consulted the first time a target is seen.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            session = self.sessions.get(target)
+            if session is None:
+                url = target if target and target.startswith(("ws://", "wss://")) else await self._resolve(target)
+                session = self.sessions[target] = CDPSession(url, self.connect, self.timeout, self.metrics)
+            elif not session.connected and self.m_reconnects is not None:
+                self.m_reconnects.inc()
+            return await session.open()
+
+    async def _resolve(self, target_id):
+        for t in await self.targets():
+            if target_id is None or t.get("id") == target_id:
+                return t["webSocketDebuggerUrl"]
+        raise LookupError(f"no page target {target_id!r} on {self.host}:{self.port}")
+
+    async def send(self, method, params=None, target=None, **kw):
+        return await (await self.session(target)).send(method, params, **kw)
+
+    async def batch(self, commands, target=None, **kw):
+        return await (await self.session(target)).batch(commands, **kw)
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+
+
+def _fetch_json(url):
+    with urllib.request.urlopen(url, timeout=5) as r:
+        return json.loads(r.read())
+
+
+class BlockingCDP:
+    """CDPPool for synchronous callers; the pool lives on a private event loop thread."""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, target=None, **pool_kwargs):
+        self.target = target
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True, name="cdp-pool")
+        self._thread.start()
+        self.pool = CDPPool(host, port, **pool_kwargs)
+
+    def _run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def call(self, method, target=None, timeout=None, **params):
+        return self._run(self.pool.send(method, params, target=target or self.target, timeout=timeout))
+
+    def batch(self, commands, target=None, timeout=None, return_exceptions=False):
+        return self._run(self.pool.batch(commands, target=target or self.target, timeout=timeout,
+                                         return_exceptions=return_exceptions))
+
+    def on(self, method, callback, target=None):
+        """callback runs on the pool thread."""
+        async def subscribe():
+            return (await self.pool.session(target or self.target)).on(method, callback)
+        return self._run(subscribe())
+
+    def close(self):
+        try:
+            self._run(self.pool.close(), timeout=5)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self.loop.close()
@@ -0,0 +1,216 @@
+"""
+Debug Capture
+Frame/audio/image dumps for debugging, written off the agent's hot path.
+
+Callers only enqueue (a queue put, no I/O); one background thread encodes
+and writes. The queue is bounded: when the disk can't keep up, captures are
+dropped and counted instead of stalling a turn.
+
+  per-session dirs   <root>/<YYYYmmdd_HHMMSS>_<pid>/, oldest sessions beyond
+                     max_sessions are deleted at startup
+  sampling           at most one frame per frame_interval seconds per tag
+                     (the first frame is always kept, like the old sanity PNG)
+  retention          per-session byte and file caps; oldest files go first
+  encoders           "png" with compress_level=1 (fast, ~3x larger than
+                     default) or "raw" BGRA (<tag>_<w>x<h>.bgra, no encoding)
+                     Audio is 16-bit WAV via the stdlib wave module
+
+Environment (see from_env):
+  NEURAL_DEBUG_CAPTURE         0 to disable
+  NEURAL_DEBUG_DIR             root directory (default debug_captures)
+  NEURAL_DEBUG_FRAME_INTERVAL  seconds between frame captures (default 30)
+  NEURAL_DEBUG_FORMAT          png | raw
+  NEURAL_DEBUG_MAX_MB          per-session cap (default 200)
+  NEURAL_DEBUG_MAX_SESSIONS    sessions kept on disk (default 5)
+"""
+
+import collections
+import os
+import queue
+import shutil
+import threading
+import time
+import wave
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FORMATS = ("png", "raw")
+
+
+def _session_name():
+    return time.strftime("%Y%m%d_%H%M%S") + f"_{os.getpid()}"
+
+
+def prune_sessions(root, keep):
+    """Deletes all but the `keep` newest session directories under root."""
+    if not os.path.isdir(root):
+        return []
+    sessions = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d)))
+    removed = sessions[:max(0, len(sessions) - keep)]
+    for name in removed:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return removed
+
+
+class DebugCapture:
+    def __init__(self, root="debug_captures", enabled=True, fmt="png", frame_interval=30.0,
+                 max_bytes=200 * 1024 * 1024, max_files=5000, max_sessions=5, queue_size=16,
+                 metrics=None, clock=time.monotonic):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown capture format '{fmt}' (expected one of {FORMATS})")
+        self.root = root
+        self.enabled = enabled
+        self.fmt = fmt
+        self.frame_interval = frame_interval
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.session_dir = os.path.join(root, _session_name())
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = collections.deque()  # (path, size), oldest first
+        self.bytes_written = 0
+        self.dropped = 0
+        self._last_frame = {}  # tag -> clock
+        self._seq = 0
+        self._thread = None
+
+        self.m_written = self.m_dropped = self.m_bytes = None
+        if metrics is not None:
+            self.m_written = metrics.counter("debug_capture_written_total", "Debug captures written")
+            self.m_dropped = metrics.counter("debug_capture_dropped_total", "Debug captures dropped (queue full)")
+            self.m_bytes = metrics.gauge("debug_capture_session_bytes", "Bytes on disk for this capture session")
+
+    # --- Producer side (agent thread) ---
+
+    def capture_frame(self, frame, tag="frame", force=False):
+        """frame: dict from read_video_frame() (BGRA). Sampled per tag unless force."""
+        if not self.enabled or not frame:
+            return False
+        now = self.clock()
+        last = self._last_frame.get(tag)
+        if not force and last is not None and now - last < self.frame_interval:
+            return False
+        self._last_frame[tag] = now
+        return self._put(("frame", tag, frame))
+
+    def capture_audio(self, audio, sample_rate, tag="utterance"):
+        """audio: float32 mono in -1..1 (copied: callers normalize their buffer in place)."""
+        if not self.enabled:
+            return False
+        return self._put(("audio", tag, (np.array(audio, dtype=np.float32), int(sample_rate))))
+
+    def capture_image(self, image, tag="image"):
+        """PIL image (screenshots, VLM inputs)."""
+        if not self.enabled:
+            return False
+        return self._put(("image", tag, image.copy()))
+
+    def _put(self, item):
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.m_dropped is not None:
+                self.m_dropped.inc()
+            return False
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._writer, daemon=True, name="debug-capture")
+        self._thread.start()
+
+    def close(self, timeout=5.0):
+        """Flushes what's queued (up to timeout) and stops the writer."""
+        if self._thread is None:
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    # --- Writer thread ---
+
+    def _writer(self):
+        prune_sessions(self.root, max(0, self.max_sessions - 1))
+        os.makedirs(self.session_dir, exist_ok=True)
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            kind, tag, payload = item
+            try:
+                path = self._write(kind, tag, payload)
+            except Exception as e:
+                print(f"⚠️ Debug capture failed ({kind}/{tag}): {e}")
+                continue
+            self._account(path)
+
+    def _path(self, tag, ext):
+        self._seq += 1
+        return os.path.join(self.session_dir, f"{self._seq:06d}_{tag}.{ext}")
+
+    def _write(self, kind, tag, payload):
+        if kind == "audio":
+            audio, rate = payload
+            path = self._path(tag, "wav")
+            with wave.open(path, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(rate)
+                w.writeframes((np.clip(audio, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+            return path
+        if kind == "image":
+            path = self._path(tag, "png")
+            payload.save(path, compress_level=1)
+            return path
+
+        width, height = payload['width'], payload['height']
+        if self.fmt == "raw" or Image is None:
+            path = self._path(f"{tag}_{width}x{height}", "bgra")
+            with open(path, "wb") as f:
+                f.write(payload['data'])
+            return path
+        path = self._path(tag, "png")
+        img = Image.frombytes('RGBA', (width, height), payload['data'], 'raw', 'BGRA')
+        img.save(path, compress_level=1)
+        return path
+
+    def _account(self, path):
+        size = os.path.getsize(path)
+        self.written.append((path, size))
+        self.bytes_written += size
+        while self.written and (self.bytes_written > self.max_bytes or len(self.written) > self.max_files):
+            old, old_size = self.written.popleft()
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+            self.bytes_written -= old_size
+        if self.m_written is not None:
+            self.m_written.inc()
+            self.m_bytes.set(self.bytes_written)
+
+
+def from_env(metrics=None, environ=None, **overrides):
+    env = os.environ if environ is None else environ
+    options = dict(
+        root=env.get("NEURAL_DEBUG_DIR", "debug_captures"),
+        enabled=env.get("NEURAL_DEBUG_CAPTURE", "1") != "0",
+        fmt=env.get("NEURAL_DEBUG_FORMAT", "png").lower(),
+        frame_interval=float(env.get("NEURAL_DEBUG_FRAME_INTERVAL", 30)),
+        max_bytes=int(float(env.get("NEURAL_DEBUG_MAX_MB", 200)) * 1024 * 1024),
+        max_sessions=int(env.get("NEURAL_DEBUG_MAX_SESSIONS", 5)),
+        metrics=metrics,
+    )
+    options.update(overrides)
+    return DebugCapture(**options)
@@ -0,0 +1,135 @@
+"""
+DOM Index
+Finds form fields in a PageState snapshot (PageState.snapshot_json: a flat,
+document-order list of {id, role, name, attributes: {tag}} nodes) and turns
+them into selectors the browser can resolve without another DOM walk.
+
+  name      the node's name: the field's name attribute, else its placeholder
+            or label (TodoMVC's input is "What needs to be done?")
+  label     the last text node seen since the previous field ("username:",
+            "Text input"), which is where forms put their visible labels
+  selector  tag[name=..], tag[placeholder=..], tag[aria-label=..], tag[id=..]
+            (plain tag when unnamed) plus selector_index, the field's position
+            among the earlier elements that selector matches: same tag+name for
+            a named field (HN login has two "acct" inputs, one per form), every
+            element of the tag (buttons, hidden inputs too) for an unnamed one
+  bulk      textbox/textarea/searchbox/combobox take one insertText; plain
+            "input" (file, checkbox, radio, range, color, hidden) and select
+            only react to key events
+  editable  False when the snapshot carries live properties (dom_observer.py)
+            saying the field is disabled or read-only; find() skips those
+
+Usage:
+    index = DomIndex.from_json(page_state.snapshot_json)
+    field = index.find("password")
+    field.selector, field.selector_index, field.bulk
+"""
+
+import json
+import re
+
+BULK_ROLES = ("textbox", "textarea", "searchbox", "combobox")
+KEY_ROLES = ("input", "select")
+FIELD_ROLES = BULK_ROLES + KEY_ROLES
+SELECTOR_ATTRS = ("name", "placeholder", "aria-label", "id")
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def css_string(value):
+    """Double-quoted CSS string literal."""
+    value = value.replace("\\", "\\\\").replace('"', '\\"')
+    return '"' + value.replace("\n", "\\a ").replace("\r", "\\d ") + '"'
+
+
+def words(text):
+    return WORD_RE.findall((text or "").lower())
+
+
+class Field:
+    def __init__(self, node_id, role, tag, name, label, selector_index=0, properties=None):
+        self.id = node_id
+        self.role = role
+        self.tag = tag
+        self.name = name
+        self.label = label
+        self.selector_index = selector_index
+        self.properties = properties or {}
+
+    @property
+    def editable(self):
+        return not (self.properties.get("disabled") or self.properties.get("readOnly"))
+
+    @property
+    def bulk(self):
+        return self.role in BULK_ROLES
+
+    @property
+    def selector(self):
+        if not self.name:
+            return self.tag
+        value = css_string(self.name)
+        return ", ".join(f"{self.tag}[{attr}={value}]" for attr in SELECTOR_ATTRS)
+
+    def __repr__(self):
+        return f"Field({self.id}, {self.role}, name={self.name!r}, label={self.label!r})"
+
+
+class DomIndex:
+    def __init__(self, nodes):
+        self.fields = []
+        self.by_id = {}
+        seen = {}   # tag or (tag, name) -> elements matched so far, for selector_index
+        label = ""
+        for node in nodes:
+            role = node.get("role", "")
+            tag = (node.get("attributes") or {}).get("tag", "")
+            if tag == "#text":
+                text = " ".join((node.get("name") or "").split())
+                if text:
+                    label = text
+                continue
+            if tag not in ("input", "textarea", "select"):
+                continue
+            name = node.get("name") or ""
+            key = (tag, name) if name else tag
+            index = seen.get(key, 0)
+            # Every element counts towards the selectors that match it, field or not
+            seen[tag] = seen.get(tag, 0) + 1
+            if name:
+                seen[(tag, name)] = seen.get((tag, name), 0) + 1
+            if role not in FIELD_ROLES:
+                continue
+            field = Field(node.get("id"), role, tag, name, label, index, node.get("properties"))
+            self.fields.append(field)
+            self.by_id[field.id] = field
+            label = ""  # Text after this field labels the next one (or is a checkbox caption)
+
+    @classmethod
+    def from_json(cls, snapshot_json):
+        nodes = json.loads(snapshot_json) if snapshot_json else []
+        return cls(nodes if isinstance(nodes, list) else [])
+
+    def find(self, query):
+        """
+        Best field for a name, label or node id. Exact name/label wins, then
+        the most shared words; ties go to the first field in document order.
+        Returns None if nothing matches.
+        """
+        if isinstance(query, int):
+            return self.by_id.get(query)
+        q = " ".join(words(query))
+        if not q:
+            return None
+        wanted = set(q.split())
+        best, best_score = None, 0
+        for field in self.fields:
+            if not field.editable:
+                continue
+            name, label = " ".join(words(field.name)), " ".join(words(field.label))
+            if q in (name, label):
+                return field
+            score = len(wanted & (set(name.split()) | set(label.split())))
+            if score > best_score:
+                best, best_score = field, score
+        return best
@@ -0,0 +1,285 @@
+"""
+DOM Observer
+Two-pass GetState over a pooled CDP session (cdp_pool.py), producing the same
+flat node list as PageState.snapshot_json ({id, role, name, attributes: {tag}}),
+with ids = backendNodeId and live properties merged into interactive nodes.
+
+  Pass 1  DOM.getDocument(depth=-1): one tree walk. Skipped when no DOM
+          mutation event arrived since the last snapshot (Chrome pushes
+          them for every node it has sent us).
+  Pass 2  property truth for inputs/selects/buttons (value, checked, ...):
+          new nodes are resolved to object ids in one pipelined batch of
+          DOM.resolveNode, then ONE Runtime.callFunctionOn per document
+          reads every element in it (object ids passed as the call's
+          arguments; V8 rejects arguments from another frame's context).
+          The calls go out as one pipelined batch. Object ids are kept
+          across snapshots until the document changes; property dicts of
+          unchanged nodes are reused, and `changed` lists the ids whose
+          properties moved.
+
+Per-node Runtime.callFunctionOn costs one round trip per field; this costs
+at most two per snapshot, whatever the number of fields.
+
+Nodes also carry "parent" (parent's id). With layout=True every snapshot
+pipelines DOMSnapshot.captureSnapshot and Page.getLayoutMetrics alongside
+pass 1 (layout moves without DOM mutations): rendered nodes get "bounds"
+([x, y, w, h], document CSS px), the rest "rendered": False, and `viewport`
+is the visible rect. snapshot_json(reduce=True) runs snapshot_reducer.py.
+
+Usage:
+    observer = DomObserver(await pool.session())
+    nodes = await observer.snapshot()
+    observer.changed   # ids whose value/checked/... changed since last time
+"""
+
+import json
+import time
+
+from cdp_pool import CDPError
+from snapshot_reducer import DEFAULT_MARGIN, reduce_snapshot
+
+OBJECT_GROUP = "glazyr-dom-observer"
+MAX_ARGS = 500  # Elements per callFunctionOn
+
+INTERACTIVE_TAGS = ("input", "textarea", "select", "button")
+TEXT_INPUT_TYPES = ("", "text", "password", "email", "search", "tel", "url", "number")
+BUTTON_INPUT_TYPES = ("submit", "button", "reset", "image")
+DOM_MUTATIONS = ("DOM.childNodeInserted", "DOM.childNodeRemoved", "DOM.attributeModified",
+                 "DOM.attributeRemoved", "DOM.characterDataModified", "DOM.childNodeCountUpdated",
+                 "DOM.setChildNodes", "DOM.shadowRootPushed", "DOM.shadowRootPopped")
+
+PROPERTY_NAMES = ("value", "checked", "disabled", "readOnly", "selectedIndex")
+READ_PROPERTIES = """function() {
+  return Array.prototype.map.call(arguments, function(el) {
+    return [el.value === undefined ? null : String(el.value), !!el.checked, !!el.disabled, !!el.readOnly,
+            el.selectedIndex === undefined ? null : el.selectedIndex];
+  });
+}"""
+
+
+def node_role(tag, attrs):
+    if tag in ("a", "link"):
+        return "link"
+    if tag == "input":
+        kind = attrs.get("type", "").lower()
+        if kind in TEXT_INPUT_TYPES:
+            return "textbox"
+        return "button" if kind in BUTTON_INPUT_TYPES else "input"
+    return tag
+
+
+def node_name(tag, attrs):
+    if tag in ("input", "textarea", "select"):
+        return attrs.get("name") or attrs.get("placeholder") or attrs.get("aria-label") or ""
+    if tag == "meta":
+        return attrs.get("name", "")
+    return attrs.get("class", "")
+
+
+def layout_bounds(capture):
+    """DOMSnapshot.captureSnapshot -> {backendNodeId: [x, y, w, h]} for every node in the layout tree."""
+    bounds = {}
+    for doc in capture.get("documents", ()):
+        backend_ids = doc["nodes"]["backendNodeId"]
+        layout = doc.get("layout", {})
+        for index, rect in zip(layout.get("nodeIndex", ()), layout.get("bounds", ())):
+            bounds[backend_ids[index]] = rect
+    return bounds
+
+
+def flatten(document, documents=None):
+    """
+    DOM.getDocument root -> document-order snapshot nodes, and the interactive ones.
+    documents: optional dict, filled with interactive id -> id of the (frame) document it lives in.
+    """
+    nodes, interactive = [], []
+    stack = [(document, None, None)]
+    while stack:
+        node, parent, owner = stack.pop()
+        kind = node.get("nodeType")
+        if kind == 9:
+            owner = node["backendNodeId"]
+        if kind == 1:
+            tag = (node.get("localName") or node.get("nodeName", "")).lower()
+            raw = node.get("attributes") or []
+            attrs = dict(zip(raw[::2], raw[1::2]))
+            entry = {"id": node["backendNodeId"], "role": node_role(tag, attrs), "name": node_name(tag, attrs),
+                     "attributes": {"tag": tag}}
+            if tag in INTERACTIVE_TAGS:
+                interactive.append(entry)
+                if documents is not None:
+                    documents[entry["id"]] = owner
+        elif kind == 3:
+            entry = {"id": node["backendNodeId"], "role": "text", "name": node.get("nodeValue", ""),
+                     "attributes": {"tag": "#text"}}
+        elif kind == 9:
+            entry = {"id": node["backendNodeId"], "role": "#document", "name": "", "attributes": {"tag": "#document"}}
+        elif kind == 10:
+            entry = {"id": node["backendNodeId"], "role": "html", "name": "", "attributes": {"tag": "html"}}
+        else:
+            entry = None
+        if entry is not None:
+            entry["parent"] = parent
+            nodes.append(entry)
+        children = list(node.get("children") or ())
+        if node.get("contentDocument"):
+            children.append(node["contentDocument"])
+        node_id = entry["id"] if entry is not None else parent
+        stack.extend((child, node_id, owner) for child in reversed(children))
+    return nodes, interactive
+
+
+class DomObserver:
+    """
+    session: CDPSession (send / batch / on coroutines).
+    """
+
+    def __init__(self, session, layout=False, metrics=None, clock=time.monotonic):
+        self.session = session
+        self.layout = layout
+        self.clock = clock
+        self.viewport = None        # (x, y, width, height) with layout=True
+        self.reduction = None       # Last snapshot_json(reduce=True) result
+        self.dirty = True           # Pass 1 needed
+        self.nodes = []
+        self.interactive = []
+        self.object_ids = {}        # backendNodeId -> objectId (valid until the document changes)
+        self.documents = {}         # Interactive backendNodeId -> its document's (one JS context per frame)
+        self.properties = {}        # backendNodeId -> property dict of the last snapshot
+        self.changed = set()
+        self._subscribed = False
+
+        self.m_seconds = self.m_pass1_skips = self.m_resolved = self.m_round_trips = None
+        if metrics is not None:
+            self.m_seconds = metrics.histogram("dom_observe_seconds", "Two-pass GetState time")
+            self.m_pass1_skips = metrics.counter("dom_observe_tree_reuses_total", "Snapshots that reused the last tree walk")
+            self.m_resolved = metrics.counter("dom_observe_nodes_resolved_total", "Nodes resolved to object ids")
+            self.m_round_trips = metrics.counter("dom_observe_round_trips_total", "CDP round trips spent observing")
+
+    def _subscribe(self):
+        if self._subscribed:
+            return
+        self._subscribed = True
+        for method in DOM_MUTATIONS:
+            self.session.on(method, self._mutated)
+        self.session.on("DOM.documentUpdated", self._document_updated)
+
+    def _mutated(self, params):
+        self.dirty = True
+
+    def _document_updated(self, params):
+        # New document: every node id and object id we hold is stale
+        self.dirty = True
+        self.object_ids.clear()
+        self.properties.clear()
+
+    def _round_trip(self):
+        if self.m_round_trips is not None:
+            self.m_round_trips.inc()
+
+    async def snapshot(self):
+        start = self.clock()
+        self._subscribe()
+        walk = self.dirty
+        self.dirty = False  # Mutations from here on mark the next snapshot dirty
+        commands = [("DOM.getDocument", {"depth": -1, "pierce": True})] if walk else []
+        if self.layout:
+            commands += [("DOMSnapshot.captureSnapshot", {"computedStyles": []}), ("Page.getLayoutMetrics", {})]
+        replies = await self.session.batch(commands) if commands else []
+        if commands:
+            self._round_trip()
+        if walk:
+            self.documents = {}
+            self.nodes, self.interactive = flatten(replies[0]["root"], self.documents)
+            live = {entry["id"] for entry in self.interactive}
+            for stale in set(self.object_ids) - live:
+                del self.object_ids[stale]
+                self.properties.pop(stale, None)
+        elif self.m_pass1_skips is not None:
+            self.m_pass1_skips.inc()
+        if self.layout:
+            self._apply_layout(*replies[-2:])
+
+        await self._resolve_new()
+        await self._read_properties()
+        if self.m_seconds is not None:
+            self.m_seconds.observe(self.clock() - start)
+        return self.nodes
+
+    def _apply_layout(self, capture, metrics):
+        bounds = layout_bounds(capture)
+        for entry in self.nodes:
+            rect = bounds.get(entry["id"])
+            entry.pop("bounds", None)
+            entry.pop("rendered", None)
+            if rect is not None:
+                entry["bounds"] = rect
+            elif entry["attributes"]["tag"] != "#document":
+                entry["rendered"] = False
+        view = metrics.get("cssLayoutViewport") or metrics.get("layoutViewport") or {}
+        if view:
+            self.viewport = (view.get("pageX", 0), view.get("pageY", 0), view["clientWidth"], view["clientHeight"])
+
+    async def snapshot_json(self, reduce=False, margin=DEFAULT_MARGIN):
+        """
+        PageState.snapshot_json. reduce=True prunes it (snapshot_reducer.py), to the
+        viewport plus `margin` when layout is on and margin is not None.
+        """
+        nodes = await self.snapshot()
+        if reduce:
+            viewport = self.viewport if margin is not None else None
+            self.reduction = reduce_snapshot(nodes, viewport=viewport, margin=margin or 0)
+            nodes = self.reduction.nodes
+        return json.dumps(nodes, separators=(",", ":"))
+
+    async def _resolve_new(self):
+        new = [entry["id"] for entry in self.interactive if entry["id"] not in self.object_ids]
+        if not new:
+            return
+        replies = await self.session.batch(
+            [("DOM.resolveNode", {"backendNodeId": node_id, "objectGroup": OBJECT_GROUP}) for node_id in new],
+            return_exceptions=True)
+        self._round_trip()
+        for node_id, reply in zip(new, replies):
+            if isinstance(reply, dict) and reply.get("object", {}).get("objectId"):
+                self.object_ids[node_id] = reply["object"]["objectId"]
+        if self.m_resolved is not None:
+            self.m_resolved.inc(len(new))
+
+    async def _read_properties(self):
+        self.changed = set()
+        by_document = {}
+        for entry in self.interactive:
+            if entry["id"] in self.object_ids:
+                by_document.setdefault(self.documents.get(entry["id"]), []).append(entry["id"])
+        chunks = [ids[i:i + MAX_ARGS] for ids in by_document.values() for i in range(0, len(ids), MAX_ARGS)]
+        if chunks:
+            replies = await self.session.batch([("Runtime.callFunctionOn", {
+                "functionDeclaration": READ_PROPERTIES,
+                "objectId": self.object_ids[chunk[0]],
+                "arguments": [{"objectId": self.object_ids[node_id]} for node_id in chunk],
+                "returnByValue": True,
+                "silent": True,
+            }) for chunk in chunks], return_exceptions=True)
+            self._round_trip()
+            for chunk, reply in zip(chunks, replies):
+                if isinstance(reply, CDPError):
+                    # Stale or foreign object id (navigated frame): resolve these again next time
+                    for node_id in chunk:
+                        self.object_ids.pop(node_id, None)
+                    continue
+                if isinstance(reply, BaseException):
+                    raise reply
+                for node_id, values in zip(chunk, reply["result"]["value"]):
+                    props = dict(zip(PROPERTY_NAMES, values))
+                    if self.properties.get(node_id) != props:
+                        self.properties[node_id] = props
+                        self.changed.add(node_id)
+        for entry in self.interactive:
+            if entry["id"] in self.properties:
+                entry["properties"] = self.properties[entry["id"]]
+
+    async def release(self):
+        """Frees the object ids held in the page (call when done observing)."""
+        self.object_ids.clear()
+        await self.session.send("Runtime.releaseObjectGroup", {"objectGroup": OBJECT_GROUP})
@@ -0,0 +1,55 @@
+"""
+Frame Delta Helpers
+Cheap change detection on BGRA frames read from the video shared memory.
+
+Instead of sending a frame to the VLM to find out whether "something happened",
+we sample a coarse luma grid and compare grids. A 64x36 grid is ~2.3K pixels,
+so a comparison costs microseconds instead of a multi-second VLM round trip.
+"""
+
+import numpy as np
+
+DEFAULT_GRID = (64, 36)  # (columns, rows)
+
+# BGRA byte order -> luma weights for B, G, R
+_LUMA_WEIGHTS = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+
+
+def frame_fingerprint(frame, grid=DEFAULT_GRID):
+    """
+    Returns a small float32 luma grid for a frame dict from read_video_frame().
+    Returns None if the frame is missing or truncated.
+    """
+    if not frame:
+        return None
+    width, height = frame['width'], frame['height']
+    data = frame['data']
+    if width <= 0 or height <= 0 or len(data) < width * height * 4:
+        return None
+
+    cols, rows = min(grid[0], width), min(grid[1], height)
+    pixels = np.frombuffer(data, dtype=np.uint8, count=width * height * 4).reshape(height, width, 4)
+    ys = np.linspace(0, height - 1, rows).astype(np.intp)
+    xs = np.linspace(0, width - 1, cols).astype(np.intp)
+    sample = pixels[np.ix_(ys, xs)][:, :, :3].astype(np.float32)
+    return sample @ _LUMA_WEIGHTS
+
+
+def fingerprint_distance(a, b):
+    """
+    Mean absolute luma difference between two fingerprints, normalised to 0..1.
+    Missing or mismatched fingerprints count as a full change (1.0).
+    """
+    if a is None or b is None or a.shape != b.shape:
+        return 1.0
+    return float(np.mean(np.abs(a - b))) / 255.0
+
+
+def changed_fraction(a, b, pixel_threshold=12.0):
+    """
+    Fraction of grid cells whose luma moved by more than pixel_threshold.
+    Better than the mean for small, local changes (a checkbox, a caret).
+    """
+    if a is None or b is None or a.shape != b.shape:
+        return 1.0
+    return float(np.count_nonzero(np.abs(a - b) > pixel_threshold)) / a.size
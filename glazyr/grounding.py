@@ -0,0 +1,212 @@
+"""
+Grounding Ladder
+Validates VLM bounding-box replies and, when a reply is useless, escalates
+through different attempts under one overall deadline (instead of paying the
+full HTTP timeout once and giving up).
+
+Verdicts (classify):
+  ok            4 numbers forming a box with positive area inside 0-1000
+  empty         nothing at all (Ollama's `done: true` with response "")
+  prose         text, but no 4 numbers
+  out_of_range  numbers beyond 1000 or a zero/negative-area box
+
+StreamCheck watches the reply while Ollama is still generating: the stream is
+cut as soon as a box is complete, or once `prose_chars` characters arrived
+without a single digit. A degenerate reply costs a few tokens, not a full
+generation.
+
+Rungs, tried in order after the first attempt fails ($NEURAL_GROUNDING_LADDER):
+  strict     same image, stricter prompt with a format example
+  small      half-width, half-height crop around the previous reply's box (any
+             box within 0-1000, even a degenerate one) or else the centre;
+             the crop's box is mapped back to the full image
+  alt_model  a second VLM (the autotune profile's vlm_fallback_model)
+  dom        dom_locator(target) -> (x, y) or None, no VLM involved
+Rungs that aren't configured (no fallback model, no locator) are skipped.
+
+Usage:
+    ladder = GroundingLadder(query, deadline=8.0, fallback_model="llava-phi3")
+    coords, attempts = ladder.ground("search box", thumbnail, frame_w, frame_h)
+"""
+
+import os
+import re
+import time
+
+GROUNDING_PROMPT = "Point to '{target}'. Return bounding box as [ymin, xmin, ymax, xmax] (0-1000). Only numbers."
+STRICT_PROMPT = ("Bounding box of '{target}' as [ymin, xmin, ymax, xmax], integers from 0 to 1000. "
+                 "Example: [120, 40, 180, 300]. Reply with the box only, no words.")
+
+OK, EMPTY, PROSE, OUT_OF_RANGE = "ok", "empty", "prose", "out_of_range"
+MISS = "miss"  # dom rung found nothing
+TIMEOUT = "timeout"  # no reply before the deadline (dropped or failed request)
+
+RUNGS = ("strict", "small", "alt_model", "dom")
+DEFAULT_DEADLINE = 8.0
+CROP = 500  # "small" rung: crop side, in 0-1000 units of the full image
+
+# Flexible regex: handles [1,2,3,4] or 1, 2, 3, 4
+BOX_RE = re.compile(r"(\d+)\D+(\d+)\D+(\d+)\D+(\d+)")
+COMPLETE_BOX_RE = re.compile(r"(\d+)\D+(\d+)\D+(\d+)\D+(\d+)\D")
+
+
+def parse_grounding(response, width, height):
+    """
+    Parses a VLM bounding box reply ([ymin, xmin, ymax, xmax], 0-1000) into the
+    screen coordinates of the box centre. Returns None if there are no 4 numbers.
+    """
+    match = BOX_RE.search(response or "")
+    if not match:
+        return None
+    y1, x1, y2, x2 = map(int, match.groups())
+    center_x = int(((x1 + x2) / 2 / 1000) * width)
+    center_y = int(((y1 + y2) / 2 / 1000) * height)
+    return center_x, center_y
+
+
+def crop_region(near=None, size=CROP):
+    """(left, top, right, bottom) in 0-1000 units: size x size around near=(x, y), kept inside the image."""
+    cx, cy = near if near is not None else (500, 500)
+    left = min(max(cx - size // 2, 0), 1000 - size)
+    top = min(max(cy - size // 2, 0), 1000 - size)
+    return left, top, left + size, top + size
+
+
+def classify(response):
+    """-> (verdict, (ymin, xmin, ymax, xmax) or None)"""
+    text = (response or "").strip()
+    if not text:
+        return EMPTY, None
+    match = BOX_RE.search(text)
+    if not match:
+        return PROSE, None
+    y1, x1, y2, x2 = box = tuple(map(int, match.groups()))
+    if max(box) > 1000 or y2 <= y1 or x2 <= x1:
+        return OUT_OF_RANGE, box
+    return OK, box
+
+
+class StreamCheck:
+    """Callable(text so far) -> True to stop reading the stream."""
+
+    def __init__(self, prose_chars=40):
+        self.prose_chars = prose_chars
+        self.reason = None
+
+    def __call__(self, text):
+        if COMPLETE_BOX_RE.search(text):
+            self.reason = "complete"
+            return True
+        if len(text.strip()) >= self.prose_chars and not any(c.isdigit() for c in text):
+            self.reason = PROSE
+            return True
+        return False
+
+
+class Attempt:
+    def __init__(self, rung, verdict, response=None, seconds=0.0):
+        self.rung = rung
+        self.verdict = verdict
+        self.response = response
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"Attempt({self.rung}: {self.verdict} in {self.seconds:.2f}s)"
+
+
+def rungs_from_env(environ=None):
+    env = os.environ if environ is None else environ
+    value = env.get("NEURAL_GROUNDING_LADDER")
+    if value is None:
+        return RUNGS
+    rungs = tuple(r.strip() for r in value.split(",") if r.strip())
+    unknown = set(rungs) - set(RUNGS)
+    if unknown:
+        raise ValueError(f"unknown grounding rungs {sorted(unknown)} (expected some of {RUNGS})")
+    return rungs
+
+
+class GroundingLadder:
+    """
+    query: callable(prompt, image, model, timeout, stream_check) -> reply text or None
+           (model None = the default VLM; timeout = seconds left in the deadline)
+    dom_locator: optional callable(target) -> (x, y) or None
+    """
+
+    def __init__(self, query, rungs=RUNGS, deadline=DEFAULT_DEADLINE, fallback_model=None, dom_locator=None,
+                 prose_chars=40, metrics=None, log=None, clock=time.monotonic):
+        self.query = query
+        self.rungs = tuple(rungs)
+        self.deadline = deadline
+        self.fallback_model = fallback_model
+        self.dom_locator = dom_locator
+        self.prose_chars = prose_chars
+        self.log = log
+        self.clock = clock
+
+        self.m_degenerate = self.m_fallbacks = self.m_failed = None
+        if metrics is not None:
+            self.m_degenerate = metrics.counter("grounding_degenerate_total", "Empty/prose/out-of-range VLM boxes")
+            self.m_fallbacks = metrics.counter("grounding_fallbacks_total", "Groundings resolved by a fallback rung")
+            self.m_failed = metrics.counter("grounding_failed_total", "Groundings with no usable answer")
+
+    def available(self, rung):
+        if rung == "alt_model":
+            return bool(self.fallback_model)
+        if rung == "dom":
+            return self.dom_locator is not None
+        return True
+
+    def ground(self, target, image, width, height):
+        """image: PIL image sent to the VLM; width/height: screen size for the centre."""
+        end = self.clock() + self.deadline
+        attempts = []
+        near = None  # Centre of the last box a reply gave, for the "small" crop
+        for rung in ("first",) + tuple(r for r in self.rungs if self.available(r)):
+            remaining = end - self.clock()
+            if remaining <= 0:
+                break
+            start = self.clock()
+            coords, verdict, response, box = self._attempt(rung, target, image, width, height, remaining, near)
+            if box is not None and max(box) <= 1000:
+                near = ((box[1] + box[3]) // 2, (box[0] + box[2]) // 2)
+            attempts.append(Attempt(rung, verdict, response, self.clock() - start))
+            if coords:
+                if rung != "first" and self.m_fallbacks is not None:
+                    self.m_fallbacks.inc()
+                return coords, attempts
+            if verdict in (EMPTY, PROSE, OUT_OF_RANGE) and self.m_degenerate is not None:
+                self.m_degenerate.inc()
+            if self.log:
+                self.log.info("grounding_retry", f"  ↪️ Grounding '{target}' [{rung}]: {verdict}",
+                              rung=rung, verdict=verdict)
+        if self.m_failed is not None:
+            self.m_failed.inc()
+        return None, attempts
+
+    def _attempt(self, rung, target, image, width, height, remaining, near):
+        """-> (coords or None, verdict, response, box in full-image 0-1000 units or None)"""
+        if rung == "dom":
+            coords = self.dom_locator(target)
+            return coords, OK if coords else MISS, None, None
+        prompt = STRICT_PROMPT if rung == "strict" else GROUNDING_PROMPT
+        model = self.fallback_model if rung == "alt_model" else None
+        region = None
+        if rung == "small":
+            region = left, top, right, bottom = crop_region(near)
+            image = image.crop((left * image.width // 1000, top * image.height // 1000,
+                                right * image.width // 1000, bottom * image.height // 1000))
+        response = self.query(prompt.format(target=target), image, model, remaining, StreamCheck(self.prose_chars))
+        if response is None:
+            return None, TIMEOUT, None, None
+        verdict, box = classify(response)
+        if box is not None and region is not None:
+            # Crop-relative 0-1000 -> full image 0-1000
+            left, top, right, bottom = region
+            y1, x1, y2, x2 = box
+            box = (top + y1 * (bottom - top) // 1000, left + x1 * (right - left) // 1000,
+                   top + y2 * (bottom - top) // 1000, left + x2 * (right - left) // 1000)
+        if verdict != OK:
+            return None, verdict, response, box
+        y1, x1, y2, x2 = box
+        return (int((x1 + x2) / 2 / 1000 * width), int((y1 + y2) / 2 / 1000 * height)), OK, response, box
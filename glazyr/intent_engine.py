@@ -0,0 +1,267 @@
+"""
+Intent Engine
+Routes a final transcript to an intent, outside of transcribe_buffer.
+
+  corrections  common mishearings ("you tube" -> "youtube"), applied in one
+               Aho-Corasick pass (leftmost-longest, whole words)
+  aliases      spoken site name -> domain, a plain dict: lookup cost doesn't
+               grow with the table
+  verbs        agent-action triggers ("click", "how to", ...), one
+               Aho-Corasick pass instead of an `in` check per verb
+
+Routing (same order as the old if/elif ladder):
+  "go to <site>"               NAVIGATE  alias, domain or <word>.com
+  "go to <several words>"      SEARCH    omnibox search
+  bare mention of a site       NAVIGATE  only for `mentions` (phonetic fix,
+                               "youtube" anywhere in the sentence)
+  contains an action verb      AGENT     handed to execute_agent_action
+  anything else                SEARCH
+
+route() returns an Intent: kind, the text for the omnibox/agent, a confidence
+in 0..1 and an action_pb2.Action (NavigateAction / InputAction; None for
+AGENT or without `make protos`).
+
+Extra aliases/corrections/verbs load from JSON ($NEURAL_INTENT_CONFIG):
+  {"aliases": {"hacker news": "news.ycombinator.com"},
+   "corrections": {"you tube": "youtube"}, "verbs": ["open tab"], "mentions": ["youtube"]}
+"""
+
+import collections
+import json
+import os
+import re
+
+try:
+    import action_pb2
+except ImportError:
+    action_pb2 = None  # Routing still works; Intent.action stays None
+
+CONFIG_ENV = "NEURAL_INTENT_CONFIG"
+
+NAVIGATE = "navigate"
+SEARCH = "search"
+AGENT = "agent"
+NONE = "none"
+
+DEFAULT_CORRECTIONS = {
+    "you tube": "youtube",
+    "go to the": "go to",
+    "show me": "go to",
+}
+
+DEFAULT_ALIASES = {
+    "twitter": "x.com",
+    "x": "x.com",
+    "youtube": "youtube.com",
+    "google": "google.com",
+    "github": "github.com",
+    "reddit": "reddit.com",
+}
+
+DEFAULT_VERBS = (
+    "click", "type", "solve", "fill", "scroll", "press", "plan", "analyze", "think",
+    "reason", "how to", "describe", "see", "look", "what",
+)
+
+DEFAULT_MENTIONS = ("youtube",)
+
+# Confidence per routing rule
+CONFIDENCE = {
+    "alias": 0.95,
+    "domain": 0.9,
+    "mention": 0.8,
+    "agent": 0.8,
+    "guess_tld": 0.6,
+    "search": 0.4,
+}
+
+_NAV_PREFIX = "go to "
+_DOMAIN_RE = re.compile(r"^[a-z0-9-]+(\.[a-z0-9-]+)+$")
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton over a fixed set of patterns."""
+
+    def __init__(self, patterns, whole_words=True):
+        self.whole_words = whole_words
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]   # state -> pattern lengths ending here
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern):
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(pattern))
+
+    def _build(self):
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _bounded(self, text, start, end):
+        if not self.whole_words:
+            return True
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+    def find_all(self, text):
+        """Every (start, end) match, in order of end position."""
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length in self._out[state]:
+                start = i + 1 - length
+                if self._bounded(text, start, i + 1):
+                    matches.append((start, i + 1))
+        return matches
+
+    def search(self, text):
+        """True if any pattern occurs."""
+        return bool(self.find_all(text))
+
+    def leftmost_longest(self, text):
+        """Non-overlapping matches, preferring the earliest then the longest."""
+        chosen = []
+        last_end = 0
+        for start, end in sorted(self.find_all(text), key=lambda m: (m[0], -m[1])):
+            if start >= last_end:
+                chosen.append((start, end))
+                last_end = end
+        return chosen
+
+    def replace(self, text, mapping):
+        """Single-pass replacement; `mapping` must cover every pattern."""
+        parts = []
+        pos = 0
+        for start, end in self.leftmost_longest(text):
+            parts.append(text[pos:start])
+            parts.append(mapping[text[start:end]])
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+
+class Intent:
+    def __init__(self, kind, text, confidence, action=None, rule=None):
+        self.kind = kind
+        self.text = text              # Omnibox text (NAVIGATE/SEARCH) or agent command (AGENT)
+        self.confidence = confidence
+        self.action = action          # action_pb2.Action or None
+        self.rule = rule              # Which routing rule fired (see CONFIDENCE)
+
+    def __repr__(self):
+        return f"Intent({self.kind}, {self.text!r}, confidence={self.confidence}, rule={self.rule})"
+
+
+def load_config(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class IntentEngine:
+    def __init__(self, aliases=None, corrections=None, verbs=None, mentions=None):
+        self.aliases = dict(DEFAULT_ALIASES if aliases is None else aliases)
+        self.corrections = dict(DEFAULT_CORRECTIONS if corrections is None else corrections)
+        self.verbs = tuple(DEFAULT_VERBS if verbs is None else verbs)
+        self.mentions = tuple(DEFAULT_MENTIONS if mentions is None else mentions)
+        self._compile()
+
+    @classmethod
+    def from_config(cls, path=None):
+        """Defaults merged with the JSON config at `path` (or $NEURAL_INTENT_CONFIG)."""
+        engine = cls()
+        path = path or os.environ.get(CONFIG_ENV)
+        if path:
+            engine.update(**load_config(path))
+        return engine
+
+    def update(self, aliases=None, corrections=None, verbs=None, mentions=None):
+        self.aliases.update({k.lower(): v for k, v in (aliases or {}).items()})
+        self.corrections.update({k.lower(): v for k, v in (corrections or {}).items()})
+        self.verbs += tuple(v.lower() for v in verbs or () if v.lower() not in self.verbs)
+        self.mentions += tuple(m.lower() for m in mentions or () if m.lower() not in self.mentions)
+        self._compile()
+
+    def _compile(self):
+        self._corrections = PatternMatcher(self.corrections)
+        # Substring match, like the old `in` checks ("clicking" still clicks)
+        self._verbs = PatternMatcher(self.verbs, whole_words=False)
+        self._mentions = PatternMatcher(self.mentions)
+
+    def normalize(self, text):
+        text = " ".join((text or "").lower().split()).strip(".,!?")
+        return self._corrections.replace(text, self.corrections)
+
+    def resolve_site(self, target):
+        """Spoken site -> (domain, rule), or (None, None) if it isn't a single site."""
+        target = target.strip().strip(".,!?")
+        domain = self.aliases.get(target)
+        if domain is not None:
+            return domain, "alias"
+        if " " in target or not target:
+            return None, None
+        if _DOMAIN_RE.match(target):
+            return target, "domain"
+        if "." not in target:
+            return target + ".com", "guess_tld"
+        return None, None
+
+    def route(self, text):
+        clean = self.normalize(text)
+        if not clean:
+            return Intent(NONE, "", 0.0)
+
+        if clean.startswith(_NAV_PREFIX):
+            target = clean[len(_NAV_PREFIX):].strip()
+            domain, rule = self.resolve_site(target)
+            if domain is not None:
+                return self._navigate(domain, rule)
+            return self._search(target or clean)
+
+        mention = self._mentions.leftmost_longest(clean)
+        if mention:
+            start, end = mention[0]
+            domain = self.aliases.get(clean[start:end], clean[start:end] + ".com")
+            return self._navigate(domain, "mention")
+
+        if self._verbs.search(clean):
+            return Intent(AGENT, clean, CONFIDENCE["agent"], rule="agent")
+
+        return self._search(clean)
+
+    def _navigate(self, domain, rule):
+        action = None
+        if action_pb2 is not None:
+            action = action_pb2.Action()
+            action.navigate.url = domain
+        return Intent(NAVIGATE, domain, CONFIDENCE[rule], action, rule)
+
+    def _search(self, text):
+        action = None
+        if action_pb2 is not None:
+            action = action_pb2.Action()
+            action.input.text = text
+            action.input.submit = True
+        return Intent(SEARCH, text, CONFIDENCE["search"], action, "search")
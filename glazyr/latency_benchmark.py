@@ -0,0 +1,338 @@
+"""
+Perception -> Action Latency Benchmark
+Breaks every agent step down by stage instead of one end-to-end number:
+
+  frame_acquire  read_video_frame() from the video segment
+  preprocess     BGRA -> PIL -> JPEG -> base64 (what every VLM call pays)
+  grounding      VLM round trip + bbox parsing (CLICK steps only)
+  injection      ActionInjector.execute() (pointer tween, keystrokes, text queue)
+  verification   injection done -> first changed frame seen (frame_delta)
+  planning       LLM plan request + parse_plan (plan scenarios only)
+
+Runs entirely on this host: a SyntheticProducer plays the browser (it renders
+frames, drains the text queue on Chrome's 100ms timer and repaints after input)
+and stub_vlm_server.py answers the Ollama requests with a configurable latency.
+The real NeuralAgent code paths do the work.
+
+Output keeps the shape of benchmark_results.json ({scenario: {"neural": {avg,
+min, max, success_rate}}}) and adds p50/p95/p99, throughput and "stages".
+
+Usage:
+    python latency_benchmark.py --runs 20 --vlm-latency-ms 40
+    make benchmark-latency
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from frame_delta import fingerprint_distance, frame_fingerprint
+from grounding import GROUNDING_PROMPT, parse_grounding
+from replay_harness import percentiles
+from shm_backend import FileBackend
+from stub_vlm_server import StubVlmServer
+from synthetic_producer import SyntheticProducer, pattern_frame
+from text_channel import TextChannelReader
+
+STAGES = ("frame_acquire", "preprocess", "grounding", "injection", "verification", "planning")
+
+SCENARIOS = {
+    "Grounded Click": "click search box",
+    "Three-Step Plan": "search the web for neural chromium",
+}
+
+CHANGE_THRESHOLD = 0.004  # Same default as PlanExecutor
+
+
+class SimulatedBrowser:
+    """
+    Renders frames into the producer at `fps` and repaints (new page tint)
+    `ui_latency_ms` after any input: a gui event or a drained text queue record.
+    """
+
+    def __init__(self, producer, width=1280, height=720, fps=60.0, ui_latency_ms=30.0, text_poll_ms=100.0):
+        self.producer = producer
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.ui_latency = ui_latency_ms / 1000.0
+        self.text_poll = text_poll_ms / 1000.0
+        self.reader = TextChannelReader(producer.text_shm) if producer.text_shm is not None else None
+        self.page = 0
+        self.navigations = []
+        self._base = pattern_frame(width, height, 0.0)
+        self._repaint_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poke(self):
+        """Input arrived; the page reacts after ui_latency."""
+        with self._lock:
+            if self._repaint_at is None:
+                self._repaint_at = time.perf_counter() + self.ui_latency
+
+    def render(self):
+        frame = self._base.copy()
+        frame[:, :, 2] = (40 + 60 * self.page) % 256  # Page tint: a full-frame luma change
+        self.producer.write_video_frame(frame, int(time.perf_counter() * 1e6))
+
+    def _loop(self):
+        next_frame = next_poll = time.perf_counter()
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            if self.reader is not None and now >= next_poll:
+                for _kind, text in self.reader.poll():
+                    self.navigations.append(text)
+                    self.poke()
+                next_poll = now + self.text_poll
+            with self._lock:
+                if self._repaint_at is not None and now >= self._repaint_at:
+                    self._repaint_at = None
+                    self.page += 1
+            if now >= next_frame:
+                self.render()
+                next_frame += 1.0 / self.fps
+            time.sleep(0.001)
+
+    def start(self):
+        self.render()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+class RecordingGui:
+    """pyautogui stand-in: records calls and pokes the simulated browser."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.calls = []
+
+    def moveTo(self, x, y, duration=0.0):
+        self.calls.append(("moveTo", x, y))
+        if duration:
+            time.sleep(duration)  # pyautogui tweens for the whole duration
+
+    def click(self, clicks=1, button="left"):
+        self.calls.append(("click", clicks, button))
+        self.browser.poke()
+
+    def write(self, text):
+        self.calls.append(("write", text))
+        self.browser.poke()
+
+    def press(self, key):
+        self.calls.append(("press", key))
+        self.browser.poke()
+
+    def scroll(self, amount):
+        self.calls.append(("scroll", amount))
+        self.browser.poke()
+
+    def hscroll(self, amount):
+        self.calls.append(("hscroll", amount))
+        self.browser.poke()
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[stage].append(time.perf_counter() - start)
+
+
+def stage_stats(samples):
+    """Latency percentiles (seconds) and throughput (ops per busy second) for one stage."""
+    if not samples:
+        return {"count": 0, "avg": -1, "min": -1, "max": -1, "p50": -1, "p95": -1, "p99": -1, "throughput": 0.0}
+    stats = {
+        "count": len(samples),
+        "avg": float(np.mean(samples)),
+        "min": float(np.min(samples)),
+        "max": float(np.max(samples)),
+    }
+    stats.update(percentiles(samples))
+    busy = float(np.sum(samples))
+    stats["throughput"] = len(samples) / busy if busy > 0 else 0.0
+    return stats
+
+
+class LatencyBenchmark:
+    """
+    agent: NeuralAgent wired to `browser`'s producer backend and the stub VLM.
+    Steps are run one stage at a time so each stage is timed on its own
+    (no prefetch overlap, unlike PlanExecutor).
+    """
+
+    def __init__(self, agent, browser, verify_timeout=2.0, poll_interval=0.002):
+        self.agent = agent
+        self.browser = browser
+        self.verify_timeout = verify_timeout
+        self.poll_interval = poll_interval
+
+    def run_step(self, step, timer):
+        """Returns (ok, error)."""
+        import nexus_agent
+
+        with timer.time("frame_acquire"):
+            frame = self.agent.memory.read_video_frame()
+        if not frame:
+            return False, "no frame"
+        before = frame_fingerprint(frame)
+
+        if step.target is not None:
+            with timer.time("preprocess"):
+                image_b64 = self.agent.encode_vlm_image(nexus_agent.frame_to_image(frame))
+            with timer.time("grounding"):
+                prompt = GROUNDING_PROMPT.format(target=step.target)
+                response = self.agent.query_ollama_vision(prompt, image_b64=image_b64)
+                coords = parse_grounding(response, frame['width'], frame['height'])
+            if coords is None:
+                return False, f"could not ground '{step.target}'"
+            step.action.interaction.x, step.action.interaction.y = coords
+
+        with timer.time("injection"):
+            ok = self.agent.injector.execute(step.action)
+        if not ok:
+            return False, "injection failed"
+
+        with timer.time("verification"):
+            changed = self._wait_for_change(before)
+        return changed, None if changed else "no visible change"
+
+    def _wait_for_change(self, before):
+        deadline = time.perf_counter() + self.verify_timeout
+        while time.perf_counter() < deadline:
+            fp = frame_fingerprint(self.agent.memory.read_video_frame())
+            if fp is not None and fingerprint_distance(fp, before) > CHANGE_THRESHOLD:
+                return True
+            time.sleep(self.poll_interval)
+        return False
+
+    def run_command(self, command, timer):
+        """One scenario run: a 'click X' command or an LLM plan. Returns (ok, steps)."""
+        from plan_executor import PLAN_PROMPT, parse_plan
+
+        if command.lower().startswith("click "):
+            steps = parse_plan("CLICK " + command[6:])
+        else:
+            with timer.time("planning"):
+                steps = parse_plan(self.agent.query_ollama(PLAN_PROMPT.format(command=command)))
+        if not steps:
+            return False, 0
+        for step in steps:
+            ok, _error = self.run_step(step, timer)
+            if not ok:
+                return False, len(steps)
+        return True, len(steps)
+
+    def run_scenario(self, command, runs=20, warmup=1):
+        for _ in range(warmup):
+            self.run_command(command, StageTimer())
+        timer = StageTimer()
+        totals, successes, steps = [], 0, 0
+        wall_start = time.perf_counter()
+        for _ in range(runs):
+            start = time.perf_counter()
+            ok, n = self.run_command(command, timer)
+            totals.append(time.perf_counter() - start)
+            successes += ok
+            steps += n
+        wall = time.perf_counter() - wall_start
+
+        result = stage_stats(totals)
+        del result["count"], result["throughput"]
+        result["success_rate"] = 100.0 * successes / runs if runs else 0.0
+        result["runs"] = runs
+        result["throughput"] = runs / wall if wall > 0 else 0.0            # Scenario runs per second
+        result["step_throughput"] = steps / wall if wall > 0 else 0.0      # Agent steps per second
+        result["stages"] = {stage: stage_stats(s) for stage, s in timer.samples.items() if s}
+        return {"neural": result}
+
+
+def run_benchmark(scenarios=None, runs=20, vlm_latency_ms=0.0, vlm_jitter_ms=0.0, ui_latency_ms=30.0,
+                  fps=60.0, width=1280, height=720, move_duration=None, shm_dir=None):
+    """Builds producer, stub VLM and agent, runs every scenario and tears it all down."""
+    import nexus_agent
+
+    scenarios = scenarios or SCENARIOS
+    tmp = None
+    if shm_dir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="neural_bench_")
+        shm_dir = tmp.name
+    producer = SyntheticProducer(FileBackend(shm_dir))
+    browser = SimulatedBrowser(producer, width, height, fps=fps, ui_latency_ms=ui_latency_ms).start()
+    stub = StubVlmServer(latency_ms=vlm_latency_ms, jitter_ms=vlm_jitter_ms).start()
+    agent = nexus_agent.NeuralAgent(shm_backend=producer.backend)
+    try:
+        agent.ollama_url = stub.url
+        agent.injector.gui = RecordingGui(browser)
+        if move_duration is not None:
+            agent.injector.move_duration = move_duration
+        bench = LatencyBenchmark(agent, browser)
+        return {name: bench.run_scenario(command, runs=runs) for name, command in scenarios.items()}
+    finally:
+        agent.plan_executor.close()
+        stub.stop()
+        browser.stop()
+        producer.close()
+        if tmp is not None:
+            tmp.cleanup()
+
+
+def format_report(results):
+    lines = []
+    for name, entry in results.items():
+        r = entry["neural"]
+        lines.append(f"{name}: avg {r['avg'] * 1000:.1f}ms  p95 {r['p95'] * 1000:.1f}ms  "
+                     f"success {r['success_rate']:.0f}%  {r['throughput']:.2f} runs/s")
+        for stage, s in r["stages"].items():
+            lines.append(f"  {stage:<14} p50 {s['p50'] * 1000:8.2f}ms  p95 {s['p95'] * 1000:8.2f}ms  "
+                         f"p99 {s['p99'] * 1000:8.2f}ms  {s['throughput']:8.1f}/s  (n={s['count']})")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage perception -> action latency benchmark")
+    parser.add_argument("--runs", type=int, default=20, help="Runs per scenario")
+    parser.add_argument("--vlm-latency-ms", type=float, default=0.0, help="Simulated model latency")
+    parser.add_argument("--vlm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--ui-latency-ms", type=float, default=30.0, help="Input -> repaint delay of the fake page")
+    parser.add_argument("--fps", type=float, default=60.0)
+    parser.add_argument("--move-duration", type=float, default=None,
+                        help="Override the injector's pointer tween (default: agent's)")
+    parser.add_argument("--output", default="latency_benchmark_results.json")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agent's own prints")
+    args = parser.parse_args()
+
+    print(f"⏱️ Latency benchmark: {args.runs} runs/scenario, VLM {args.vlm_latency_ms}ms, UI {args.ui_latency_ms}ms")
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        results = run_benchmark(runs=args.runs, vlm_latency_ms=args.vlm_latency_ms, vlm_jitter_ms=args.vlm_jitter_ms,
+                                ui_latency_ms=args.ui_latency_ms, fps=args.fps, move_duration=args.move_duration)
+    print(format_report(results))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
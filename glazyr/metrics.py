@@ -0,0 +1,251 @@
+"""
+Agent Metrics
+Counters, gauges and histograms cheap enough for the zero-sleep audio loop:
+an update is an attribute add (histograms: one bisect over fixed buckets).
+No locks on the write path; Python int/float updates are atomic enough for
+monitoring, and exporters only ever read.
+
+Exporters (pluggable, run off the hot path):
+  PrometheusExporter  text exposition format on http://host:port/metrics
+  JsonlExporter       appends one snapshot per interval to a .jsonl file
+
+Environment (see start_exporters_from_env):
+  NEURAL_METRICS_PORT   serve Prometheus text on this port
+  NEURAL_METRICS_FILE   append JSONL snapshots here
+  NEURAL_METRICS_INTERVAL  JSONL snapshot period in seconds (default 10)
+"""
+
+import bisect
+import http.server
+import json
+import os
+import threading
+import time
+
+# Seconds; covers a 1ms shared memory read up to a 30s VLM timeout.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, n=1):
+        self.value += n
+
+    def dec(self, n=1):
+        self.value -= n
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help="", buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Bucket upper bound holding the q-th observation (coarse, for dashboards)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        cumulative, total = {}, 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            cumulative[repr(bound)] = total
+        cumulative["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+class MetricsRegistry:
+    """
+    Get-or-create store for one agent's metrics.
+    prefix is prepended to every name; labels (e.g. {"agent": "tab-1"}) are
+    attached to every exported series.
+    """
+
+    def __init__(self, prefix="neural_", labels=None):
+        self.prefix = prefix
+        self.labels = dict(labels or {})
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(name)
+                if metric is None:
+                    metric = self._metrics[name] = cls(self.prefix + name, help, **kwargs)
+        if not isinstance(metric, cls):
+            raise TypeError(f"metric '{name}' already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help=""):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help="", buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def snapshot(self):
+        return {m.name: m.snapshot() for m in list(self._metrics.values())}
+
+    def _series(self, name, extra=None):
+        labels = dict(self.labels, **(extra or {}))
+        if not labels:
+            return name
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+        return f"{name}{{{body}}}"
+
+    def render_prometheus(self):
+        lines = []
+        for m in list(self._metrics.values()):
+            if m.help:
+                lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            if m.kind == "histogram":
+                total = 0
+                for bound, n in zip(m.buckets, m.counts):
+                    total += n
+                    lines.append(f"{self._series(m.name + '_bucket', {'le': repr(bound)})} {total}")
+                lines.append(f"{self._series(m.name + '_bucket', {'le': '+Inf'})} {m.count}")
+                lines.append(f"{self._series(m.name + '_sum')} {m.sum}")
+                lines.append(f"{self._series(m.name + '_count')} {m.count}")
+            else:
+                lines.append(f"{self._series(m.name)} {m.value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PrometheusExporter:
+    def __init__(self, registry, port=9464, host="0.0.0.0"):
+        self.httpd = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.registry = registry
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="metrics-http")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class JsonlExporter:
+    """Appends {"ts": ..., "labels": ..., "metrics": {...}} every `interval` seconds."""
+
+    def __init__(self, registry, path, interval=10.0):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write_snapshot(self):
+        record = {"ts": time.time(), "labels": self.registry.labels, "metrics": self.registry.snapshot()}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.write_snapshot()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="metrics-jsonl")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.write_snapshot()  # Final state on shutdown
+
+
+def start_exporters_from_env(registry, environ=None):
+    """Starts whatever NEURAL_METRICS_* asks for. Returns the running exporters."""
+    env = os.environ if environ is None else environ
+    exporters = []
+    port = env.get("NEURAL_METRICS_PORT")
+    if port:
+        exporters.append(PrometheusExporter(registry, int(port)).start())
+    path = env.get("NEURAL_METRICS_FILE")
+    if path:
+        interval = float(env.get("NEURAL_METRICS_INTERVAL", 10.0))
+        exporters.append(JsonlExporter(registry, path, interval).start())
+    return exporters
@@ -1,10 +1,10 @@
-import sys
 import time
 import struct
-import mmap
 import threading
+import traceback
 import numpy as np
 import collections
+import contextlib
 from PIL import Image
 import io
 import io
@@ -22,7 +22,8 @@ except ImportError:
     HAS_WEBRTC_VAD = False
     print("⚠️  webrtcvad not found. Using Energy-based VAD fallback.")
 
-import re
+import json
+import autotune
 try:
     import pyautogui
     pyautogui.FAILSAFE = True # Drag mouse to corner to abort
@@ -30,6 +31,35 @@ except ImportError:
     print("⚠️ pyautogui not found. Mouse control disabled.")
     pyautogui = None
 
+from action_injector import ActionInjector
+from text_channel import (TextChannelWriter, QueueOverflow, TEXT_SHM_NAME, TEXT_SHM_SIZE, KIND_OMNIBOX_TEXT, KIND_PRECONNECT,
+                          KIND_INSERT_TEXT, insert_text_payload)
+from plan_executor import PlanExecutor, PLAN_PROMPT, parse_plan
+try:
+    import action_pb2
+except ImportError:
+    print("⚠️ action_pb2 not found (run `make protos`). Multi-step plans disabled.")
+    action_pb2 = None
+
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
+AMBIENT_PROMPT = "Describe this screen in 5 words."
+AMBIENT_DEADLINE = 2.0  # An ambient caption still queued after this is stale: drop it
+AMBIENT_HTTP_TIMEOUT = 5.0  # Sent captions can't be preempted: this bounds how long a click waits behind one
+# Transcribe with Context Prompt (Biasing)
+# This tells Whisper: "Expect these kinds of phrases", which prevents "Thank you" hallucinations.
+WHISPER_PROMPT = "Go to YouTube. Go to Twitter. Go to Google. Click. Type. Scroll. Search."
+
+def trajectory_path(target):
+    """NEURAL_TRAJECTORY: a .ntraj file, or a directory for one file per session."""
+    if target.endswith(".ntraj"):
+        return target
+    os.makedirs(target, exist_ok=True)
+    return os.path.join(target, time.strftime("session_%Y%m%d_%H%M%S") + f"_{os.getpid()}.ntraj")
+
+def frame_to_image(frame):
+    # Chrome usually sends BGRA on Windows
+    return Image.frombytes('RGBA', (frame['width'], frame['height']), frame['data'], 'raw', 'BGRA')
+
 class SimpleVad:
     def is_speech(self, chunk, rate):
         # Simple energy check: if > 1% max amplitude, treat as speech
@@ -42,17 +72,37 @@ class SimpleVad:
         data = np.frombuffer(chunk, dtype=np.int16)
         return np.sqrt(np.mean(data**2))
 
-# Shared Memory Constants
-SHM_SIZE = 32 * 1024 * 1024  # 32MB
-VIDEO_SHM_SIZE = 1920 * 1080 * 4 + 256 # Exactly match C++ size
-MAGIC_NUMBER = 0x4E43524D     # "NCRM" (Frame Header)
-VIDEO_MAGIC_NUMBER = 0x5649444F # "VIDO" (Video Header)
-AUDIO_MAGIC_NUMBER = 0x41554449 # "AUDI" (Audio Header)
+# Shared Memory Constants (see shm_layout.py)
+from shm_layout import (SHM_SIZE, VIDEO_SHM_SIZE, STATE_SHM_SIZE, VIDEO_MAGIC_NUMBER,
+                        AUDIO_MAGIC_NUMBER, AGENT_SHM_NAME, VIDEO_SHM_NAME, STATE_SHM_NAME, NAMESPACE_ENV, segment_name,
+                        AUDIO_HEADER_OFFSET, AUDIO_DATA_OFFSET, VIDEO_DATA_OFFSET, VIDEO_HEADER)
+from shm_backend import open_segment
+from metrics import MetricsRegistry, start_exporters_from_env
+from profiler import Tracer, traced
+from transcription_server import ADDR_ENV as WHISPER_ADDR_ENV, TranscriptionClient
+from ambient_cadence import AmbientCadence
+from frame_delta import frame_fingerprint
+from audio_stats import AudioStats, agc_gain, normalize
+from grounding import GroundingLadder, rungs_from_env
+from intent_engine import AGENT, IntentEngine
+from speculative_nav import SpeculativeNavigator
+from trajectory import TrajectoryRecorder
+from vlm_scheduler import AMBIENT, INTERACTIVE, PLANNING, DeadlineExceeded, Superseded, VlmScheduler
+import structured_log
+import debug_capture
 
 class AgentSharedMemory:
-    def __init__(self, name="NeuralChromium_Agent_SharedMem"):
-        self.name = name
-        self.shm = mmap.mmap(-1, SHM_SIZE, tagname=name)
+    def __init__(self, name=AGENT_SHM_NAME, backend=None, metrics=None, log=None, namespace=None):
+        self.name = segment_name(name, namespace)
+        self.video_name = segment_name(VIDEO_SHM_NAME, namespace)
+        self.backend = backend
+        self.metrics = metrics or MetricsRegistry()
+        self.log = log or structured_log.from_env()
+        self.m_video_reads = self.metrics.counter("video_reads_total", "Video header reads")
+        self.m_video_not_ready = self.metrics.counter("video_not_ready_total", "Reads without a valid video header")
+        self.m_video_torn = self.metrics.counter("video_frames_torn_total", "Frames overwritten while copying pixels")
+        self.m_video_errors = self.metrics.counter("video_read_errors_total", "Video read exceptions")
+        self.shm = open_segment(self.name, SHM_SIZE, backend=backend)
         self.audio_buffer = collections.deque(maxlen=16000 * 5) # 5 seconds
         if HAS_WEBRTC_VAD:
             self.vad = webrtcvad.Vad(3) # Aggressiveness: 0-3
@@ -61,10 +111,10 @@ class AgentSharedMemory:
 
         # Video Shared Memory (Separate Header)
         try:
-            self.video_shm = mmap.mmap(-1, VIDEO_SHM_SIZE, tagname="NeuralChromium_Video")
-            print("📹 Video Return Path Connected")
+            self.video_shm = open_segment(self.video_name, VIDEO_SHM_SIZE, readonly=True, backend=backend)
+            self.log.info("video_connected", "📹 Video Return Path Connected")
         except Exception as e:
-            print(f"⚠️ Video Path Init: {e} (Will retry)")
+            self.log.warning("video_init_failed", f"⚠️ Video Path Init: {e} (Will retry)", error=str(e))
             self.video_shm = None
         
         self.last_video_ts = 0
@@ -73,8 +123,8 @@ class AgentSharedMemory:
     def connect_video(self):
         if self.video_shm: return True
         try:
-            self.video_shm = mmap.mmap(-1, VIDEO_SHM_SIZE, tagname="NeuralChromium_Video")
-            print("\n📹 >>> Video Return Path Connected! <<<")
+            self.video_shm = open_segment(self.video_name, VIDEO_SHM_SIZE, readonly=True, backend=self.backend)
+            self.log.info("video_connected", "\n📹 >>> Video Return Path Connected! <<<")
             return True
         except Exception:
             return False
@@ -103,7 +153,7 @@ class AgentSharedMemory:
 
     def read_audio_header(self):
         # Audio header is at offset 16MB (halfway point)
-        self.shm.seek(16 * 1024 * 1024)
+        self.shm.seek(AUDIO_HEADER_OFFSET)
         data = self.shm.read(24)
         # struct AudioHeader {
         #   uint32_t magic_number;
@@ -126,9 +176,8 @@ class AgentSharedMemory:
 
     def read_audio_data(self, frames):
         # Audio data follows header at 16MB + 256 bytes
-        offset = 16 * 1024 * 1024 + 256
         size = frames * 4 # float32 = 4 bytes
-        self.shm.seek(offset)
+        self.shm.seek(AUDIO_DATA_OFFSET)
         return self.shm.read(size)
 
     def read_video_frame(self):
@@ -146,20 +195,27 @@ class AgentSharedMemory:
         #   int64_t timestamp_us;
         # };
         try:
-            magic, width, height, stride, fmt, ts = struct.unpack('IIIIIq', header_data)
+            magic, width, height, stride, fmt, ts = VIDEO_HEADER.unpack(header_data)
             self.read_count += 1
+            self.m_video_reads.inc()
             if magic != VIDEO_MAGIC_NUMBER:
-                if self.read_count % 200 == 0:
-                     print(f"⚠️ Video Wait: Magic={hex(magic)} (Expected {hex(VIDEO_MAGIC_NUMBER)})")
+                self.m_video_not_ready.inc()
+                self.log.throttled(5.0, "warning", "video_wait",
+                                   f"⚠️ Video Wait: Magic={hex(magic)} (Expected {hex(VIDEO_MAGIC_NUMBER)})",
+                                   magic=magic)
                 return None
             
             # Read Pixel Data (Offset 256)
             pixel_size = width * height * 4
-            if pixel_size > VIDEO_SHM_SIZE - 256:
+            if pixel_size > VIDEO_SHM_SIZE - VIDEO_DATA_OFFSET:
                 return None # Safety check
 
-            self.video_shm.seek(256)
+            self.video_shm.seek(VIDEO_DATA_OFFSET)
             pixel_data = self.video_shm.read(pixel_size)
+
+            # Producer wrote a new frame while we copied: pixels may be mixed.
+            if VIDEO_HEADER.unpack_from(self.video_shm, 0)[5] != ts:
+                self.m_video_torn.inc()
             
             return {
                 'width': width,
@@ -171,21 +227,42 @@ class AgentSharedMemory:
             }
         except Exception as e:
             self.read_count += 1
-            if self.read_count % 200 == 0:
-                print(f"⚠️ Video Read Error: {e}")
+            self.m_video_errors.inc()
+            self.log.throttled(5.0, "warning", "video_read_error", f"⚠️ Video Read Error: {e}", error=str(e))
             return None
 
 class NeuralAgent:
-    def __init__(self):
-        self.memory = AgentSharedMemory()
+    def __init__(self, shm_backend=None, metrics=None, log=None, namespace=None):
+        self.shm_backend = shm_backend
+        # Segment namespace (one agent per browser, see supervisor.py); '' = legacy names
+        self.namespace = namespace if namespace is not None else os.environ.get(NAMESPACE_ENV, "")
+        # Observability (metrics.py / structured_log.py): no console I/O on the hot path.
+        self.metrics = metrics or MetricsRegistry(labels={"agent": self.namespace} if self.namespace else None)
+        self.log = log or structured_log.from_env()
+        self.exporters = []
+        self._busy_lock = threading.Lock()
+        self._init_metrics()
+        # Opt-in tracing/sampling (profiler.py), toggled with "profile start|stop"
+        self.tracer = Tracer()
+        # Voice command routing; extra aliases from $NEURAL_INTENT_CONFIG
+        self.intents = IntentEngine.from_config()
+        # Measured model/thumbnail/concurrency choices ($NEURAL_AUTOTUNE_PROFILE, see autotune.py)
+        self.tuning = autotune.load_profile()
+        self.vlm_model = self.tuning["vlm_model"]
+        self.llm_model = self.tuning["llm_model"]
+        # All Ollama traffic goes through one scheduler: grounding > planning > ambient.
+        # Every model shares one Ollama instance, so the cap is global as well as per model.
+        in_flight = int(os.environ.get("NEURAL_VLM_MAX_IN_FLIGHT", self.tuning["vlm_max_in_flight"]))
+        self.vlm_scheduler = VlmScheduler(default_in_flight=in_flight, total_in_flight=in_flight,
+                                          metrics=self.metrics)
+        self.memory = AgentSharedMemory(backend=shm_backend, metrics=self.metrics, log=self.log, namespace=self.namespace)
         self.running = True
         self.last_audio_ts = 0
         self.frames = []
+        self.utterance_stats = AudioStats()  # RMS/peak/p95 of self.frames, kept as chunks arrive
         self.silence_frames = 0
         self.frame_count = 0
         self.video_status = "No Signal"
-        self.last_vlm_ts = 0
-        self.vlm_busy = False
         self.is_recording = False
         self.last_sample_rate = 48000
         self.last_channels = 1
@@ -194,44 +271,117 @@ class NeuralAgent:
         self.recording_start_time = 0
         self.last_state = -1
         self.stuck_frames = 0
+        self.state_shm = None
+        self.transcriber = None  # TranscriptionClient when NEURAL_WHISPER_ADDR is set
+        self.whisper_lock = threading.Lock()
+        self.partial_whisper_lock = threading.Lock()  # Speculative partials never hold up the final pass
+        self.ollama_url = OLLAMA_URL
+        # Time sources (swapped for a virtual clock by replay_harness.py)
+        self.clock = time.time
+        self.sleep = time.sleep
+        # Debug frame/audio dumps, written by a background thread (debug_capture.py)
+        self.capture = debug_capture.from_env(self.metrics, clock=lambda: self.clock())
+        # When the ambient caption runs: on scene change, backing off on static pages and under load
+        self.ambient = AmbientCadence(metrics=self.metrics, clock=lambda: self.clock())
         
-        # Text Return Path (Agent -> Browser)
+        # Text Return Path (Agent -> Browser), SPSC queue (see text_channel.py)
+        # The pyautogui wake-up click is opt-in: Chrome polls the queue on its own timer.
+        doorbell = self.wake_up_browser if os.environ.get("NEURAL_WAKE_CLICK") == "1" else None
+        self.text_channel = None
         try:
-            self.text_shm = mmap.mmap(-1, 4096, tagname="NeuralChromium_Input_Text")
-            print("📝 Text Return Path Connected")
+            self.text_shm = open_segment(segment_name(TEXT_SHM_NAME, self.namespace), TEXT_SHM_SIZE, backend=shm_backend)
+            self.text_channel = TextChannelWriter(self.text_shm, doorbell=doorbell)
+            self.log.info("text_connected", "📝 Text Return Path Connected")
         except Exception as e:
-            print(f"⚠️ Text Path Failed (Chrome not ready?): {e}")
+            self.log.warning("text_init_failed", f"⚠️ Text Path Failed (Chrome not ready?): {e}", error=str(e))
             self.text_shm = None
 
-    def write_text_to_browser(self, text):
-        if not self.text_shm: return
-        try:
-            # Protocol: Revision (u32), Length (u32), Data
-            self.text_shm.seek(0)
-            current_rev_bytes = self.text_shm.read(4)
-            self.text_shm.seek(0)
-            current_rev = struct.unpack('I', current_rev_bytes)[0]
-            
-            new_rev = current_rev + 1
-            encoded = text.encode('utf-8')
-            length = len(encoded)
-            
-            print(f"📝 Writing Text to SHM (Rev {current_rev} -> {new_rev}): '{text}'")
+        # Action Path (Plan steps -> Input Injection)
+        # Opt-in session recording to a seekable trajectory file (trajectory.py)
+        self.trajectory = None
+        self.trajectory_fps = float(os.environ.get("NEURAL_TRAJECTORY_FPS", 5))
+        self.last_trajectory_frame = None
+        if os.environ.get("NEURAL_TRAJECTORY"):
+            self.trajectory = TrajectoryRecorder(trajectory_path(os.environ["NEURAL_TRAJECTORY"]), background=True)
+            self.log.info("trajectory_start", f"🎞️ Recording trajectory -> {self.trajectory.path}", path=self.trajectory.path)
+        self.injector = ActionInjector(self.write_text_to_browser, move_duration=0.1,
+                                       preconnect_writer=self.preconnect_browser,
+                                       listener=self.record_action if self.trajectory else None,
+                                       insert_writer=self.insert_text_browser)
+        # Opt-in: preconnect to navigation targets heard in partial transcripts (speculative_nav.py)
+        self.speculative = None
+        if os.environ.get("NEURAL_SPECULATIVE_NAV") == "1":
+            self.speculative = SpeculativeNavigator(self.intents, lambda audio: self.run_whisper(audio, WHISPER_PROMPT, partial=True),
+                                                    self.injector.execute, metrics=self.metrics, log=self.log)
+        self.plan_executor = PlanExecutor(self.memory, self.injector, self.ground_target)
+        # Degenerate grounding replies escalate (stricter prompt, smaller image, second VLM, DOM) under one deadline.
+        # The dom rung runs once something sets self.grounding.dom_locator (callable(target) -> (x, y) or None).
+        self.grounding = GroundingLadder(self.query_grounding, rungs=rungs_from_env(),
+                                         deadline=float(os.environ.get("NEURAL_GROUNDING_DEADLINE", 8.0)),
+                                         fallback_model=self.tuning["vlm_fallback_model"],
+                                         metrics=self.metrics, log=self.log)
 
-            # Pack: Rev, Len, Text
-            # We explicitly overwrite
-            self.text_shm.write(struct.pack('II', new_rev, length))
-            self.text_shm.write(encoded)
-            
-            # WAKE UP CHROME! (Force a Compositor Frame)
-            # If the page is static, Chrome stops calling OnFrame/Viz.
-            # We need an input event to force a tick so it reads the SHM.
-            self.wake_up_browser()
-            
+    def _init_metrics(self):
+        m = self.metrics
+        self.m_loop_iterations = m.counter("loop_iterations_total", "Agent loop iterations")
+        self.m_loop_seconds = m.histogram("loop_seconds", "Agent loop iteration time (incl. poll sleep)")
+        self.m_loop_busy = m.gauge("loop_busy", "Long blocking operations in progress (supervisor stall check waits)")
+        self.m_waiting_browser = m.gauge("waiting_for_browser", "1 until the browser's state segment is attached")
+        self.m_state = m.gauge("ui_state", "Brain switch state (0 idle, 1 recording)")
+        self.m_frames_new = m.counter("video_frames_new_total", "Frames with a new timestamp")
+        self.m_frames_stale = m.counter("video_frames_stale_total", "Reads that returned the previous frame")
+        self.m_audio_chunks = m.counter("audio_chunks_total", "New audio chunks consumed")
+        self.m_audio_dropped = m.counter("audio_chunks_dropped_total", "Chunks skipped by the producer before we read them")
+        self.m_audio_stale = m.counter("audio_stale_reads_total", "Audio reads with no new chunk")
+        self.m_audio_errors = m.counter("audio_header_errors_total", "Missing or invalid audio headers")
+        self.m_audio_buffered = m.gauge("audio_buffered_chunks", "Chunks buffered for transcription")
+        self.m_audio_rms = m.gauge("audio_rms", "RMS of the last audio chunk (before gain)")
+        self.m_vlm_requests = m.counter("vlm_requests_total", "VLM requests")
+        self.m_vlm_errors = m.counter("vlm_errors_total", "Failed VLM requests")
+        self.m_vlm_latency = m.histogram("vlm_latency_seconds", "VLM round trip")
+        self.m_vlm_early_stops = m.counter("vlm_early_stops_total", "Streamed VLM replies cut short (box complete or prose)")
+        self.m_llm_latency = m.histogram("llm_latency_seconds", "LLM (planning) round trip")
+        self.m_llm_errors = m.counter("llm_errors_total", "Failed LLM requests")
+        self.m_text_sent = m.counter("text_messages_total", "Messages queued to the browser")
+        self.m_text_overflows = m.counter("text_queue_overflows_total", "Messages dropped on a full text queue")
+        self.m_text_pending = m.gauge("text_queue_pending_bytes", "Bytes Chrome has not drained yet")
+        self.m_ambient_rate = m.gauge("ambient_vlm_rate_hz", "Effective ambient caption rate")
+
+    def write_text_to_browser(self, text, kind=KIND_OMNIBOX_TEXT):
+        if not self.text_channel: return False
+        try:
+            seq = self.text_channel.send(text, kind=kind, timeout=0.5)
+            self.m_text_sent.inc()
+            self.m_text_pending.set(self.text_channel.pending_bytes())
+            if kind == KIND_INSERT_TEXT:
+                text = f"<{len(text)}B field entry>"  # Don't log what goes into fields (passwords)
+            self.log.info("text_queued", f"📝 Queued Text to SHM (Msg {seq}, {self.m_text_pending.value}B pending): '{text}'",
+                          seq=seq, text=text)
+            return True
+        except QueueOverflow as e:
+            self.m_text_overflows.inc()
+            self.log.warning("text_overflow", f"⚠️ Text Queue Overflow ({self.text_channel.overflow_count} dropped): {e}")
         except Exception as e:
-            print(f"Write Failed: {e}")
+            self.log.error("text_write_failed", f"Write Failed: {e}", error=str(e))
+        return False
+
+    def insert_text_browser(self, selector, text, submit=False, index=0):
+        # Bulk text into a page field (Chrome focuses it and runs one insertText)
+        return self.write_text_to_browser(insert_text_payload(selector, text, submit, index), kind=KIND_INSERT_TEXT)
+
+    def record_action(self, action):
+        self.trajectory.add_action(self.clock() * 1e6, action)
+
+    def mark_step(self, label):
+        # Trajectory seek point: one per command, voice or typed
+        if self.trajectory: self.trajectory.mark_step(self.clock() * 1e6, label)
+
+    def preconnect_browser(self, url):
+        # Connection warm-up only; the omnibox text is untouched
+        return self.write_text_to_browser(url, kind=KIND_PRECONNECT)
 
     def wake_up_browser(self):
+        # Optional doorbell for the text queue (NEURAL_WAKE_CLICK=1).
         try:
             if pyautogui:
                 # Force Click at Top-Left to ensure Chrome is Focused and Awake
@@ -242,142 +392,198 @@ class NeuralAgent:
         except: pass
 
     def run(self):
-        print("🧠 Neural Agent Connected via Shared Memory")
-        print("🔊 Listening for Audio (Neural Audio Hook v2)...")
+        self.log.info("agent_start", "🧠 Neural Agent Connected via Shared Memory", namespace=self.namespace)
+        self.log.info("audio_listen", "🔊 Listening for Audio (Neural Audio Hook v2)...")
         
-        # Poll for State Shared Memory (created by Chrome)
-        print("Waiting for UI Control State...")
+        # Metrics first: the supervisor's health check scrapes them while we wait for the browser
+        self.exporters = start_exporters_from_env(self.metrics)
+        try:
+            self.wait_for_browser()
+
+            # Start Terminal Input Thread (Fallback)
+            self.start_terminal_listener()
+            if os.environ.get("NEURAL_PROFILE") == "1":
+                self.handle_profile_command("profile start")
+
+            while self.running:
+                self.step()
+        finally:
+            if self.tracer.enabled:
+                self.handle_profile_command("profile stop")
+            self.vlm_scheduler.shutdown()
+            self.plan_executor.close()
+            self.capture.close()
+            if self.trajectory:
+                self.trajectory.close()
+            if self.speculative:
+                self.speculative.close()
+            for exporter in self.exporters:
+                exporter.stop()
+            self.log.close()
+
+    def wait_for_browser(self):
+        """Polls for the State Shared Memory (created by Chrome), reporting waiting_for_browser meanwhile."""
+        self.log.info("state_wait", "Waiting for UI Control State...")
+        self.m_waiting_browser.set(1)
         self.state_shm = None
-        while not self.state_shm:
+        while not self.state_shm and self.running:
             try:
-                self.state_shm = mmap.mmap(-1, 4, tagname="NeuralChromium_State")
-                print("✅ Control State Connected!")
-            except:
-                time.sleep(1)
+                self.state_shm = open_segment(segment_name(STATE_SHM_NAME, self.namespace), STATE_SHM_SIZE, readonly=True,
+                                              create=False, backend=self.shm_backend)
+                self.log.info("state_connected", "✅ Control State Connected!")
+            except Exception:
+                self.sleep(1)
+        self.m_waiting_browser.set(0)
+
+    @contextlib.contextmanager
+    def busy(self):
+        """Marks a long blocking operation (Whisper, LLM, plan) so supervisor.py doesn't take it for a stall."""
+        with self._busy_lock:
+            self.m_loop_busy.inc()
+        try:
+            yield
+        finally:
+            with self._busy_lock:
+                self.m_loop_busy.dec()
+
+    def step(self):
+        """One iteration of the agent loop (state check, vision, audio, PTT logic)."""
+        start = time.perf_counter()
+        try:
+            self._step()
+        finally:
+            self.m_loop_iterations.inc()
+            self.m_loop_seconds.observe(time.perf_counter() - start)
+
+    @traced("step")
+    def _step(self):
+        # check state
+        self.state_shm.seek(0)
+        state = struct.unpack('i', self.state_shm.read(4))[0]
         
-        # Start Terminal Input Thread (Fallback)
-        self.start_terminal_listener()
+        if state != self.last_state:
+            self.log.info("state_change", f"🔄 State Change: {self.last_state} -> {state}", old=self.last_state, new=state)
+            self.last_state = state
+            self.m_state.set(state)
+        
+        # Always try to connect/process video (for debug/preview)
+        if not self.memory.video_shm:
+            self.memory.connect_video()
+        self.process_vision()
+        
+        # Check for manual file commands (Fallback for Audio)
+        self.check_command_file()
 
-        while self.running:
-            # check state
-            self.state_shm.seek(0)
-            state = struct.unpack('i', self.state_shm.read(4))[0]
+        # Push-to-Talk Logic (Brain Switch) with Hysteresis
+        if state == 1:
+            # User pressed "Microphone" (Brain ON)
+            if not self.is_recording:
+                 self.log.info("recording_start", f"\n🔴 RECORDING (Brain ON)... [TS={self.last_audio_ts}]", ts=self.last_audio_ts)
+                 if self.last_state != -1: # Don't beep on first loop init
+                      try: winsound.Beep(1000, 100) # High Beep on Start
+                      except: pass
+                 self.is_recording = True
+                 self.recording_start_time = self.clock() # Timestamp start
+                 self.frames = [] # Start fresh
+                 self.utterance_stats.reset()
+                 if self.speculative: self.speculative.reset()
             
-            if state != self.last_state:
-                print(f"🔄 State Change: {self.last_state} -> {state}")
-                self.last_state = state
+            # Reset Cooldown (Keep alive for 1s after release)
+            self.recording_cooldown = 100 # ~1.0s tail (Throttled loop)
             
-            # Always try to connect/process video (for debug/preview)
-            if not self.memory.video_shm:
-                self.memory.connect_video()
-            self.process_vision()
+            # CRITICAL: Fast Loop (No Sleep) to beat Windows 15ms Timer Resolution
+            self.process_audio()
+            if self.speculative:
+                self.speculative.maybe_transcribe(self.frames, self.last_sample_rate,  # Non-blocking
+                                                  p95=lambda: self.utterance_stats.quantile(0.95))
+            return
             
-            # Check for manual file commands (Fallback for Audio)
-            self.check_command_file()
-
-            # Push-to-Talk Logic (Brain Switch) with Hysteresis
-            if state == 1:
-                # User pressed "Microphone" (Brain ON)
-                if not self.is_recording:
-                     print(f"\n🔴 RECORDING (Brain ON)... [TS={self.last_audio_ts}]")
-                     if self.last_state != -1: # Don't beep on first loop init
-                          try: winsound.Beep(1000, 100) # High Beep on Start
-                          except: pass
-                     self.is_recording = True
-                     self.recording_start_time = time.time() # Timestamp start
-                     self.frames = [] # Start fresh
-                
-                # Reset Cooldown (Keep alive for 1s after release)
-                self.recording_cooldown = 100 # ~1.0s tail (Throttled loop)
-                
-                # CRITICAL: Fast Loop (No Sleep) to beat Windows 15ms Timer Resolution
+        elif self.is_recording:
+            # User released button, but we check cooldown/debounce AND Minimum Duration
+            # Force at least 2.0 seconds of recording time to prevent premature triggers.
+            if self.recording_cooldown > 0 or (self.clock() - self.recording_start_time < 2.0):
+                self.recording_cooldown -= 1
+                # Continue capturing "Tail" audio
                 self.process_audio()
-                continue 
-                
-            elif self.is_recording:
-                # User released button, but we check cooldown/debounce AND Minimum Duration
-                # Force at least 2.0 seconds of recording time to prevent premature triggers.
-                if self.recording_cooldown > 0 or (time.time() - self.recording_start_time < 2.0):
-                    self.recording_cooldown -= 1
-                    # Continue capturing "Tail" audio
-                    self.process_audio()
-                    # We can sleep a tiny bit here since we are just capturing tail, 
-                    # but safer to stay fast to avoid drops even in tail.
-                    time.sleep(0.01) # Throttle to 10ms to make '30 frames' last 300ms
-                    continue
-                else:
-                    # Cooldown expired -> Transcribe
-                    print("\n🛑 STOP (Brain OFF) -> Transcribing...")
-                    try: winsound.Beep(500, 100) # Low Beep on Stop
-                    except: pass
-                    self.is_recording = False
-                    self.transcribe_buffer()
+                # We can sleep a tiny bit here since we are just capturing tail, 
+                # but safer to stay fast to avoid drops even in tail.
+                self.sleep(0.01) # Throttle to 10ms to make '30 frames' last 300ms
+                return
             else:
-                # Idle Mode
-                if self.frame_count % 100 == 0:
-                     sys.stdout.write(f"\r💤 Idle (Toggle Brain to Talk) Video: {self.video_status} \033[K")
-                     sys.stdout.flush()
-                self.frame_count += 1
-                
-                # Vision Pipeline (Only when not recording)
-                self.process_vision()
-                time.sleep(0.01) # Standard UI poll rate
+                # Cooldown expired -> Transcribe
+                self.log.info("recording_stop", "\n🛑 STOP (Brain OFF) -> Transcribing...", chunks=len(self.frames))
+                try: winsound.Beep(500, 100) # Low Beep on Stop
+                except: pass
+                self.is_recording = False
+                if self.speculative: self.speculative.stop()  # Drop partials still queued for this utterance
+                with self.busy():  # Model load, transcription and any agent action it triggers
+                    self.transcribe_buffer()
+        else:
+            # Idle Mode
+            if self.frame_count % 100 == 0:
+                 self.log.status(f"💤 Idle (Toggle Brain to Talk) Video: {self.video_status}")
+            self.frame_count += 1
+            
+            # Vision Pipeline (Only when not recording)
+            self.process_vision()
+            self.sleep(0.01) # Standard UI poll rate
 
+    @traced()
     def process_vision(self):
         frame = self.memory.read_video_frame()
         if not frame: return
 
         # Simple debug: Print FPS if frame changes
         # (TODO: Add VLM Logic here)
-        if frame['timestamp'] != self.memory.last_video_ts:
+        if frame['timestamp'] == self.memory.last_video_ts:
+             self.m_frames_stale.inc()
+        else:
+             self.m_frames_new.inc()
              self.memory.last_video_ts = frame['timestamp']
              self.video_status = f"{frame['width']}x{frame['height']}"
              
-             # --- VLM INFERENCE LOOP (Mutex Protected) ---
-             current_time = time.time()
-             if not self.vlm_busy and (current_time - self.last_vlm_ts > 1.0): 
-                 self.last_vlm_ts = current_time
-                 self.vlm_busy = True # Lock
-                 
+             # --- AMBIENT VLM (lowest priority, see vlm_scheduler.py / ambient_cadence.py) ---
+             queue_depth = self.vlm_scheduler.pending()
+             if self.ambient.should_query(frame_fingerprint(frame), queue_depth):
                  # 1. Prepare Image
-                 img = Image.frombytes('RGBA', (frame['width'], frame['height']), frame['data'], 'raw', 'BGRA')
-                 img.thumbnail((512, 512)) 
+                 img = frame_to_image(frame)
+                 img.thumbnail((self.tuning["vlm_thumbnail"],) * 2)
                  
-                 # 2. Async Query (Threaded)
-                 def vlm_task():
-                     try:
-                         desc = self.query_ollama_vision("Describe this screen in 5 words.", img)
-                         if desc:
-                             print(f"\n👁️ VLM Saw: {desc}")
-                     finally:
-                         self.vlm_busy = False # Unlock
-                 
-                 threading.Thread(target=vlm_task, daemon=True).start()
+                 # 2. Async Query: replaces a caption request still waiting for a slot
+                 submitted = self.clock()
+                 future = self.submit_vision(AMBIENT_PROMPT, img, priority=AMBIENT, timeout=AMBIENT_DEADLINE,
+                                             coalesce_key="ambient", http_timeout=AMBIENT_HTTP_TIMEOUT)
+                 future.add_done_callback(lambda f: self._on_ambient_caption(f, submitted))
+             self.m_ambient_rate.set(self.ambient.rate())
              # ----------------------------------
 
-            # --- DEBUG: Save 1 frame to disk to verify ---
-             if not os.path.exists("debug_frame.png"):
-                 # Create Image from BGRA buffer
-                 # Note: Chrome usually sends BGRA on Windows
-                 img = Image.frombytes('RGBA', (frame['width'], frame['height']), frame['data'], 'raw', 'BGRA')
-                 img.save("debug_frame.png")
-                 print("\n📸 Saved debug_frame.png (Sanity Check)")
+            # --- DEBUG: Sampled frame dump (sanity check), queued for the capture thread ---
+             self.capture.capture_frame(frame)
+             if self.trajectory:
+                 now = self.clock()
+                 if self.last_trajectory_frame is None or now - self.last_trajectory_frame >= 1.0 / self.trajectory_fps:
+                     self.last_trajectory_frame = now
+                     self.trajectory.add_frame(now * 1e6, frame)
             # ---------------------------------------------100Hz
 
+    @traced()
     def process_audio(self):
         header = self.memory.read_audio_header()
         if not header:
-            print("DEBUG: No Audio Header found (Read failed)") 
+            self.m_audio_errors.inc()
+            self.log.throttled(5.0, "warning", "audio_header_missing", "DEBUG: No Audio Header found (Read failed)")
             return
             
         if header['magic'] != AUDIO_MAGIC_NUMBER:
-            # Only print if it's NOT zero (0x0 means just not initialized yet)
+            # Only warn if it's NOT zero (0x0 means just not initialized yet)
             if header['magic'] != 0:
-                 print(f"DEBUG: Magic Mismatch: Read {hex(header['magic'])} (Expected {hex(AUDIO_MAGIC_NUMBER)})")
+                 self.m_audio_errors.inc()
+                 self.log.throttled(5.0, "warning", "audio_magic_mismatch",
+                                    f"DEBUG: Magic Mismatch: Read {hex(header['magic'])} (Expected {hex(AUDIO_MAGIC_NUMBER)})",
+                                    magic=header['magic'])
             else:
                  # Magic is 0. Chrome hasn't started writing audio yet.
-                 if self.frame_count % 100 == 0:
-                     print(f"⚠️ Audio Idle: SharedMem=0x0 (Chrome Mic Inactive?)")
+                 self.log.throttled(10.0, "info", "audio_idle", "⚠️ Audio Idle: SharedMem=0x0 (Chrome Mic Inactive?)")
             return
         
         # print(f"DEBUG: Header Found! TS={header['timestamp']} Last={self.last_audio_ts} Frames={header['frames']}")
@@ -387,9 +593,9 @@ class NeuralAgent:
         
         # Debug: Print header occasionally to verify we are reading *something*
         # Reduced frequency to avoid spamming the console
-        if self.frame_count % 500 == 0:
-             sys.stdout.write(f"\nDEBUG: Reading SHM Header: Magic={hex(header['magic'])} Rate={header['rate']} Frames={header['frames']}\n")
-             sys.stdout.flush()
+        if self.frame_count % 500 == 0 and self.log.enabled("debug"):
+             self.log.debug("audio_header", f"DEBUG: Reading SHM Header: Magic={hex(header['magic'])} Rate={header['rate']} Frames={header['frames']}",
+                            rate=header['rate'], frames=header['frames'])
 
         # Check for Reset (New Page Load = New Audio Source = TS reset to 0)
         # If timestamp jumps backwards significantly, accept it.
@@ -403,42 +609,47 @@ class NeuralAgent:
             # Timestamp is usually microseconds or nanoseconds? C++ `TimeTicks::Now()` is usually microseconds.
             # Let's assume if it dropped by > 1 second (1,000,000 us), it's a reset.
             if (self.last_audio_ts - header['timestamp']) > 500000: # 0.5s tolerance
-                 print(f"🔄 Audio Source Reset Detected! (TS {self.last_audio_ts} -> {header['timestamp']})")
+                 self.log.info("audio_reset", f"🔄 Audio Source Reset Detected! (TS {self.last_audio_ts} -> {header['timestamp']})",
+                               old_ts=self.last_audio_ts, new_ts=header['timestamp'])
                  self.last_audio_ts = header['timestamp'] - 1 # Allow update
         
         if header['timestamp'] <= self.last_audio_ts:
             # Silently return on stale data
+            self.m_audio_stale.inc()
             if self.is_recording:
                 self.stuck_frames += 1
                 if self.stuck_frames % 50 == 0:
-                     print(f"⚠️ Audio Stuck (No new data from Chrome). Is Mic active on this page? (Stuck Count: {self.stuck_frames})")
+                     self.log.throttled(2.0, "warning", "audio_stuck",
+                                        f"⚠️ Audio Stuck (No new data from Chrome). Is Mic active on this page? (Stuck Count: {self.stuck_frames})",
+                                        stuck=self.stuck_frames)
             else:
                 self.stuck_frames = 0 # Reset if not recording and timestamp is stale
             return 
             
         self.stuck_frames = 0
+        # Drop detection: a gap of more than one chunk duration means the producer
+        # overwrote chunks we never saw.
+        chunk_us = header['frames'] * 1e6 / header['rate'] if header['rate'] else 0
+        gap_us = header['timestamp'] - self.last_audio_ts
+        if self.last_audio_ts > 0 and chunk_us > 0 and gap_us > 1.5 * chunk_us:
+            self.m_audio_dropped.inc(int(round(gap_us / chunk_us)) - 1)
+        self.m_audio_chunks.inc()
         self.last_audio_ts = header['timestamp']
         
         raw_bytes = self.memory.read_audio_data(header['frames'])
         # Convert raw bytes (float32) to numpy array
         audio_float = np.frombuffer(raw_bytes, dtype=np.float32)
 
-        # 1. Gain/AGC (Automatic Gain Control)
+        # 1. Gain/AGC (Automatic Gain Control, see audio_stats.py)
         # Previously we used fixed 150x gain. Now we use dynamic normalization.
-        rms = np.sqrt(np.mean(audio_float**2))
-        
-        gain = 1.0
-        if 0.0001 < rms < 0.1:
-            gain = 0.1 / rms
-            gain = min(gain, 30.0) # Cap at 30x to avoid noise explosion
+        sum_sq = float(np.dot(audio_float, audio_float))
+        rms = np.sqrt(sum_sq / len(audio_float)) if len(audio_float) else 0.0
+        self.m_audio_rms.set(float(rms))
+        gain = agc_gain(rms)
         
-        audio_boosted = audio_float * gain
         # 2. VAD (Voice Activity Detection)
-        # Check RMS of the boosted float audio
-        boosted_rms = np.sqrt(np.mean(audio_boosted**2))
-        
-        # Convert to Int16 for storage/transcription
-        audio_int16 = (audio_boosted * 32767).astype(np.int16)
+        # RMS scales linearly with gain: no need to boost the chunk to measure it
+        boosted_rms = rms * gain
         
         # VAD: Speech detected if RMS > 0.005 (after gain) - adjusted for sensitivity
         is_speech = boosted_rms > 0.005
@@ -453,9 +664,7 @@ class NeuralAgent:
             if self.silence_frames == 0:
                 status_text = "🔴 REC      "
             
-            # Use ANSI escape code \033[K to clear the rest of the line and \r to return to start
-            sys.stdout.write(f"\r{status_text} Vol: [{vol_bar}] Video: {self.video_status} \033[K")
-            sys.stdout.flush()
+            self.log.status(f"{status_text} Vol: [{vol_bar}] Video: {self.video_status}")
 
         # Voice Activity Detection
         # In Push-to-Talk (self.is_recording), we capture EVERYTHING.
@@ -463,28 +672,29 @@ class NeuralAgent:
         if is_speech or self.is_recording:
             # IMPORTANT: Buffer RAW float data to avoid per-chunk gain distortion
             self.frames.append(audio_float.tobytes())
+            self.utterance_stats.add(audio_float, sum_sq)
+            if self.trajectory: self.trajectory.add_audio(self.clock() * 1e6, audio_float, self.last_sample_rate)
+            self.m_audio_buffered.set(len(self.frames))
             self.silence_frames = 0
         else:
             self.silence_frames += 1
 
 
+    @traced()
     def transcribe_buffer(self):
         text = ""  # Initialize to prevent UnboundLocalError
         # Allow short audio for debugging purposes
         if len(self.frames) == 0:
-             print(f"⚠️ Buffer empty. (TS={self.last_audio_ts}, Mic Active?)")
+             self.log.warning("audio_buffer_empty", f"⚠️ Buffer empty. (TS={self.last_audio_ts}, Mic Active?)", ts=self.last_audio_ts)
              return
              
-        print(f"📝 Transcribing {len(self.frames)} frames...")
-        audio_data = b''.join(self.frames)
+        self.log.info("transcribe_start", f"📝 Transcribing {len(self.frames)} frames...", chunks=len(self.frames))
+        audio_data = bytearray().join(self.frames)  # Writable: normalized in place below
         try:
-            import whisper
-            from scipy import signal
-            
             # Convert int16 audio to float32 numpy array (Whisper's expected format)
             sample_rate = int(self.last_sample_rate)
             
-            print(f"📊 Audio: {len(audio_data)} bytes, {sample_rate}Hz")
+            self.log.info("audio_buffer", f"📊 Audio: {len(audio_data)} bytes, {sample_rate}Hz", bytes=len(audio_data), rate=sample_rate)
             
             # Convert raw bytes to float32 numpy array
             audio_float32 = np.frombuffer(audio_data, dtype=np.float32)
@@ -492,76 +702,53 @@ class NeuralAgent:
             # Source is already Mono (handled by C++ NeuralAudioWriter)
             # Decimation REMOVED (Was causing garbled audio if source was actually Mono)
 
-            # Save Raw Audio for Debugging
-            
-            # Save Raw Audio for Debugging
-            try:
-                from scipy.io import wavfile
-                # Scale to int16 for WAV saving
-                wav_data = (audio_float32 * 32767).astype(np.int16)
-                wavfile.write("debug_audio.wav", sample_rate, wav_data)
-                print("💾 Saved debug_audio.wav")
-            except Exception as e:
-                print(f"⚠️ Could not save WAV: {e}")
+            # Save Raw Audio for Debugging (queued; written off the critical path)
+            self.capture.capture_audio(audio_float32, sample_rate)
 
             # Normalize using 95th percentile (Robust to clicks/pops)
             # If we just use max(), a single click will make the voice quiet.
-            abs_audio = np.abs(audio_float32)
-            p95 = np.percentile(abs_audio, 95)
-            
+            # p95/RMS/peak were tracked as chunks arrived; this is one in-place scale.
+            stats = self.utterance_stats
+            if stats.count != len(audio_float32):  # Buffer was replaced behind our back: rescan once
+                stats = AudioStats()
+                stats.add(audio_float32)
+            if stats.peak == 0:
+                self.log.info("audio_silent", "❌ Audio Discarded (Absolute Silence).")
+                return
+            p95 = stats.quantile(0.95)
+            gain = normalize(audio_float32, stats)
             if p95 > 0.0001: # Threshold: 0.01% signal (Almost zero, accept everything)
-                gain = 0.5 / p95 # Target 50% amplitude for the main body
-                audio_float32 = audio_float32 * gain
-                audio_float32 = np.clip(audio_float32, -1.0, 1.0)
-                print(f"🔊 Boosted Audio (Gain={gain:.1f}x, p95={p95:.5f})")
+                self.log.info("audio_gain", f"🔊 Boosted Audio (Gain={gain:.1f}x, p95={p95:.5f})", gain=gain, p95=p95)
             else:
                 # Log but DO NOT ABORT (Unless strictly 0)
                 # Some mics are incredibly quiet.
-                if p95 == 0:
-                     print(f"❌ Audio Discarded (Absolute Silence).")
-                     return
-                print(f"⚠️ Audio Very Quiet (p95={p95:.5f}). Proceeding anyway.")
-                # Apply massive gain
-                audio_float32 = audio_float32 * 1000.0  
-                audio_float32 = np.clip(audio_float32, -1.0, 1.0)
+                self.log.warning("audio_quiet", f"⚠️ Audio Very Quiet (p95={p95:.5f}). Proceeding anyway.", gain=gain, p95=p95)
             
-            # Audio diagnostics
+            # Audio diagnostics (pre-clip estimates from the running stats)
             duration = len(audio_float32) / sample_rate
-            rms = np.sqrt(np.mean(audio_float32**2))
-            peak = np.max(np.abs(audio_float32))
-            print(f"🔍 Duration: {duration:.2f}s, RMS: {rms:.4f}, Peak: {peak:.4f}")
+            rms = stats.rms * gain
+            peak = min(stats.peak * gain, 1.0)
+            self.log.info("audio_stats", f"🔍 Duration: {duration:.2f}s, RMS: {rms:.4f}, Peak: {peak:.4f}",
+                          seconds=duration, rms=rms, peak=peak)
             
             # Resample to 16kHz (Whisper's native sample rate) for better accuracy
             if sample_rate != 16000:
+                from scipy import signal
                 num_samples = int(len(audio_float32) * 16000 / sample_rate)
                 audio_float32 = signal.resample(audio_float32, num_samples)
-                print(f"🔄 Resampled to 16kHz ({num_samples} samples)")
+                self.log.debug("audio_resampled", f"🔄 Resampled to 16kHz ({num_samples} samples)", samples=num_samples)
             
             # Pad short audio to at least 1.5 seconds (24000 samples @ 16kHz) to reduce hallucinations
             MIN_SAMPLES = 24000
             if len(audio_float32) < MIN_SAMPLES:
                 padding = MIN_SAMPLES - len(audio_float32)
                 audio_float32 = np.pad(audio_float32, (0, padding), 'constant')
-                print(f"🧱 Padded audio to 1.5s")
+                self.log.debug("audio_padded", "🧱 Padded audio to 1.5s")
 
-            # Low-latency model switch: Use 'small.en' for better accuracy than 'base.en'
-            if not hasattr(self, 'whisper_model'):
-                print("🔄 Loading Whisper model (small.en)...")
-                self.whisper_model = whisper.load_model("small.en")
-            
-            # Transcribe with Context Prompt (Biasing)
-            # This tells Whisper: "Expect these kinds of phrases", which prevents "Thank you" hallucinations.
-            prompt = "Go to YouTube. Go to Twitter. Go to Google. Click. Type. Scroll. Search."
-            result = self.whisper_model.transcribe(
-                audio_float32, 
-                language='en', 
-                fp16=False,
-                initial_prompt=prompt,
-                condition_on_previous_text=False
-            )
-            print(f"📝 Result: \"{result['text']}\"")
+            raw_text = self.run_whisper(np.asarray(audio_float32, dtype=np.float32), WHISPER_PROMPT)
+            self.log.info("transcription", f"📝 Result: \"{raw_text}\"", text=raw_text)
             
-            final_text = result['text'].strip().lower()
+            final_text = raw_text.strip().lower()
 
             # Hallucination Filter: Check for heavy repetition
             # e.g. "Search. Search. Search."
@@ -570,104 +757,128 @@ class NeuralAgent:
                 unique_words = set(words)
                 # If unique words are less than 40% of total, it's likely a loop
                 if len(unique_words) / len(words) < 0.4:
-                     print(f"⚠️ Hallucination Detected (Repetitive): '{final_text}' -> Ignored.")
+                     self.log.warning("transcription_repetitive", f"⚠️ Hallucination Detected (Repetitive): '{final_text}' -> Ignored.",
+                                      text=final_text)
                      final_text = ""
 
             # Remove trailing punctuation
             final_text = final_text.strip(".,!?")
             text = final_text # Restore variable name for downstream logic
 
-            # Correction Layer (Fix common mishearings)
-            corrections = {
-                "you tube": "youtube",
-                "go to the": "go to",
-                "show me": "go to"
-            }
-            text_lower = text.lower()
-            for wrong, right in corrections.items():
-                if wrong in text_lower:
-                    text = text_lower.replace(wrong, right) # Apply correction
-            
-            # Intent Router (Multi-Modal Dispatacher)
-            clean_text = text.lower().replace(".", "")
-            is_navigation = False
-            
-            # 1. Navigation Intent
-            if clean_text.startswith("go to "):
-                target = clean_text.replace("go to ", "").strip()
-                if " " not in target: # Single word target usually means domain
-                    if "twitter" in target: target = "x.com"
-                    elif "x" == target: target = "x.com"
-                    elif "youtube" in target: target = "youtube.com"
-                    elif "google" in target: target = "google.com"
-                    elif "github" in target: target = "github.com"
-                    elif "reddit" in target: target = "reddit.com"
-                    elif "." not in target: target += ".com" 
-                    print(f"🧠 Intent: Navigation -> {target}")
-                    text = target
-                    is_navigation = True
-                else:
-                     is_navigation = True
-            
-            elif "youtube" in clean_text:
-                 print(f"🧠 Intent: Navigation (Phonetic Fix) -> youtube.com")
-                 text = "youtube.com"
-                 is_navigation = True
-            
-            # 2. Action Intent (Click, Type, Solve, Fill, Plan)
-            elif any(x in clean_text for x in ["click", "type", "solve", "fill", "scroll", "press", "plan", "analyze", "think", "reason", "how to", "describe", "see", "look", "what"]):
-                print(f"🧠 Intent: Agent Action -> \"{text}\"")
+            # Intent Router (Multi-Modal Dispatcher, see intent_engine.py)
+            intent = self.intents.route(text)
+            text = intent.text
+            self.mark_step(f"voice {intent.kind}: {text}")
+            if self.speculative: self.speculative.resolve(intent)
+            if intent.kind == AGENT:
+                self.log.info("intent", f"🧠 Intent: Agent Action -> \"{text}\" ({intent.confidence:.2f})",
+                              kind=intent.kind, text=text, rule=intent.rule, confidence=intent.confidence)
                 # DO NOT write to browser text input (which triggers nav)
                 # Instead, dispatch to Agent Action Loop
                 self.execute_agent_action(text)
-                is_navigation = False
-            
-            else:
-                # Default: Treat as Navigation/Search
-                is_navigation = True
-
-            if is_navigation and text:
-                print(f"✨ Sending Navigation Command: \"{text}\"")
+            elif text:
+                # Navigation, or anything else as an omnibox search
+                self.log.info("intent", f"🧠 Intent: {intent.kind.title()} -> {text} ({intent.rule}, {intent.confidence:.2f})",
+                              kind=intent.kind, text=text, rule=intent.rule, confidence=intent.confidence)
+                self.log.info("navigate", f"✨ Sending Navigation Command: \"{text}\"", text=text)
                 self.write_text_to_browser(text)
             
             if not text:
-                print("🤷 (No speech detected)")
+                self.log.info("no_speech", "🤷 (No speech detected)")
                 
-            print("🔊 Listening...") 
+            self.log.info("audio_listen", "🔊 Listening...")
         except Exception as e:
-            print(f"❌ Error: {e}")
-            import traceback
-            traceback.print_exc()
+            self.log.error("transcribe_failed", f"❌ Error: {e}", error=str(e), traceback=traceback.format_exc())
         
         self.frames = []
+        self.utterance_stats.reset()
+        self.m_audio_buffered.set(0)
         self.silence_frames = 0
 
-    def query_ollama(self, prompt):
+    def run_whisper(self, audio, prompt, partial=False):
+        """
+        16kHz mono float32 -> text. Uses the shared transcription server
+        (transcription_server.py) when NEURAL_WHISPER_ADDR is set, else a local model.
+        partial: speculative pass. Locally it runs on the smallest model under its
+        own lock, so a final pass never waits for one to finish.
+        """
+        if self.transcriber is None and os.environ.get(WHISPER_ADDR_ENV):
+            try:
+                self.transcriber = TranscriptionClient()
+                self.log.info("whisper_remote", f"🎙️ Using transcription server {self.transcriber.address}")
+            except OSError as e:
+                self.log.warning("whisper_remote_failed", f"⚠️ Transcription server unreachable: {e}", error=str(e))
+                raise
+        if self.transcriber is not None:
+            try:
+                return self.transcriber.transcribe(audio, prompt, timeout=60)
+            except Exception:
+                self.transcriber.close()
+                self.transcriber = None  # Reconnect on the next utterance
+                raise
+
+        import whisper
+        # Final: largest model the autotuner measured as comfortably faster than real time
+        attr, name, lock = "whisper_model", self.tuning["whisper_model"], self.whisper_lock
+        if partial:
+            attr, name, lock = "partial_whisper_model", autotune.WHISPER_CANDIDATES[0], self.partial_whisper_lock
+        with lock:
+            if not hasattr(self, attr):
+                self.log.info("whisper_load", f"🔄 Loading Whisper model ({name})...", model=name, partial=partial)
+                setattr(self, attr, whisper.load_model(name))
+            result = getattr(self, attr).transcribe(
+                audio, 
+                language='en', 
+                fp16=False,
+                initial_prompt=prompt,
+                condition_on_previous_text=False
+            )
+        return result['text']
+
+    def _on_ambient_caption(self, future, submitted):
+        if future.cancelled() or future.exception() is not None:
+            return  # Superseded, expired or shut down
+        self.ambient.observe_latency(self.clock() - submitted)
+        desc = future.result()
+        if desc:
+            self.log.info("vlm_caption", f"\n👁️ VLM Saw: {desc}", caption=desc)
+
+    def query_ollama(self, prompt, priority=PLANNING, timeout=None):
         """
-        Sends prompt to local Llama instance via Ollama.
+        Sends prompt to local Llama instance via Ollama (queued in the VLM scheduler).
         """
+        try:
+            return self.vlm_scheduler.run(self.llm_model, lambda: self._llm_request(prompt), priority, timeout)
+        except (DeadlineExceeded, Superseded) as e:
+            self.log.info("llm_dropped", f"⏭️ LLM request dropped: {e}", reason=type(e).__name__)
+            return None
+
+    @traced("llm_request", cat="http")
+    def _llm_request(self, prompt):
         try:
             import requests
-            # Use 'llama3' or 'mistral' or 'qwen2.5-coder'
-            model = "llama3" 
+            model = self.llm_model
             
             payload = {
                 "model": model,
                 "prompt": prompt,
                 "stream": False
             }
-            start_time = time.time()
-            response = requests.post("http://localhost:11434/api/generate", json=payload, timeout=30)
-            duration = time.time() - start_time
+            start_time = time.perf_counter()
+            response = requests.post(self.ollama_url, json=payload, headers=self.http_headers(), timeout=30)
+            duration = time.perf_counter() - start_time
+            self.m_llm_latency.observe(duration)
             
             if response.status_code == 200:
                 fps = 1.0 / duration if duration > 0 else 0
-                print(f"⚡ Llama Inference: {duration:.2f}s ({fps:.2f} FPS)")
+                self.log.info("llm_inference", f"⚡ Llama Inference: {duration:.2f}s ({fps:.2f} FPS)", seconds=duration)
                 return response.json().get("response", "").strip()
+            self.m_llm_errors.inc()
         except ImportError:
-            print("⚠️ 'requests' module not found. Run: pip install requests")
+            self.log.error("requests_missing", "⚠️ 'requests' module not found. Run: pip install requests")
         except Exception as e:
-            print(f"⚠️ Ollama Connection Failed: {e}")
+            self.m_llm_errors.inc()
+            self.log.warning("llm_failed", f"⚠️ Ollama Connection Failed: {e}", error=str(e))
         return None
 
     def check_command_file(self):
@@ -676,150 +887,255 @@ class NeuralAgent:
                 with open("manual_command.txt", "r") as f:
                     command = f.read().strip()
                 if command:
-                    print(f"\n📂 File Command Detected: {command}")
-                    self.execute_agent_action(command)
+                    self.log.info("file_command", f"\n📂 File Command Detected: {command}", command=command)
+                    self.dispatch_command(command)
                 try:
                     os.remove("manual_command.txt")
                 except: pass
         except Exception as e:
-            print(f"⚠️ File Watcher Error: {e}")
+            self.log.warning("file_watch_failed", f"⚠️ File Watcher Error: {e}", error=str(e))
 
-    def query_ollama_vision(self, prompt, image):
+    def http_headers(self):
+        # Lets supervisor.py's model gateway share Ollama fairly between agents
+        return {"X-Neural-Agent": self.namespace or "default"}
+
+    def encode_vlm_image(self, image):
+        """PIL Image -> base64 JPEG (low quality for speed) as Ollama expects."""
+        import base64
+        from io import BytesIO
+        buffered = BytesIO()
+        image = image.convert('RGB') # JPEG needs RGB
+        image.save(buffered, format="JPEG", quality=self.tuning["jpeg_quality"]) # Low quality for speed
+        return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+    def query_ollama_vision(self, prompt, image=None, image_b64=None, priority=INTERACTIVE, timeout=None, **request):
         """
-        Sends prompt + image to local Llama Vision instance.
-        image: PIL Image object
+        Sends prompt + image to local Llama Vision instance (queued in the VLM scheduler).
+        image: PIL Image object (or image_b64: an already encoded JPEG)
+        request: model / stream_check overrides for _vlm_request
+        Returns None on failure or if the request expired before it was sent.
         """
+        try:
+            return self.submit_vision(prompt, image, image_b64, priority, timeout, **request).result()
+        except (DeadlineExceeded, Superseded) as e:
+            self.log.info("vlm_dropped", f"⏭️ VLM request dropped: {e}", reason=type(e).__name__)
+            return None
+
+    def submit_vision(self, prompt, image=None, image_b64=None, priority=INTERACTIVE, timeout=None, coalesce_key=None,
+                      **request):
+        """Non-blocking query_ollama_vision(): returns a Future."""
+        model = request.get("model") or self.vlm_model
+        return self.vlm_scheduler.submit(model, lambda: self._vlm_request(prompt, image, image_b64, **request),
+                                         priority, timeout, coalesce_key)
+
+    def query_grounding(self, prompt, image, model, timeout, stream_check):
+        """GroundingLadder's query: streamed, so a degenerate reply is cut short."""
+        # One absolute deadline: the scheduler wait uses part of it, the request only gets what's left
+        deadline = time.perf_counter() + timeout
+        return self.query_ollama_vision(prompt, image, timeout=timeout, model=model, stream_check=stream_check,
+                                        deadline=deadline)
+
+    @traced("vlm_request", cat="http")
+    def _vlm_request(self, prompt, image=None, image_b64=None, model=None, stream_check=None, http_timeout=30,
+                     deadline=None):
+        """deadline: optional time.perf_counter() by which the whole request must be done (overrides http_timeout)."""
+        if deadline is not None:
+            http_timeout = deadline - time.perf_counter()
+            if http_timeout <= 0:
+                return None  # The scheduler wait used it all up
         try:
             import requests
-            import base64
-            from io import BytesIO
+            model = model or self.vlm_model
             
-            # Use 'moondream' (Fast, efficient)
-            model = "moondream" 
-            
-            # Convert PIL Image to Base64 (JPEG for speed)
-            buffered = BytesIO()
-            image = image.convert('RGB') # JPEG needs RGB
-            image.save(buffered, format="JPEG", quality=50) # Low quality for speed
-            img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
+            img_str = image_b64 if image_b64 is not None else self.encode_vlm_image(image)
             
             payload = {
                 "model": model,
                 "prompt": prompt,
                 "images": [img_str],
-                "stream": False
+                "stream": stream_check is not None
             }
-            start_time = time.time()
-            # print("  -> Sending to VLM...")
-            response = requests.post("http://localhost:11434/api/generate", json=payload, timeout=30)
-            duration = time.time() - start_time
+            start_time = time.perf_counter()
+            self.m_vlm_requests.inc()
+            response = requests.post(self.ollama_url, json=payload, headers=self.http_headers(),
+                                     timeout=http_timeout, stream=stream_check is not None)
+            if response.status_code == 200 and stream_check is not None:
+                text = self._read_vlm_stream(response, stream_check,
+                                             deadline if deadline is not None else start_time + http_timeout)
+            elif response.status_code == 200:
+                text = response.json().get("response", "")
+            duration = time.perf_counter() - start_time
+            self.m_vlm_latency.observe(duration)
             
             if response.status_code == 200:
                 fps = 1.0 / duration if duration > 0 else 0
-                print(f"👁️ VLM Inference: {duration:.2f}s ({fps:.2f} FPS)")
-                return response.json().get("response", "").strip()
+                self.log.info("vlm_inference", f"👁️ VLM Inference: {duration:.2f}s ({fps:.2f} FPS)", seconds=duration)
+                return text.strip()
             else:
-                print(f"⚠️ VLM Error: {response.text}")
+                self.m_vlm_errors.inc()
+                self.log.warning("vlm_error", f"⚠️ VLM Error: {response.text}", status=response.status_code)
         except Exception as e:
-            print(f"⚠️ VLM Connection Failed: {e}")
+            self.m_vlm_errors.inc()
+            self.log.warning("vlm_failed", f"⚠️ VLM Connection Failed: {e}", error=str(e))
         return None
 
+    def _read_vlm_stream(self, response, stream_check, deadline):
+        """Accumulates Ollama's NDJSON chunks until done, stream_check says stop, or the deadline passes."""
+        text = ""
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                text += chunk.get("response", "")
+                if chunk.get("done"):
+                    break
+                if stream_check(text):
+                    self.m_vlm_early_stops.inc()
+                    break
+                if time.perf_counter() > deadline:
+                    break
+        finally:
+            response.close()  # Closing mid-stream makes Ollama stop generating
+        return text
+
     def start_terminal_listener(self):
         def listener():
-            print("\n⌨️  Terminal Input Active. Type a command (e.g. 'click search') and hit Enter:\n")
+            self.log.info("terminal_input", "\n⌨️  Terminal Input Active. Type a command (e.g. 'click search') and hit Enter:\n")
             while self.running:
                 try:
                     text = input()
                     if text.strip():
-                        print(f"⌨️  Manual Command: {text}")
-                        self.execute_agent_action(text)
+                        self.log.info("terminal_command", f"⌨️  Manual Command: {text}", command=text)
+                        self.dispatch_command(text)
                 except EOFError:
                     break
         t = threading.Thread(target=listener, daemon=True)
         t.start()
     
+    def dispatch_command(self, command):
+        """Typed/file commands: control commands first, everything else is an agent action."""
+        if command.strip().lower().startswith("profile"):
+            self.handle_profile_command(command)
+            return
+        self.mark_step(f"command: {command}")
+        with self.busy():
+            self.execute_agent_action(command)
+
+    def handle_profile_command(self, command):
+        """profile start [interval_ms] | profile stop [prefix] | profile status"""
+        parts = command.split()
+        sub = parts[1].lower() if len(parts) > 1 else "status"
+        if sub == "start":
+            interval = float(parts[2]) / 1000.0 if len(parts) > 2 else 0.005
+            self.tracer.start(sample_interval=interval)
+            mode = f"sampling every {interval * 1000:g}ms" if interval else "spans only"
+            self.log.info("profile_start", f"🔬 Profiling ON ({mode})", interval=interval)
+        elif sub == "stop":
+            self.tracer.stop()
+            prefix = parts[2] if len(parts) > 2 else time.strftime("agent_trace_%Y%m%d_%H%M%S")
+            paths = self.tracer.save(prefix)
+            self.log.info("profile_stop", f"🔬 Profiling OFF -> {', '.join(paths)}", paths=paths)
+            return paths
+        else:
+            self.log.info("profile_status", f"🔬 Profiler: {self.tracer.status()}", **self.tracer.status())
+
+    @traced()
     def execute_agent_action(self, command):
         """
         Executes a complex agentic task using VLM + Input Injection.
         """
-        print(f"🤖 AGENT EXECUTING: {command}")
+        self.log.info("agent_action", f"🤖 AGENT EXECUTING: {command}", command=command)
         
         # 1. "Click X" (Visual Grounding)
         if command.lower().startswith("click "):
             target = command[6:].strip() # Remove "click "
-            print(f"👁️ Grounding Target: '{target}'")
+            self.log.info("ground_target", f"👁️ Grounding Target: '{target}'", target=target)
             
             # Snap a fresh frame
             frame = self.memory.read_video_frame()
             if not frame:
-                print("❌ No video signal to ground against.")
+                self.log.warning("ground_no_video", "❌ No video signal to ground against.")
                 return
 
-            # Prepare Image
-            img = Image.frombytes('RGBA', (frame['width'], frame['height']), frame['data'], 'raw', 'BGRA')
-            # Use lower res for VLM speed, but high res for coordinate mapping? 
-            # Actually, standard VLM (Moondream) works well on 512x512 equivalents.
-            # But Moondream outputs 0-1000 coordinates.
-            
-            prompt = f"Point to '{target}'. Return bounding box as [ymin, xmin, ymax, xmax] (0-1000). Only numbers."
-            
-            # Synchronous VLM Query (Blocking Audio Loop? No, this is fine for actions)
-            response = self.query_ollama_vision(prompt, img)
-            
-            if response:
-                print(f"  -> VLM Output: {response}")
-                # Parse 4 numbers (ymin, xmin, ymax, xmax)
-                # Flexible regex: handles [1,2,3,4] or 1, 2, 3, 4
-                match = re.search(r"(\d+)\D+(\d+)\D+(\d+)\D+(\d+)", response)
-                if match:
-                    y1, x1, y2, x2 = map(int, match.groups())
-                    
-                    # Convert to Screen Coords
-                    # VLM 0-1000 -> Screen Width/Height
-                    screen_w = frame['width']
-                    screen_h = frame['height']
-                    
-                    center_x = int(((x1 + x2) / 2 / 1000) * screen_w)
-                    center_y = int(((y1 + y2) / 2 / 1000) * screen_h)
-                    
-                    print(f"🎯 Coordinates: ({center_x}, {center_y})")
-                    
-                    if pyautogui:
-                        pyautogui.moveTo(center_x, center_y, duration=0.5)
-                        pyautogui.click()
-                        print("✅ Clicked.")
-                    else:
-                        print("⚠️ Skipping Click (pyautogui missing)")
-                    return
+            coords = self.ground_target(target, frame)
+            if coords:
+                center_x, center_y = coords
+                if pyautogui:
+                    pyautogui.moveTo(center_x, center_y, duration=0.5)
+                    pyautogui.click()
+                    self.log.info("clicked", "✅ Clicked.", x=center_x, y=center_y)
                 else:
-                    print("⚠️ Could not parse coordinates.")
+                    self.log.warning("click_skipped", "⚠️ Skipping Click (pyautogui missing)")
             return
 
         # 2. "Scroll"
         elif "scroll" in command.lower():
             if "down" in command.lower():
                 if pyautogui: pyautogui.scroll(-500)
-                print("  -> Scrolled Down")
+                self.log.info("scrolled", "  -> Scrolled Down", direction="down")
             elif "up" in command.lower():
                 if pyautogui: pyautogui.scroll(500)
-                print("  -> Scrolled Up")
+                self.log.info("scrolled", "  -> Scrolled Up", direction="up")
             return
              
         # 3. Complex Reasoning (LLM Path)
         # If it's not a simple UI command, ask Llama for a plan.
-        print("🤔 Reasoning with Llama...")
-        prompt = f"You are a browser automation agent. Convert this command into a sequence of actions (CLICK, TYPE, SCROLL, NAVIGATE). Command: '{command}'. keep it brief."
+        self.log.info("plan_request", "🤔 Reasoning with Llama...")
+        prompt = PLAN_PROMPT.format(command=command)
         
         plan = self.query_ollama(prompt)
-        if plan:
-            print(f"📜 Generated Plan:\n{plan}")
+        if not plan:
+            self.log.error("plan_unavailable", "❌ Llama unavailable. Please install Ollama or check connection.")
+            return
+
+        self.log.info("plan", f"📜 Generated Plan:\n{plan}", plan=plan)
+        steps = parse_plan(plan) if action_pb2 else []
+        if not steps:
+            # Model didn't follow the step format; surface the text instead.
             self.write_text_to_browser(f"Plan: {plan}") # Feedback to Omnibox
-        else:
-            print("❌ Llama unavailable. Please install Ollama or check connection.")
+            return
+
+        self.execute_plan(steps)
+
+    def execute_plan(self, steps):
+        """Runs parsed plan steps back-to-back (see plan_executor.py)."""
+        start = time.time()
+        results = self.plan_executor.execute(steps)
+        for r in results:
+            flag = "✅" if r.ok and r.verified else ("⚠️" if r.ok else "❌")
+            extra = " (prefetched)" if r.prefetch_hit else ""
+            self.log.info("plan_step", f"  {flag} {r.step.raw} [{r.duration:.2f}s]{extra}" + (f" -> {r.error}" if r.error else ""),
+                          step=r.step.raw, ok=r.ok, verified=r.verified, prefetch_hit=r.prefetch_hit,
+                          seconds=r.duration, error=r.error)
+        done = sum(1 for r in results if r.ok)
+        self.log.info("plan_done", f"📜 Plan: {done}/{len(steps)} steps in {time.time() - start:.2f}s",
+                      done=done, steps=len(steps), seconds=time.time() - start)
+        return results
+
+    @traced()
+    def ground_target(self, target, frame):
+        """
+        Asks the VLM for the bounding box of `target` in `frame`.
+        Returns screen (x, y) of the box centre, or None.
+        """
+        img = frame_to_image(frame)
+        # Moondream outputs 0-1000 coordinates regardless of input size, so shrink to the tuned thumbnail.
+        img.thumbnail((self.tuning["vlm_thumbnail"],) * 2)
+        coords, attempts = self.grounding.ground(target, img, frame['width'], frame['height'])
+        for a in attempts:
+            self.log.info("ground_attempt", f"  -> VLM [{a.rung}] {a.verdict} in {a.seconds:.2f}s: {a.response}",
+                          rung=a.rung, verdict=a.verdict, seconds=a.seconds, response=a.response)
+        if not coords:
+            self.log.warning("ground_failed", "⚠️ Could not ground target (" + ", ".join(f"{a.rung}: {a.verdict}" for a in attempts) + ").",
+                             target=target)
+            return None
+        self.log.info("ground_ok", f"🎯 Coordinates: ({coords[0]}, {coords[1]})", target=target, x=coords[0], y=coords[1])
+        return coords
 
 if __name__ == "__main__":
     agent = NeuralAgent()
     try:
         agent.run()
     except KeyboardInterrupt:
-        print("\n🛑 Agent Stopped")
+        agent.log.info("agent_stop", "\n🛑 Agent Stopped")
@@ -0,0 +1,228 @@
+"""
+Plan Executor
+Parses an LLM plan into Action protos and runs the steps back-to-back.
+
+Per step:
+  1. Resolve coordinates for CLICK steps (VLM grounding, or the prefetched result).
+  2. Inject the action (ActionInjector).
+  3. Verify cheaply by watching the video frame fingerprint change and settle
+     (frame_delta), instead of asking the VLM what happened.
+  4. While step N settles, ground step N+1 on the first changed frame. If the
+     settled frame still matches the frame the prefetch saw, the result is reused.
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from frame_delta import frame_fingerprint, fingerprint_distance
+
+try:
+    import action_pb2
+except ImportError:
+    action_pb2 = None  # Run `make protos` to generate bindings
+
+PLAN_PROMPT = (
+    "You are a browser automation agent. Convert the command into browser steps.\n"
+    "Reply with one step per line and nothing else, using only these forms:\n"
+    "NAVIGATE <url>\n"
+    "CLICK <short visual description of the element>\n"
+    "TYPE <text>\n"
+    "PRESS <key>\n"
+    "SCROLL UP|DOWN\n"
+    "Command: '{command}'"
+)
+
+STEP_RE = re.compile(
+    r"^\s*(?:step\s*)?(?:\d+\s*[.):-]\s*|[-*•]\s*)?"
+    r"\**(NAVIGATE|GO TO|OPEN|CLICK|TAP|TYPE|ENTER TEXT|PRESS|SCROLL)\**\b\s*[:\-]?\s*(.*)$",
+    re.IGNORECASE,
+)
+
+SCROLL_STEP = 500  # Same step as the single-command "scroll" path
+
+
+class PlanStep:
+    def __init__(self, action, target=None, raw=""):
+        self.action = action    # action_pb2.Action
+        self.target = target    # Grounding query for CLICK steps, else None
+        self.raw = raw
+
+    def __repr__(self):
+        return f"PlanStep({self.action.WhichOneof('action')}, target={self.target!r}, raw={self.raw!r})"
+
+
+class StepResult:
+    def __init__(self, step, ok, verified=False, prefetch_hit=False, duration=0.0, error=None):
+        self.step = step
+        self.ok = ok
+        self.verified = verified          # Frame changed and settled after injection
+        self.prefetch_hit = prefetch_hit  # Grounding came from the N-1 prefetch
+        self.duration = duration
+        self.error = error
+
+
+def _clean_arg(arg):
+    arg = arg.strip().rstrip(".")
+    if len(arg) >= 2 and arg[0] == arg[-1] and arg[0] in "'\"`":
+        arg = arg[1:-1]
+    return arg.strip()
+
+
+def parse_plan(text, start_sequence=1):
+    """
+    Turns free-form model output into a list of PlanSteps.
+    Lines that don't look like a step (preamble, commentary) are skipped.
+    """
+    if action_pb2 is None:
+        raise RuntimeError("action_pb2 bindings missing (run `make protos`)")
+
+    steps = []
+    seq = start_sequence
+    for line in (text or "").splitlines():
+        match = STEP_RE.match(line)
+        if not match:
+            continue
+        verb = match.group(1).upper()
+        arg = _clean_arg(match.group(2))
+        action = action_pb2.Action(sequence_id=seq)
+        target = None
+
+        if verb in ("NAVIGATE", "GO TO", "OPEN"):
+            if not arg:
+                continue
+            action.navigate.url = arg
+        elif verb in ("CLICK", "TAP"):
+            if not arg:
+                continue
+            action.interaction.type = action_pb2.InteractionAction.CLICK_LEFT
+            target = arg
+        elif verb in ("TYPE", "ENTER TEXT"):
+            submit = False
+            # "TYPE hello and press enter" / "TYPE hello [ENTER]"
+            tail = re.search(r"\s*(?:\band\s+press\s+enter|\[enter\])\s*$", arg, re.IGNORECASE)
+            if tail:
+                arg, submit = _clean_arg(arg[:tail.start()]), True
+            if not arg:
+                continue
+            action.input.text = arg
+            action.input.submit = submit
+        elif verb == "PRESS":
+            if not arg:
+                continue
+            action.interaction.type = action_pb2.InteractionAction.KEY_PRESS
+            action.interaction.key_code = arg.split()[0]
+        elif verb == "SCROLL":
+            action.interaction.type = action_pb2.InteractionAction.SCROLL
+            action.interaction.scroll_dy = -SCROLL_STEP if "up" in arg.lower() else SCROLL_STEP
+
+        steps.append(PlanStep(action, target=target, raw=line.strip()))
+        seq += 1
+    return steps
+
+
+class PlanExecutor:
+    """
+    memory: AgentSharedMemory (read_video_frame()).
+    injector: ActionInjector.
+    ground_fn: callable(target, frame) -> (x, y) or None.
+    """
+
+    def __init__(self, memory, injector, ground_fn,
+                 change_threshold=0.004, settle_quiet=0.15, settle_timeout=2.0,
+                 poll_interval=0.01, clock=time.monotonic, sleep=time.sleep):
+        self.memory = memory
+        self.injector = injector
+        self.ground_fn = ground_fn
+        self.change_threshold = change_threshold  # Mean luma delta (0..1) that counts as a change
+        self.settle_quiet = settle_quiet          # Seconds without change => settled
+        self.settle_timeout = settle_timeout      # Give up waiting for a change/settle
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plan-ground")
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+    def execute(self, steps):
+        """Runs steps in order. Stops at the first step that cannot be dispatched."""
+        results = []
+        prefetch = None  # (future, fingerprint of the frame it grounded on)
+
+        for i, step in enumerate(steps):
+            start = self.clock()
+            prefetch_hit = False
+
+            if step.target is not None:
+                coords, prefetch_hit = self._resolve(step, prefetch)
+                if coords is None:
+                    results.append(StepResult(step, False, duration=self.clock() - start,
+                                              error=f"could not ground '{step.target}'"))
+                    break
+                step.action.interaction.x, step.action.interaction.y = coords
+            prefetch = None
+
+            before = frame_fingerprint(self.memory.read_video_frame())
+            if not self.injector.execute(step.action):
+                results.append(StepResult(step, False, duration=self.clock() - start,
+                                          error="injection failed"))
+                break
+
+            next_step = steps[i + 1] if i + 1 < len(steps) else None
+            needs_ground = next_step is not None and next_step.target is not None
+            verified, prefetch = self._settle(before, next_step if needs_ground else None)
+
+            results.append(StepResult(step, True, verified=verified, prefetch_hit=prefetch_hit,
+                                      duration=self.clock() - start))
+        return results
+
+    def _resolve(self, step, prefetch):
+        """Returns ((x, y) or None, used_prefetch)."""
+        frame = self.memory.read_video_frame()
+        if prefetch is not None:
+            future, fp = prefetch
+            if fingerprint_distance(fp, frame_fingerprint(frame)) <= self.change_threshold:
+                coords = future.result()
+                if coords is not None:
+                    return coords, True
+            else:
+                future.cancel()
+        if not frame:
+            return None, False
+        return self.ground_fn(step.target, frame), False
+
+    def _settle(self, before, next_step):
+        """
+        Waits for the frame to change and then stay still for settle_quiet.
+        Kicks off grounding of next_step on the first changed frame.
+        Returns (verified, prefetch).
+        """
+        prefetch = None
+        changed = False
+        last_fp = before
+        last_change = self.clock()
+        deadline = last_change + self.settle_timeout
+
+        while self.clock() < deadline:
+            frame = self.memory.read_video_frame()
+            fp = frame_fingerprint(frame)
+            if fp is not None and fingerprint_distance(fp, last_fp) > self.change_threshold:
+                changed = True
+                last_fp = fp
+                last_change = self.clock()
+                if next_step is not None:
+                    if prefetch is not None:
+                        prefetch[0].cancel()
+                    prefetch = (self._pool.submit(self.ground_fn, next_step.target, frame), fp)
+            elif changed and self.clock() - last_change >= self.settle_quiet:
+                return True, prefetch
+            self.sleep(self.poll_interval)
+
+        # Timed out: either nothing moved (e.g. scroll at page end) or it never stopped
+        # moving (animation). Still prefetch on the current frame.
+        if next_step is not None and prefetch is None:
+            frame = self.memory.read_video_frame()
+            if frame:
+                prefetch = (self._pool.submit(self.ground_fn, next_step.target, frame), frame_fingerprint(frame))
+        return changed, prefetch
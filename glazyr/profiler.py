@@ -0,0 +1,231 @@
+"""
+Agent Profiler
+Opt-in tracing for NeuralAgent, off by default and nearly free while off
+(one attribute check per traced call).
+
+  Tracer           nested spans recorded as Chrome trace events ("ph": "X");
+                   load the JSON in chrome://tracing or ui.perfetto.dev
+  SamplingProfiler background thread that snapshots every thread's Python stack
+                   at a fixed interval; samples are tagged with the spans that
+                   were open on that thread, so stacks fold per stage
+  traced()         method decorator: wraps a NeuralAgent method in a span
+
+Output of Tracer.save(prefix):
+  <prefix>.json    trace events + stackFrames/samples (trace viewer format)
+  <prefix>.folded  "thread;span;...;func count" lines for flamegraph.pl / speedscope
+
+Runtime control (NeuralAgent.dispatch_command, i.e. terminal or manual_command.txt):
+"profile start [interval_ms]", "profile stop [prefix]", "profile status". NEURAL_PROFILE=1 starts at launch.
+"""
+
+import collections
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+MAX_EVENTS = 200_000   # ~40MB of JSON; oldest events drop first
+MAX_SAMPLES = MAX_EVENTS  # Per-thread stack samples kept for the trace; oldest drop first
+MAX_STACK_DEPTH = 64
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _now_us():
+    return time.perf_counter() * 1e6
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start", "stack")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.stack = self.tracer._thread_stack()
+        self.stack.append(self.name)
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, *exc):
+        end = _now_us()
+        self.stack.pop()
+        event = {"name": self.name, "cat": self.cat, "ph": "X", "ts": self.start, "dur": end - self.start,
+                 "pid": self.tracer.pid, "tid": threading.get_ident()}
+        if self.args:
+            event["args"] = self.args
+        self.tracer.events.append(event)
+        return False
+
+
+class Tracer:
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.pid = os.getpid()
+        self.events = collections.deque(maxlen=max_events)
+        self.started_at = None
+        self._stacks = {}   # tid -> list of open span names (read by the sampler)
+        self.sampler = None
+
+    def _thread_stack(self):
+        tid = threading.get_ident()
+        stack = self._stacks.get(tid)
+        if stack is None:
+            stack = self._stacks[tid] = []
+        return stack
+
+    def open_spans(self, tid):
+        return tuple(self._stacks.get(tid, ()))
+
+    def span(self, name, cat="agent", **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def instant(self, name, cat="agent", **args):
+        if self.enabled:
+            self.events.append({"name": name, "cat": cat, "ph": "i", "s": "t", "ts": _now_us(),
+                                "pid": self.pid, "tid": threading.get_ident(), "args": args})
+
+    def start(self, sample_interval=0.005):
+        """Clears previous data and starts recording (and sampling if interval > 0)."""
+        if self.enabled:
+            return
+        self.events.clear()
+        self.started_at = time.time()
+        self.enabled = True
+        self.sampler = None
+        if sample_interval:
+            self.sampler = SamplingProfiler(self, sample_interval).start()
+
+    def stop(self):
+        self.enabled = False
+        if self.sampler:
+            self.sampler.stop()
+
+    def status(self):
+        samples = self.sampler.sample_count if self.sampler else 0
+        return {"enabled": self.enabled, "events": len(self.events), "samples": samples}
+
+    def _thread_names(self):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        tids = {e["tid"] for e in self.events}
+        if self.sampler:
+            tids |= {s["tid"] for s in self.sampler.samples}
+        return [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid,
+                 "args": {"name": names.get(tid, f"thread-{tid}")}} for tid in sorted(tids)]
+
+    def to_json(self):
+        trace = {"traceEvents": self._thread_names() + list(self.events), "displayTimeUnit": "ms"}
+        if self.sampler:
+            trace["stackFrames"] = self.sampler.stack_frames_json()
+            trace["samples"] = list(self.sampler.samples)
+        return trace
+
+    def save(self, prefix):
+        """Writes <prefix>.json (and <prefix>.folded with samples). Returns the paths."""
+        paths = [prefix + ".json"]
+        with open(paths[0], "w") as f:
+            json.dump(self.to_json(), f)
+        if self.sampler and self.sampler.folded:
+            paths.append(prefix + ".folded")
+            with open(paths[1], "w") as f:
+                f.write(self.sampler.folded_text())
+        return paths
+
+
+class SamplingProfiler:
+    """
+    Snapshots sys._current_frames() every `interval` seconds. Costs one stack
+    walk per live thread per tick, on its own thread; the agent threads are
+    only paused for the GIL hand-off.
+    """
+
+    def __init__(self, tracer, interval=0.005, max_samples=MAX_SAMPLES):
+        self.tracer = tracer
+        self.interval = interval
+        self.samples = collections.deque(maxlen=max_samples)
+        self.folded = collections.Counter()  # One entry per distinct stack: bounded by the code, not the session
+        self.sample_count = 0
+        self._frames = {}   # (parent_id, label) -> id
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _frame_id(self, parent, label):
+        key = (parent, label)
+        fid = self._frames.get(key)
+        if fid is None:
+            fid = self._frames[key] = len(self._frames) + 1
+        return fid
+
+    def sample_once(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        ts = _now_us()
+        for tid, frame in sys._current_frames().items():
+            if tid == me:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            labels.reverse()
+            spans = self.tracer.open_spans(tid)
+
+            sf = None
+            for label in labels:
+                sf = self._frame_id(sf, label)
+            if sf is not None:
+                self.samples.append({"cpu": 0, "tid": tid, "ts": ts, "name": "sample", "sf": str(sf), "weight": 1})
+            stage = [f"[{s}]" for s in spans]
+            self.folded[";".join([names.get(tid, f"thread-{tid}")] + stage + labels)] += 1
+        self.sample_count += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sample_once()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="agent-sampler")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def stack_frames_json(self):
+        frames = {}
+        for (parent, label), fid in self._frames.items():
+            entry = {"name": label, "category": "python"}
+            if parent is not None:
+                entry["parent"] = str(parent)
+            frames[str(fid)] = entry
+        return frames
+
+    def folded_text(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.folded.most_common())
+
+
+def traced(name=None, cat="agent"):
+    """Wraps a method in a span on self.tracer (no-op while the tracer is off)."""
+    def decorate(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            tracer = self.tracer
+            if not tracer.enabled:
+                return fn(self, *args, **kwargs)
+            with _Span(tracer, label, cat, None):
+                return fn(self, *args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,383 @@
+"""
+Replay Harness
+Drives NeuralAgent without a live browser.
+
+  Session           timestamped producer events: video frames, audio chunks and
+                    UI state transitions (save/load as .npz)
+  synthetic_session deterministic generated session (test pattern + tone/noise)
+  capture_session   records a live session from the shared memory segments
+  ProducerSimulator writes session events through a SyntheticProducer, either
+                    paced in real time or one event at a time
+  ReplayHarness     deterministic replay: interleaves events with agent.step()
+                    calls on a virtual clock and reports per-frame latency,
+                    drop rates and agent CPU
+
+Usage:
+    python replay_harness.py --synthetic 10 --record-at 2:5
+    python replay_harness.py session.npz
+"""
+
+import argparse
+import json
+import struct
+import threading
+import time
+
+import numpy as np
+
+from shm_layout import STATE_SHM_NAME, STATE_SHM_SIZE
+from synthetic_producer import SyntheticProducer, pattern_frame, tone
+
+KIND_VIDEO = 0
+KIND_AUDIO = 1
+KIND_STATE = 2
+KIND_NAMES = {KIND_VIDEO: "video", KIND_AUDIO: "audio", KIND_STATE: "state"}
+
+# Producer timestamps start here so the first frame never equals the agent's
+# initial last_video_ts / last_audio_ts of 0.
+TS_BASE_US = 1_000_000
+
+
+class SessionEvent:
+    __slots__ = ("t_us", "kind", "data", "rate", "channels", "state")
+
+    def __init__(self, t_us, kind, data=None, rate=0, channels=1, state=0):
+        self.t_us = t_us
+        self.kind = kind
+        self.data = data          # BGRA (h, w, 4) uint8 for video, float32 samples for audio
+        self.rate = rate
+        self.channels = channels
+        self.state = state
+
+
+class Session:
+    """Producer events ordered by time (ties keep insertion order)."""
+
+    def __init__(self):
+        self.events = []
+
+    def add_video(self, t_us, pixels):
+        self.events.append(SessionEvent(int(t_us), KIND_VIDEO, data=np.asarray(pixels, dtype=np.uint8)))
+
+    def add_audio(self, t_us, samples, rate, channels=1):
+        self.events.append(SessionEvent(int(t_us), KIND_AUDIO, data=np.asarray(samples, dtype=np.float32),
+                                        rate=rate, channels=channels))
+
+    def add_state(self, t_us, state):
+        self.events.append(SessionEvent(int(t_us), KIND_STATE, state=int(state)))
+
+    def sorted_events(self):
+        return sorted(self.events, key=lambda e: e.t_us)  # Stable
+
+    @property
+    def duration_us(self):
+        return max((e.t_us for e in self.events), default=0)
+
+    def counts(self):
+        out = {name: 0 for name in KIND_NAMES.values()}
+        for e in self.events:
+            out[KIND_NAMES[e.kind]] += 1
+        return out
+
+    def save(self, path):
+        arrays = {}
+        table = np.zeros((len(self.events), 5), dtype=np.int64)  # t_us, kind, rate, channels, state
+        for i, e in enumerate(self.events):
+            table[i] = (e.t_us, e.kind, e.rate, e.channels, e.state)
+            if e.data is not None:
+                arrays[f"d{i}"] = e.data
+        np.savez_compressed(path, events=table, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        session = cls()
+        with np.load(path) as npz:
+            for i, (t_us, kind, rate, channels, state) in enumerate(npz["events"]):
+                data = npz[f"d{i}"] if f"d{i}" in npz.files else None
+                session.events.append(SessionEvent(int(t_us), int(kind), data=data, rate=int(rate),
+                                                   channels=int(channels), state=int(state)))
+        return session
+
+
+def synthetic_session(seconds=5.0, fps=30.0, audio_hz=100.0, rate=48000, width=640, height=360,
+                      state_script=((0.0, 0),), seed=0, noise=0.002):
+    """
+    Deterministic session. state_script: (seconds, state) transitions, e.g.
+    ((0, 0), (1.0, 1), (3.0, 0)) holds the Brain switch from 1s to 3s.
+    Audio is a tone while state == 1 (speech stand-in) plus seeded noise.
+    """
+    rng = np.random.default_rng(seed)
+    session = Session()
+    script = sorted(state_script)
+    for t, state in script:
+        session.add_state(t * 1e6, state)
+
+    def state_at(t):
+        current = 0
+        for ts, st in script:
+            if ts <= t:
+                current = st
+        return current
+
+    if fps > 0:
+        for i in range(int(seconds * fps)):
+            t = i / fps
+            session.add_video(t * 1e6, pattern_frame(width, height, t))
+    if audio_hz > 0:
+        chunk = int(rate / audio_hz)
+        for i in range(int(seconds * audio_hz)):
+            t = i / audio_hz
+            samples = rng.normal(0.0, noise, chunk).astype(np.float32)
+            if state_at(t) == 1:
+                samples += tone(chunk, rate, t, amplitude=0.1)
+            session.add_audio(t * 1e6, samples, rate)
+    return session
+
+
+def capture_session(memory, state_shm, seconds, poll_interval=0.001):
+    """
+    Records what a live producer writes. memory: AgentSharedMemory, state_shm:
+    the NeuralChromium_State mapping. Only new timestamps are captured.
+    """
+    session = Session()
+    start = time.perf_counter()
+    last_video = last_audio = None
+    last_state = None
+    while time.perf_counter() - start < seconds:
+        t_us = (time.perf_counter() - start) * 1e6
+        state = struct.unpack_from('<i', state_shm, 0)[0]
+        if state != last_state:
+            session.add_state(t_us, state)
+            last_state = state
+        frame = memory.read_video_frame()
+        if frame and frame['timestamp'] != last_video:
+            last_video = frame['timestamp']
+            pixels = np.frombuffer(frame['data'], dtype=np.uint8).reshape(frame['height'], frame['width'], 4)
+            session.add_video(t_us, pixels.copy())
+        header = memory.read_audio_header()
+        if header and header['frames'] and header['timestamp'] != last_audio:
+            last_audio = header['timestamp']
+            samples = np.frombuffer(memory.read_audio_data(header['frames']), dtype=np.float32)
+            session.add_audio(t_us, samples.copy(), header['rate'], header['channels'])
+        time.sleep(poll_interval)
+    return session
+
+
+class ProducerSimulator:
+    """Writes session events into shared memory through a SyntheticProducer."""
+
+    def __init__(self, producer):
+        self.producer = producer
+
+    def emit(self, event):
+        ts = TS_BASE_US + event.t_us
+        if event.kind == KIND_VIDEO:
+            self.producer.write_video_frame(event.data, ts)
+        elif event.kind == KIND_AUDIO:
+            self.producer.write_audio_chunk(event.data, event.rate, ts, event.channels)
+        elif event.kind == KIND_STATE:
+            self.producer.set_state(event.state)
+        return ts
+
+    def play_realtime(self, session, speed=1.0, stop=None):
+        """
+        Paces events on the wall clock (for load tests against a free-running agent).
+        Returns the producer's own lateness per event in microseconds.
+        """
+        lateness = []
+        start = time.perf_counter()
+        for event in session.sorted_events():
+            if stop is not None and stop.is_set():
+                break
+            due = start + event.t_us / 1e6 / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            lateness.append(max(0.0, (time.perf_counter() - due) * 1e6))
+            self.emit(event)
+        return lateness
+
+    def start_realtime(self, session, speed=1.0):
+        """Runs play_realtime on a thread. Returns (thread, stop_event)."""
+        stop = threading.Event()
+        t = threading.Thread(target=self.play_realtime, args=(session, speed, stop), daemon=True)
+        t.start()
+        return t, stop
+
+
+class VirtualClock:
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        pass  # The harness advances time between steps
+
+
+def percentiles(values, ps=(50, 95, 99)):
+    if len(values) == 0:
+        return {f"p{p}": None for p in ps}
+    arr = np.asarray(values, dtype=np.float64)
+    return {f"p{p}": float(np.percentile(arr, p)) for p in ps}
+
+
+class ReplayReport:
+    def __init__(self):
+        self.steps = 0
+        self.frames_written = 0
+        self.frames_seen = 0
+        self.frames_dropped = 0
+        self.frame_latency_us = []   # Virtual time from write to the step that saw it
+        self.audio_written = 0       # Chunks written while the agent was listening
+        self.audio_consumed = 0
+        self.audio_dropped = 0
+        self.step_wall_ms = []
+        self.step_cpu_ms = []
+        self.process_cpu_s = 0.0
+        self.wall_s = 0.0
+
+    def to_dict(self):
+        return {
+            "steps": self.steps,
+            "video": {
+                "written": self.frames_written,
+                "seen": self.frames_seen,
+                "dropped": self.frames_dropped,
+                "drop_rate": self.frames_dropped / self.frames_written if self.frames_written else 0.0,
+                "latency_us": percentiles(self.frame_latency_us),
+            },
+            "audio": {
+                "written": self.audio_written,
+                "consumed": self.audio_consumed,
+                "dropped": self.audio_dropped,
+                "drop_rate": self.audio_dropped / self.audio_written if self.audio_written else 0.0,
+            },
+            "step_wall_ms": percentiles(self.step_wall_ms),
+            "step_cpu_ms": percentiles(self.step_cpu_ms),
+            "agent_cpu_ms_total": float(sum(self.step_cpu_ms)),
+            "process_cpu_s": self.process_cpu_s,
+            "wall_s": self.wall_s,
+        }
+
+
+class ReplayHarness:
+    """
+    Deterministic replay. The agent's clock/sleep are replaced by a virtual
+    clock; the agent is stepped every idle_period_us (its 10ms poll) or every
+    recording_period_us while recording (the zero-sleep PTT loop). Everything
+    measured in virtual time is reproducible; wall/CPU figures are real.
+    """
+
+    def __init__(self, agent, producer, idle_period_us=10_000, recording_period_us=1_000, tail_us=3_000_000):
+        self.agent = agent
+        self.sim = ProducerSimulator(producer)
+        self.idle_period_us = idle_period_us
+        self.recording_period_us = recording_period_us
+        self.tail_us = tail_us  # Keep stepping after the last event (PTT cooldown, transcription)
+        self.clock = VirtualClock()
+        agent.clock = self.clock.time
+        agent.sleep = self.clock.sleep
+        if agent.state_shm is None:
+            agent.state_shm = producer.backend.open(producer.segment_name(STATE_SHM_NAME), STATE_SHM_SIZE,
+                                                    readonly=True, create=False)
+
+    def replay(self, session):
+        report = ReplayReport()
+        events = session.sorted_events()
+        end_us = session.duration_us + self.tail_us
+        base_clock = self.clock.now
+        agent = self.agent
+
+        video_pending = None  # (producer ts, virtual write time)
+        audio_pending = None  # producer ts, only tracked while listening
+        state = 0
+
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        t_us, i = 0, 0
+        while t_us <= end_us or i < len(events):
+            while i < len(events) and events[i].t_us <= t_us:
+                ev = events[i]
+                i += 1
+                if ev.kind == KIND_VIDEO:
+                    if video_pending is not None:
+                        report.frames_dropped += 1  # Overwritten before the agent looked
+                    video_pending = (self.sim.emit(ev), t_us)
+                    report.frames_written += 1
+                elif ev.kind == KIND_AUDIO:
+                    listening = agent.is_recording or state == 1
+                    if audio_pending is not None:
+                        report.audio_dropped += 1  # Listening chunk overwritten unread
+                    ts = self.sim.emit(ev)
+                    audio_pending = ts if listening else None
+                    report.audio_written += 1 if listening else 0
+                else:
+                    state = ev.state
+                    self.sim.emit(ev)
+
+            self.clock.now = base_clock + t_us / 1e6
+            w, c = time.perf_counter(), time.thread_time()
+            agent.step()
+            report.step_wall_ms.append((time.perf_counter() - w) * 1e3)
+            report.step_cpu_ms.append((time.thread_time() - c) * 1e3)
+            report.steps += 1
+
+            if video_pending is not None and agent.memory.last_video_ts == video_pending[0]:
+                report.frames_seen += 1
+                report.frame_latency_us.append(t_us - video_pending[1])
+                video_pending = None
+            if audio_pending is not None and agent.last_audio_ts >= audio_pending:
+                report.audio_consumed += 1
+                audio_pending = None
+
+            t_us += self.recording_period_us if agent.is_recording else self.idle_period_us
+
+        if video_pending is not None:
+            report.frames_dropped += 1
+        if audio_pending is not None:
+            report.audio_dropped += 1
+        report.wall_s = time.perf_counter() - wall0
+        report.process_cpu_s = time.process_time() - cpu0
+        return report
+
+
+def _parse_window(text):
+    start, end = text.split(":")
+    return float(start), float(end)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay producer sessions against NeuralAgent")
+    parser.add_argument("session", nargs="?", help="Session .npz (omit with --synthetic)")
+    parser.add_argument("--synthetic", type=float, default=0, help="Generate an N-second synthetic session")
+    parser.add_argument("--record-at", type=_parse_window, default=None, help="start:end seconds with Brain ON")
+    parser.add_argument("--save", help="Write the (synthetic) session to this .npz")
+    parser.add_argument("--backend", default="file", help="Shared memory backend (default: file)")
+    parser.add_argument("--vlm", action="store_true", help="Keep real VLM calls (default: stubbed)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        script = [(0.0, 0)]
+        if args.record_at:
+            script += [(args.record_at[0], 1), (args.record_at[1], 0)]
+        session = synthetic_session(args.synthetic, state_script=script)
+    elif args.session:
+        session = Session.load(args.session)
+    else:
+        parser.error("give a session file or --synthetic N")
+    if args.save:
+        session.save(args.save)
+
+    import nexus_agent
+    producer = SyntheticProducer(args.backend)
+    agent = nexus_agent.NeuralAgent(shm_backend=producer.backend)
+    if not args.vlm:
+        agent._vlm_request = lambda prompt, image=None, image_b64=None, **request: "synthetic screen"
+    report = ReplayHarness(agent, producer).replay(session)
+    print(json.dumps(report.to_dict(), indent=2))
+    producer.close()
+
+
+if __name__ == "__main__":
+    main()
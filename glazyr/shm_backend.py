@@ -0,0 +1,131 @@
+"""
+Shared Memory Backends
+Opens the named segments (Agent, Video, State, Input_Text, VisualCortex) on any OS.
+
+  windows : named file mappings (mmap tagname), what Chrome creates on Windows
+  posix   : files in /dev/shm (tmpfs), for Linux inference hosts
+  file    : plain files in a directory, portable fallback and handy for tests
+
+Every backend returns a plain mmap.mmap, so callers keep using seek/read/write
+and slicing exactly as before.
+
+Selection: open_segment(..., backend=...) > $NEURAL_SHM_BACKEND > OS default.
+The file backend root comes from $NEURAL_SHM_DIR (default: <tmp>/neural_chromium_shm).
+"""
+
+import mmap
+import os
+import tempfile
+
+BACKEND_ENV = "NEURAL_SHM_BACKEND"
+DIR_ENV = "NEURAL_SHM_DIR"
+NAMESPACE_PREFIXES = ("Local\\", "Global\\")
+
+
+def _file_name(name):
+    """'Local\\NeuralChromium_VisualCortex' -> 'NeuralChromium_VisualCortex'"""
+    for prefix in NAMESPACE_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    return name.replace("\\", "_").replace("/", "_")
+
+
+class WindowsNamedBackend:
+    """Named mappings backed by the paging file. Windows only."""
+    name = "windows"
+
+    def open(self, name, size, readonly=False, create=True):
+        # tagname mappings are always create-or-open, so `create` can't be honoured.
+        # If we get there before Chrome, the mapping we create is the one Chrome
+        # opens; creating it PAGE_READONLY would break Chrome's FILE_MAP_ALL_ACCESS
+        # view, so `readonly` is only enforced by the other backends.
+        return mmap.mmap(-1, size, tagname=name, access=mmap.ACCESS_WRITE)
+
+    def unlink(self, name):
+        pass  # The mapping disappears with its last handle
+
+
+class FileBackend:
+    """Segments as regular files under `root`, mapped MAP_SHARED."""
+    name = "file"
+
+    def __init__(self, root=None):
+        self.root = root or os.environ.get(DIR_ENV) or os.path.join(tempfile.gettempdir(), "neural_chromium_shm")
+
+    def path(self, name):
+        return os.path.join(self.root, _file_name(name))
+
+    def open(self, name, size, readonly=False, create=True):
+        """
+        Maps `size` bytes of segment `name`.
+        create=False raises FileNotFoundError until the producer has created it.
+        readonly segments are never created or resized.
+        """
+        path = self.path(name)
+        if readonly:
+            fd = os.open(path, os.O_RDONLY)
+        else:
+            flags = os.O_RDWR
+            if create:
+                os.makedirs(self.root, exist_ok=True)
+                flags |= os.O_CREAT
+            fd = os.open(path, flags, 0o600)
+        try:
+            current = os.fstat(fd).st_size
+            if current < size:
+                if readonly or not create:
+                    raise ValueError(f"segment {name} is {current} bytes, expected {size}")
+                os.ftruncate(fd, size)
+            access = mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE
+            return mmap.mmap(fd, size, access=access)
+        finally:
+            os.close(fd)  # The mapping keeps its own reference
+
+    def unlink(self, name):
+        try:
+            os.unlink(self.path(name))
+        except FileNotFoundError:
+            pass
+
+
+class PosixShmBackend(FileBackend):
+    """POSIX shared memory via tmpfs (/dev/shm), i.e. what shm_open() uses on Linux."""
+    name = "posix"
+
+    def __init__(self, root="/dev/shm"):
+        super().__init__(root)
+
+
+BACKENDS = {
+    "windows": WindowsNamedBackend,
+    "posix": PosixShmBackend,
+    "file": FileBackend,
+}
+
+
+def default_backend_name():
+    name = os.environ.get(BACKEND_ENV)
+    if name:
+        return name
+    if os.name == "nt":
+        return "windows"
+    return "posix" if os.path.isdir("/dev/shm") else "file"
+
+
+def get_backend(backend=None):
+    """Accepts a backend instance, a backend name, or None (environment/OS default)."""
+    if backend is not None and not isinstance(backend, str):
+        return backend
+    name = backend or default_backend_name()
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"unknown shared memory backend '{name}' (expected one of {sorted(BACKENDS)})")
+
+
+def open_segment(name, size, readonly=False, create=True, backend=None):
+    return get_backend(backend).open(name, size, readonly=readonly, create=create)
+
+
+def unlink_segment(name, backend=None):
+    get_backend(backend).unlink(name)
@@ -0,0 +1,60 @@
+"""
+Shared Memory Layout
+Segment names, sizes, offsets and header formats shared by the agent and the
+producers (Chrome, synthetic_producer.py). Must match components/agent_interface
+and the viz video writer.
+"""
+
+import os
+import struct
+
+# Segment names (Windows tagnames; other backends derive file names from these)
+AGENT_SHM_NAME = "NeuralChromium_Agent_SharedMem"
+VIDEO_SHM_NAME = "NeuralChromium_Video"
+STATE_SHM_NAME = "NeuralChromium_State"
+VISUAL_CORTEX_SHM_NAME = "Local\\NeuralChromium_VisualCortex"
+
+# One browser/agent pair per namespace (supervisor.py). Empty = the legacy names above.
+NAMESPACE_ENV = "NEURAL_SHM_NAMESPACE"
+
+
+def segment_name(base, namespace=None):
+    """
+    'NeuralChromium_Video', 'tab3' -> 'NeuralChromium_Video_tab3'.
+    namespace=None reads $NEURAL_SHM_NAMESPACE.
+    """
+    if namespace is None:
+        namespace = os.environ.get(NAMESPACE_ENV, "")
+    return f"{base}_{namespace}" if namespace else base
+
+# Sizes
+SHM_SIZE = 32 * 1024 * 1024  # 32MB
+VIDEO_SHM_SIZE = 1920 * 1080 * 4 + 256 # Exactly match C++ size
+STATE_SHM_SIZE = 4
+VISUAL_CORTEX_SHM_SIZE = 32 * 1024 * 1024
+
+# Magic numbers
+MAGIC_NUMBER = 0x4E43524D     # "NCRM" (Frame Header)
+VIDEO_MAGIC_NUMBER = 0x5649444F # "VIDO" (Video Header)
+AUDIO_MAGIC_NUMBER = 0x41554449 # "AUDI" (Audio Header)
+VISUAL_CORTEX_MAGIC = 0x4E455552 # "NEUR"
+
+# Offsets
+VIDEO_DATA_OFFSET = 256                       # Pixels follow the 256-byte header block
+AUDIO_HEADER_OFFSET = 16 * 1024 * 1024        # Audio lives in the upper half of the agent segment
+AUDIO_DATA_OFFSET = AUDIO_HEADER_OFFSET + 256
+
+# struct VideoHeader { u32 magic, width, height, stride, format; /*pad*/ int64 timestamp_us; }
+VIDEO_HEADER = struct.Struct('<IIIII4xq')
+# struct AudioHeader { u32 magic, sample_rate, channels, samples_per_frame; u64 timestamp_us; u32 format, frame_index; }
+# The agent only reads the first 24 bytes (AUDIO_HEADER_PREFIX).
+AUDIO_HEADER = struct.Struct('<IIIIqII')
+AUDIO_HEADER_PREFIX = struct.Struct('<IIIIq')
+
+VIDEO_FORMAT_ARGB = 1
+VIDEO_FORMAT_ABGR = 2
+AUDIO_FORMAT_FLOAT32 = 1
+
+# UI control state (NeuralChromium_State, int32)
+STATE_IDLE = 0
+STATE_RECORDING = 1
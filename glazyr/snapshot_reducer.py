@@ -0,0 +1,150 @@
+"""
+Snapshot Reducer
+Shrinks a PageState snapshot (flat document-order list of {id, role, name,
+attributes: {tag}} nodes) before it is shipped, indexed or put in a prompt.
+
+  non-rendered  head/meta/link/script/style/title/... and everything inside
+                them; whitespace-only text; <br>; nodes marked
+                "rendered": False (not in the layout tree, e.g. display:none)
+  wrappers      div/span/td/tr/table/... carry no meaning of their own:
+                dropped when nothing under them survives, collapsed into
+                their only surviving child otherwise
+  viewport      optional: nodes whose bounds miss the viewport grown by
+                `margin` px (nodes without bounds use their nearest
+                ancestor's; no bounds at all = kept)
+
+Optional per-node keys (dom_observer.py emits them): "parent" (id of the
+parent node) and "bounds" ([x, y, w, h] in document CSS px). Without
+"parent" (the dom_dump_*.json files) there is no structure to collapse:
+wrappers are simply dropped, the text right after a title/script/style is
+taken to be its content, and bounds come from the previous node that had some.
+
+Ids are never renumbered. Reduction.aliases maps each collapsed/dropped
+wrapper to the node that now stands for it (its surviving child), so an
+action aimed at an old id still lands: reduction.resolve(old_id).
+
+Usage:
+    reduction = reduce_snapshot(nodes, viewport=(0, scroll_y, 1280, 720), margin=300)
+    json.dumps(reduction.nodes)
+"""
+
+NON_RENDERED_TAGS = ("head", "meta", "link", "script", "style", "noscript", "title", "template", "base")
+EMPTY_TAGS = ("br", "wbr")
+WRAPPER_TAGS = ("html", "body", "div", "span", "center", "font", "table", "tbody", "thead", "tfoot", "tr", "td",
+                "section", "article", "main", "p", "b", "i", "em", "strong", "small", "u")
+
+DEFAULT_MARGIN = 300
+
+
+class Reduction:
+    def __init__(self, nodes, aliases, total):
+        self.nodes = nodes
+        self.aliases = aliases   # dropped id -> id of the kept node standing in for it
+        self.total = total       # Nodes before reduction
+        self.kept_ids = {node["id"] for node in nodes}
+
+    def resolve(self, node_id):
+        """Id an action should target for node_id, or None if it was pruned outright."""
+        while node_id not in self.kept_ids:
+            if node_id not in self.aliases:
+                return None
+            node_id = self.aliases[node_id]
+        return node_id
+
+    def __repr__(self):
+        return f"Reduction({len(self.nodes)}/{self.total} nodes, {len(self.aliases)} aliases)"
+
+
+def tag_of(node):
+    return (node.get("attributes") or {}).get("tag", "")
+
+
+def is_blank_text(node):
+    return tag_of(node) == "#text" and not (node.get("name") or "").strip()
+
+
+def intersects(bounds, viewport, margin):
+    x, y, w, h = bounds
+    vx, vy, vw, vh = viewport
+    return x + w >= vx - margin and x <= vx + vw + margin and y + h >= vy - margin and y <= vy + vh + margin
+
+
+def reduce_snapshot(nodes, viewport=None, margin=DEFAULT_MARGIN):
+    if any("parent" in node for node in nodes):
+        return _reduce_tree(nodes, viewport, margin)
+    return _reduce_flat(nodes, viewport, margin)
+
+
+def _reduce_flat(nodes, viewport, margin):
+    kept, aliases, waiting = [], {}, []  # waiting: wrappers to alias to the next kept node
+    content_of_dropped = False
+    last_bounds = None
+    for node in nodes:
+        tag = tag_of(node)
+        if tag == "#text" and content_of_dropped:
+            content_of_dropped = False
+            continue
+        content_of_dropped = tag in NON_RENDERED_TAGS
+        if content_of_dropped or tag in EMPTY_TAGS or is_blank_text(node) or node.get("rendered") is False:
+            continue
+        if node.get("bounds"):
+            last_bounds = node["bounds"]
+        if tag in WRAPPER_TAGS:
+            waiting.append(node["id"])
+            continue
+        if viewport is not None and last_bounds and not intersects(last_bounds, viewport, margin):
+            waiting = []
+            continue
+        for wrapper_id in waiting:
+            aliases[wrapper_id] = node["id"]
+        waiting = []
+        kept.append(node)
+    return Reduction(kept, aliases, len(nodes))
+
+
+def _reduce_tree(nodes, viewport, margin):
+    by_id = {node["id"]: node for node in nodes}
+    children = {}
+    for node in nodes:
+        children.setdefault(node.get("parent"), []).append(node["id"])
+
+    # Top-down: non-rendered subtrees and effective bounds
+    hidden, bounds = set(), {}
+    for node in nodes:
+        parent = node.get("parent")
+        if parent in hidden or tag_of(node) in NON_RENDERED_TAGS:
+            hidden.add(node["id"])
+        own = node.get("bounds")
+        bounds[node["id"]] = own if own else bounds.get(parent)
+
+    # Bottom-up: which node stands for each subtree (None = nothing survives)
+    stands_for, aliases = {}, {}
+    for node in reversed(nodes):
+        node_id, tag = node["id"], tag_of(node)
+        if node_id in hidden or tag in EMPTY_TAGS or is_blank_text(node):
+            stands_for[node_id] = None
+            continue
+        if viewport is not None and bounds[node_id] and not intersects(bounds[node_id], viewport, margin):
+            stands_for[node_id] = None
+            continue
+        survivors = [stands_for[c] for c in children.get(node_id, ()) if stands_for.get(c) is not None]
+        # display:contents boxes aren't in the layout tree but their children are: treat like wrappers
+        if (tag in WRAPPER_TAGS or node.get("rendered") is False) and len(survivors) <= 1:
+            stands_for[node_id] = survivors[0] if survivors else None
+            if survivors:
+                aliases[node_id] = survivors[0]
+            continue
+        stands_for[node_id] = node_id
+
+    # Emit in document order, re-parented to the nearest kept ancestor
+    kept = []
+    for node in nodes:
+        if stands_for.get(node["id"]) != node["id"]:
+            continue
+        out = dict(node)
+        parent = node.get("parent")
+        while parent is not None and stands_for.get(parent) != parent:
+            parent = by_id[parent].get("parent") if parent in by_id else None
+        out["parent"] = parent
+        kept.append(out)
+    return Reduction(kept, aliases, len(nodes))
@@ -0,0 +1,163 @@
+"""
+Speculative Navigation
+Starts warming up a voice navigation target while the user is still talking.
+
+While push-to-talk is held, the audio captured so far is transcribed every
+`interval` seconds on a background thread (one partial at a time). When a
+partial routes (intent_engine) to NAVIGATE with confidence >= min_confidence,
+a PreconnectAction for that domain goes out immediately, so DNS/TCP/TLS
+overlap with the rest of the utterance. The final transcript then confirms
+the guess (the normal navigation hits a warm connection) or cancels it (the
+preconnect is simply left to idle out; nothing was navigated).
+
+stop() on PTT release makes any partial not yet started skip its pass and
+any in-flight one discard its text, so the final pass is never queued behind
+a partial. The agent also runs partials on their own smaller model, so the
+two never wait on one model lock.
+
+    nav = SpeculativeNavigator(engine, transcribe_fn, preconnect_fn)
+    nav.reset()                                   # PTT pressed
+    nav.maybe_transcribe(frames, sample_rate)     # every loop while recording
+    nav.stop()                                    # PTT released
+    nav.resolve(engine.route(final_text))         # -> "confirmed" | "cancelled" | None
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from intent_engine import NAVIGATE
+
+try:
+    import action_pb2
+except ImportError:
+    action_pb2 = None  # Run `make protos` to generate bindings
+
+WHISPER_RATE = 16000
+
+
+def partial_audio(frames, sample_rate, p95=None):
+    """
+    Float32 chunks -> 16kHz float32 for a partial pass. Cheaper than the final
+    path in transcribe_buffer (linear resample, no debug WAV).
+    p95: |x| 95th percentile if the caller tracks it (audio_stats.AudioStats).
+    """
+    audio = np.frombuffer(bytearray().join(frames), dtype=np.float32)
+    if audio.size == 0:
+        return audio
+    if p95 is None:
+        p95 = np.percentile(np.abs(audio), 95)
+    if p95 > 0:
+        np.multiply(audio, np.float32(0.5 / p95), out=audio)
+        np.clip(audio, -1.0, 1.0, out=audio)
+    if sample_rate != WHISPER_RATE:
+        n = int(len(audio) * WHISPER_RATE / sample_rate)
+        audio = np.interp(np.linspace(0, len(audio) - 1, n), np.arange(len(audio)), audio)
+    return audio.astype(np.float32, copy=False)
+
+
+class SpeculativeNavigator:
+    """
+    intents: IntentEngine.
+    transcribe: callable(float32 16kHz audio) -> text, run off the agent loop.
+    preconnect: callable(action_pb2.Action) -> bool (ActionInjector.execute).
+    """
+
+    def __init__(self, intents, transcribe, preconnect, min_confidence=0.9, interval=0.75, min_seconds=0.8,
+                 metrics=None, log=None, clock=time.monotonic):
+        self.intents = intents
+        self.transcribe = transcribe
+        self.preconnect = preconnect
+        self.min_confidence = min_confidence
+        self.interval = interval
+        self.min_seconds = min_seconds
+        self.log = log
+        self.clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="partial-stt")
+        self._pending = None
+        self._generation = 0   # Bumped on reset(); late partials from an old utterance are ignored
+        self._last_submit = None
+        self.speculated = None  # Domain we preconnected to for this utterance
+
+        self.m_issued = self.m_outcome = None
+        if metrics is not None:
+            self.m_issued = metrics.counter("speculative_preconnects_total", "Preconnects issued from partial transcripts")
+            self.m_outcome = {
+                "confirmed": metrics.counter("speculative_confirmed_total", "Speculated target matched the final transcript"),
+                "cancelled": metrics.counter("speculative_cancelled_total", "Speculated target did not match"),
+            }
+
+    def reset(self):
+        self._generation += 1
+        self._last_submit = None
+        self.speculated = None
+
+    def stop(self):
+        """PTT released: partials for this utterance are skipped or ignored; the speculation stays for resolve()."""
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()  # Only succeeds if it hasn't started
+
+    def maybe_transcribe(self, frames, sample_rate, p95=None):
+        """
+        Submits a partial pass if one is due. Never blocks. p95: see partial_audio();
+        may be a callable, only evaluated when a pass is actually submitted.
+        """
+        if self._pending is not None and not self._pending.done():
+            return False
+        now = self.clock()
+        if self._last_submit is not None and now - self._last_submit < self.interval:
+            return False
+        # Chunks are float32 mono; skip until there is enough speech to say anything
+        if sum(len(f) for f in frames) / 4 / sample_rate < self.min_seconds:
+            return False
+        self._last_submit = now
+        if callable(p95):
+            p95 = p95()
+        frames = list(frames)
+        generation = self._generation
+        self._pending = self._pool.submit(self._partial, frames, sample_rate, generation, p95)
+        return True
+
+    def _partial(self, frames, sample_rate, generation, p95=None):
+        if generation != self._generation:
+            return None  # Utterance ended while queued
+        text = self.transcribe(partial_audio(frames, sample_rate, p95))
+        if generation == self._generation:
+            return self.on_partial(text)
+        return None
+
+    def on_partial(self, text):
+        """Routes a partial transcript; preconnects on a confident new navigation target."""
+        intent = self.intents.route(text)
+        if action_pb2 is None or intent.kind != NAVIGATE or intent.confidence < self.min_confidence or intent.text == self.speculated:
+            return None
+        self.speculated = intent.text
+        action = action_pb2.Action()
+        action.preconnect.url = intent.text
+        self.preconnect(action)
+        if self.m_issued is not None:
+            self.m_issued.inc()
+        if self.log is not None:
+            self.log.info("speculative_preconnect", f"🏎️ Speculative preconnect -> {intent.text} (partial: '{text}')",
+                          target=intent.text, confidence=intent.confidence)
+        return intent
+
+    def resolve(self, final_intent):
+        """Confirms or cancels the speculation against the final transcript's intent."""
+        speculated = self.speculated
+        self.reset()  # Also ignores a partial still in flight for this utterance
+        if speculated is None:
+            return None
+        hit = final_intent.kind == NAVIGATE and final_intent.text == speculated
+        outcome = "confirmed" if hit else "cancelled"
+        if self.m_outcome is not None:
+            self.m_outcome[outcome].inc()
+        if self.log is not None:
+            self.log.info("speculative_" + outcome, f"🏎️ Speculation {outcome}: {speculated}",
+                          target=speculated, final=final_intent.text)
+        return outcome
+
+    def close(self):
+        self._pool.shutdown(wait=False)
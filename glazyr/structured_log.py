@@ -0,0 +1,115 @@
+"""
+Structured Logger
+Replaces ad-hoc print()/sys.stdout.write in the agent.
+
+Every record is an event name plus fields. Sinks:
+  console  the human message (emoji and all), like the old prints
+  JSONL    {"ts", "level", "component", "event", "msg", ...fields} per line
+
+throttled() caps noisy events to one per interval per key and reports how many
+were suppressed; status() is the single-line console heartbeat and is skipped
+entirely when stdout isn't a terminal.
+
+Environment (see from_env):
+  NEURAL_LOG_LEVEL    debug | info | warning | error (default info)
+  NEURAL_LOG_FILE     append JSONL records here
+  NEURAL_LOG_CONSOLE  0 to silence the console sink
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+
+class StructuredLogger:
+    def __init__(self, component="agent", level="info", console=True, path=None, stream=None,
+                 clock=time.monotonic):
+        self.component = component
+        self.level = LEVELS[level]
+        self.console = console
+        self.stream = stream or sys.stdout
+        self.clock = clock
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        self._lock = threading.Lock()
+        self._throttle = {}  # key -> [last_emit, suppressed]
+        self._status_shown = False
+
+    def enabled(self, level):
+        return LEVELS[level] >= self.level
+
+    def log(self, level, event, msg=None, **fields):
+        if LEVELS[level] < self.level:
+            return
+        if self.console:
+            text = msg if msg is not None else event + "".join(f" {k}={v}" for k, v in fields.items())
+            with self._lock:
+                if self._status_shown:
+                    self.stream.write("\n")  # Don't overwrite the status line
+                    self._status_shown = False
+                self.stream.write(text + "\n")
+        if self._file is not None:
+            record = {"ts": time.time(), "level": level, "component": self.component, "event": event}
+            if msg is not None:
+                record["msg"] = msg
+            record.update(fields)
+            line = json.dumps(record, default=str)
+            with self._lock:
+                self._file.write(line + "\n")
+                if LEVELS[level] >= LEVELS["warning"]:
+                    self._file.flush()
+
+    def debug(self, event, msg=None, **fields):
+        self.log("debug", event, msg, **fields)
+
+    def info(self, event, msg=None, **fields):
+        self.log("info", event, msg, **fields)
+
+    def warning(self, event, msg=None, **fields):
+        self.log("warning", event, msg, **fields)
+
+    def error(self, event, msg=None, **fields):
+        self.log("error", event, msg, **fields)
+
+    def throttled(self, interval, level, event, msg=None, key=None, **fields):
+        """Emits at most once per `interval` seconds per key (default: event)."""
+        if LEVELS[level] < self.level:
+            return
+        key = key or event
+        now = self.clock()
+        slot = self._throttle.get(key)
+        if slot is not None and now - slot[0] < interval:
+            slot[1] += 1
+            return
+        suppressed = slot[1] if slot is not None else 0
+        self._throttle[key] = [now, 0]
+        if suppressed:
+            fields["suppressed"] = suppressed
+        self.log(level, event, msg, **fields)
+
+    def status(self, text):
+        """Rewrites the console status line (\\r). No-op without a terminal."""
+        if not self.console or not getattr(self.stream, "isatty", lambda: False)():
+            return
+        with self._lock:
+            self.stream.write(f"\r{text} \033[K")
+            self.stream.flush()
+            self._status_shown = True
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def from_env(component="agent", environ=None):
+    env = os.environ if environ is None else environ
+    return StructuredLogger(
+        component=component,
+        level=env.get("NEURAL_LOG_LEVEL", "info").lower(),
+        console=env.get("NEURAL_LOG_CONSOLE", "1") != "0",
+        path=env.get("NEURAL_LOG_FILE") or None,
+    )
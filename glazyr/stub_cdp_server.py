@@ -0,0 +1,214 @@
+"""
+Stub CDP Server
+Minimal stand-in for Chrome's remote debugging port so cdp_pool.py (and
+anything built on it) can be tested without a browser.
+
+  GET /json/list, /json/version     target listing, like Chrome
+  ws://.../devtools/page/<id>       commands answered by StubCdpServer.handlers
+                                    (method -> callable(params) -> result dict;
+                                    raise StubCdpError for an error reply)
+
+Every reply is delayed by rtt_ms without blocking the connection, like a
+network round trip: N pipelined commands take ~1 RTT, N sequential ones N.
+Page.navigate also emits Page.frameNavigated and Page.loadEventFired; emit()
+pushes any other event to every client.
+
+Usage:
+    python stub_cdp_server.py --port 9223 --rtt-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+
+from cdp_pool import OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, accept_key, encode_frame, read_frame
+
+
+class StubCdpError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class StubCdpServer:
+    def __init__(self, host="127.0.0.1", port=0, rtt_ms=0.0, targets=("page-1",)):
+        self.host = host
+        self.port = port
+        self.rtt_ms = rtt_ms
+        self.target_ids = list(targets)
+        self.commands = []      # (target id, method, params) in arrival order
+        self.connections = 0    # WebSocket handshakes accepted
+        self.handlers = {
+            "Page.enable": lambda p: {},
+            "Runtime.enable": lambda p: {},
+            "DOM.enable": lambda p: {},
+            "Runtime.evaluate": lambda p: {"result": {"type": "undefined"}},
+            "Input.insertText": lambda p: {},
+            "Input.dispatchKeyEvent": lambda p: {},
+            "Page.navigate": self._navigate,
+        }
+        self.loop = None
+        self._server = None
+        self._clients = set()
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def ws_url(self, target_id):
+        return f"ws://{self.host}:{self.port}/devtools/page/{target_id}"
+
+    def targets(self):
+        return [{"id": t, "type": "page", "title": t, "url": "about:blank", "webSocketDebuggerUrl": self.ws_url(t)}
+                for t in self.target_ids]
+
+    def _navigate(self, params):
+        self.emit("Page.frameNavigated", {"frame": {"id": "frame-1", "url": params.get("url", "")}})
+        self.emit("Page.loadEventFired", {"timestamp": 0})
+        return {"frameId": "frame-1", "loaderId": "loader-1"}
+
+    # --- Events ---
+
+    def emit(self, method, params=None):
+        """Sends an event to every connected client (any thread)."""
+        frame = encode_frame(OP_TEXT, json.dumps({"method": method, "params": params or {}}).encode(), False)
+
+        def send():
+            for writer in list(self._clients):
+                writer.write(frame)
+        if self.loop is not None:
+            if threading.current_thread() is self._thread:
+                self.loop.call_later(self.rtt_ms / 1000.0 + 0.001, send)  # After the reply that triggered it
+            else:
+                self.loop.call_soon_threadsafe(send)
+
+    def drop_clients(self):
+        """Closes every WebSocket (reconnect tests)."""
+        def close():
+            for writer in list(self._clients):
+                writer.close()
+        self.loop.call_soon_threadsafe(close)
+
+    # --- Connection handling ---
+
+    async def _handle(self, reader, writer):
+        try:
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        request, *lines = head.split("\r\n")
+        path = request.split()[1] if len(request.split()) > 1 else "/"
+        headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines if line)}
+        if headers.get("upgrade", "").lower() == "websocket":
+            await self._websocket(path, headers, reader, writer)
+        else:
+            self._http(path, writer)
+
+    def _http(self, path, writer):
+        if path.startswith("/json/list") or path == "/json":
+            body, status = json.dumps(self.targets()), "200 OK"
+        elif path.startswith("/json/version"):
+            body, status = json.dumps({"Browser": "StubCdp/1.0", "Protocol-Version": "1.3"}), "200 OK"
+        else:
+            body, status = "{}", "404 Not Found"
+        data = body.encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + data)
+        writer.close()
+
+    async def _websocket(self, path, headers, reader, writer):
+        target_id = path.rsplit("/", 1)[-1]
+        if target_id not in self.target_ids:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+            writer.close()
+            return
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept_key(headers.get('sec-websocket-key', ''))}\r\n\r\n").encode())
+        self.connections += 1
+        self._clients.add(writer)
+        try:
+            while True:
+                _, opcode, payload = await read_frame(reader)
+                if opcode == OP_CLOSE:
+                    writer.write(encode_frame(OP_CLOSE, payload[:2], False))
+                    break
+                if opcode == OP_PING:
+                    writer.write(encode_frame(OP_PONG, payload, False))
+                elif opcode == OP_TEXT:
+                    self._command(target_id, json.loads(payload), writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    def _command(self, target_id, message, writer):
+        method, params = message.get("method", ""), message.get("params", {})
+        self.commands.append((target_id, method, params))
+        reply = {"id": message.get("id")}
+        if message.get("sessionId"):
+            reply["sessionId"] = message["sessionId"]
+        handler = self.handlers.get(method)
+        try:
+            if handler is None:
+                raise StubCdpError(-32601, f"'{method}' wasn't found")
+            reply["result"] = handler(params)
+        except StubCdpError as e:
+            reply["error"] = {"code": e.code, "message": str(e)}
+        frame = encode_frame(OP_TEXT, json.dumps(reply).encode(), False)
+        self.loop.call_later(self.rtt_ms / 1000.0, lambda: writer.is_closing() or writer.write(frame))
+
+    # --- Lifecycle ---
+
+    async def _serve(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=64 * 1024 * 1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="stub-cdp")
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._serve())
+        self.loop.run_forever()
+
+    def stop(self):
+        async def shutdown():
+            self._server.close()
+            for writer in list(self._clients):
+                writer.close()
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Chrome DevTools endpoint")
+    parser.add_argument("--port", type=int, default=9223)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubCdpServer(port=args.port, rtt_ms=args.rtt_ms).start()
+    print(f"🛰️ Stub CDP listening on {server.url} (targets: {', '.join(server.target_ids)})")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
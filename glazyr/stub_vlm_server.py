@@ -0,0 +1,151 @@
+"""
+Stub VLM Server
+Minimal stand-in for Ollama's /api/generate so benchmarks and load tests can
+exercise the full request path (JPEG + base64 + HTTP + JSON) without a GPU.
+
+Replies are picked from the prompt:
+  grounding ("bounding box")  -> "[ymin, xmin, ymax, xmax]" of StubVlmServer.bbox
+  planning  ("browser steps") -> StubVlmServer.plan
+  anything else               -> StubVlmServer.caption
+
+Latency is simulated with a fixed delay plus optional seeded jitter.
+With "stream": true the reply comes back as NDJSON chunks, one word each,
+followed by a final {"done": true} chunk (like Ollama). token_ms spaces the
+chunks out (chunked encoding); a client hanging up mid-stream counts in
+`aborted`, the way Ollama stops generating.
+
+Usage:
+    python stub_vlm_server.py --port 11435 --latency-ms 40
+    OLLAMA_URL=http://127.0.0.1:11435/api/generate python nexus_agent.py
+"""
+
+import argparse
+import http.server
+import json
+import random
+import re
+import threading
+import time
+
+DEFAULT_PLAN = "NAVIGATE example.com\nCLICK search box\nTYPE neural chromium and press enter"
+
+
+class StubVlmHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like Ollama
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        stub = self.server.stub
+        stub.delay()
+        model = request.get("model", "")
+        reply = stub.reply(request.get("prompt", ""))
+        if request.get("stream"):
+            chunks = [{"model": model, "response": word, "done": False} for word in re.findall(r"\S+\s*", reply)]
+            chunks.append({"model": model, "response": "", "done": True})
+            if stub.token_ms:
+                self.stream([(json.dumps(c) + "\n").encode("utf-8") for c in chunks], stub.token_ms / 1000.0)
+                return
+            body = "".join(json.dumps(c) + "\n" for c in chunks).encode("utf-8")
+        else:
+            body = json.dumps({"model": model, "response": reply, "done": True}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson" if request.get("stream") else "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        stub.requests += 1
+
+    def stream(self, chunks, interval):
+        stub = self.server.stub
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                time.sleep(interval)
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            stub.aborted += 1
+            return
+        stub.requests += 1
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+class StubVlmServer:
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, seed=0,
+                 bbox=(450, 450, 550, 550), plan=DEFAULT_PLAN, caption="a synthetic web page", token_ms=0.0):
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.jitter_ms = jitter_ms
+        self.bbox = bbox
+        self.plan = plan
+        self.caption = caption
+        self.requests = 0
+        self.aborted = 0   # Streams the client hung up on
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = http.server.ThreadingHTTPServer((host, port), StubVlmHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    def delay(self):
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        if self.latency_ms or jitter:
+            time.sleep((self.latency_ms + jitter) / 1000.0)
+
+    def reply(self, prompt):
+        p = prompt.lower()
+        if "bounding box" in p:
+            return "[{}, {}, {}, {}]".format(*self.bbox)
+        if "browser steps" in p:
+            return self.plan
+        return self.caption
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Ollama /api/generate server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubVlmServer(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    print(f"🤖 Stub VLM listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
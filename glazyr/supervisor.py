@@ -0,0 +1,506 @@
+"""
+Agent Supervisor
+Runs N NeuralAgent workers on one host, one per browser.
+
+Each worker is its own process (a crash or a stuck VLM call takes down one
+tab, not the fleet) bound to:
+  - a shared memory namespace  NEURAL_SHM_NAMESPACE=<namespace>  (shm_layout.segment_name)
+  - a NATS subject             NEURAL_NATS_SUBJECT=browser.semantic.<name>
+  - a metrics port             NEURAL_METRICS_PORT=<base_port + i>  (health checks)
+  - a working directory        <run_dir>/<name> (manual_command.txt, debug files, logs)
+
+The browser only creates the un-namespaced NeuralChromium_* segments, so a
+single worker (or one configured with "namespace": "") gets no namespace and
+attaches to it directly. With several workers each defaults to its name as
+namespace, which needs a namespace-aware producer (synthetic_producer.py) per
+worker; a stock browser serves only the un-namespaced one.
+
+Shared model servers are multiplexed instead of loaded per worker: every
+worker's OLLAMA_URL points at one ModelGateway, which forwards to Ollama with a
+cap on concurrent requests and round-robin fairness between workers
+(X-Neural-Agent header). Replies are streamed through as they arrive, and a
+worker hanging up closes the upstream request, so Ollama stops generating and
+the slot frees at once. With --whisper, one transcription_server.py process
+hosts the Whisper model for all workers (NEURAL_WHISPER_ADDR).
+
+Health: a worker is restarted (with exponential backoff) when its process
+exits or when neural_loop_iterations_total stops advancing for stall_timeout.
+While the worker reports neural_loop_busy > 0 (loading Whisper, transcribing,
+waiting on the LLM, executing a plan) the loop is legitimately blocked and
+the allowance is busy_timeout instead. A worker reporting
+neural_waiting_for_browser > 0 is up but its browser hasn't created the
+segments yet: it is left alone ("waiting") however long that takes.
+
+Usage:
+    python supervisor.py --workers 4
+    python supervisor.py --config fleet.json
+      {"workers": [{"name": "tab1", "namespace": ""}, {"name": "tab2", "env": {"NEURAL_LOG_LEVEL": "debug"}}],
+       "ollama_url": "http://localhost:11434", "max_model_concurrency": 1,
+       "whisper": {"model": "small.en", "max_batch": 8}}
+"""
+
+import argparse
+import collections
+import http.server
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+AGENT_SCRIPT = os.path.join(HERE, "nexus_agent.py")
+WHISPER_SCRIPT = os.path.join(HERE, "transcription_server.py")
+DEFAULT_SUBJECT = "browser.semantic.{name}"
+LOOP_METRIC = re.compile(r"^neural_loop_iterations_total(?:\{[^}]*\})?\s+(\d+)", re.MULTILINE)
+BUSY_METRIC = re.compile(r"^neural_loop_busy(?:\{[^}]*\})?\s+([-\d.e+]+)", re.MULTILINE)
+WAITING_METRIC = re.compile(r"^neural_waiting_for_browser(?:\{[^}]*\})?\s+([-\d.e+]+)", re.MULTILINE)
+RELAY_CHUNK = 64 * 1024
+
+
+class FairScheduler:
+    """
+    `slots` concurrent holders; waiters are granted round-robin by client key,
+    so one chatty worker can't starve the others.
+    """
+
+    def __init__(self, slots=1):
+        self.slots = slots
+        self._queues = collections.OrderedDict()  # client -> deque of Events
+        self._lock = threading.Lock()
+
+    def waiting(self):
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+    def acquire(self, client):
+        with self._lock:
+            if self.slots > 0 and not self._queues:
+                self.slots -= 1
+                return
+            ticket = threading.Event()
+            self._queues.setdefault(client, collections.deque()).append(ticket)
+        ticket.wait()
+
+    def release(self):
+        with self._lock:
+            if not self._queues:
+                self.slots += 1
+                return
+            client, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            del self._queues[client]
+            if queue:
+                self._queues[client] = queue  # Back of the line
+            ticket.set()  # Slot passes straight to the waiter
+
+
+class _GatewayHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        gw = self.server.gateway
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        client = self.headers.get("X-Neural-Agent", self.client_address[0])
+        gw.scheduler.acquire(client)
+        try:
+            gw.requests[client] += 1
+            request = urllib.request.Request(gw.upstream + self.path, data=body,
+                                             headers={"Content-Type": "application/json"})
+            try:
+                resp = urllib.request.urlopen(request, timeout=gw.timeout)
+            except urllib.error.HTTPError as e:
+                self._reply(e.code, e.read())
+                return
+            except Exception as e:
+                self._reply(502, json.dumps({"error": str(e)}).encode())
+                return
+            with resp:  # Closing it mid-stream makes Ollama stop generating
+                self._relay(resp)
+        finally:
+            gw.scheduler.release()
+
+    def _reply(self, status, payload):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _relay(self, resp):
+        """Upstream body -> client as it arrives (chunked), until either side is done."""
+        self.send_response(resp.status)
+        self.send_header("Content-Type", resp.headers.get("Content-Type", "application/json"))
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            while True:
+                chunk = resp.read1(RELAY_CHUNK)
+                if not chunk:
+                    break
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            self.server.gateway.aborted += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ModelGateway:
+    """Ollama-compatible proxy: POST <gateway>/api/... -> <upstream>/api/..."""
+
+    def __init__(self, upstream="http://localhost:11434", max_concurrency=1, host="127.0.0.1", port=0, timeout=60):
+        self.upstream = upstream.rstrip("/")
+        self.timeout = timeout
+        self.scheduler = FairScheduler(max_concurrency)
+        self.requests = collections.Counter()
+        self.aborted = 0  # Replies cut short because the worker hung up
+        self.httpd = http.server.ThreadingHTTPServer((host, port), _GatewayHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.gateway = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="model-gateway")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class WorkerSpec:
+    def __init__(self, name, metrics_port, subject=None, env=None, command=None, namespace=None):
+        self.name = name
+        self.namespace = name if namespace is None else namespace  # "" = the browser's own segments
+        self.metrics_port = metrics_port
+        self.subject = subject or DEFAULT_SUBJECT.format(name=name)
+        self.env = dict(env or {})
+        self.command = command  # None = [python, nexus_agent.py]
+
+
+class Worker:
+    def __init__(self, spec, run_dir):
+        self.spec = spec
+        self.workdir = os.path.join(run_dir, spec.name)
+        self.proc = None
+        self.restarts = 0
+        self.failures = 0          # Consecutive; drives the backoff
+        self.started_at = 0.0
+        self.next_start = 0.0      # Backoff deadline while down
+        self.last_iterations = None
+        self.last_progress = 0.0
+        self.busy = False          # Worker reported a long blocking operation in progress
+        self.state = "stopped"
+
+    def environment(self, gateway_url):
+        env = dict(os.environ)
+        env.pop("NEURAL_SHM_NAMESPACE", None)
+        if self.spec.namespace:
+            env["NEURAL_SHM_NAMESPACE"] = self.spec.namespace
+        env.update({
+            "NEURAL_NATS_SUBJECT": self.spec.subject,
+            "NEURAL_METRICS_PORT": str(self.spec.metrics_port),
+            "NEURAL_LOG_FILE": os.path.join(self.workdir, "agent.jsonl"),
+            "NEURAL_LOG_CONSOLE": "0",
+            "PYTHONUNBUFFERED": "1",
+        })
+        if gateway_url:
+            env["OLLAMA_URL"] = gateway_url + "/api/generate"
+        env.update(self.spec.env)
+        return env
+
+    def start(self, gateway_url, now):
+        os.makedirs(self.workdir, exist_ok=True)
+        command = self.spec.command or [sys.executable, AGENT_SCRIPT]
+        log = open(os.path.join(self.workdir, "stdout.log"), "ab")
+        try:
+            self.proc = subprocess.Popen(command, cwd=self.workdir, env=self.environment(gateway_url),
+                                         stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+        finally:
+            log.close()  # The child keeps its own handle
+        self.started_at = self.last_progress = now
+        self.last_iterations = None
+        self.state = "starting"
+
+    def stop(self, timeout=5.0):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self.state = "stopped"
+
+    def status(self):
+        return {
+            "name": self.spec.name,
+            "state": self.state,
+            "pid": self.proc.pid if self.proc else None,
+            "restarts": self.restarts,
+            "namespace": self.spec.namespace,
+            "subject": self.spec.subject,
+            "metrics_port": self.spec.metrics_port,
+            "loop_iterations": self.last_iterations,
+        }
+
+
+class Service:
+    """Shared helper process (e.g. the transcription server), restarted with exponential backoff if it exits."""
+
+    def __init__(self, name, command, run_dir, backoff=1.0, backoff_max=60.0, healthy_after=60.0):
+        self.name = name
+        self.command = command
+        self.log_path = os.path.join(run_dir, f"{name}.log")
+        self.proc = None
+        self.restarts = 0
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.healthy_after = healthy_after  # Uptime that resets the backoff
+        self.failures = 0                   # Consecutive exits; drives the backoff
+        self.started_at = 0.0
+        self.next_start = None              # Restart deadline while down
+
+    def start(self, now=0.0):
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, "ab") as log:
+            self.proc = subprocess.Popen(self.command, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+        self.started_at = now
+        self.next_start = None
+
+    def check(self, now):
+        if self.next_start is not None:
+            if now >= self.next_start:
+                self.restarts += 1
+                self.start(now)
+            return
+        if self.proc is None or self.proc.poll() is None:
+            return
+        if now - self.started_at >= self.healthy_after:
+            self.failures = 0
+        self.failures += 1
+        delay = min(self.backoff_max, self.backoff * 2 ** (self.failures - 1))
+        self.next_start = now + delay
+        print(f"♻️ Service {self.name}: exited with code {self.proc.returncode}, restarting in {delay:.1f}s")
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+def whisper_service(run_dir, address, model="small.en", max_batch=8, max_wait_ms=50.0):
+    command = [sys.executable, WHISPER_SCRIPT, "--address", address, "--model", model,
+               "--max-batch", str(max_batch), "--max-wait-ms", str(max_wait_ms)]
+    return Service("whisper", command, run_dir)
+
+
+def read_loop_health(port, timeout=1.0):
+    """
+    Scrapes a worker's Prometheus endpoint -> (loop iterations, busy, waiting for browser).
+    (None, False, False) if unreachable.
+    """
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=timeout) as resp:
+            text = resp.read().decode("utf-8", "replace")
+    except Exception:
+        return None, False, False
+    loop, busy, waiting = LOOP_METRIC.search(text), BUSY_METRIC.search(text), WAITING_METRIC.search(text)
+    return ((int(loop.group(1)) if loop else None), bool(busy and float(busy.group(1)) > 0),
+            bool(waiting and float(waiting.group(1)) > 0))
+
+
+class Supervisor:
+    def __init__(self, specs, run_dir="agents", gateway=None, services=(), stall_timeout=30.0, startup_grace=60.0,
+                 busy_timeout=300.0, backoff=1.0, backoff_max=60.0, healthy_after=60.0, clock=time.monotonic,
+                 probe=read_loop_health):
+        self.workers = [Worker(spec, run_dir) for spec in specs]
+        self.run_dir = run_dir
+        self.gateway = gateway
+        self.services = list(services)
+        self.stall_timeout = stall_timeout    # No loop progress for this long => restart
+        self.startup_grace = startup_grace    # Model/segment loading before the first scrape must succeed
+        self.busy_timeout = busy_timeout      # Allowance while the worker reports a long blocking operation
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.healthy_after = healthy_after    # Uptime that resets the backoff
+        self.clock = clock
+        self.probe = probe
+        self.running = False
+
+    @property
+    def gateway_url(self):
+        return self.gateway.base_url if self.gateway else None
+
+    def start(self):
+        self.running = True
+        now = self.clock()
+        for service in self.services:
+            service.start(now)
+        for w in self.workers:
+            w.start(self.gateway_url, now)
+
+    def stop(self):
+        self.running = False
+        for w in self.workers:
+            w.stop()
+        for service in self.services:
+            service.stop()
+
+    def _schedule_restart(self, w, now, reason):
+        w.stop()
+        w.failures += 1
+        delay = min(self.backoff_max, self.backoff * 2 ** (w.failures - 1))
+        w.next_start = now + delay
+        w.state = "backoff"
+        print(f"♻️ Worker {w.spec.name}: {reason}, restarting in {delay:.1f}s")
+
+    def check(self):
+        """One health pass over every worker. Call periodically."""
+        now = self.clock()
+        for service in self.services:
+            service.check(now)
+        for w in self.workers:
+            if w.state == "backoff":
+                if now >= w.next_start:
+                    w.restarts += 1
+                    w.start(self.gateway_url, now)
+                continue
+            if w.state == "stopped":
+                continue
+
+            code = w.proc.poll()
+            if code is not None:
+                self._schedule_restart(w, now, f"exited with code {code}")
+                continue
+
+            iterations, w.busy, waiting = self.probe(w.spec.metrics_port)
+            if waiting:
+                w.last_progress = now  # Alive and answering; the stall clock starts once attached
+                w.state = "waiting"
+                continue
+            if iterations is not None and iterations != w.last_iterations:
+                w.last_iterations = iterations
+                w.last_progress = now
+                w.state = "healthy"
+                if w.failures and now - w.started_at >= self.healthy_after:
+                    w.failures = 0
+                continue
+
+            if w.state == "starting":
+                limit = self.startup_grace
+            else:
+                limit = self.busy_timeout if w.busy else self.stall_timeout
+            if now - w.last_progress >= limit:
+                why = "no metrics" if iterations is None else f"loop stalled at {iterations}"
+                if w.busy:
+                    why += " (busy)"
+                self._schedule_restart(w, now, f"{why} for {now - w.last_progress:.0f}s")
+
+    def status(self):
+        return [w.status() for w in self.workers]
+
+    def serve(self, interval=2.0):
+        self.start()
+        try:
+            while self.running:
+                time.sleep(interval)
+                self.check()
+        finally:
+            self.stop()
+
+
+def build_specs(names, base_port, env=None, command=None):
+    # A lone worker uses the browser's un-namespaced segments
+    namespace = "" if len(names) == 1 else None
+    return [WorkerSpec(name, base_port + i, env=env, command=command, namespace=namespace)
+            for i, name in enumerate(names)]
+
+
+def load_config(path):
+    with open(path) as f:
+        config = json.load(f)
+    base_port = config.get("base_metrics_port", 9500)
+    workers = config.get("workers", [])
+    specs = []
+    for i, w in enumerate(workers):
+        namespace = w.get("namespace", "" if len(workers) == 1 else None)
+        specs.append(WorkerSpec(w["name"], w.get("metrics_port", base_port + i), subject=w.get("subject"),
+                                env=w.get("env"), command=w.get("command"), namespace=namespace))
+    return config, specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Supervise N NeuralAgent workers")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--config", help="JSON fleet config (overrides --workers)")
+    parser.add_argument("--run-dir", default="agents")
+    parser.add_argument("--base-metrics-port", type=int, default=9500)
+    parser.add_argument("--ollama-url", default="http://localhost:11434", help="Upstream for the model gateway")
+    parser.add_argument("--max-model-concurrency", type=int, default=1)
+    parser.add_argument("--no-gateway", action="store_true", help="Workers talk to Ollama directly")
+    parser.add_argument("--stall-timeout", type=float, default=30.0)
+    parser.add_argument("--busy-timeout", type=float, default=300.0,
+                        help="Stall allowance while a worker reports a long operation (model load, LLM, plan)")
+    parser.add_argument("--whisper", action="store_true", help="Share one transcription server between workers")
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        config, specs = load_config(args.config)
+    else:
+        specs = build_specs([f"agent{i}" for i in range(args.workers)], args.base_metrics_port)
+
+    services = []
+    whisper = config.get("whisper") or ({} if args.whisper else None)
+    if whisper is not None:
+        from transcription_server import default_address
+        address = whisper.get("address") or default_address()
+        from autotune import load_profile
+        model = whisper.get("model") or load_profile()["whisper_model"]
+        services.append(whisper_service(args.run_dir, address, model,
+                                        whisper.get("max_batch", 8), whisper.get("max_wait_ms", 50.0)))
+        for spec in specs:
+            spec.env.setdefault("NEURAL_WHISPER_ADDR", address)
+        print(f"🎙️ Shared transcription server on {address}")
+
+    gateway = None
+    if not args.no_gateway:
+        gateway = ModelGateway(config.get("ollama_url", args.ollama_url),
+                               config.get("max_model_concurrency", args.max_model_concurrency)).start()
+        print(f"🔀 Model gateway {gateway.base_url} -> {gateway.upstream}")
+
+    supervisor = Supervisor(specs, run_dir=args.run_dir, gateway=gateway, services=services,
+                            stall_timeout=args.stall_timeout, busy_timeout=args.busy_timeout)
+    signal.signal(signal.SIGTERM, lambda *_: setattr(supervisor, "running", False))
+    print(f"🧑‍✈️ Supervising {len(specs)} agents: {', '.join(s.name for s in specs)}")
+    try:
+        supervisor.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+        if gateway:
+            gateway.stop()
+        print(json.dumps(supervisor.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
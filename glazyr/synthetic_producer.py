@@ -0,0 +1,150 @@
+"""
+Synthetic Producer
+Stands in for the patched Chrome: creates the shared memory segments and writes
+VideoHeader / AudioHeader records plus pixel and audio payloads in the same
+layout the browser uses (shm_layout.py). Lets the agent hot paths run, be
+benchmarked and load-tested on hosts without a Windows Chrome build.
+
+Usage:
+    python synthetic_producer.py --fps 30 --audio-hz 100 --seconds 60
+"""
+
+import argparse
+import struct
+import time
+
+import numpy as np
+
+from shm_backend import get_backend
+from shm_layout import (AGENT_SHM_NAME, AUDIO_DATA_OFFSET, AUDIO_FORMAT_FLOAT32, AUDIO_HEADER,
+                        AUDIO_HEADER_OFFSET, AUDIO_MAGIC_NUMBER, SHM_SIZE, STATE_SHM_NAME,
+                        STATE_SHM_SIZE, VIDEO_DATA_OFFSET, VIDEO_FORMAT_ARGB, VIDEO_HEADER,
+                        VIDEO_MAGIC_NUMBER, VIDEO_SHM_NAME, VIDEO_SHM_SIZE, segment_name)
+from text_channel import TEXT_SHM_NAME, TEXT_SHM_SIZE, init_queue
+
+MAX_AUDIO_FRAMES = (SHM_SIZE - AUDIO_DATA_OFFSET) // 4
+
+
+def pattern_frame(width, height, t):
+    """BGRA frame: static gradient background plus a box that moves with t (seconds)."""
+    ys = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    xs = np.linspace(0, 255, width, dtype=np.float32)[None, :]
+    frame = np.empty((height, width, 4), dtype=np.uint8)
+    frame[:, :, 0] = (xs * 0.5 + 64).astype(np.uint8)  # B
+    frame[:, :, 1] = ys.astype(np.uint8)               # G
+    frame[:, :, 2] = 40                                # R
+    frame[:, :, 3] = 255                               # A
+    box = max(8, min(width, height) // 8)
+    x0 = int((t * 200) % max(1, width - box))
+    y0 = int(height // 2 - box // 2)
+    frame[y0:y0 + box, x0:x0 + box, :3] = 255
+    return frame
+
+
+def tone(samples, rate, t0, freq=440.0, amplitude=0.05):
+    """float32 mono sine chunk starting at t0 seconds (phase-continuous across chunks)."""
+    t = t0 + np.arange(samples, dtype=np.float64) / rate
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+class SyntheticProducer:
+    """
+    Owns the producer side of every segment. backend: see shm_backend.get_backend().
+    namespace: see shm_layout.segment_name(). Timestamps are microseconds, like
+    Chrome's TimeTicks.
+    """
+
+    def __init__(self, backend=None, text_queue=True, namespace=None):
+        self.backend = get_backend(backend)
+        self.namespace = namespace
+        self.agent_shm = self.backend.open(self.segment_name(AGENT_SHM_NAME), SHM_SIZE)
+        self.video_shm = self.backend.open(self.segment_name(VIDEO_SHM_NAME), VIDEO_SHM_SIZE)
+        self.state_shm = self.backend.open(self.segment_name(STATE_SHM_NAME), STATE_SHM_SIZE)
+        self.text_shm = None
+        if text_queue:
+            self.text_shm = self.backend.open(self.segment_name(TEXT_SHM_NAME), TEXT_SHM_SIZE)
+            init_queue(self.text_shm)  # Chrome does the same in InitNeuralInput()
+        self.video_frames = 0
+        self.audio_chunks = 0
+        self.set_state(0)
+
+    def close(self):
+        for shm in (self.agent_shm, self.video_shm, self.state_shm, self.text_shm):
+            if shm is not None:
+                shm.close()
+
+    def segment_name(self, base):
+        return segment_name(base, self.namespace)
+
+    def unlink(self):
+        for name in (AGENT_SHM_NAME, VIDEO_SHM_NAME, STATE_SHM_NAME, TEXT_SHM_NAME):
+            self.backend.unlink(self.segment_name(name))
+
+    def set_state(self, state):
+        struct.pack_into('<i', self.state_shm, 0, state)
+
+    def write_video_frame(self, pixels, timestamp_us, fmt=VIDEO_FORMAT_ARGB):
+        """pixels: (height, width, 4) uint8 BGRA array."""
+        height, width = pixels.shape[:2]
+        size = width * height * 4
+        if size > VIDEO_SHM_SIZE - VIDEO_DATA_OFFSET:
+            raise ValueError(f"{width}x{height} frame does not fit the video segment")
+        # Payload first, header last: the reader keys off magic + timestamp.
+        self.video_shm[VIDEO_DATA_OFFSET:VIDEO_DATA_OFFSET + size] = np.ascontiguousarray(pixels).tobytes()
+        VIDEO_HEADER.pack_into(self.video_shm, 0, VIDEO_MAGIC_NUMBER, width, height, width * 4, fmt, timestamp_us)
+        self.video_frames += 1
+
+    def write_audio_chunk(self, samples, rate, timestamp_us, channels=1):
+        """samples: float32 array (interleaved if channels > 1)."""
+        samples = np.asarray(samples, dtype=np.float32)
+        frames = len(samples)
+        if frames > MAX_AUDIO_FRAMES:
+            raise ValueError(f"{frames} samples do not fit the audio region")
+        self.agent_shm[AUDIO_DATA_OFFSET:AUDIO_DATA_OFFSET + frames * 4] = samples.tobytes()
+        AUDIO_HEADER.pack_into(self.agent_shm, AUDIO_HEADER_OFFSET, AUDIO_MAGIC_NUMBER, rate, channels,
+                               frames, timestamp_us, AUDIO_FORMAT_FLOAT32, self.audio_chunks)
+        self.audio_chunks += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic Neural-Chromium shared memory producer")
+    parser.add_argument("--backend", default=None, help="windows | posix | file (default: OS)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--audio-hz", type=float, default=100.0, help="Audio chunks per second (0 = off)")
+    parser.add_argument("--rate", type=int, default=48000)
+    parser.add_argument("--seconds", type=float, default=0, help="0 = run until Ctrl+C")
+    parser.add_argument("--recording", action="store_true", help="Hold the Brain switch ON (state=1)")
+    parser.add_argument("--namespace", default=None, help="Segment namespace (default: $NEURAL_SHM_NAMESPACE)")
+    args = parser.parse_args()
+
+    producer = SyntheticProducer(args.backend, namespace=args.namespace)
+    producer.set_state(1 if args.recording else 0)
+    print(f"🏭 Synthetic producer ({producer.backend.name}): {args.width}x{args.height}@{args.fps}fps, "
+          f"audio {args.audio_hz} chunks/s @ {args.rate}Hz")
+
+    start = time.perf_counter()
+    next_video = next_audio = start
+    chunk = int(args.rate / args.audio_hz) if args.audio_hz > 0 else 0
+    try:
+        while not args.seconds or time.perf_counter() - start < args.seconds:
+            now = time.perf_counter()
+            t = now - start
+            ts = int(t * 1e6)
+            if now >= next_video:
+                producer.write_video_frame(pattern_frame(args.width, args.height, t), ts)
+                next_video += 1.0 / args.fps
+            if chunk and now >= next_audio:
+                producer.write_audio_chunk(tone(chunk, args.rate, t), args.rate, ts)
+                next_audio += 1.0 / args.audio_hz
+            time.sleep(max(0.0, min(next_video, next_audio if chunk else next_video) - time.perf_counter()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"\n🏭 Wrote {producer.video_frames} frames, {producer.audio_chunks} audio chunks")
+        producer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Text Return Channel (Agent -> Browser)
+Single-producer / single-consumer message queue in the NeuralChromium_Input_Text segment.
+
+Replaces the old "Revision, Length, Text" overwrite protocol, where a second
+write before Chrome's 100ms poll silently replaced the first one.
+
+Layout (little-endian, must match ToolbarView::OnNeuralInputTimer):
+
+    Header (64 bytes)
+      0  u32 magic            0x4E435451 ("NCTQ")
+      4  u32 version          1
+      8  u32 capacity         ring size in bytes (power of two)
+      12 u32 overflow_count   messages dropped by the writer (ring full / too large)
+      16 u32 write_cursor     bytes published (producer-owned, wraps at 2^32)
+      20 u32 read_cursor      bytes consumed, i.e. the ack cursor (consumer-owned)
+      24 u32 write_seq        messages published
+      28 u32 read_seq         messages consumed
+    Ring (capacity bytes) of 8-byte aligned records:
+      0  u32 length           payload bytes
+      4  u16 kind             KIND_* below
+      6  u16 flags            FLAG_PAD = skip to ring start
+      8  payload              UTF-8 (KIND_INSERT_TEXT: JSON, see insert_text_payload)
+
+The producer writes the record first and publishes it by advancing write_cursor;
+the consumer advances read_cursor once it has copied the payload out.
+"""
+
+import json
+import struct
+import time
+
+TEXT_QUEUE_MAGIC = 0x4E435451  # "NCTQ"
+TEXT_QUEUE_VERSION = 1
+TEXT_QUEUE_HEADER_SIZE = 64
+TEXT_QUEUE_CAPACITY = 64 * 1024
+TEXT_SHM_SIZE = TEXT_QUEUE_HEADER_SIZE + TEXT_QUEUE_CAPACITY
+TEXT_SHM_NAME = "NeuralChromium_Input_Text"
+
+RECORD_HEADER_SIZE = 8
+FLAG_PAD = 0x1
+
+# Message kinds
+KIND_OMNIBOX_TEXT = 1  # Set omnibox text (navigation target / feedback)
+KIND_PRECONNECT = 2    # Preconnect to a URL/host the agent expects to navigate to
+KIND_INSERT_TEXT = 3   # Bulk text into a page field (insertText), see insert_text_payload
+
+_HDR = struct.Struct('<IIIIIIII')
+_REC = struct.Struct('<IHH')
+_U32 = struct.Struct('<I')
+
+OFF_OVERFLOW = 12
+OFF_WRITE = 16
+OFF_READ = 20
+OFF_WRITE_SEQ = 24
+OFF_READ_SEQ = 28
+
+MASK32 = 0xFFFFFFFF
+
+
+class QueueOverflow(Exception):
+    """The message could not be queued (ring full or message too large)."""
+
+
+def insert_text_payload(selector, text, submit=False, index=0):
+    """
+    KIND_INSERT_TEXT message: fill the index-th querySelectorAll(selector) match
+    (empty selector = the focused element) and optionally submit its form.
+    """
+    return json.dumps({"selector": selector, "index": index, "text": text, "submit": bool(submit)},
+                      separators=(",", ":"))
+
+
+def _align8(n):
+    return (n + 7) & ~7
+
+
+def init_queue(buf, capacity=TEXT_QUEUE_CAPACITY):
+    """Writes a fresh header. Only the segment creator (or tests) should call this."""
+    if capacity & (capacity - 1):
+        raise ValueError("capacity must be a power of two")
+    if len(buf) < TEXT_QUEUE_HEADER_SIZE + capacity:
+        raise ValueError("segment too small for capacity")
+    buf[0:TEXT_QUEUE_HEADER_SIZE] = bytes(TEXT_QUEUE_HEADER_SIZE)
+    _HDR.pack_into(buf, 0, TEXT_QUEUE_MAGIC, TEXT_QUEUE_VERSION, capacity, 0, 0, 0, 0, 0)
+
+
+class _QueueView:
+    def __init__(self, buf):
+        self.buf = buf
+        magic, version, capacity = struct.unpack_from('<III', buf, 0)
+        if magic != TEXT_QUEUE_MAGIC:
+            raise ValueError(f"text queue not initialised (magic={hex(magic)})")
+        if version != TEXT_QUEUE_VERSION:
+            raise ValueError(f"unsupported text queue version {version}")
+        self.capacity = capacity
+        self.mask = capacity - 1
+
+    def _get(self, off):
+        return _U32.unpack_from(self.buf, off)[0]
+
+    def _set(self, off, value):
+        _U32.pack_into(self.buf, off, value & MASK32)
+
+    def pending_bytes(self):
+        return (self._get(OFF_WRITE) - self._get(OFF_READ)) & MASK32
+
+    @property
+    def overflow_count(self):
+        return self._get(OFF_OVERFLOW)
+
+
+class TextChannelWriter(_QueueView):
+    """
+    Producer side (Python agent).
+    doorbell: optional callable invoked after each publish to nudge the browser.
+    """
+
+    def __init__(self, buf, doorbell=None, init_if_empty=True):
+        if init_if_empty and _U32.unpack_from(buf, 0)[0] == 0:
+            init_queue(buf, min(TEXT_QUEUE_CAPACITY, _floor_pow2(len(buf) - TEXT_QUEUE_HEADER_SIZE)))
+        super().__init__(buf)
+        self.doorbell = doorbell
+        # The largest record that always fits after a wrap pad once the ring drains.
+        self.max_payload = self.capacity // 2 - RECORD_HEADER_SIZE
+
+    def send(self, text, kind=KIND_OMNIBOX_TEXT, timeout=0.0):
+        """
+        Queues one message. Waits up to `timeout` seconds for the reader to free
+        space; raises QueueOverflow (and bumps overflow_count) if it can't.
+        """
+        payload = text.encode('utf-8') if isinstance(text, str) else bytes(text)
+        if len(payload) > self.max_payload:
+            self._overflow()
+            raise QueueOverflow(f"message of {len(payload)} bytes exceeds {self.max_payload}")
+
+        record_size = _align8(RECORD_HEADER_SIZE + len(payload))
+        deadline = time.monotonic() + timeout
+        rang = False
+        while True:
+            write = self._get(OFF_WRITE)
+            pos = write & self.mask
+            tail = self.capacity - pos
+            needed = record_size if record_size <= tail else tail + record_size
+            free = self.capacity - ((write - self._get(OFF_READ)) & MASK32)
+            if needed <= free:
+                break
+            if time.monotonic() >= deadline:
+                self._overflow()
+                raise QueueOverflow(f"ring full ({free} bytes free, {needed} needed)")
+            if self.doorbell and not rang:
+                self.doorbell()  # Reader may be asleep; nudge it once
+                rang = True
+            time.sleep(0.005)
+
+        base = TEXT_QUEUE_HEADER_SIZE
+        if record_size > tail:
+            # Not enough contiguous room: pad to the end and wrap.
+            _REC.pack_into(self.buf, base + pos, tail - RECORD_HEADER_SIZE, 0, FLAG_PAD)
+            write = (write + tail) & MASK32
+            pos = 0
+
+        start = base + pos + RECORD_HEADER_SIZE
+        self.buf[start:start + len(payload)] = payload
+        _REC.pack_into(self.buf, base + pos, len(payload), kind, 0)
+        # Publish: cursor last, so the reader never sees a half-written record.
+        self._set(OFF_WRITE, write + record_size)
+        self._set(OFF_WRITE_SEQ, self._get(OFF_WRITE_SEQ) + 1)
+
+        if self.doorbell:
+            self.doorbell()
+        return self._get(OFF_WRITE_SEQ)
+
+    def _overflow(self):
+        self._set(OFF_OVERFLOW, self._get(OFF_OVERFLOW) + 1)
+
+
+class TextChannelReader(_QueueView):
+    """
+    Consumer side. Chrome implements this in C++ (toolbar_view.cc); this Python
+    mirror exists for tests and for headless harnesses without a browser.
+    """
+
+    def poll(self):
+        """Returns a list of (kind, text) for every message published since the last poll."""
+        messages = []
+        read = self._get(OFF_READ)
+        write = self._get(OFF_WRITE)
+        base = TEXT_QUEUE_HEADER_SIZE
+        while read != write:
+            pos = read & self.mask
+            length, kind, flags = _REC.unpack_from(self.buf, base + pos)
+            if not flags & FLAG_PAD:
+                start = base + pos + RECORD_HEADER_SIZE
+                messages.append((kind, bytes(self.buf[start:start + length]).decode('utf-8', 'replace')))
+            read = (read + _align8(RECORD_HEADER_SIZE + length)) & MASK32
+        self._set(OFF_READ, read)  # Ack
+        if messages:
+            self._set(OFF_READ_SEQ, self._get(OFF_READ_SEQ) + len(messages))
+        return messages
+
+
+def _floor_pow2(n):
+    p = 1
+    while p * 2 <= n:
+        p *= 2
+    return p
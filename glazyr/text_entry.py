@@ -0,0 +1,108 @@
+"""
+Text Entry
+Fills page fields from the DOM snapshot instead of clicking and typing.
+
+Each field is resolved once per snapshot (dom_index.py) and filled with a
+single InputAction carrying its selector: Chrome focuses the element and
+inserts the whole string with one insertText (KIND_INSERT_TEXT on the text
+queue), so 500 characters cost one message instead of 1000 SendInput calls.
+Fields that reject bulk input (file/range/checkbox inputs, selects) get
+key_events=True and are typed in chunks by the ActionInjector.
+
+The snapshot comes from whoever observes the page (dom_observer.py, or a
+PageState's snapshot_json); the agent itself doesn't receive one.
+
+Usage:
+    entry = TextEntry(agent.injector.execute, metrics=agent.metrics)
+    entry.set_snapshot(await observer.snapshot())
+    entry.fill({"username": "pg", "password": "hunter2"}, submit=True)
+"""
+
+import time
+
+from dom_index import DomIndex
+
+try:
+    import action_pb2
+except ImportError:
+    action_pb2 = None  # Run `make protos` to generate bindings
+
+
+class TextEntry:
+    """
+    execute: callable(action_pb2.Action) -> bool (ActionInjector.execute).
+    """
+
+    def __init__(self, execute, metrics=None, log=None, clock=time.monotonic):
+        self.execute = execute
+        self.log = log
+        self.clock = clock
+        self.index = DomIndex([])
+        self._resolved = {}
+        self.sequence = 0
+
+        self.m_bulk = self.m_keys = self.m_unresolved = self.m_chars = self.m_seconds = None
+        if metrics is not None:
+            self.m_bulk = metrics.counter("text_entry_bulk_total", "Fields filled with one insertText")
+            self.m_keys = metrics.counter("text_entry_key_events_total", "Fields typed with key events")
+            self.m_unresolved = metrics.counter("text_entry_unresolved_total", "Field queries with no match in the snapshot")
+            self.m_chars = metrics.counter("text_entry_chars_total", "Characters entered")
+            self.m_seconds = metrics.histogram("text_entry_seconds", "Time to dispatch one field's text")
+
+    def set_snapshot(self, snapshot):
+        """snapshot: PageState.snapshot_json (str/bytes), a node list or a DomIndex."""
+        if isinstance(snapshot, DomIndex):
+            self.index = snapshot
+        elif isinstance(snapshot, (str, bytes)):
+            self.index = DomIndex.from_json(snapshot)
+        else:
+            self.index = DomIndex(snapshot)
+        self._resolved = {}
+
+    def resolve(self, query):
+        """Field for a name/label/node id, cached until the next snapshot."""
+        if query not in self._resolved:
+            self._resolved[query] = self.index.find(query)
+        return self._resolved[query]
+
+    def action_for(self, field, text, submit=False):
+        if action_pb2 is None:
+            raise RuntimeError("action_pb2 bindings missing (run `make protos`)")
+        self.sequence += 1
+        action = action_pb2.Action(sequence_id=self.sequence, timestamp_us=int(time.time() * 1e6))
+        action.input.text = text
+        action.input.submit = submit
+        action.input.selector = field.selector
+        action.input.selector_index = field.selector_index
+        action.input.key_events = not field.bulk
+        return action
+
+    def type_into(self, query, text, submit=False):
+        """Returns True if the text was dispatched to the field."""
+        field = self.resolve(query)
+        if field is None:
+            if self.m_unresolved is not None:
+                self.m_unresolved.inc()
+            if self.log:
+                self.log.warning("text_entry_unresolved", f"⚠️ No field matches '{query}'", query=str(query))
+            return False
+        start = self.clock()
+        ok = self.execute(self.action_for(field, text, submit))
+        if ok and self.m_bulk is not None:
+            (self.m_bulk if field.bulk else self.m_keys).inc()
+            self.m_chars.inc(len(text))
+            self.m_seconds.observe(self.clock() - start)
+        return ok
+
+    def fill(self, values, submit=False):
+        """
+        values: {field query: text}, filled in order; submit goes with the last one.
+        Stops at the first field that can't be filled. Returns {query: ok}.
+        """
+        results = {}
+        items = list(values.items())
+        for n, (query, text) in enumerate(items):
+            results[query] = self.type_into(query, text, submit=submit and n == len(items) - 1)
+            if not results[query]:
+                break
+        return results
@@ -0,0 +1,409 @@
+"""
+Trajectory Files
+One append-only file per agent session holding everything needed to replay
+what the agent saw and did: video frames, audio, PageState snapshots and the
+Actions it issued, all timestamped, plus step markers.
+
+Layout (.ntraj, little-endian):
+    file header   b"NTRJ", u32 version, i64 created_us
+    records       u8 kind, u8 codec, u16 flags, u32 length, i64 t_us, u32 crc32, payload
+    index record  KIND_INDEX, zlib(JSON) of keyframe/step offsets
+    trailer       u64 offset of the index record, b"NTRX"
+
+Encoding:
+    frames        keyframe (zlib of BGRA) every keyframe_interval frames or on
+                  a size change; in between, zlib of the XOR with the previous
+                  frame, which is mostly zeros for UI video
+    page states   full serialized PageState every page_keyframe_interval,
+                  otherwise (prefix, suffix, middle) against the previous one
+    audio         int16 PCM, actions: serialized Action protos as-is
+
+Seeking: the index maps steps and times to the nearest preceding keyframes,
+so frame_at() / state_at_step() decode at most one keyframe interval. A file
+without a trailer (crashed session) is still readable; the index is rebuilt
+by scanning record headers.
+
+Usage:
+    python trajectory.py info session.ntraj
+    python trajectory.py frame session.ntraj --step 3 --out step3.png
+"""
+
+import argparse
+import bisect
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b"NTRJ"
+TRAILER_MAGIC = b"NTRX"
+VERSION = 1
+
+FILE_HEADER = struct.Struct('<4sIq')
+RECORD = struct.Struct('<BBHIqI')
+TRAILER = struct.Struct('<Q4s')
+FRAME_META = struct.Struct('<II')     # width, height
+AUDIO_META = struct.Struct('<II')     # rate, channels
+PAGE_DELTA = struct.Struct('<II')     # prefix, suffix
+
+KIND_FRAME_KEY = 1
+KIND_FRAME_DELTA = 2
+KIND_AUDIO = 3
+KIND_PAGE_KEY = 4
+KIND_PAGE_DELTA = 5
+KIND_ACTION = 6
+KIND_STEP = 7
+KIND_INDEX = 8
+KIND_NAMES = {KIND_FRAME_KEY: "frame_key", KIND_FRAME_DELTA: "frame_delta", KIND_AUDIO: "audio",
+              KIND_PAGE_KEY: "page_key", KIND_PAGE_DELTA: "page_delta", KIND_ACTION: "action",
+              KIND_STEP: "step", KIND_INDEX: "index"}
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+
+def _pixels(frame):
+    """frame dict from read_video_frame() or (h, w, 4) uint8 -> (h, w, 4) uint8."""
+    if isinstance(frame, dict):
+        return np.frombuffer(frame['data'], dtype=np.uint8,
+                             count=frame['width'] * frame['height'] * 4).reshape(frame['height'], frame['width'], 4)
+    return np.asarray(frame, dtype=np.uint8)
+
+
+def _common_prefix(a, b):
+    n = min(len(a), len(b))
+    if n == 0:
+        return 0
+    diff = np.frombuffer(a, dtype=np.uint8, count=n) != np.frombuffer(b, dtype=np.uint8, count=n)
+    i = int(np.argmax(diff))
+    return i if diff[i] else n
+
+
+def _serialize(msg):
+    return msg if isinstance(msg, (bytes, bytearray)) else msg.SerializeToString()
+
+
+class TrajectoryRecorder:
+    """
+    background=True moves encoding and writes to a thread with a bounded queue;
+    records that don't fit are dropped (counted in .dropped), never blocking.
+    """
+
+    def __init__(self, path, keyframe_interval=120, page_keyframe_interval=20, level=1,
+                 background=False, queue_size=64):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.page_keyframe_interval = page_keyframe_interval
+        self.level = level
+        self.f = open(path, "wb")
+        self.f.write(FILE_HEADER.pack(MAGIC, VERSION, int(time.time() * 1e6)))
+        self.index = {"frame_keys": [], "page_keys": [], "steps": []}
+        self.counts = {name: 0 for name in KIND_NAMES.values()}
+        self.bytes = {name: 0 for name in KIND_NAMES.values()}
+        self.dropped = 0
+        self._prev_frame = None
+        self._frames_since_key = 0
+        self._prev_page = None
+        self._pages_since_key = 0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        if background:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._drain, daemon=True, name="trajectory-writer")
+            self._thread.start()
+
+    # --- Public API (any thread) ---
+
+    def add_frame(self, t_us, frame):
+        # Copy now: shared memory buffers get overwritten by the producer
+        self._submit(self._frame, int(t_us), np.array(_pixels(frame), copy=True))
+
+    def add_audio(self, t_us, samples, rate, channels=1):
+        if isinstance(samples, (bytes, bytearray)):
+            samples = np.frombuffer(samples, dtype=np.float32)
+        pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype('<i2')
+        self._submit(self._write, KIND_AUDIO, int(t_us), AUDIO_META.pack(int(rate), int(channels)) + pcm.tobytes(),
+                     CODEC_RAW)
+
+    def add_page_state(self, t_us, state):
+        """state: page_state_pb2.PageState or its serialized bytes."""
+        self._submit(self._page, int(t_us), bytes(_serialize(state)))
+
+    def add_action(self, t_us, action):
+        """action: action_pb2.Action or its serialized bytes."""
+        self._submit(self._write, KIND_ACTION, int(t_us), bytes(_serialize(action)), CODEC_RAW)
+
+    def mark_step(self, t_us, label=""):
+        """Starts a new step (a command, a plan step). Seek targets."""
+        self._submit(self._step, int(t_us), label)
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            if self.f is None:
+                return
+            offset = self._write(KIND_INDEX, 0, json.dumps(self.index).encode("utf-8"), CODEC_ZLIB)
+            self.f.write(TRAILER.pack(offset, TRAILER_MAGIC))
+            self.f.close()
+            self.f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Encoding (writer thread, or caller when not in background) ---
+
+    def _submit(self, fn, *args):
+        if self._queue is None:
+            with self._lock:
+                fn(*args)
+            return
+        try:
+            self._queue.put_nowait((fn, args))
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args = item
+            with self._lock:
+                fn(*args)
+
+    def _write(self, kind, t_us, payload, codec):
+        if codec == CODEC_ZLIB:
+            payload = zlib.compress(payload, self.level)
+        offset = self.f.tell()
+        self.f.write(RECORD.pack(kind, codec, 0, len(payload), t_us, zlib.crc32(payload)))
+        self.f.write(payload)
+        name = KIND_NAMES[kind]
+        self.counts[name] += 1
+        self.bytes[name] += RECORD.size + len(payload)
+        return offset
+
+    def _frame(self, t_us, pixels):
+        h, w = pixels.shape[:2]
+        prev = self._prev_frame
+        key = (prev is None or prev.shape != pixels.shape or self._frames_since_key >= self.keyframe_interval)
+        if key:
+            offset = self._write(KIND_FRAME_KEY, t_us, FRAME_META.pack(w, h) + pixels.tobytes(), CODEC_ZLIB)
+            self.index["frame_keys"].append([t_us, offset])
+            self._frames_since_key = 0
+        else:
+            delta = np.bitwise_xor(pixels, prev)
+            self._write(KIND_FRAME_DELTA, t_us, FRAME_META.pack(w, h) + delta.tobytes(), CODEC_ZLIB)
+            self._frames_since_key += 1
+        self._prev_frame = pixels
+
+    def _page(self, t_us, data):
+        prev = self._prev_page
+        if prev is None or self._pages_since_key >= self.page_keyframe_interval:
+            offset = self._write(KIND_PAGE_KEY, t_us, data, CODEC_ZLIB)
+            self.index["page_keys"].append([t_us, offset])
+            self._pages_since_key = 0
+        else:
+            prefix = _common_prefix(prev, data)
+            suffix = _common_prefix(prev[prefix:][::-1], data[prefix:][::-1])
+            middle = data[prefix:len(data) - suffix]
+            self._write(KIND_PAGE_DELTA, t_us, PAGE_DELTA.pack(prefix, suffix) + middle, CODEC_ZLIB)
+            self._pages_since_key += 1
+        self._prev_page = data
+
+    def _step(self, t_us, label):
+        offset = self._write(KIND_STEP, t_us, label.encode("utf-8"), CODEC_RAW)
+        self.index["steps"].append([t_us, offset, label])
+
+
+class Record:
+    __slots__ = ("kind", "t_us", "offset", "payload")
+
+    def __init__(self, kind, t_us, offset, payload):
+        self.kind = kind
+        self.t_us = t_us
+        self.offset = offset
+        self.payload = payload  # Decompressed
+
+    @property
+    def name(self):
+        return KIND_NAMES.get(self.kind, str(self.kind))
+
+
+class TrajectoryReader:
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, "rb")
+        magic, self.version, self.created_us = FILE_HEADER.unpack(self.f.read(FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trajectory file")
+        if self.version != VERSION:
+            raise ValueError(f"unsupported trajectory version {self.version}")
+        self.size = os.path.getsize(path)
+        self.index = self._read_index() or self._scan_index()
+        self._frame_key_times = [t for t, _ in self.index["frame_keys"]]
+        self._page_key_times = [t for t, _ in self.index["page_keys"]]
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def steps(self):
+        """[(t_us, label)]"""
+        return [(t, label) for t, _, label in self.index["steps"]]
+
+    def _read_index(self):
+        if self.size < FILE_HEADER.size + TRAILER.size:
+            return None
+        self.f.seek(self.size - TRAILER.size)
+        offset, magic = TRAILER.unpack(self.f.read(TRAILER.size))
+        if magic != TRAILER_MAGIC:
+            return None
+        record, _ = self._read_at(offset)
+        return json.loads(record.payload) if record and record.kind == KIND_INDEX else None
+
+    def _scan_index(self):
+        index = {"frame_keys": [], "page_keys": [], "steps": []}
+        for rec in self.records(headers_only=True):
+            if rec.kind == KIND_FRAME_KEY:
+                index["frame_keys"].append([rec.t_us, rec.offset])
+            elif rec.kind == KIND_PAGE_KEY:
+                index["page_keys"].append([rec.t_us, rec.offset])
+            elif rec.kind == KIND_STEP:
+                index["steps"].append([rec.t_us, rec.offset, self._read_at(rec.offset)[0].payload.decode("utf-8")])
+        return index
+
+    def _read_at(self, offset, headers_only=False):
+        """Returns (Record or None, offset of the next record)."""
+        self.f.seek(offset)
+        header = self.f.read(RECORD.size)
+        if len(header) < RECORD.size:
+            return None, self.size
+        kind, codec, _flags, length, t_us, crc = RECORD.unpack(header)
+        end = offset + RECORD.size + length
+        if end > self.size:
+            return None, self.size  # Truncated tail (crash mid-write)
+        if headers_only:
+            return Record(kind, t_us, offset, None), end
+        payload = self.f.read(length)
+        if zlib.crc32(payload) != crc:
+            return None, self.size  # Torn record
+        if codec == CODEC_ZLIB:
+            payload = zlib.decompress(payload)
+        return Record(kind, t_us, offset, payload), end
+
+    def records(self, start=None, kinds=None, headers_only=False):
+        """Records in file order from `start` (an offset; default: first record)."""
+        offset = FILE_HEADER.size if start is None else start
+        while offset < self.size:
+            rec, next_offset = self._read_at(offset, headers_only=True)
+            if rec is None or rec.kind == KIND_INDEX:
+                return
+            if kinds is None or rec.kind in kinds:
+                if not headers_only:
+                    rec, _ = self._read_at(offset)  # Only decode what the caller wants
+                    if rec is None:
+                        return
+                yield rec
+            offset = next_offset
+
+    def frame_at(self, t_us):
+        """The last frame at or before t_us as (h, w, 4) uint8 BGRA, or None."""
+        i = bisect.bisect_right(self._frame_key_times, t_us) - 1
+        if i < 0:
+            return None
+        pixels = None
+        for rec in self.records(self.index["frame_keys"][i][1], kinds=(KIND_FRAME_KEY, KIND_FRAME_DELTA)):
+            if rec.t_us > t_us:
+                break
+            w, h = FRAME_META.unpack_from(rec.payload)
+            data = np.frombuffer(rec.payload, dtype=np.uint8, offset=FRAME_META.size).reshape(h, w, 4)
+            if rec.kind == KIND_FRAME_KEY:
+                if pixels is not None:
+                    break  # Next keyframe starts after t_us's interval
+                pixels = data.copy()
+            else:
+                np.bitwise_xor(pixels, data, out=pixels)
+        return pixels
+
+    def page_state_at(self, t_us):
+        """Serialized PageState current at t_us, or None."""
+        i = bisect.bisect_right(self._page_key_times, t_us) - 1
+        if i < 0:
+            return None
+        data = None
+        for rec in self.records(self.index["page_keys"][i][1], kinds=(KIND_PAGE_KEY, KIND_PAGE_DELTA)):
+            if rec.t_us > t_us or (rec.kind == KIND_PAGE_KEY and data is not None):
+                break
+            if rec.kind == KIND_PAGE_KEY:
+                data = rec.payload
+            else:
+                prefix, suffix = PAGE_DELTA.unpack_from(rec.payload)
+                data = data[:prefix] + rec.payload[PAGE_DELTA.size:] + (data[len(data) - suffix:] if suffix else b"")
+        return data
+
+    def state_at_step(self, n):
+        """What the agent had in front of it when step n started: (t_us, label, frame, page_state)."""
+        t_us, _, label = self.index["steps"][n]
+        return t_us, label, self.frame_at(t_us), self.page_state_at(t_us)
+
+    def summary(self):
+        counts, sizes = {}, {}
+        offset = FILE_HEADER.size
+        while offset < self.size:
+            rec, next_offset = self._read_at(offset, headers_only=True)
+            if rec is None:
+                break
+            counts[rec.name] = counts.get(rec.name, 0) + 1
+            sizes[rec.name] = sizes.get(rec.name, 0) + next_offset - offset
+            offset = next_offset
+        return {"bytes": self.size, "records": counts, "record_bytes": sizes,
+                "steps": len(self.index["steps"]), "frame_keys": len(self.index["frame_keys"])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect agent trajectory files")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    info = sub.add_parser("info", help="record counts, sizes and steps")
+    info.add_argument("path")
+    frame = sub.add_parser("frame", help="decode the frame at a step or time")
+    frame.add_argument("path")
+    frame.add_argument("--step", type=int)
+    frame.add_argument("--t-us", type=int)
+    frame.add_argument("--out", default="trajectory_frame.png")
+    args = parser.parse_args()
+
+    with TrajectoryReader(args.path) as reader:
+        if args.cmd == "info":
+            print(json.dumps(reader.summary(), indent=2))
+            for i, (t_us, label) in enumerate(reader.steps):
+                print(f"  step {i:3d}  t={t_us / 1e6:10.3f}s  {label}")
+            return
+        t_us = reader.steps[args.step][0] if args.step is not None else args.t_us
+        pixels = reader.frame_at(t_us)
+        if pixels is None:
+            raise SystemExit("no frame at that point")
+        from PIL import Image
+        Image.fromarray(pixels[:, :, [2, 1, 0, 3]], "RGBA").save(args.out)
+        print(f"🎞️ Frame at t={t_us}us -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
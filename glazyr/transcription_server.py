@@ -0,0 +1,349 @@
+"""
+Transcription Server
+One resident Whisper model shared by every agent on the host.
+
+Agents send preprocessed utterances (16kHz mono float32) over a Unix socket
+(TCP on Windows). The server micro-batches whatever arrives within
+max_wait_ms (up to max_batch), runs one batched decode per prompt and
+answers each request as soon as its group is done. Clients can pipeline
+requests on one connection; replies carry the request id.
+
+Length buckets only pay off for backends that accept variable-length input
+(backend.variable_length = True): short commands then aren't padded to the
+longest utterance, and the shortest bucket runs first. openai-whisper's
+encoder always takes a 30s window, so WhisperBackend batches by prompt only.
+
+Unlike the agent's local path (model.transcribe: temperature fallback,
+30s sliding windows), WhisperBackend runs one greedy decode() per utterance;
+audio past 30s is trimmed. Push-to-talk commands are well under that.
+
+Wire format (both directions): u32 header_len, u32 payload_len, JSON header, payload
+  request  {"id": 7, "prompt": "..."} + float32 samples
+  reply    {"id": 7, "text": "...", "batch": 3, "queue_ms": 12.0, "infer_ms": 480.0}
+           or {"id": 7, "error": "..."}
+
+Address: $NEURAL_WHISPER_ADDR, "unix:/path/to.sock" or "tcp:host:port".
+
+Usage:
+    python transcription_server.py --model small.en --max-batch 8 --max-wait-ms 50
+    NEURAL_WHISPER_ADDR=unix:/tmp/neural_whisper.sock python nexus_agent.py
+"""
+
+import argparse
+import collections
+import itertools
+import json
+import os
+import queue
+import socket
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+ADDR_ENV = "NEURAL_WHISPER_ADDR"
+SAMPLE_RATE = 16000
+FRAME = struct.Struct('<II')
+LENGTH_BUCKETS = (2.0, 4.0, 8.0, 16.0, 30.0)  # Seconds; Whisper's window is 30s
+
+
+def default_address():
+    if hasattr(socket, "AF_UNIX"):
+        return "unix:" + os.path.join(tempfile.gettempdir(), "neural_whisper.sock")
+    return "tcp:127.0.0.1:9876"
+
+
+def _parse_address(address):
+    kind, _, rest = address.partition(":")
+    if kind == "unix":
+        return socket.AF_UNIX, rest
+    if kind == "tcp":
+        host, _, port = rest.rpartition(":")
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    raise ValueError(f"bad transcription address '{address}' (unix:/path or tcp:host:port)")
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("peer closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def send_message(sock, header, payload=b""):
+    body = json.dumps(header).encode("utf-8")
+    sock.sendall(FRAME.pack(len(body), len(payload)) + body + payload)
+
+
+def recv_message(sock):
+    header_len, payload_len = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    header = json.loads(_recv_exact(sock, header_len))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
+
+
+def bucket_for(samples, rate=SAMPLE_RATE, buckets=LENGTH_BUCKETS):
+    """Smallest bucket length (in samples) that holds `samples`."""
+    seconds = samples / rate
+    for b in buckets:
+        if seconds <= b:
+            return int(b * rate)
+    return int(buckets[-1] * rate)  # Longer audio is trimmed by the model anyway
+
+
+class WhisperBackend:
+    """Batched greedy decode with openai-whisper: one encoder pass for the whole batch."""
+
+    variable_length = False  # Every clip is padded to the 30s window
+
+    def __init__(self, model_name="small.en", device=None):
+        import whisper
+        self.whisper = whisper
+        print(f"🔄 Loading Whisper model ({model_name})...")
+        self.model = whisper.load_model(model_name, device=device)
+
+    def transcribe_batch(self, audios, prompt=None):
+        import torch
+        w = self.whisper
+        n_mels = self.model.dims.n_mels
+        mels = torch.stack([w.log_mel_spectrogram(w.pad_or_trim(torch.from_numpy(a)), n_mels=n_mels)
+                            for a in audios]).to(self.model.device)
+        options = w.DecodingOptions(language="en", fp16=False, prompt=prompt, without_timestamps=True)
+        return [r.text for r in w.decode(self.model, mels, options)]
+
+
+class _Request:
+    __slots__ = ("id", "conn", "audio", "prompt", "enqueued")
+
+    def __init__(self, req_id, conn, audio, prompt):
+        self.id = req_id
+        self.conn = conn
+        self.audio = audio
+        self.prompt = prompt
+        self.enqueued = time.perf_counter()
+
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def reply(self, header):
+        with self.lock:
+            try:
+                send_message(self.sock, header)
+            except OSError:
+                pass  # Client went away; nothing to do
+
+
+class TranscriptionServer:
+    """
+    backend: object with transcribe_batch(list of float32 arrays, prompt) -> list of str,
+             and optionally variable_length (True = bucket by length before batching).
+    """
+
+    def __init__(self, backend, address=None, max_batch=8, max_wait_ms=50.0, buckets=LENGTH_BUCKETS):
+        self.backend = backend
+        self.address = address or os.environ.get(ADDR_ENV) or default_address()
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.buckets = buckets
+        self.requests = queue.Queue()
+        self.batch_sizes = collections.Counter()
+        self.running = False
+        self._sock = None
+        self._threads = []
+
+    def start(self):
+        family, addr = _parse_address(self.address)
+        if family == getattr(socket, "AF_UNIX", None) and os.path.exists(addr):
+            os.unlink(addr)  # Stale socket from a previous run
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(addr)
+        if family == socket.AF_INET and addr[1] == 0:
+            self.address = "tcp:%s:%d" % self._sock.getsockname()[:2]
+        self._sock.listen(64)
+        self.running = True
+        for target in (self._accept_loop, self._batch_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self.running = False
+        self.requests.put(None)  # Wake the batcher
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        family, addr = _parse_address(self.address)
+        if family == getattr(socket, "AF_UNIX", None) and os.path.exists(addr):
+            os.unlink(addr)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                sock, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._client_loop, args=(_Connection(sock),), daemon=True).start()
+
+    def _client_loop(self, conn):
+        try:
+            while self.running:
+                header, payload = recv_message(conn.sock)
+                audio = np.frombuffer(payload, dtype=np.float32)
+                self.requests.put(_Request(header.get("id"), conn, audio, header.get("prompt")))
+        except (ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            conn.sock.close()
+
+    def _collect(self):
+        """Blocks for one request, then gathers more for up to max_wait."""
+        first = self.requests.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self.running = False
+                break
+            batch.append(item)
+        return batch
+
+    def _batch_loop(self):
+        while self.running:
+            batch = self._collect()
+            bucketed = getattr(self.backend, "variable_length", False)
+            groups = collections.defaultdict(list)
+            for req in batch:
+                length = bucket_for(len(req.audio), buckets=self.buckets) if bucketed else None
+                groups[(length, req.prompt)].append(req)
+            # Shortest bucket first: quick commands aren't stuck behind dictation
+            for (length, prompt), reqs in sorted(groups.items(), key=lambda kv: kv[0][0] or 0):
+                self._run_group(reqs, length, prompt)
+
+    def _run_group(self, reqs, length, prompt):
+        """length: bucket to pad/trim to, or None to hand the audio over as is (the backend pads)."""
+        if length is None:
+            audios = [r.audio for r in reqs]
+        else:
+            audios = [np.pad(r.audio[:length], (0, max(0, length - len(r.audio)))) for r in reqs]
+        start = time.perf_counter()
+        try:
+            texts = self.backend.transcribe_batch(audios, prompt)
+            error = None
+        except Exception as e:
+            texts, error = [None] * len(reqs), str(e)
+        infer_ms = (time.perf_counter() - start) * 1000
+        self.batch_sizes[len(reqs)] += 1
+        for req, text in zip(reqs, texts):
+            reply = {"id": req.id, "batch": len(reqs), "infer_ms": infer_ms,
+                     "queue_ms": (start - req.enqueued) * 1000}
+            if error is None:
+                reply["text"] = text
+            else:
+                reply["error"] = error
+            req.conn.reply(reply)
+
+
+class TranscriptionClient:
+    """
+    Persistent connection to a TranscriptionServer. submit() returns a Future,
+    so an agent can keep polling audio while its utterance is decoded.
+    """
+
+    def __init__(self, address=None, connect_timeout=2.0):
+        self.address = address or os.environ.get(ADDR_ENV) or default_address()
+        family, addr = _parse_address(self.address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(connect_timeout)
+        self.sock.connect(addr)
+        self.sock.settimeout(None)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def submit(self, audio, prompt=None):
+        """audio: 16kHz mono float32."""
+        future = Future()
+        with self._lock:
+            req_id = next(self._ids)
+            self._pending[req_id] = future
+            send_message(self.sock, {"id": req_id, "prompt": prompt},
+                         np.ascontiguousarray(audio, dtype=np.float32).tobytes())
+        return future
+
+    def transcribe(self, audio, prompt=None, timeout=60.0):
+        return self.submit(audio, prompt).result(timeout)
+
+    def _read_loop(self):
+        try:
+            while True:
+                header, _ = recv_message(self.sock)
+                with self._lock:
+                    future = self._pending.pop(header.get("id"), None)
+                if future is None:
+                    continue
+                if "error" in header:
+                    future.set_exception(RuntimeError(header["error"]))
+                else:
+                    future.set_result(header["text"])
+        except (ConnectionError, OSError, ValueError) as e:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError(f"transcription server lost: {e}"))
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared, batching Whisper transcription server")
+    parser.add_argument("--address", default=None, help="unix:/path or tcp:host:port (default: $NEURAL_WHISPER_ADDR)")
+    parser.add_argument("--model", default="small.en")
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    server = TranscriptionServer(WhisperBackend(args.model, args.device), args.address,
+                                 max_batch=args.max_batch, max_wait_ms=args.max_wait_ms).start()
+    print(f"🎙️ Transcription server on {server.address} (batch<={args.max_batch}, wait {args.max_wait_ms}ms)")
+    try:
+        while server.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"🎙️ Batch sizes: {dict(server.batch_sizes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+VLM Request Scheduler
+Single front door for all model traffic (Ollama VLM + LLM) from one agent.
+
+  priority classes  INTERACTIVE (grounding a click the user is waiting on)
+                    > PLANNING (LLM plan) > AMBIENT (background "describe")
+  deadlines         a request still queued at its deadline is dropped
+                    (DeadlineExceeded) instead of sent late
+  coalescing        a new request with the same coalesce_key replaces the one
+                    still queued (Superseded), so ambient captions never pile up
+  in-flight caps    per model, optionally per class and in total
+
+Requests already sent can't be preempted, so with one slot an interactive
+request waits for at most the one ambient call in flight, never for a queue
+of them.
+"""
+
+import collections
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+INTERACTIVE = 0
+PLANNING = 1
+AMBIENT = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PLANNING: "planning", AMBIENT: "ambient"}
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Superseded(Exception):
+    pass
+
+
+def _fail(job, exc):
+    if not job.future.cancelled():
+        job.future.set_exception(exc)
+
+
+class _Job:
+    __slots__ = ("model", "fn", "priority", "seq", "deadline", "key", "future", "enqueued", "dropped")
+
+    def __init__(self, model, fn, priority, seq, deadline, key, enqueued):
+        self.model = model
+        self.fn = fn
+        self.priority = priority
+        self.seq = seq
+        self.deadline = deadline
+        self.key = key
+        self.future = Future()
+        self.enqueued = enqueued
+        self.dropped = False
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class VlmScheduler:
+    """
+    max_in_flight: {model: cap}; models not listed get default_in_flight.
+    class_limits: {priority: cap} across models, e.g. {AMBIENT: 1}.
+    total_in_flight: cap across everything (one GPU behind Ollama).
+    metrics: optional MetricsRegistry.
+    """
+
+    def __init__(self, max_in_flight=None, default_in_flight=1, class_limits=None, total_in_flight=None,
+                 metrics=None, clock=time.monotonic):
+        self.max_in_flight = dict(max_in_flight or {})
+        self.default_in_flight = default_in_flight
+        self.class_limits = dict(class_limits or {})
+        self.total_in_flight = total_in_flight
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._queues = collections.defaultdict(list)   # model -> heap of _Job
+        self._running = collections.Counter()           # model -> in flight
+        self._running_class = collections.Counter()     # priority -> in flight
+        self._keys = {}                                 # coalesce_key -> queued _Job
+        self._seq = itertools.count()
+        self._workers = []
+        self._stopped = False
+
+        self.m_depth = self.m_in_flight = self.m_dropped = self.m_coalesced = self.m_wait = None
+        if metrics is not None:
+            self.m_depth = metrics.gauge("vlm_queue_depth", "Model requests waiting for a slot")
+            self.m_in_flight = metrics.gauge("vlm_in_flight", "Model requests in flight")
+            self.m_dropped = metrics.counter("vlm_dropped_total", "Requests dropped at their deadline")
+            self.m_coalesced = metrics.counter("vlm_coalesced_total", "Queued requests replaced by a newer one")
+            self.m_wait = metrics.histogram("vlm_queue_wait_seconds", "Time from submit to dispatch")
+
+    def cap(self, model):
+        return self.max_in_flight.get(model, self.default_in_flight)
+
+    def pending(self, model=None):
+        with self._cond:
+            queues = [self._queues[model]] if model is not None else self._queues.values()
+            return sum(1 for q in queues for job in q if not job.dropped)
+
+    def in_flight(self):
+        with self._cond:
+            return sum(self._running.values())
+
+    def submit(self, model, fn, priority=AMBIENT, timeout=None, coalesce_key=None):
+        """Queues fn() for `model`. Returns a Future with fn's result."""
+        now = self.clock()
+        job = _Job(model, fn, priority, next(self._seq), now + timeout if timeout is not None else None,
+                   coalesce_key, now)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("scheduler is shut down")
+            if coalesce_key is not None:
+                old = self._keys.get(coalesce_key)
+                if old is not None and not old.dropped:
+                    old.dropped = True
+                    _fail(old, Superseded(coalesce_key))
+                    if self.m_coalesced:
+                        self.m_coalesced.inc()
+                self._keys[coalesce_key] = job
+            heapq.heappush(self._queues[model], job)
+            self._ensure_workers()
+            self._update_gauges()
+            self._cond.notify_all()
+        return job.future
+
+    def run(self, model, fn, priority=INTERACTIVE, timeout=None, coalesce_key=None):
+        """Blocking submit(). Raises DeadlineExceeded / Superseded if dropped."""
+        return self.submit(model, fn, priority, timeout, coalesce_key).result()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            for queue in self._queues.values():
+                for job in queue:
+                    if not job.dropped:
+                        job.dropped = True
+                        job.future.cancel()
+                queue.clear()
+            self._cond.notify_all()
+
+    # --- Workers ---
+
+    def _ensure_workers(self):
+        wanted = sum(self.cap(m) for m in self._queues)
+        if self.total_in_flight is not None:
+            wanted = min(wanted, self.total_in_flight)
+        while len(self._workers) < wanted:
+            t = threading.Thread(target=self._worker, daemon=True, name=f"vlm-sched-{len(self._workers)}")
+            self._workers.append(t)
+            t.start()
+
+    def _update_gauges(self):
+        if self.m_depth is not None:
+            self.m_depth.set(sum(1 for q in self._queues.values() for job in q if not job.dropped))
+            self.m_in_flight.set(sum(self._running.values()))
+
+    def _next_job(self):
+        """Best runnable job across models, dropping dead ones. Caller holds the lock."""
+        now = self.clock()
+        for queue in self._queues.values():
+            for job in queue:
+                if not job.dropped and job.deadline is not None and now >= job.deadline:
+                    self._drop(job)  # Even if its model is saturated: the caller stops waiting now
+            while queue and queue[0].dropped:
+                heapq.heappop(queue)
+        if self.total_in_flight is not None and sum(self._running.values()) >= self.total_in_flight:
+            return None
+
+        best = None
+        for model, queue in self._queues.items():
+            if self._running[model] >= self.cap(model):
+                continue
+            for job in sorted(queue):  # Queues hold a handful of jobs
+                if job.dropped:
+                    continue
+                limit = self.class_limits.get(job.priority)
+                if limit is not None and self._running_class[job.priority] >= limit:
+                    continue
+                if best is None or job < best:
+                    best = job
+                break
+        if best is not None:
+            self._queues[best.model].remove(best)
+            heapq.heapify(self._queues[best.model])
+        return best
+
+    def _drop(self, job):
+        job.dropped = True
+        if self._keys.get(job.key) is job:
+            del self._keys[job.key]
+        _fail(job, DeadlineExceeded(f"{PRIORITY_NAMES.get(job.priority, job.priority)} "
+                                    f"request to {job.model} expired in queue"))
+        if self.m_dropped:
+            self.m_dropped.inc()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopped:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    # Wake up for the earliest deadline so expired jobs are reported promptly
+                    deadlines = [j.deadline for q in self._queues.values() for j in q
+                                 if j.deadline is not None and not j.dropped]
+                    self._cond.wait(max(0.0, min(deadlines) - self.clock()) if deadlines else None)
+                if job is None:
+                    return
+                if self._keys.get(job.key) is job:
+                    del self._keys[job.key]
+                self._running[job.model] += 1
+                self._running_class[job.priority] += 1
+                self._update_gauges()
+            if self.m_wait is not None:
+                self.m_wait.observe(self.clock() - job.enqueued)
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        job.future.set_result(job.fn())
+                    except BaseException as e:
+                        job.future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running[job.model] -= 1
+                    self._running_class[job.priority] -= 1
+                    self._update_gauges()
+                    self._cond.notify_all()
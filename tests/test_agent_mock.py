@@ -1,57 +1,74 @@
-import sys
 import os
-import json
-import base64
-import time
-from unittest.mock import MagicMock, patch
+import sys
 
-# Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
 
-# Mock external libs before importing nexus_agent
-sys.modules["openai"] = MagicMock()
-sys.modules["google.generativeai"] = MagicMock()
-sys.modules["anthropic"] = MagicMock()
-sys.modules["ctypes"] = MagicMock()
+from replay_harness import ReplayHarness, Session, synthetic_session
+from shm_backend import FileBackend
+from synthetic_producer import SyntheticProducer
 
 import nexus_agent
 
-def test_provider_switching():
-    print("Testing Provider Switching...")
-    
-    # Mock Config
-    agent = nexus_agent.NexusAgent()
-    
-    # Switch to OpenAI
-    agent.update_config({"active_provider": "openai", "openai_api_key": "test_key"})
-    assert isinstance(agent.provider, nexus_agent.OpenAIProvider)
-    print("PASS: Switch to OpenAI")
-    
-    # Switch to Gemini
-    agent.update_config({"active_provider": "gemini", "gemini_api_key": "test_key"})
-    assert isinstance(agent.provider, nexus_agent.GeminiProvider)
-    print("PASS: Switch to Gemini")
-
-    # Switch to Anthropic
-    agent.update_config({"active_provider": "anthropic", "anthropic_api_key": "test_key"})
-    assert isinstance(agent.provider, nexus_agent.AnthropicProvider)
-    print("PASS: Switch to Anthropic")
-
-def test_command_logic():
-    print("Testing Command Logic...")
-    agent = nexus_agent.NexusAgent()
-    # Mock Provider
-    agent.provider = MagicMock()
-    agent.provider.transcribe.return_value = "Computer go to google dot com"
-    
-    # Simulate Audio End
-    agent.on_speech_complete()
-    
-    # Verify execute_command called
-    # (Here we'd need to spy on execute_command, but simple print check is fine for now)
-    agent.provider.transcribe.assert_called()
-    print("PASS: Transcription Called")
-
-if __name__ == "__main__":
-    test_provider_switching()
-    test_command_logic()
+
+def make_agent(tmp_path, monkeypatch):
+    # The agent drops debug files into the working directory.
+    monkeypatch.chdir(tmp_path)
+    backend = FileBackend(str(tmp_path / "shm"))
+    producer = SyntheticProducer(backend)
+    agent = nexus_agent.NeuralAgent(shm_backend=backend)
+    agent._vlm_request = lambda prompt, image=None, image_b64=None, **request: "synthetic screen"
+    return agent, producer
+
+
+def test_idle_agent_sees_every_frame(tmp_path, monkeypatch):
+    agent, producer = make_agent(tmp_path, monkeypatch)
+    session = synthetic_session(seconds=1.0, fps=30, audio_hz=0, width=160, height=90)
+    report = ReplayHarness(agent, producer, tail_us=0).replay(session).to_dict()
+
+    assert report["video"]["written"] == 30
+    assert report["video"]["seen"] == 30
+    assert report["video"]["dropped"] == 0
+    assert report["video"]["latency_us"]["p99"] < 10_000  # Within one 10ms idle poll
+    assert agent.m_frames_new.value == 30
+    assert agent.m_loop_iterations.value == report["steps"]
+    producer.close()
+
+
+def test_push_to_talk_buffers_and_transcribes(tmp_path, monkeypatch):
+    agent, producer = make_agent(tmp_path, monkeypatch)
+    transcribed = []
+
+    def fake_transcribe():
+        transcribed.append(len(agent.frames))
+        agent.frames = []
+
+    agent.transcribe_buffer = fake_transcribe
+    session = synthetic_session(seconds=3.0, fps=10, audio_hz=100, width=160, height=90,
+                                state_script=((0.0, 0), (0.5, 1), (2.0, 0)))
+    report = ReplayHarness(agent, producer).replay(session).to_dict()
+
+    assert len(transcribed) == 1
+    assert transcribed[0] > 100  # 1.5s held + cooldown tail of 10ms chunks
+    # At most the chunk that lands as the cooldown expires goes unread.
+    assert report["audio"]["dropped"] <= 1
+    assert report["audio"]["consumed"] + report["audio"]["dropped"] == report["audio"]["written"]
+    assert agent.m_audio_chunks.value == report["audio"]["consumed"]
+    producer.close()
+
+
+def test_replay_is_deterministic(tmp_path, monkeypatch):
+    session = synthetic_session(seconds=1.0, fps=60, audio_hz=50, width=160, height=90,
+                                state_script=((0.0, 0), (0.2, 1), (0.6, 0)))
+    path = str(tmp_path / "session.npz")
+    session.save(path)
+
+    results = []
+    for run in ("a", "b"):
+        run_dir = tmp_path / run
+        run_dir.mkdir()
+        agent, producer = make_agent(run_dir, monkeypatch)
+        agent.transcribe_buffer = lambda: None
+        report = ReplayHarness(agent, producer).replay(Session.load(path)).to_dict()
+        results.append((report["steps"], report["video"], report["audio"]))
+        producer.close()
+    assert results[0] == results[1]
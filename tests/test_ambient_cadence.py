@@ -0,0 +1,69 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from ambient_cadence import AmbientCadence
+from metrics import MetricsRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def _queries(cadence, clock, fp, seconds, step=0.1, queue_depth=0):
+    times = []
+    start = clock.t
+    for i in range(int(round(seconds / step))):
+        clock.t = round(start + i * step, 6)
+        if cadence.should_query(fp, queue_depth):
+            times.append(clock.t)
+    clock.t = start + seconds
+    return times
+
+
+def test_backs_off_on_static_screen_and_resets_on_change():
+    clock = FakeClock()
+    cadence = AmbientCadence(min_interval=1.0, max_interval=8.0, clock=clock)
+    page = np.zeros((36, 64), dtype=np.float32)
+
+    assert _queries(cadence, clock, page, 16) == [0.0, 1.0, 3.0, 7.0, 15.0]
+    assert cadence.rate() == 1.0 / 8.0
+
+    navigated = page + 200
+    assert _queries(cadence, clock, navigated, 1.0) == [16.0]
+    assert cadence.rate() == 1.0
+
+
+def test_throttles_on_queue_depth_and_latency():
+    clock = FakeClock()
+    cadence = AmbientCadence(min_interval=1.0, max_interval=30.0, max_queue=1, clock=clock)
+    fp = np.zeros((36, 64), dtype=np.float32)
+    assert not cadence.should_query(fp, queue_depth=1)
+    assert cadence.should_query(fp, queue_depth=0)
+
+    cadence.observe_latency(2.5)  # Slow model: at most one caption per 5s
+    assert cadence.effective_interval() == 5.0
+    clock.t = 3.0
+    assert not cadence.should_query(fp + 100)
+    clock.t = 5.0
+    assert cadence.should_query(fp + 100)
+
+
+def test_skips_count_due_captions_not_frames():
+    clock = FakeClock()
+    reg = MetricsRegistry()
+    cadence = AmbientCadence(min_interval=1.0, max_interval=1.0, metrics=reg, clock=clock)
+    fp = np.zeros((36, 64), dtype=np.float32)
+    assert _queries(cadence, clock, fp, 0.5) == [0.0]
+    skipped = reg.get("ambient_vlm_skipped_total")
+    assert _queries(cadence, clock, fp, 0.4) == [] and skipped.value == 0  # Not due yet: nothing skipped
+    assert _queries(cadence, clock, fp, 2.1, queue_depth=1) == []  # 21 frames with the queue busy
+    assert skipped.value == 2  # One per interval the caption was due
+    assert _queries(cadence, clock, fp, 0.1) == [3.0]
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from audio_stats import AudioStats, agc_gain, chunk_rms, normalize
+
+
+def _speech(seconds=2.0, rate=16000, seed=0):
+    rng = np.random.default_rng(seed)
+    audio = (rng.standard_normal(int(seconds * rate)) * 0.02).astype(np.float32)
+    audio[::4000] = 0.9  # Clicks: p95 must ignore them
+    return audio
+
+
+def test_running_stats_match_full_buffer():
+    audio = _speech()
+    stats = AudioStats()
+    for chunk in np.split(audio, 40):
+        stats.add(chunk)
+    assert stats.count == len(audio)
+    assert stats.rms == pytest.approx(np.sqrt(np.mean(audio.astype(np.float64) ** 2)), rel=1e-5)
+    assert stats.peak == pytest.approx(0.9)
+    exact = np.percentile(np.abs(audio), 95)
+    assert stats.quantile(0.95) == pytest.approx(exact, rel=0.06)  # One histogram bin
+
+
+def test_normalize_in_place_and_silence():
+    audio = _speech()
+    stats = AudioStats()
+    stats.add(audio)
+    expected = np.clip(audio * (0.5 / stats.quantile(0.95)), -1, 1)
+    buf = audio.copy()
+    gain = normalize(buf, stats)
+    assert gain == pytest.approx(0.5 / stats.quantile(0.95))
+    assert np.allclose(buf, expected, atol=1e-6)
+    assert np.percentile(np.abs(buf), 95) == pytest.approx(0.5, rel=0.06)
+
+    silent = np.zeros(1600, dtype=np.float32)
+    stats = AudioStats()
+    stats.add(silent)
+    assert normalize(silent, stats) == 0.0
+
+    quiet = np.full(1600, 5e-5, dtype=np.float32)
+    stats = AudioStats()
+    stats.add(quiet)
+    assert normalize(quiet, stats) == 1000.0  # Very quiet mic: fixed boost
+
+    faint = np.full(1600, 5e-7, dtype=np.float32)  # Under the histogram's 1e-6 floor, but not silent
+    stats = AudioStats()
+    stats.add(faint)
+    assert stats.quantile(0.95) == 0.0
+    assert normalize(faint, stats) == 1000.0
+    assert faint[0] == pytest.approx(5e-4)
+
+
+def test_chunk_agc():
+    chunk = np.full(480, 0.01, dtype=np.float32)
+    assert chunk_rms(chunk) == pytest.approx(0.01)
+    assert agc_gain(0.01) == pytest.approx(10.0)
+    assert agc_gain(0.001) == 30.0    # Capped
+    assert agc_gain(0.00001) == 1.0   # Silence is not boosted
+    assert agc_gain(0.2) == 1.0       # Already loud
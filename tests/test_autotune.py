@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from autotune import DEFAULTS, autotune, load_profile, pick, pick_concurrency, pick_variant, save_profile
+from stub_vlm_server import StubVlmServer
+
+
+def _s(p50, p95, valid=1.0, **extra):
+    return dict(p50=p50, p95=p95, valid_rate=valid, **extra)
+
+
+def test_selection_rules():
+    # Fastest model that is reliable and within budget; fall back to most reliable
+    assert pick({"a": _s(0.5, 4.0), "b": _s(1.0, 2.0), "c": _s(0.2, 0.3, valid=0.5)}, budget=3.0) == "b"
+    assert pick({"a": _s(5, 9, valid=0.9), "b": _s(4, 8, valid=0.6)}, budget=3.0) == "a"
+    assert pick({"a": _s(None, None, valid=0.0)}, budget=3.0) is None
+    variants = {"384q50": _s(0.3, 0.4, size=384, quality=50), "768q70": _s(2.0, 5.0, size=768, quality=70),
+                "512q70": _s(0.6, 0.9, size=512, quality=70)}
+    assert pick_variant(variants, budget=1.0) == "512q70"
+    levels = {1: {"throughput": 1.0, "p95": 1.0}, 2: {"throughput": 1.9, "p95": 1.5}, 4: {"throughput": 2.0, "p95": 2.5}}
+    assert pick_concurrency(levels, budget=3.0) == 2       # 4 in flight isn't worth it
+    assert pick_concurrency(levels, budget=1.2) == 1       # 2 in flight blows the budget
+
+
+def test_autotune_against_stub_writes_loadable_profile(tmp_path):
+    with StubVlmServer(latency_ms=5) as stub:
+        profile = autotune(stub.url, vlm_models=("fast-vlm",), llm_models=("plan-llm",),
+                           whisper_models=("tiny.en",), runs=2, sizes=(256, 384), qualities=(50,),
+                           levels=(1, 2), log=lambda *_: None)
+    assert profile["vlm_model"] == "fast-vlm" and profile["llm_model"] == "plan-llm"
+    assert (profile["vlm_thumbnail"], profile["jpeg_quality"]) == (384, 50)
+    assert profile["measurements"]["vlm"]["fast-vlm"]["256q50"]["valid_rate"] == 1.0
+    assert profile["vlm_max_in_flight"] in (1, 2)
+    if "error" in profile["measurements"]["whisper"]["tiny.en"]:
+        assert profile["whisper_model"] == DEFAULTS["whisper_model"]
+
+    path = save_profile(profile, str(tmp_path / "profile.json"))
+    loaded = load_profile(path)
+    assert loaded == {k: profile[k] for k in DEFAULTS}
+
+
+def test_load_profile_falls_back_to_defaults(tmp_path):
+    assert load_profile(str(tmp_path / "missing.json")) == DEFAULTS
+    path = tmp_path / "partial.json"
+    path.write_text(json.dumps({"vlm_model": "qwen2.5vl:3b", "unknown": 1}))
+    assert load_profile(str(path)) == dict(DEFAULTS, vlm_model="qwen2.5vl:3b")
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../tools"))
+
+from build_analytics import RateEta, analyze, diff, group_of, load_edges, read_ninja_log, target_of
+
+# start end mtime output cmdhash (ms). Build 1: a and b in parallel, then link (waits on b).
+NINJA_LOG = """# ninja log v5
+0\t4000\t0\tobj/components/viz/service/service/a.o\taa
+0\t6000\t0\tobj/content/browser/browser/b.o\tbb
+0\t6000\t0\tobj/content/browser/browser/b.h.d\tbb
+6000\t9000\t0\tchrome\tcc
+0\t1000\t0\tobj/components/viz/service/service/a.o\taa
+1000\t3000\t0\tchrome\tcc
+"""
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    (tmp_path / ".ninja_log").write_text(NINJA_LOG)
+    return tmp_path
+
+
+def test_builds_groups_and_critical_path(out_dir):
+    builds = read_ninja_log(str(out_dir / ".ninja_log"))
+    assert [len(b) for b in builds] == [3, 2]
+    assert builds[0][1].outputs == ["obj/content/browser/browser/b.o", "obj/content/browser/browser/b.h.d"]
+
+    r = analyze(load_edges(str(out_dir), build=0))
+    assert (r["edges"], r["wall_s"], r["cpu_s"]) == (3, 9.0, 13.0)
+    assert [e["output"] for e in r["critical_path"]["edges"]] == ["obj/content/browser/browser/b.o", "chrome"]
+    assert r["critical_path"]["seconds"] == 9.0
+    groups = {g["name"]: g for g in r["groups"]}
+    # a.o shared its 4s with b.o: 2s weighted; b.o gets 2s + 2s alone
+    assert groups["components/viz"]["weighted_s"] == 2.0
+    assert groups["content/browser"]["weighted_s"] == 4.0
+    assert groups["(root)"]["weighted_s"] == 3.0
+    assert sum(g["weighted_s"] for g in r["groups"]) == r["wall_s"]
+    assert r["timeline"]["concurrency"][:5] == [2.0, 2.0, 2.0, 2.0, 1.0]
+
+    latest = analyze(load_edges(f"{out_dir}@-1"))
+    d = diff(r, latest)
+    assert d["wall_s"]["delta"] == -6.0 and d["groups"][0]["name"] == "content/browser"
+
+
+def test_timeline_with_fractional_buckets(tmp_path):
+    # 100.7s wall: 60 buckets of ~1.678s, so bucket edges never land on whole numbers
+    (tmp_path / ".ninja_log").write_text("# ninja log v5\n350\t47210\t0\tb.o\tbb\n0\t100700\t0\ta.o\taa\n")
+    r = analyze(load_edges(str(tmp_path)))
+    timeline = r["timeline"]
+    assert timeline["bucket_s"] == pytest.approx(100.7 / 60)
+    assert sum(timeline["concurrency"]) * timeline["bucket_s"] == pytest.approx(r["cpu_s"], rel=1e-3)
+    assert timeline["concurrency"][10] == 2.0 and timeline["concurrency"][40] == 1.0
+
+
+def test_grouping_and_rate_eta():
+    assert group_of("obj/components/viz/service/x.o") == "components/viz"
+    assert group_of("gen/content/public/mojom.cc", depth=1) == "content"
+    assert target_of("obj/components/viz/service/service/x.o") == "components/viz/service/service"
+    assert target_of("chrome.exe") == "chrome.exe"
+
+    eta = RateEta(window=10)
+    assert eta.eta() is None
+    eta.observe(100, 1000, t=0)
+    eta.observe(150, 1000, t=5)
+    assert eta.eta() == pytest.approx(85.0)  # 850 left at 10/s
+    eta.observe(10, 2000, t=6)              # New build: old samples dropped
+    assert eta.eta() is None
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from cdp_pool import BlockingCDP, CDPError, CDPPool, ConnectionClosed, _mask, encode_frame
+from metrics import MetricsRegistry
+from stub_cdp_server import StubCdpError, StubCdpServer
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_mask_round_trips():
+    key = b"\x01\x02\x03\x04"
+    payload = bytes(range(256)) * 3
+    assert _mask(_mask(payload, key), key) == payload
+    assert len(encode_frame(1, b"x" * 70000, mask=True)) == 70000 + 2 + 8 + 4
+
+
+def test_one_socket_per_target_and_errors_surface():
+    with StubCdpServer() as server:
+        async def scenario():
+            pool = CDPPool(port=server.port, metrics=MetricsRegistry())
+            await pool.send("Page.enable")
+            result = await pool.send("Page.navigate", {"url": "https://example.com"})
+            with pytest.raises(CDPError) as err:
+                await pool.send("Bogus.method")
+            await pool.close()
+            return result, err.value
+
+        result, error = run(scenario())
+        assert result["frameId"] == "frame-1"
+        assert error.code == -32601
+        assert server.connections == 1  # Three commands, one WebSocket
+        assert [m for _, m, _ in server.commands] == ["Page.enable", "Page.navigate", "Bogus.method"]
+
+
+def test_batch_is_pipelined():
+    with StubCdpServer(rtt_ms=40) as server:
+        commands = [("Runtime.evaluate", {"expression": f"{i}"}) for i in range(10)]
+
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            session = await pool.session()
+            start = time.monotonic()
+            results = await session.batch(commands)
+            batched = time.monotonic() - start
+            start = time.monotonic()
+            for method, params in commands[:3]:
+                await session.send(method, params)
+            serial = time.monotonic() - start
+            await pool.close()
+            return results, batched, serial
+
+        results, batched, serial = run(scenario())
+        assert len(results) == 10
+        assert batched < 0.2   # ~1 RTT for ten commands
+        assert serial >= 0.12  # vs one RTT each
+        assert [p["expression"] for _, m, p in server.commands[:10]] == [str(i) for i in range(10)]
+
+
+def test_batch_can_return_errors_in_place():
+    with StubCdpServer() as server:
+        def fail(params):
+            raise StubCdpError(-32000, "Cannot find context")
+        server.handlers["Runtime.callFunctionOn"] = fail
+
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            results = await pool.batch([("Page.enable", None), ("Runtime.callFunctionOn", {})], return_exceptions=True)
+            await pool.close()
+            return results
+
+        ok, failed = run(scenario())
+        assert ok == {}
+        assert isinstance(failed, CDPError) and failed.method == "Runtime.callFunctionOn"
+
+
+def test_events_reach_subscribers():
+    with StubCdpServer() as server:
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            session = await pool.session()
+            seen = []
+            unsubscribe = session.on("Page.frameNavigated", lambda p: seen.append(p["frame"]["url"]))
+            load = asyncio.ensure_future(session.wait_for("Page.loadEventFired", timeout=2))
+            await session.send("Page.navigate", {"url": "https://a.test"})
+            await load
+            unsubscribe()
+            await session.send("Page.navigate", {"url": "https://b.test"})
+            await session.wait_for("Page.loadEventFired", timeout=2)
+            await pool.close()
+            return seen
+
+        assert run(scenario()) == ["https://a.test"]
+
+
+def test_dropped_session_reconnects_and_fails_pending():
+    with StubCdpServer(rtt_ms=200) as server:
+        async def scenario():
+            metrics = MetricsRegistry()
+            pool = CDPPool(port=server.port, metrics=metrics)
+            session = await pool.session()
+            pending = asyncio.ensure_future(session.send("Page.enable"))
+            await asyncio.sleep(0.05)
+            server.drop_clients()
+            with pytest.raises(ConnectionClosed):
+                await pending
+            server.rtt_ms = 0
+            await pool.send("Page.enable")
+            await pool.close()
+            return metrics.get("cdp_reconnects_total").value
+
+        assert run(scenario()) == 1
+        assert server.connections == 2
+
+
+def test_blocking_wrapper():
+    with StubCdpServer() as server:
+        cdp = BlockingCDP(port=server.port)
+        try:
+            focus, inserted = cdp.batch([("Runtime.evaluate", {"expression": "1"}), ("Input.insertText", {"text": "hi"})])
+            assert inserted == {}
+            assert cdp.call("Page.navigate", url="https://example.com")["loaderId"] == "loader-1"
+        finally:
+            cdp.close()
+        assert server.connections == 1
@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from debug_capture import DebugCapture, prune_sessions
+from metrics import MetricsRegistry
+
+
+def _frame(width=32, height=16):
+    return {"width": width, "height": height, "timestamp": 1, "data": bytes(width * height * 4)}
+
+
+def test_sampling_formats_and_retention(tmp_path):
+    clock = [0.0]
+    reg = MetricsRegistry()
+    cap = DebugCapture(root=str(tmp_path), frame_interval=10.0, max_files=3, metrics=reg, clock=lambda: clock[0])
+    assert cap.capture_frame(_frame())
+    assert not cap.capture_frame(_frame())          # Within frame_interval
+    assert cap.capture_frame(_frame(), tag="vlm")   # Separate tag, separate budget
+    clock[0] = 10.0
+    assert cap.capture_frame(_frame())
+    cap.capture_audio(np.zeros(1600, dtype=np.float32), 16000)
+    cap.close()
+
+    files = sorted(os.listdir(cap.session_dir))
+    assert len(files) == 3  # Oldest frame evicted by max_files
+    assert files[0].endswith("_vlm.png") and files[-1].endswith("_utterance.wav")
+    with wave.open(os.path.join(cap.session_dir, files[-1])) as w:
+        assert (w.getframerate(), w.getnframes()) == (16000, 1600)
+    assert reg.get("debug_capture_written_total").value == 4
+    assert cap.bytes_written == sum(os.path.getsize(os.path.join(cap.session_dir, f)) for f in files)
+
+    raw = DebugCapture(root=str(tmp_path / "raw"), fmt="raw")
+    raw.capture_frame(_frame())
+    raw.close()
+    (name,) = os.listdir(raw.session_dir)
+    assert name.endswith("_frame_32x16.bgra")
+    assert os.path.getsize(os.path.join(raw.session_dir, name)) == 32 * 16 * 4
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    cap = DebugCapture(root=str(tmp_path), queue_size=1, frame_interval=0)
+    gate = threading.Event()
+    original = cap._write
+    cap._write = lambda *a: gate.wait(5) and original(*a)
+    results = [cap.capture_frame(_frame(), force=True) for _ in range(5)]
+    assert results[0] and not all(results)
+    assert cap.dropped >= 3
+    gate.set()
+    cap.close()
+
+
+def test_prune_sessions_keeps_newest(tmp_path):
+    for name in ("20240101_000000_1", "20240102_000000_1", "20240103_000000_1"):
+        (tmp_path / name).mkdir()
+    assert prune_sessions(str(tmp_path), 1) == ["20240101_000000_1", "20240102_000000_1"]
+    assert os.listdir(tmp_path) == ["20240103_000000_1"]
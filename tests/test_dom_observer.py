@@ -0,0 +1,235 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from cdp_pool import CDPPool
+from dom_index import DomIndex
+from dom_observer import READ_PROPERTIES, DomObserver, flatten
+from metrics import MetricsRegistry
+from stub_cdp_server import StubCdpError, StubCdpServer
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def selenium_form_document():
+    """A DOM.getDocument tree with the Selenium web form's fields (dom_dump_selenium_form.json)."""
+    with open(os.path.join(ROOT, "dom_dump_selenium_form.json"), encoding="utf-8") as f:
+        dump = json.load(f)
+    types = {"textbox": "text", "input": "checkbox", "button": "submit"}
+    fields = []
+    for node in dump:
+        tag = node["attributes"]["tag"]
+        if tag in ("input", "textarea", "select"):
+            attrs = ["name", node["name"]]
+            if tag == "input":
+                attrs += ["type", types.get(node["role"], "text")]
+            fields.append({"nodeType": 1, "backendNodeId": node["id"], "localName": tag, "attributes": attrs})
+    body = {"nodeType": 1, "backendNodeId": 3, "localName": "body", "attributes": ["class", "d-flex"],
+            "children": [{"nodeType": 3, "backendNodeId": 4, "nodeValue": "Web form"},
+                         {"nodeType": 1, "backendNodeId": 5, "localName": "form", "children": fields}]}
+    return {"nodeType": 9, "backendNodeId": 1, "children": [
+        {"nodeType": 10, "backendNodeId": 2},
+        {"nodeType": 1, "backendNodeId": 6, "localName": "html", "children": [body]}]}
+
+
+class FakePage:
+    def __init__(self, server):
+        self.document = selenium_form_document()
+        self.values = {}  # backendNodeId -> value
+        server.handlers.update({
+            "DOM.getDocument": lambda p: {"root": self.document},
+            "DOM.resolveNode": self.resolve,
+            "Runtime.callFunctionOn": self.call,
+            "Runtime.releaseObjectGroup": lambda p: {},
+        })
+
+    def resolve(self, params):
+        return {"object": {"type": "object", "objectId": f"obj-{params['backendNodeId']}"}}
+
+    def call(self, params):
+        assert params["functionDeclaration"] == READ_PROPERTIES
+        rows = []
+        for arg in params["arguments"]:
+            node_id = int(arg["objectId"].split("-")[1])
+            rows.append([self.values.get(node_id, ""), False, node_id == 41, node_id == 48, None])
+        return {"result": {"type": "object", "value": rows}}
+
+
+def count(server, method):
+    return sum(1 for _, m, _ in server.commands if m == method)
+
+
+def test_flatten_matches_the_snapshot_format():
+    nodes, interactive = flatten(selenium_form_document())
+    assert nodes[0] == {"id": 1, "role": "#document", "name": "", "attributes": {"tag": "#document"}, "parent": None}
+    assert {"id": 26, "role": "textbox", "name": "my-text", "attributes": {"tag": "input"}, "parent": 5} in nodes
+    assert [n["id"] for n in nodes[:5]] == [1, 2, 6, 3, 4]  # Document order
+    assert len(interactive) == 16
+
+
+def test_properties_resolve_in_one_call_and_are_cached():
+    with StubCdpServer() as server:
+        page = FakePage(server)
+
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            observer = DomObserver(await pool.session(), metrics=MetricsRegistry())
+            first = await observer.snapshot()
+            first_changed = set(observer.changed)
+            calls_after_first = (count(server, "DOM.getDocument"), count(server, "DOM.resolveNode"),
+                                 count(server, "Runtime.callFunctionOn"))
+
+            page.values[26] = "typed"
+            second = await observer.snapshot()
+            second_changed = set(observer.changed)
+            calls_after_second = (count(server, "DOM.getDocument"), count(server, "DOM.resolveNode"),
+                                  count(server, "Runtime.callFunctionOn"))
+
+            server.emit("DOM.attributeModified", {"nodeId": 1, "name": "class", "value": "x"})
+            await asyncio.sleep(0.05)
+            await observer.snapshot()
+            await observer.release()
+            await pool.close()
+            return first, first_changed, calls_after_first, second, second_changed, calls_after_second
+
+        first, first_changed, after_first, second, second_changed, after_second = asyncio.run(scenario())
+        assert after_first == (1, 16, 1)     # One walk, one pipelined resolve batch, ONE property call
+        assert len(first_changed) == 16
+        assert after_second == (1, 16, 2)    # No mutation: tree and object ids reused
+        assert second_changed == {26}
+        assert count(server, "DOM.getDocument") == 2  # The mutation event forced a new walk
+        assert count(server, "DOM.resolveNode") == 16  # ...but object ids survived it
+
+        by_id = {n["id"]: n for n in second}
+        assert by_id[26]["properties"]["value"] == "typed"
+        index = DomIndex(second)
+        assert index.by_id[41].editable is False  # Disabled input
+        assert index.find("my-disabled").id != 41  # Skipped, best editable match instead
+        assert index.find("my-text").id == 26
+
+
+def test_document_update_drops_object_ids():
+    with StubCdpServer() as server:
+        FakePage(server)
+
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            observer = DomObserver(await pool.session())
+            await observer.snapshot()
+            server.emit("DOM.documentUpdated")
+            await asyncio.sleep(0.05)
+            await observer.snapshot()
+            await pool.close()
+
+        asyncio.run(scenario())
+        assert count(server, "DOM.resolveNode") == 32
+
+
+def test_unresolvable_nodes_get_no_properties():
+    with StubCdpServer() as server:
+        page = FakePage(server)
+
+        def gone(params):
+            raise StubCdpError(-32000, "No node with given id found")
+
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            observer = DomObserver(await pool.session())
+            server.handlers["DOM.resolveNode"] = gone
+            nodes = await observer.snapshot()
+            server.handlers["DOM.resolveNode"] = page.resolve
+            await pool.close()
+            return nodes, observer
+
+        nodes, observer = asyncio.run(scenario())
+        assert not any("properties" in n for n in nodes)
+        assert observer.object_ids == {}
+
+
+def test_iframe_fields_are_read_in_their_own_context():
+    with StubCdpServer() as server:
+        page = FakePage(server)
+        frame = {"nodeType": 9, "backendNodeId": 90, "children": [
+            {"nodeType": 1, "backendNodeId": 91, "localName": "input", "attributes": ["name", "coupon"]}]}
+        page.document["children"][1]["children"][0]["children"].append(
+            {"nodeType": 1, "backendNodeId": 89, "localName": "iframe", "contentDocument": frame})
+        context = lambda arg: "frame" if arg["objectId"] == "obj-91" else "main"
+        call = page.call
+
+        def one_world(params):
+            if {context(arg) for arg in params["arguments"]} != {context({"objectId": params["objectId"]})}:
+                raise StubCdpError(-32000, "Argument should belong to the same JavaScript world as target object")
+            return call(params)
+
+        server.handlers["Runtime.callFunctionOn"] = one_world
+        page.values[91] = "SAVE10"
+
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            observer = DomObserver(await pool.session())
+            nodes = await observer.snapshot()
+            await pool.close()
+            return nodes
+
+        by_id = {n["id"]: n for n in asyncio.run(scenario())}
+        assert by_id[91]["properties"]["value"] == "SAVE10" and by_id[91]["parent"] == 90
+        assert "properties" in by_id[26]
+        assert count(server, "Runtime.callFunctionOn") == 2  # One per document, pipelined
+
+
+def test_rejected_property_read_re_resolves_next_time():
+    with StubCdpServer() as server:
+        page = FakePage(server)
+
+        def stale(params):
+            raise StubCdpError(-32000, "Could not find object with given id")
+
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            observer = DomObserver(await pool.session())
+            server.handlers["Runtime.callFunctionOn"] = stale
+            await observer.snapshot()
+            dropped = dict(observer.object_ids)
+            server.handlers["Runtime.callFunctionOn"] = page.call
+            nodes = await observer.snapshot()
+            await pool.close()
+            return dropped, nodes
+
+        dropped, nodes = asyncio.run(scenario())
+        assert dropped == {}
+        assert count(server, "DOM.resolveNode") == 32
+        assert sum(1 for n in nodes if "properties" in n) == 16
+
+
+def test_layout_mode_adds_bounds_and_reduces_to_the_viewport():
+    with StubCdpServer() as server:
+        FakePage(server)
+        # Fields in document order, 100px apart; the textarea (id 36) is display:none
+        fields = [n["id"] for n in flatten(selenium_form_document())[1] if n["id"] != 36]
+        ids = [1, 2, 6, 3, 4, 5] + fields
+        bounds = [[0, 0, 1280, 4000]] * 6 + [[0, 100 * i, 200, 30] for i in range(len(fields))]
+        server.handlers["DOMSnapshot.captureSnapshot"] = lambda p: {
+            "documents": [{"nodes": {"backendNodeId": ids}, "layout": {"nodeIndex": list(range(len(ids))), "bounds": bounds}}],
+            "strings": []}
+        server.handlers["Page.getLayoutMetrics"] = lambda p: {
+            "cssLayoutViewport": {"pageX": 0, "pageY": 0, "clientWidth": 1280, "clientHeight": 400}}
+
+        async def scenario():
+            pool = CDPPool(port=server.port)
+            observer = DomObserver(await pool.session(), layout=True)
+            reduced = json.loads(await observer.snapshot_json(reduce=True, margin=100))
+            await pool.close()
+            return observer, reduced
+
+        observer, reduced = asyncio.run(scenario())
+        assert observer.viewport == (0, 0, 1280, 400)
+        by_id = {n["id"]: n for n in observer.nodes}
+        assert by_id[26]["bounds"] == [0, 0, 200, 30] and by_id[36]["rendered"] is False
+        assert [n["id"] for n in reduced if n["attributes"]["tag"] != "#text"] == [1, 3, 5] + fields[:6]
+        assert observer.reduction.resolve(6) == 3  # html collapsed into body
+        # Tree walk, layout capture and viewport metrics went out as one pipelined batch
+        assert [m for _, m, _ in server.commands[:3]] == ["DOM.getDocument", "DOMSnapshot.captureSnapshot",
+                                                          "Page.getLayoutMetrics"]
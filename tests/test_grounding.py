@@ -0,0 +1,145 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from grounding import (EMPTY, MISS, OK, OUT_OF_RANGE, PROSE, TIMEOUT, GroundingLadder, StreamCheck, classify,
+                       rungs_from_env)
+from metrics import MetricsRegistry
+from shm_backend import FileBackend
+from stub_vlm_server import StubVlmServer
+
+import nexus_agent
+
+
+def test_classify_and_stream_check():
+    assert classify("") == (EMPTY, None)
+    assert classify("  ") == (EMPTY, None)
+    assert classify("The search box is at the top.") == (PROSE, None)
+    assert classify("[100, 200, 1500, 300]")[0] == OUT_OF_RANGE
+    assert classify("0, 0, 0, 0")[0] == OUT_OF_RANGE  # Zero-area box
+    assert classify("Box: [100, 200, 150, 300]") == (OK, (100, 200, 150, 300))
+
+    check = StreamCheck(prose_chars=20)
+    assert not check("[100, 200, 150")
+    assert check("[100, 200, 150, 300]") and check.reason == "complete"
+    check = StreamCheck(prose_chars=20)
+    assert not check("The search")
+    assert check("The search box is located") and check.reason == PROSE
+
+    assert rungs_from_env({}) == ("strict", "small", "alt_model", "dom")
+    assert rungs_from_env({"NEURAL_GROUNDING_LADDER": "small, dom"}) == ("small", "dom")
+
+
+def test_ladder_escalates_and_skips_unconfigured_rungs():
+    calls = []
+    replies = iter(["", "I can see a search box", "[10, 20, 10, 40]", "[100, 200, 200, 400]"])
+
+    def query(prompt, image, model, timeout, stream_check):
+        calls.append((prompt.split()[0], image.size, model))
+        return next(replies)
+
+    reg = MetricsRegistry()
+    ladder = GroundingLadder(query, fallback_model="llava-phi3", metrics=reg)
+    coords, attempts = ladder.ground("search box", Image.new("RGB", (512, 288)), 1000, 500)
+    assert coords == (300, 75)
+    assert [(a.rung, a.verdict) for a in attempts] == [
+        ("first", EMPTY), ("strict", PROSE), ("small", OUT_OF_RANGE), ("alt_model", OK)]
+    assert calls[1][0] == "Bounding" and calls[2][1] == (256, 144) and calls[3][2] == "llava-phi3"
+    assert reg.get("grounding_degenerate_total").value == 3
+    assert reg.get("grounding_fallbacks_total").value == 1
+
+    # No fallback model: alt_model is skipped, the DOM locator answers
+    ladder = GroundingLadder(lambda *a: "", dom_locator=lambda target: (7, 9) if target == "login" else None)
+    coords, attempts = ladder.ground("login", Image.new("RGB", (64, 64)), 100, 100)
+    assert coords == (7, 9) and [a.rung for a in attempts] == ["first", "strict", "small", "dom"]
+    coords, attempts = ladder.ground("logout", Image.new("RGB", (64, 64)), 100, 100)
+    assert coords is None and attempts[-1].verdict == MISS
+
+
+def test_ladder_shares_one_deadline():
+    clock = [0.0]
+    timeouts = []
+
+    def query(prompt, image, model, timeout, stream_check):
+        timeouts.append(timeout)
+        clock[0] += 3.0  # Every attempt burns 3s and yields nothing
+        return None
+
+    reg = MetricsRegistry()
+    ladder = GroundingLadder(query, deadline=8.0, metrics=reg, clock=lambda: clock[0])
+    coords, attempts = ladder.ground("x", Image.new("RGB", (64, 64)), 100, 100)
+    assert coords is None
+    assert [a.verdict for a in attempts] == [TIMEOUT] * 3
+    assert timeouts == [8.0, 5.0, 2.0]
+    assert reg.get("grounding_failed_total").value == 1
+
+
+def test_small_rung_crops_around_the_previous_box():
+    seen = []
+    replies = iter(["", "[100, 700, 100, 900]", "[400, 400, 600, 600]"])  # Second: zero-height box near the right
+
+    def query(prompt, image, model, timeout, stream_check):
+        seen.append(image)
+        return next(replies)
+
+    image = Image.new("RGB", (1000, 500))
+    image.paste((255, 0, 0), (750, 0, 1000, 250))  # Top-right quarter
+    ladder = GroundingLadder(query, rungs=("strict", "small"))
+    coords, attempts = ladder.ground("logo", image, 2000, 1000)
+    assert [a.rung for a in attempts] == ["first", "strict", "small"]
+    crop = seen[2]
+    assert crop.size == (500, 250) and crop.getpixel((499, 0)) == (255, 0, 0)  # Right half, top half
+    # Centre of the crop (500, 500 in its own units) is (750, 250) in the full image
+    assert coords == (1500, 250)
+
+
+def test_agent_grounding_deadline_covers_the_scheduler_wait(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    agent = nexus_agent.NeuralAgent(shm_backend=FileBackend(str(tmp_path / "shm")))
+    requests = pytest.importorskip("requests")
+    timeouts = []
+
+    def post(*args, **kwargs):
+        timeouts.append(kwargs["timeout"])
+        raise requests.ConnectionError("down")
+
+    monkeypatch.setattr(requests, "post", post)
+    submit = agent.vlm_scheduler.submit
+
+    def slow_submit(model, fn, *args, **kwargs):
+        time.sleep(0.3)  # Queued behind another request
+        return submit(model, fn, *args, **kwargs)
+
+    monkeypatch.setattr(agent.vlm_scheduler, "submit", slow_submit)
+    agent.query_grounding("p", Image.new("RGB", (8, 8)), None, 1.0, lambda text: False)
+    assert len(timeouts) == 1 and timeouts[0] <= 0.7
+    agent.vlm_scheduler.shutdown()
+
+
+def test_agent_streams_and_cuts_prose_short(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("NEURAL_LOG_FILE", str(tmp_path / "agent.jsonl"))
+    monkeypatch.setenv("NEURAL_LOG_CONSOLE", "0")
+    agent = nexus_agent.NeuralAgent(shm_backend=FileBackend(str(tmp_path / "shm")))
+    frame = {"width": 200, "height": 100, "timestamp": 1, "data": bytes(200 * 100 * 4)}
+    prose = "I am sorry, but I cannot find anything like that on this screen " * 20
+    with StubVlmServer() as stub:
+        agent.ollama_url = stub.url
+        replies = iter([prose, "[400, 100, 600, 300]"])
+        stub.reply = lambda prompt: next(replies)
+        assert agent.ground_target("search box", frame) == (40, 50)
+    assert agent.m_vlm_early_stops.value == 2  # Prose abandoned, then stopped right after the box
+    assert agent.metrics.get("grounding_fallbacks_total").value == 1
+    agent.vlm_scheduler.shutdown()
+    agent.log.close()
+    events = [json.loads(line) for line in (tmp_path / "agent.jsonl").read_text().splitlines()]
+    assert [(e["rung"], e["verdict"]) for e in events if e["event"] == "ground_attempt"] == [
+        ("first", "prose"), ("strict", "ok")]
+    assert [(e["x"], e["y"]) for e in events if e["event"] == "ground_ok"] == [(40, 50)]
+    assert capsys.readouterr().out == ""  # NEURAL_LOG_CONSOLE=0 silences all of it
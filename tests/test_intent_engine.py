@@ -0,0 +1,49 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from intent_engine import AGENT, NAVIGATE, NONE, SEARCH, IntentEngine, PatternMatcher
+
+
+def test_matcher_whole_words_and_leftmost_longest():
+    m = PatternMatcher(["go to", "go to the", "x"])
+    assert m.leftmost_longest("go to the x files") == [(0, 9), (10, 11)]
+    assert m.find_all("xylophone") == []  # whole words only
+    corrections = {"you tube": "youtube", "show me": "go to"}
+    assert PatternMatcher(corrections).replace("show me you tube please", corrections) == "go to youtube please"
+    assert sorted(PatternMatcher(["he", "she", "hers"], whole_words=False).find_all("ushers")) == [(1, 4), (2, 4), (2, 6)]
+
+
+@pytest.mark.parametrize("text, kind, out, rule", [
+    ("Go to Twitter.", NAVIGATE, "x.com", "alias"),
+    ("show me github", NAVIGATE, "github.com", "alias"),
+    ("go to wikipedia.org", NAVIGATE, "wikipedia.org", "domain"),
+    ("go to the bbc", NAVIGATE, "bbc.com", "guess_tld"),
+    ("go to cheap flights to rome", SEARCH, "cheap flights to rome", "search"),
+    ("play something on you tube", NAVIGATE, "youtube.com", "mention"),
+    ("click the search button", AGENT, "click the search button", "agent"),
+    ("weather tomorrow", SEARCH, "weather tomorrow", "search"),
+    ("", NONE, "", None),
+])
+def test_routing(text, kind, out, rule):
+    intent = IntentEngine().route(text)
+    assert (intent.kind, intent.text, intent.rule) == (kind, out, rule)
+
+
+def test_config_aliases_and_actions(tmp_path):
+    action_pb2 = pytest.importorskip("action_pb2", reason="run `make protos` first")
+    path = tmp_path / "intents.json"
+    path.write_text(json.dumps({"aliases": {"Hacker News": "news.ycombinator.com"}, "verbs": ["open tab"]}))
+    engine = IntentEngine.from_config(str(path))
+
+    intent = engine.route("go to hacker news")
+    assert intent.kind == NAVIGATE and intent.confidence > 0.9
+    assert intent.action.navigate.url == "news.ycombinator.com"
+    assert engine.route("open tabs please").kind == AGENT
+    search = engine.route("best pizza")
+    assert search.action.input.text == "best pizza" and search.action.input.submit
+    assert isinstance(search.action, action_pb2.Action)
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+pytest.importorskip("action_pb2", reason="run `make protos` first")
+pytest.importorskip("requests")
+
+from latency_benchmark import run_benchmark, stage_stats
+from stub_vlm_server import StubVlmServer
+
+
+def test_stub_vlm_routes_prompts():
+    import requests
+
+    with StubVlmServer(bbox=(100, 200, 300, 400)) as stub:
+        ground = requests.post(stub.url, json={"prompt": "Point to 'x'. Return bounding box"}).json()
+        plan = requests.post(stub.url, json={"prompt": "Convert the command into browser steps."}).json()
+        assert ground["response"] == "[100, 200, 300, 400]"
+        assert plan["response"].startswith("NAVIGATE")
+        assert stub.requests == 2
+
+
+def test_stage_stats_empty_and_filled():
+    assert stage_stats([])["count"] == 0
+    stats = stage_stats([0.1, 0.2, 0.3, 0.4])
+    assert stats["p50"] == pytest.approx(0.25)
+    assert stats["throughput"] == pytest.approx(4 / 1.0)
+
+
+def test_benchmark_reports_every_stage(tmp_path):
+    results = run_benchmark(runs=2, ui_latency_ms=5, move_duration=0.0, shm_dir=str(tmp_path))
+    json.dumps(results)  # Must stay serialisable like benchmark_results.json
+
+    click = results["Grounded Click"]["neural"]
+    assert click["success_rate"] == 100.0
+    assert {"avg", "min", "max", "p50", "p95", "p99", "throughput"} <= set(click)
+    assert set(click["stages"]) == {"frame_acquire", "preprocess", "grounding", "injection", "verification"}
+    assert click["stages"]["grounding"]["count"] == 2
+
+    plan = results["Three-Step Plan"]["neural"]
+    assert plan["success_rate"] == 100.0
+    assert plan["stages"]["planning"]["count"] == 2
+    assert plan["stages"]["injection"]["count"] == 6
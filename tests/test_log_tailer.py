@@ -0,0 +1,82 @@
+import http.client
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../tools"))
+
+from build_dashboard import make_server
+from log_tailer import LogTailer
+
+
+def test_incremental_reads_partial_lines_and_restarts(tmp_path):
+    log = tmp_path / "build.log"
+    log.write_bytes(b"ninja: Entering directory\n[1/10] CXX a.o\n[2/10] CX")
+    seen = []
+    tailer = LogTailer(str(log), tail_lines=3, on_line=seen.append)
+    assert tailer.poll()
+    state = tailer.state()
+    assert (state["status"], state["current"], state["total"], state["percentage"]) == ("RUNNING", 1, 10, 10.0)
+    assert not tailer.poll()  # Nothing appended: no read at all
+    read = tailer.bytes_read
+
+    with open(log, "ab") as f:
+        f.write(b"X b.o\nFAILED: obj/c.o <bad>\n")
+    assert tailer.poll()
+    assert tailer.bytes_read - read == len(b"X b.o\nFAILED: obj/c.o <bad>\n")
+    state = tailer.state()
+    assert seen[-2:] == ["[2/10] CXX b.o", "FAILED: obj/c.o <bad>"]
+    assert state["status"] == "FAILED" and state["failures"] == ["FAILED: obj/c.o <bad>"]
+    assert state["logs"][-1] == '<div class="log-line error">FAILED: obj/c.o &lt;bad&gt;</div>'
+    assert len(state["logs"]) == 3
+
+    log.write_bytes(b"[1/5] CXX d.o\n")  # New build truncates the log
+    assert tailer.poll()
+    state = tailer.state()
+    assert (state["current"], state["total"], state["failures"]) == (1, 5, [])
+
+    with open(log, "ab") as f:
+        f.write(b"Build Succeeded\n")
+    tailer.poll()
+    assert tailer.state()["percentage"] == 100 and tailer.state()["current"] == 5
+
+
+def test_initial_bytes_skips_old_history(tmp_path):
+    log = tmp_path / "build.log"
+    log.write_bytes(b"".join(b"[%d/1000] CXX obj/file_%d.o\n" % (i, i) for i in range(1, 1001)))
+    tailer = LogTailer(str(log), initial_bytes=200)
+    tailer.poll()
+    assert tailer.bytes_read < 200 and tailer.state()["current"] == 1000
+
+
+def test_dashboard_pushes_changes_over_sse(tmp_path):
+    log = tmp_path / "build.log"
+    log.write_bytes(b"[1/4] CXX a.o\n")
+    server = make_server(str(log), port=0, host="127.0.0.1")
+    server.RequestHandlerClass.tailer.poll_interval = 0.02
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        conn.request("GET", "/status")
+        assert json.loads(conn.getresponse().read())["current"] == 1
+
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+        conn.request("GET", "/events")
+        response = conn.getresponse()
+        assert response.getheader("Content-type") == "text/event-stream"
+
+        def next_event():
+            line = response.fp.readline()
+            response.fp.readline()  # Blank line ends the event
+            return json.loads(line[len(b"data: "):])
+
+        assert next_event()["current"] == 1
+        with open(log, "ab") as f:
+            f.write(b"[3/4] CXX c.o\n")
+        assert next_event()["current"] == 3
+        conn.close()
+    finally:
+        server.shutdown()
+        server.RequestHandlerClass.tailer.stop()
+        server.server_close()
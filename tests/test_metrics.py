@@ -0,0 +1,68 @@
+import io
+import json
+import os
+import sys
+import urllib.request
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from metrics import JsonlExporter, MetricsRegistry, PrometheusExporter
+from structured_log import StructuredLogger
+
+
+def test_registry_and_prometheus_text():
+    reg = MetricsRegistry(labels={"agent": "tab-1"})
+    reg.counter("frames_total", "Frames").inc(3)
+    assert reg.counter("frames_total") is reg.get("frames_total")
+    reg.gauge("depth").set(7)
+    h = reg.histogram("latency_seconds", buckets=(0.01, 0.1))
+    for v in (0.005, 0.05, 0.5):
+        h.observe(v)
+    with pytest.raises(TypeError):
+        reg.gauge("frames_total")
+
+    text = reg.render_prometheus()
+    assert '# TYPE neural_frames_total counter' in text
+    assert 'neural_frames_total{agent="tab-1"} 3' in text
+    assert 'neural_latency_seconds_bucket{agent="tab-1",le="0.1"} 2' in text
+    assert 'neural_latency_seconds_bucket{agent="tab-1",le="+Inf"} 3' in text
+    assert h.quantile(0.5) == 0.1
+
+
+def test_exporters(tmp_path):
+    reg = MetricsRegistry()
+    reg.counter("reads_total").inc()
+
+    path = tmp_path / "metrics.jsonl"
+    exporter = JsonlExporter(reg, str(path), interval=60).start()
+    exporter.stop()
+    record = json.loads(path.read_text().splitlines()[-1])
+    assert record["metrics"]["neural_reads_total"] == 1
+
+    http = PrometheusExporter(reg, port=0, host="127.0.0.1").start()
+    try:
+        body = urllib.request.urlopen(http.url, timeout=5).read().decode()
+        assert "neural_reads_total 1" in body
+    finally:
+        http.stop()
+
+
+def test_logger_throttles_and_writes_jsonl(tmp_path):
+    now = [0.0]
+    out = io.StringIO()
+    path = tmp_path / "agent.jsonl"
+    log = StructuredLogger(stream=out, path=str(path), clock=lambda: now[0])
+    for _ in range(5):
+        log.throttled(1.0, "warning", "video_wait", "waiting")
+    now[0] = 2.0
+    log.throttled(1.0, "warning", "video_wait", "waiting")
+    log.debug("hidden")
+    log.status("not a tty")
+    log.close()
+
+    assert out.getvalue() == "waiting\nwaiting\n"
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r.get("suppressed") for r in records] == [None, 4]
+    assert records[0]["event"] == "video_wait" and records[0]["level"] == "warning"
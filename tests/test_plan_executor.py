@@ -0,0 +1,111 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+action_pb2 = pytest.importorskip("action_pb2", reason="run `make protos` first")
+
+from plan_executor import PlanExecutor, parse_plan
+
+W, H = 64, 36
+
+
+def make_frame(value, ts):
+    data = np.full((H, W, 4), value, dtype=np.uint8).tobytes()
+    return {'width': W, 'height': H, 'stride': W * 4, 'format': 1, 'timestamp': ts, 'data': data}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, dt):
+        self.now += dt
+
+
+class FakeScreen:
+    """Video memory whose content changes whenever the injector fires."""
+
+    def __init__(self):
+        self.value = 10
+        self.ts = 0
+
+    def read_video_frame(self):
+        self.ts += 1
+        return make_frame(self.value, self.ts)
+
+
+class FakeInjector:
+    def __init__(self, screen, change=True):
+        self.screen = screen
+        self.change = change
+        self.actions = []
+
+    def execute(self, action):
+        self.actions.append(action)
+        if self.change:
+            self.screen.value += 40
+        return True
+
+
+def test_parse_plan():
+    plan = """Sure! Here is the plan:
+1. NAVIGATE google.com
+2. CLICK "search box"
+3. TYPE weather in Paris and press enter
+- SCROLL down
+PRESS Enter
+That's it."""
+    steps = parse_plan(plan)
+    kinds = [s.action.WhichOneof('action') for s in steps]
+    assert kinds == ['navigate', 'interaction', 'input', 'interaction', 'interaction']
+    assert steps[0].action.navigate.url == "google.com"
+    assert steps[1].target == "search box"
+    assert steps[2].action.input.text == "weather in Paris"
+    assert steps[2].action.input.submit
+    assert steps[3].action.interaction.scroll_dy == 500
+    assert steps[4].action.interaction.key_code == "Enter"
+    assert [s.action.sequence_id for s in steps] == [1, 2, 3, 4, 5]
+
+
+def test_executor_prefetches_next_grounding():
+    screen = FakeScreen()
+    injector = FakeInjector(screen)
+    clock = FakeClock()
+    grounded = []
+
+    def ground(target, frame):
+        grounded.append((target, frame['data'][0]))
+        return (100, 200)
+
+    ex = PlanExecutor(screen, injector, ground, clock=clock, sleep=clock.sleep)
+    steps = parse_plan("NAVIGATE example.com\nCLICK login\nCLICK submit")
+    results = ex.execute(steps)
+    ex.close()
+
+    assert [r.ok for r in results] == [True, True, True]
+    assert all(r.verified for r in results)
+    # Both clicks were grounded while the previous step settled.
+    assert [r.prefetch_hit for r in results] == [False, True, True]
+    assert len(grounded) == 2
+    assert injector.actions[1].interaction.x == 100
+    assert injector.actions[1].interaction.y == 200
+
+
+def test_executor_stops_when_grounding_fails():
+    screen = FakeScreen()
+    injector = FakeInjector(screen, change=False)
+    clock = FakeClock()
+    ex = PlanExecutor(screen, injector, lambda target, frame: None, clock=clock, sleep=clock.sleep)
+    results = ex.execute(parse_plan("SCROLL down\nCLICK missing\nTYPE never"))
+    ex.close()
+
+    assert [r.ok for r in results] == [True, False]
+    assert not results[0].verified  # Frame never changed
+    assert len(injector.actions) == 1
@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from profiler import SamplingProfiler, Tracer, traced
+
+
+class Worker:
+    def __init__(self):
+        self.tracer = Tracer()
+
+    @traced()
+    def outer(self):
+        return self.inner() + 1
+
+    @traced("inner_stage", cat="http")
+    def inner(self):
+        time.sleep(0.03)
+        return 1
+
+
+def test_spans_are_free_when_off_and_nested_when_on(tmp_path):
+    w = Worker()
+    assert w.outer() == 2
+    assert len(w.tracer.events) == 0
+
+    w.tracer.start(sample_interval=0.002)
+    w.outer()
+    w.tracer.stop()
+
+    spans = {e["name"]: e for e in w.tracer.events if e["ph"] == "X"}
+    assert set(spans) == {"outer", "inner_stage"}
+    assert spans["inner_stage"]["cat"] == "http"
+    assert spans["outer"]["ts"] <= spans["inner_stage"]["ts"]
+    assert spans["outer"]["dur"] >= spans["inner_stage"]["dur"] >= 25_000
+
+    json_path, folded_path = w.tracer.save(str(tmp_path / "trace"))
+    trace = json.load(open(json_path))
+    assert trace["samples"] and all(s["sf"] in trace["stackFrames"] for s in trace["samples"])
+    folded = open(folded_path).read()
+    assert "[outer];[inner_stage]" in folded
+
+
+def test_agent_profile_command(tmp_path, monkeypatch):
+    import nexus_agent
+    from shm_backend import FileBackend
+
+    monkeypatch.chdir(tmp_path)
+    agent = nexus_agent.NeuralAgent(shm_backend=FileBackend(str(tmp_path / "shm")))
+    agent.dispatch_command("profile start 0")
+    agent.process_vision()
+    paths = agent.handle_profile_command(f"profile stop {tmp_path / 'agent'}")
+    assert not agent.tracer.enabled
+    events = json.load(open(paths[0]))["traceEvents"]
+    assert any(e["name"] == "process_vision" for e in events)
+
+
+def test_samples_are_bounded():
+    sampler = SamplingProfiler(Tracer(), max_samples=5)
+    done = threading.Event()
+    other = threading.Thread(target=done.wait, args=(5,))  # The sampler skips its own thread
+    other.start()
+    for _ in range(10):
+        sampler.sample_once()
+    done.set()
+    other.join()
+    assert len(sampler.samples) == 5 and sampler.sample_count == 10
+    assert sum(sampler.folded.values()) >= 10  # Folded counts keep the whole session
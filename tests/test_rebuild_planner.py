@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../tools"))
+
+from rebuild_planner import RebuildPlanner, changed_since, changed_vs_src, dry_run_edges, parse_deps, parse_query, sync
+
+QUERY = """../../components/viz/service/display/display.cc:
+  outputs:
+    obj/components/viz/service/service/display.o
+"""
+
+DEPS = """obj/components/viz/service/service/display.o: #deps 3, deps mtime 1 (VALID)
+    ../../components/viz/service/display/display.cc
+    ../../components/agent_interface/frame_header.h
+    ../../base/logging.h
+
+obj/content/browser/browser/browser_main_loop.o: #deps 2, deps mtime 1 (VALID)
+    ../../content/browser/browser_main_loop.cc
+    ../../components/agent_interface/frame_header.h
+
+"""
+
+
+class FakeNinja:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, args, cwd=None):
+        self.calls.append(args[3:])
+        if args[3:5] == ["-t", "query"]:
+            return QUERY if args[5].endswith("display.cc") else ""
+        if args[3:5] == ["-t", "deps"]:
+            return DEPS
+        if args[3] == "-n":
+            return "".join(f"[{i}/{len(args) - 4}] CXX x\n" for i in range(1, len(args) - 3))
+        raise AssertionError(args)
+
+
+def test_parsers():
+    assert parse_query(QUERY) == ["obj/components/viz/service/service/display.o"]
+    reverse = parse_deps(DEPS, keep=lambda dep: dep.startswith("../../components/"))
+    assert reverse["../../components/agent_interface/frame_header.h"] == [
+        "obj/components/viz/service/service/display.o", "obj/content/browser/browser/browser_main_loop.o"]
+    assert "../../base/logging.h" not in reverse
+    assert dry_run_edges("[1/3] CXX a\n[3/3] LINK chrome\n") == 3
+
+
+def test_plan_maps_sources_headers_and_caches_the_deps_index(tmp_path):
+    src = tmp_path / "src"
+    out = src / "out" / "AgentDebug"
+    out.mkdir(parents=True)
+    (out / ".ninja_deps").write_bytes(b"x")
+    (out / ".ninja_log").write_text("# ninja log v5\n0\t2500\t0\tobj/components/viz/service/service/display.o\taa\n")
+    ninja = FakeNinja()
+    planner = RebuildPlanner(str(src), os.path.join("out", "AgentDebug"), run=ninja)
+
+    changed = ["components/viz/service/display/display.cc", "components/agent_interface/frame_header.h",
+               "components/mcp/new_file.cc", "components/viz/service/BUILD.gn"]
+    plan = planner.estimate(planner.plan(changed, link="chrome"))
+    assert plan["targets"] == ["obj/components/viz/service/service/display.o",
+                               "obj/content/browser/browser/browser_main_loop.o", "chrome"]
+    assert plan["unmapped"] == ["components/mcp/new_file.cc"]
+    assert plan["gn_changes"] == ["components/viz/service/BUILD.gn"]
+    assert plan["edges"] == 3 and plan["cpu_s"] == 2.5
+
+    # Second plan: deps index comes from the cache, not another `ninja -t deps`
+    planner.plan(["components/agent_interface/frame_header.h"])
+    assert sum(1 for c in ninja.calls if c[:2] == ["-t", "deps"]) == 1
+    (out / ".ninja_deps").write_bytes(b"xy")  # Build updated the deps log
+    planner.plan(["components/agent_interface/frame_header.h"])
+    assert sum(1 for c in ninja.calls if c[:2] == ["-t", "deps"]) == 2
+
+
+def test_changed_vs_src_and_sync(tmp_path):
+    root, src = tmp_path / "overlay", tmp_path / "src"
+    for base in (root, src):
+        (base / "media").mkdir(parents=True)
+        (base / "media" / "same.cc").write_text("int a;")
+    (root / "media" / "diff.cc").write_text("int b;")
+    (src / "media" / "diff.cc").write_text("int c;")
+    (root / "media" / "new.cc").write_text("int d;")
+    files = ["media/diff.cc", "media/new.cc", "media/same.cc"]
+    changed = changed_vs_src(files, str(root), str(src))
+    assert changed == ["media/diff.cc", "media/new.cc"]
+    sync(changed, str(root), str(src))
+    assert changed_vs_src(files, str(root), str(src)) == []
+
+
+
+def test_changed_since_leaves_out_deleted_files(tmp_path):
+    git = lambda *args: subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+    (tmp_path / "media").mkdir()
+    (tmp_path / "media" / "kept.cc").write_text("int a;")
+    (tmp_path / "media" / "gone.cc").write_text("int b;")
+    git("init", "-q")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "base")
+    (tmp_path / "media" / "kept.cc").write_text("int c;")
+    (tmp_path / "media" / "gone.cc").unlink()
+    changed = changed_since("HEAD", root=str(tmp_path))
+    assert changed == ["media/kept.cc"]
+    src = tmp_path / "src"
+    sync(changed, str(tmp_path), str(src))  # Nothing to copy for the deleted file
+    assert (src / "media" / "kept.cc").read_text() == "int c;"
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from shm_backend import FileBackend, get_backend, open_segment
+from shm_layout import AUDIO_MAGIC_NUMBER
+from synthetic_producer import SyntheticProducer, pattern_frame, tone
+
+
+def test_file_backend_sizing_and_readonly(tmp_path):
+    backend = FileBackend(str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        open_segment("Local\\Missing", 64, create=False, backend=backend)
+
+    rw = open_segment("Local\\Seg", 64, backend=backend)
+    rw[0:4] = b"NCRM"
+    assert os.path.getsize(tmp_path / "Seg") == 64
+
+    ro = open_segment("Local\\Seg", 64, readonly=True, backend=backend)
+    assert ro[0:4] == b"NCRM"
+    with pytest.raises(TypeError):
+        ro[0:4] = b"XXXX"
+    with pytest.raises(ValueError):
+        open_segment("Local\\Seg", 128, readonly=True, backend=backend)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend("carrier-pigeon")
+
+
+def test_agent_reads_synthetic_producer(tmp_path):
+    import nexus_agent
+
+    backend = FileBackend(str(tmp_path))
+    producer = SyntheticProducer(backend)
+    producer.write_video_frame(pattern_frame(320, 180, 0.5), timestamp_us=1234)
+    producer.write_audio_chunk(tone(480, 48000, 0.0), 48000, timestamp_us=5678)
+
+    memory = nexus_agent.AgentSharedMemory(backend=backend)
+    frame = memory.read_video_frame()
+    assert (frame['width'], frame['height'], frame['timestamp']) == (320, 180, 1234)
+    assert frame['data'] == pattern_frame(320, 180, 0.5).tobytes()
+
+    header = memory.read_audio_header()
+    assert header['magic'] == AUDIO_MAGIC_NUMBER
+    assert (header['rate'], header['frames'], header['timestamp']) == (48000, 480, 5678)
+    samples = np.frombuffer(memory.read_audio_data(header['frames']), dtype=np.float32)
+    np.testing.assert_array_equal(samples, tone(480, 48000, 0.0))
+    producer.close()
@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from dom_index import DomIndex
+from snapshot_reducer import reduce_snapshot
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def load(name):
+    with open(os.path.join(ROOT, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def node(node_id, tag, parent, name="", **extra):
+    role = {"#text": "text", "a": "link"}.get(tag, tag)
+    return dict({"id": node_id, "role": role, "name": name, "attributes": {"tag": tag}, "parent": parent}, **extra)
+
+
+def test_flat_dump_drops_head_and_wrappers():
+    nodes = load("dom_dump_hackernews_front.json")
+    reduction = reduce_snapshot(nodes)
+    tags = {n["attributes"]["tag"] for n in reduction.nodes}
+    assert not tags & {"head", "meta", "link", "script", "title", "td", "tr", "span", "center"}
+    assert not any(n["attributes"]["tag"] == "#text" and not n["name"].strip() for n in reduction.nodes)
+    assert len(reduction.nodes) < len(nodes) * 0.6
+    assert len(json.dumps(reduction.nodes)) < len(json.dumps(nodes)) * 0.6
+
+    original = {n["id"]: n for n in nodes}
+    assert all(original[n["id"]] is n for n in reduction.nodes)  # Same ids, untouched nodes
+    assert "Hacker News" not in [n["name"] for n in reduction.nodes[:1]]  # <title> text went with the title
+    for wrapper_id, kept_id in reduction.aliases.items():
+        assert original[wrapper_id]["attributes"]["tag"] not in ("a", "input", "#text")
+        assert reduction.resolve(wrapper_id) == kept_id
+
+
+def test_reduced_form_still_indexes_the_same_fields():
+    nodes = load("dom_dump_selenium_form.json")
+    full, reduced = DomIndex(nodes), DomIndex(reduce_snapshot(nodes).nodes)
+    assert [(f.id, f.label) for f in reduced.fields] == [(f.id, f.label) for f in full.fields]
+
+
+def test_tree_collapses_single_child_chains():
+    nodes = [
+        node(1, "#document", None),
+        node(2, "html", 1),
+        node(3, "head", 2),
+        node(4, "title", 3),
+        node(5, "#text", 4, "Page title"),
+        node(6, "body", 2),
+        node(7, "div", 6, "outer"),
+        node(8, "div", 7, "inner"),
+        node(9, "a", 8),
+        node(10, "#text", 9, "Only link"),
+        node(11, "div", 6),
+        node(12, "#text", 11, "   "),
+        node(13, "form", 6),
+        node(14, "input", 13, "q"),
+        node(15, "button", 13),
+        node(16, "#text", 15, "Go"),
+    ]
+    reduction = reduce_snapshot(nodes)
+    assert [n["id"] for n in reduction.nodes] == [1, 6, 9, 10, 13, 14, 15, 16]  # body has two children: kept
+    parents = {n["id"]: n["parent"] for n in reduction.nodes}
+    assert parents[6] == 1 and parents[9] == 6  # Re-parented past the collapsed html and divs
+    assert reduction.resolve(7) == 9 and reduction.resolve(8) == 9
+    assert reduction.resolve(2) == 6
+    assert reduction.resolve(11) is None  # Only whitespace inside
+    assert reduction.resolve(5) is None
+
+
+def test_viewport_filter_and_layout_visibility():
+    nodes = [
+        node(1, "#document", None),
+        node(2, "a", 1, bounds=[0, 100, 200, 20]),
+        node(3, "#text", 2, "Visible", bounds=[0, 100, 200, 20]),
+        node(4, "a", 1, bounds=[0, 5000, 200, 20]),
+        node(5, "#text", 4, "Far below"),  # No bounds of its own: inherits its link's
+        node(6, "a", 1, bounds=[0, 900, 200, 20]),
+        node(7, "#text", 6, "Just below the fold", bounds=[0, 900, 200, 20]),
+        node(8, "div", 1, rendered=False),
+        node(9, "a", 8, rendered=False),
+        node(10, "#text", 9, "display:none", rendered=False),
+    ]
+    names = lambda r: [n["name"] for n in r.nodes if n["role"] == "text"]
+    assert names(reduce_snapshot(nodes)) == ["Visible", "Far below", "Just below the fold"]
+    viewport = (0, 0, 1280, 720)
+    assert names(reduce_snapshot(nodes, viewport=viewport, margin=300)) == ["Visible", "Just below the fold"]
+    assert names(reduce_snapshot(nodes, viewport=viewport, margin=0)) == ["Visible"]
@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+pytest.importorskip("action_pb2", reason="run `make protos` first")
+
+from action_injector import ActionInjector
+from intent_engine import IntentEngine
+from metrics import MetricsRegistry
+from speculative_nav import SpeculativeNavigator, partial_audio
+
+
+def _frames(seconds, rate=48000, chunk=480):
+    audio = (0.1 * np.sin(np.linspace(0, 2000, int(seconds * rate)))).astype(np.float32)
+    return [audio[i:i + chunk].tobytes() for i in range(0, len(audio), chunk)]
+
+
+def test_partial_preconnects_and_final_confirms():
+    engine = IntentEngine()
+    sent = []
+    injector = ActionInjector(text_writer=lambda t: None, preconnect_writer=lambda url: sent.append(url) or True)
+    reg = MetricsRegistry()
+    partials = iter(["go to", "go to you tube", "go to youtube"])
+    done = threading.Event()
+
+    def transcribe(audio):
+        assert audio.dtype == np.float32 and len(audio) > 0
+        text = next(partials)
+        done.set()
+        return text
+
+    clock = [0.0]
+    nav = SpeculativeNavigator(engine, transcribe, injector.execute, metrics=reg, clock=lambda: clock[0])
+    nav.reset()
+    assert not nav.maybe_transcribe(_frames(0.5), 48000)  # Too short to say anything
+    for t in (0.0, 1.0, 2.0):
+        clock[0] = t
+        done.clear()
+        assert nav.maybe_transcribe(_frames(1.0 + t), 48000)
+        assert done.wait(5)
+        nav._pending.result(5)
+    assert sent == ["youtube.com"]  # Once, on the first confident partial
+
+    assert nav.resolve(engine.route("go to youtube")) == "confirmed"
+    assert reg.get("speculative_preconnects_total").value == 1
+    assert reg.get("speculative_confirmed_total").value == 1
+    nav.close()
+
+
+def test_final_cancels_and_late_partials_are_ignored():
+    engine = IntentEngine()
+    sent = []
+    nav = SpeculativeNavigator(engine, lambda audio: "go to github", lambda a: sent.append(a.preconnect.url))
+    nav.on_partial("go to github")
+    assert nav.resolve(engine.route("go to github and click issues")) == "cancelled"
+    assert nav.speculated is None
+
+    gate = threading.Event()
+    slow = SpeculativeNavigator(engine, lambda audio: gate.wait(5) and "go to reddit",
+                                lambda a: sent.append(a.preconnect.url))
+    assert slow.maybe_transcribe(_frames(1.0), 48000)
+    assert slow.resolve(engine.route("weather")) is None  # Final arrived first
+    gate.set()
+    assert slow._pending.result(5) is None
+    assert sent == ["github.com"]
+    assert len(partial_audio(_frames(1.0), 48000)) == 16000
+
+
+def test_stop_skips_a_queued_partial_but_keeps_the_speculation():
+    engine = IntentEngine()
+    calls = []
+    nav = SpeculativeNavigator(engine, lambda audio: calls.append(audio) or "go to reddit", lambda a: True)
+    nav.on_partial("go to github")
+    gate = threading.Event()
+    busy = nav._pool.submit(gate.wait, 5)  # Worker busy: the next partial queues
+    assert nav.maybe_transcribe(_frames(1.0), 48000)
+    nav.stop()  # PTT released
+    gate.set()
+    busy.result(5)
+    assert nav._pending.cancelled() and calls == []
+    assert nav.resolve(engine.route("go to github")) == "confirmed"
+    nav.close()
+
+
+def test_p95_is_only_computed_for_a_submitted_pass():
+    calls = []
+    clock = [0.0]
+    nav = SpeculativeNavigator(IntentEngine(), lambda audio: "", lambda a: True, clock=lambda: clock[0])
+    p95 = lambda: calls.append(1) or 0.01
+    assert not nav.maybe_transcribe(_frames(0.5), 48000, p95=p95)  # Too short
+    assert nav.maybe_transcribe(_frames(1.0), 48000, p95=p95)
+    nav._pending.result(5)
+    clock[0] = 0.5
+    assert not nav.maybe_transcribe(_frames(1.5), 48000, p95=p95)  # Not due yet
+    assert calls == [1]
+    nav.close()
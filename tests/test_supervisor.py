@@ -0,0 +1,215 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from shm_backend import FileBackend
+from supervisor import FairScheduler, ModelGateway, Service, Supervisor, Worker, build_specs, read_loop_health
+from synthetic_producer import SyntheticProducer, pattern_frame
+
+SLEEPER = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+
+def test_fair_scheduler_round_robins_clients():
+    sched = FairScheduler(slots=1)
+    sched.acquire("holder")
+    order = []
+
+    def client(name):
+        sched.acquire(name)
+        order.append(name)
+        sched.release()
+
+    threads = []
+    for name in ("a", "a", "b"):
+        t = threading.Thread(target=client, args=(name,))
+        t.start()
+        threads.append(t)
+        while sched.waiting() < len(threads):
+            time.sleep(0.001)
+    sched.release()
+    for t in threads:
+        t.join(5)
+    assert order == ["a", "b", "a"]
+    assert sched.slots == 1
+
+
+def test_supervisor_restarts_stalled_and_dead_workers(tmp_path):
+    now = [0.0]
+    iterations = {}
+    specs = build_specs(["tab1", "tab2"], 9600, command=SLEEPER)
+    sup = Supervisor(specs, run_dir=str(tmp_path), stall_timeout=5, startup_grace=10, backoff=1,
+                     clock=lambda: now[0], probe=lambda port: (iterations.get(port), False, False))
+    sup.start()
+    try:
+        tab1, tab2 = sup.workers
+        assert os.path.isdir(tmp_path / "tab1")
+
+        iterations.update({9600: 10, 9601: 10})
+        sup.check()
+        assert [w.state for w in sup.workers] == ["healthy", "healthy"]
+
+        # tab1 keeps looping, tab2 freezes
+        now[0] = 6.0
+        iterations[9600] = 20
+        sup.check()
+        assert tab1.state == "healthy" and tab2.state == "backoff"
+
+        now[0] = 7.5
+        sup.check()
+        assert tab2.state == "starting" and tab2.restarts == 1
+
+        # Process death is noticed without waiting for the stall timeout
+        tab1.proc.kill()
+        tab1.proc.wait()
+        iterations[9600] = 30
+        sup.check()
+        assert tab1.state == "backoff"
+        assert {s["name"]: s["restarts"] for s in sup.status()} == {"tab1": 0, "tab2": 1}
+    finally:
+        sup.stop()
+
+
+def test_busy_worker_gets_the_longer_allowance(tmp_path):
+    now = [0.0]
+    health = {9600: (10, False, False)}
+    sup = Supervisor(build_specs(["tab1", "tab2"], 9600, command=SLEEPER)[:1], run_dir=str(tmp_path),
+                     stall_timeout=5, busy_timeout=60, clock=lambda: now[0], probe=lambda port: health[port])
+    sup.start()
+    try:
+        [w] = sup.workers
+        sup.check()
+        health[9600] = (10, True, False)  # e.g. loading Whisper on the loop thread
+        now[0] = 30.0
+        sup.check()
+        assert w.state == "healthy" and w.busy
+        now[0] = 61.0
+        sup.check()
+        assert w.state == "backoff"
+    finally:
+        sup.stop()
+
+
+def test_worker_waiting_for_its_browser_is_left_alone(tmp_path):
+    now = [0.0]
+    health = {9600: (None, False, False)}
+    sup = Supervisor(build_specs(["tab1"], 9600, command=SLEEPER), run_dir=str(tmp_path), stall_timeout=5,
+                     startup_grace=10, clock=lambda: now[0], probe=lambda port: health[port])
+    sup.start()
+    try:
+        [w] = sup.workers
+        sup.check()
+        assert w.state == "starting"
+        health[9600] = (0, False, True)  # Metrics up, browser not started yet
+        for now[0] in (5.0, 60.0, 600.0):
+            sup.check()
+            assert w.state == "waiting" and w.restarts == 0
+        health[9600] = (1, False, False)  # Attached, loop running
+        now[0] = 601.0
+        sup.check()
+        assert w.state == "healthy"
+        now[0] = 607.0
+        sup.check()
+        assert w.state == "backoff"  # Normal stall check from here on
+    finally:
+        sup.stop()
+
+
+def test_crashing_service_restarts_with_backoff(tmp_path):
+    service = Service("whisper", [sys.executable, "-c", "raise SystemExit(3)"], str(tmp_path), backoff=2)
+    service.start(0.0)
+    service.proc.wait()
+    service.check(1.0)
+    assert service.next_start == 3.0 and service.restarts == 0
+    service.check(2.0)
+    assert service.restarts == 0  # Still backing off
+    service.check(3.0)
+    assert service.restarts == 1
+    service.proc.wait()
+    service.check(4.0)
+    assert service.next_start == 8.0  # Doubled
+
+
+def test_lone_worker_uses_the_browsers_segments(tmp_path):
+    [solo] = build_specs(["agent0"], 9600)
+    pair = build_specs(["agent0", "agent1"], 9600)
+    env = Worker(solo, str(tmp_path)).environment(None)
+    assert solo.namespace == "" and "NEURAL_SHM_NAMESPACE" not in env
+    assert [s.namespace for s in pair] == ["agent0", "agent1"]
+    assert Worker(pair[1], str(tmp_path)).environment(None)["NEURAL_SHM_NAMESPACE"] == "agent1"
+
+
+def test_read_loop_health_parses_busy(tmp_path):
+    from metrics import MetricsRegistry, PrometheusExporter
+
+    registry = MetricsRegistry(labels={"agent": "tab1"})
+    registry.counter("loop_iterations_total").inc(7)
+    busy = registry.gauge("loop_busy")
+    exporter = PrometheusExporter(registry, port=0, host="127.0.0.1").start()
+    try:
+        port = exporter.httpd.server_address[1]
+        assert read_loop_health(port) == (7, False, False)
+        busy.inc()
+        assert read_loop_health(port) == (7, True, False)
+        registry.gauge("waiting_for_browser").set(1)
+        assert read_loop_health(port) == (7, True, True)
+    finally:
+        exporter.stop()
+
+
+def test_namespaced_segments_are_isolated(tmp_path):
+    import nexus_agent
+
+    backend = FileBackend(str(tmp_path))
+    producer = SyntheticProducer(backend, namespace="tab1")
+    producer.write_video_frame(pattern_frame(64, 36, 0.0), timestamp_us=42)
+
+    mine = nexus_agent.AgentSharedMemory(backend=backend, namespace="tab1")
+    assert mine.read_video_frame()['timestamp'] == 42
+    other = nexus_agent.AgentSharedMemory(backend=backend, namespace="tab2")
+    assert other.read_video_frame() is None
+    assert os.path.exists(tmp_path / "NeuralChromium_Video_tab1")
+    producer.close()
+
+
+def test_gateway_forwards_and_counts_per_agent():
+    requests = pytest.importorskip("requests")
+    from stub_vlm_server import StubVlmServer
+
+    with StubVlmServer() as stub:
+        upstream = stub.url.rsplit("/api/", 1)[0]
+        gateway = ModelGateway(upstream).start()
+        try:
+            for agent in ("tab1", "tab2", "tab1"):
+                r = requests.post(gateway.base_url + "/api/generate", json={"prompt": "hi"},
+                                  headers={"X-Neural-Agent": agent}, timeout=5)
+                assert r.json()["response"] == stub.caption
+        finally:
+            gateway.stop()
+    assert gateway.requests == {"tab1": 2, "tab2": 1}
+
+
+def test_gateway_streams_and_stops_upstream_when_the_worker_hangs_up():
+    requests = pytest.importorskip("requests")
+    from stub_vlm_server import StubVlmServer
+
+    caption = " ".join(f"word{i}" for i in range(100))
+    with StubVlmServer(caption=caption, token_ms=20) as stub:
+        gateway = ModelGateway(stub.url.rsplit("/api/", 1)[0]).start()
+        try:
+            r = requests.post(gateway.base_url + "/api/generate", json={"prompt": "hi", "stream": True},
+                              stream=True, timeout=5)
+            first = next(line for line in r.iter_lines() if line)
+            assert b"word0" in first
+            r.close()  # ~2s of generation left
+            deadline = time.monotonic() + 1.0
+            while (stub.aborted == 0 or gateway.scheduler.slots != 1) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert stub.aborted == 1 and gateway.aborted == 1
+            assert gateway.scheduler.slots == 1  # Slot freed without waiting for the whole reply
+        finally:
+            gateway.stop()
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from text_channel import (KIND_OMNIBOX_TEXT, QueueOverflow, TEXT_QUEUE_HEADER_SIZE,
+                          TextChannelReader, TextChannelWriter, init_queue)
+
+
+def make_queue(capacity=256):
+    buf = bytearray(TEXT_QUEUE_HEADER_SIZE + capacity)
+    init_queue(buf, capacity)
+    return buf, TextChannelWriter(buf), TextChannelReader(buf)
+
+
+def test_burst_is_not_lost():
+    buf, writer, reader = make_queue()
+    writer.send("Plan: search weather")
+    writer.send("google.com")
+    assert reader.poll() == [(KIND_OMNIBOX_TEXT, "Plan: search weather"), (KIND_OMNIBOX_TEXT, "google.com")]
+    assert reader.poll() == []
+    assert writer.pending_bytes() == 0
+
+
+def test_wraparound_keeps_order():
+    buf, writer, reader = make_queue(capacity=128)
+    received = []
+    for i in range(50):
+        writer.send(f"message {i} " + "x" * (i % 7))
+        received += [text for _, text in reader.poll()]
+    assert received == [f"message {i} " + "x" * (i % 7) for i in range(50)]
+
+
+def test_overflow_is_signalled():
+    buf, writer, reader = make_queue(capacity=128)
+    with pytest.raises(QueueOverflow):
+        writer.send("y" * 100)  # Larger than half the ring
+    writer.send("a" * 40)
+    writer.send("b" * 40)
+    with pytest.raises(QueueOverflow):
+        writer.send("c" * 40)  # Reader hasn't acked yet
+    assert writer.overflow_count == 2
+    assert [t for _, t in reader.poll()] == ["a" * 40, "b" * 40]
+    writer.send("c" * 40)  # Space is back after the ack
+    assert [t for _, t in reader.poll()] == ["c" * 40]
+
+
+def test_doorbell_rings_per_message():
+    buf = bytearray(TEXT_QUEUE_HEADER_SIZE + 256)
+    rings = []
+    writer = TextChannelWriter(buf, doorbell=lambda: rings.append(1))  # Initialises empty segment
+    writer.send("hello")
+    assert rings == [1]
+    assert TextChannelReader(buf).poll() == [(KIND_OMNIBOX_TEXT, "hello")]
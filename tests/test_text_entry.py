@@ -0,0 +1,176 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+action_pb2 = pytest.importorskip("action_pb2", reason="run `make protos` first")
+
+from action_injector import ActionInjector, BULK_CHUNK, KEY_CHUNK
+from dom_index import DomIndex, css_string
+from metrics import MetricsRegistry
+from text_channel import KIND_INSERT_TEXT, TEXT_QUEUE_HEADER_SIZE, TextChannelReader, TextChannelWriter, init_queue, insert_text_payload
+from text_entry import TextEntry
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def load(name):
+    with open(os.path.join(ROOT, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeGui:
+    def __init__(self):
+        self.calls = []
+
+    def write(self, text):
+        self.calls.append(("write", text))
+
+    def press(self, key):
+        self.calls.append(("press", key))
+
+
+def make_entry(insert_ok=True):
+    inserts, gui = [], FakeGui()
+
+    def insert_writer(selector, text, submit, index):
+        inserts.append((selector, text, submit, index))
+        return insert_ok
+
+    injector = ActionInjector(text_writer=lambda t: True, gui=gui, insert_writer=insert_writer, sleep=lambda s: None)
+    return TextEntry(injector.execute, metrics=MetricsRegistry()), inserts, gui
+
+
+def test_index_finds_selenium_form_fields_by_label_and_name():
+    index = DomIndex(load("dom_dump_selenium_form.json"))
+    assert index.find("Text input").name == "my-text"
+    assert index.find("password").name == "my-password"
+    assert index.find("my-textarea").role == "textarea"
+    assert index.find("file input").bulk is False
+    assert index.find("nonexistent widget") is None
+    assert index.find(26).name == "my-text"
+
+
+def test_duplicate_names_get_a_selector_index():
+    index = DomIndex(load("dom_dump_hackernews_login.json"))
+    accts = [f for f in index.fields if f.name == "acct"]
+    assert [f.selector_index for f in accts] == [0, 1]
+    assert index.find("username") is accts[0]  # Login form comes first
+    assert 'input[name="acct"]' in accts[0].selector
+
+
+def test_unnamed_field_index_counts_every_element_of_its_tag():
+    nodes = [
+        {"id": 1, "role": "textbox", "name": "user", "attributes": {"tag": "input"}},
+        {"id": 2, "role": "button", "name": "", "attributes": {"tag": "input"}},
+        {"id": 3, "role": "text", "name": "Comment", "attributes": {"tag": "#text"}},
+        {"id": 4, "role": "textbox", "name": "", "attributes": {"tag": "input"}},
+        {"id": 5, "role": "textbox", "name": "user", "attributes": {"tag": "input"}},
+    ]
+    index = DomIndex(nodes)
+    comment = index.find("comment")
+    assert comment.id == 4
+    assert (comment.selector, comment.selector_index) == ("input", 2)  # querySelectorAll("input")[2]
+    assert index.by_id[5].selector_index == 1  # Second input named "user"
+
+
+def test_placeholder_names_still_resolve():
+    field = DomIndex(load("dom_dump_todomvc.json")).find("what needs to be done")
+    assert field.bulk
+    assert 'input[placeholder="What needs to be done?"]' in field.selector
+
+
+def test_css_string_escapes_quotes():
+    assert css_string('a"b\\c') == '"a\\"b\\\\c"'
+
+
+def test_whole_string_goes_out_as_one_insert():
+    entry, inserts, gui = make_entry()
+    entry.set_snapshot(json.dumps(load("dom_dump_hackernews_login.json")))
+    text = "x" * 500
+    assert entry.fill({"username": "pg", "password": text}, submit=True) == {"username": True, "password": True}
+    assert [(t, s, i) for _, t, s, i in inserts] == [("pg", False, 0), (text, True, 0)]
+    assert gui.calls == []
+
+
+def test_resolution_is_cached_until_the_next_snapshot():
+    entry, _, _ = make_entry()
+    entry.set_snapshot(load("dom_dump_selenium_form.json"))
+    calls = []
+    find = entry.index.find
+    entry.index.find = lambda q: calls.append(q) or find(q)
+    entry.type_into("password", "a")
+    entry.type_into("password", "b")
+    assert calls == ["password"]
+    entry.set_snapshot(load("dom_dump_selenium_form.json"))
+    assert entry.resolve("password").name == "my-password"
+
+
+def test_fields_that_reject_bulk_input_use_chunked_key_events():
+    entry, inserts, gui = make_entry()
+    entry.set_snapshot(load("dom_dump_selenium_form.json"))
+    text = "y" * (KEY_CHUNK * 2 + 3)
+    assert entry.type_into("Example range", text)
+    assert inserts[0][1:3] == ("", False)  # Focus only
+    assert gui.calls == [("write", text[:KEY_CHUNK]), ("write", text[KEY_CHUNK:2 * KEY_CHUNK]),
+                         ("write", text[2 * KEY_CHUNK:])]
+
+
+def test_unqueued_insert_fails_without_typing():
+    entry, inserts, gui = make_entry(insert_ok=False)
+    entry.set_snapshot(load("dom_dump_todomvc.json"))
+    assert not entry.type_into("what needs to be done", "milk", submit=True)
+    assert len(inserts) == 1 and gui.calls == []  # Keystrokes would land wherever focus is
+
+
+def test_selectorless_input_is_typed_into_the_focused_window():
+    inserts, gui = [], FakeGui()
+    injector = ActionInjector(text_writer=lambda t: True, gui=gui, insert_writer=lambda *a: inserts.append(a) or True)
+    action = action_pb2.Action()
+    action.input.text = "milk"
+    action.input.submit = True
+    assert injector.execute(action)
+    assert inserts == []  # Omnibox, iframe or native dialog: not the page's activeElement
+    assert gui.calls == [("write", "milk"), ("press", "enter")]
+
+
+def test_dropped_navigation_fails_the_action():
+    sent = []
+    injector = ActionInjector(text_writer=lambda t: sent.append(t) and False, gui=FakeGui())  # Text ring full
+    action = action_pb2.Action()
+    action.navigate.url = "example.com"
+    assert not injector.execute(action)
+    assert sent == ["example.com"]
+
+
+def test_long_text_is_split_into_bulk_chunks():
+    sent = []
+    injector = ActionInjector(text_writer=lambda t: True, gui=FakeGui(),
+                              insert_writer=lambda sel, text, submit, index: sent.append((text, submit)) or True)
+    action = action_pb2.Action()
+    action.input.text = "z" * (BULK_CHUNK + 10)
+    action.input.submit = True
+    action.input.selector = 'textarea[name="body"]'
+    assert injector.execute(action)
+    assert sent == [("z" * BULK_CHUNK, False), ("z" * 10, True)]
+
+
+def test_unresolved_field_is_counted():
+    entry, inserts, _ = make_entry()
+    entry.set_snapshot("[]")
+    assert not entry.type_into("email", "a@b.c")
+    assert inserts == []
+    assert entry.m_unresolved.value == 1
+
+
+def test_insert_payload_round_trips_through_the_queue():
+    buf = bytearray(TEXT_QUEUE_HEADER_SIZE + 1024)
+    init_queue(buf, 1024)
+    TextChannelWriter(buf).send(insert_text_payload('input[name="q"]', 'say "hi"', submit=True, index=1),
+                                kind=KIND_INSERT_TEXT)
+    [(kind, payload)] = TextChannelReader(buf).poll()
+    assert kind == KIND_INSERT_TEXT
+    assert json.loads(payload) == {"selector": 'input[name="q"]', "index": 1, "text": 'say "hi"', "submit": True}
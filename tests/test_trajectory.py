@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from trajectory import TrajectoryReader, TrajectoryRecorder
+
+
+def _frames(n, h=36, w=64):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (h, w, 4), dtype=np.uint8)
+    out = []
+    for i in range(n):
+        f = base.copy()
+        f[i % h, :, :3] = i  # One changing row per frame
+        out.append(f)
+    return out
+
+
+def _record(path, frames, close=True, background=False):
+    rec = TrajectoryRecorder(str(path), keyframe_interval=3, page_keyframe_interval=2, background=background)
+    for i, f in enumerate(frames):
+        t = 1000 * i
+        if i % 4 == 0:
+            rec.mark_step(t, f"step {i // 4}")
+        rec.add_frame(t, f)
+        rec.add_page_state(t, ('{"url": "https://example.com", "nodes": [%s]}' % ",".join(["1"] * i)).encode())
+        rec.add_audio(t, np.full(160, 0.25, dtype=np.float32), 16000)
+        rec.add_action(t, b"\x1a\x05" + bytes([i]) * 5)
+    if close:
+        rec.close()
+    else:
+        rec.f.flush()
+    return rec
+
+
+def test_roundtrip_seek_and_compression(tmp_path):
+    frames = _frames(10)
+    rec = _record(tmp_path / "s.ntraj", frames, background=True)
+    assert rec.counts["frame_key"] == 3 and rec.counts["frame_delta"] == 7
+    assert rec.bytes["frame_delta"] < rec.bytes["frame_key"] / 3  # Deltas are mostly zeros
+
+    with TrajectoryReader(str(tmp_path / "s.ntraj")) as reader:
+        for i in (0, 2, 5, 9):
+            assert np.array_equal(reader.frame_at(1000 * i + 500), frames[i])
+        assert reader.frame_at(-1) is None
+        t_us, label, frame, page = reader.state_at_step(2)
+        assert (t_us, label) == (8000, "step 2")
+        assert np.array_equal(frame, frames[8])
+        assert page == b'{"url": "https://example.com", "nodes": [1,1,1,1,1,1,1,1]}'
+        actions = [r.payload for r in reader.records(kinds=(6,))]
+        assert len(actions) == 10 and actions[3].endswith(b"\x03" * 5)
+        summary = reader.summary()
+        assert summary["steps"] == 3 and summary["records"]["audio"] == 10
+
+
+def test_unclosed_file_is_still_seekable(tmp_path):
+    frames = _frames(6)
+    _record(tmp_path / "crash.ntraj", frames, close=False)
+    # Simulate a torn last record
+    shutil.copy(tmp_path / "crash.ntraj", tmp_path / "torn.ntraj")
+    with open(tmp_path / "torn.ntraj", "r+b") as f:
+        f.truncate(os.path.getsize(tmp_path / "torn.ntraj") - 3)
+
+    with TrajectoryReader(str(tmp_path / "torn.ntraj")) as reader:
+        assert [label for _, label in reader.steps] == ["step 0", "step 1"]
+        assert np.array_equal(reader.frame_at(5000), frames[5])
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "x.ntraj"
+    path.write_bytes(b"not a trajectory at all")
+    with pytest.raises(ValueError):
+        TrajectoryReader(str(path))
@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from transcription_server import SAMPLE_RATE, TranscriptionClient, TranscriptionServer, bucket_for
+
+
+class FakeBackend:
+    """Reports each utterance's unpadded length; records batch shapes."""
+
+    def __init__(self, gate=None, variable_length=True):
+        self.variable_length = variable_length
+        self.batches = []
+        self.gate = gate
+        self.entered = threading.Event()
+
+    def transcribe_batch(self, audios, prompt=None):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append([len(a) for a in audios])
+        if prompt == "boom":
+            raise RuntimeError("model exploded")
+        return [f"{int(np.count_nonzero(a))} samples" for a in audios]
+
+
+def utterance(seconds):
+    return np.ones(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_bucket_for():
+    assert bucket_for(SAMPLE_RATE) == 2 * SAMPLE_RATE
+    assert bucket_for(3 * SAMPLE_RATE) == 4 * SAMPLE_RATE
+    assert bucket_for(60 * SAMPLE_RATE) == 30 * SAMPLE_RATE
+
+
+def test_batches_concurrent_agents_by_length_bucket():
+    gate = threading.Event()
+    backend = FakeBackend(gate)
+    server = TranscriptionServer(backend, "tcp:127.0.0.1:0", max_batch=8, max_wait_ms=100).start()
+    clients = [TranscriptionClient(server.address) for _ in range(3)]
+    try:
+        # Hold the model busy on a first request so the rest pile up into one batch.
+        first = clients[0].submit(utterance(1.0))
+        assert backend.entered.wait(5)
+        futures = [c.submit(utterance(s)) for c, s in zip(clients, (1.0, 1.5, 5.0))]
+        while server.requests.qsize() < 3:
+            time.sleep(0.001)
+        gate.set()
+        assert first.result(5) == f"{SAMPLE_RATE} samples"
+        assert [f.result(5) for f in futures] == [f"{SAMPLE_RATE} samples", f"{int(1.5 * SAMPLE_RATE)} samples",
+                                                  f"{5 * SAMPLE_RATE} samples"]
+    finally:
+        for c in clients:
+            c.close()
+        server.stop()
+
+    assert backend.batches[0] == [2 * SAMPLE_RATE]
+    # Two short utterances share the 2s bucket, the 5s one gets its own 8s bucket
+    assert sorted(backend.batches[1:]) == [[2 * SAMPLE_RATE, 2 * SAMPLE_RATE], [8 * SAMPLE_RATE]]
+
+
+@pytest.mark.skipif(not hasattr(__import__("socket"), "AF_UNIX"), reason="no Unix sockets")
+def test_unix_socket_and_errors():
+    path = os.path.join(tempfile.mkdtemp(), "w.sock")
+    server = TranscriptionServer(FakeBackend(), "unix:" + path, max_wait_ms=1).start()
+    client = TranscriptionClient("unix:" + path)
+    try:
+        assert client.transcribe(utterance(0.5), timeout=5) == f"{SAMPLE_RATE // 2} samples"
+        with pytest.raises(RuntimeError, match="exploded"):
+            client.transcribe(utterance(0.5), prompt="boom", timeout=5)
+    finally:
+        client.close()
+        server.stop()
+    assert not os.path.exists(path)
+
+
+def test_fixed_window_backend_batches_by_prompt_only():
+    gate = threading.Event()
+    backend = FakeBackend(gate, variable_length=False)  # Pads everything to 30s itself (like Whisper)
+    server = TranscriptionServer(backend, "tcp:127.0.0.1:0", max_batch=8, max_wait_ms=100).start()
+    client = TranscriptionClient(server.address)
+    try:
+        first = client.submit(utterance(1.0))
+        assert backend.entered.wait(5)
+        futures = [client.submit(utterance(s)) for s in (1.0, 5.0, 12.0)]
+        while server.requests.qsize() < 3:
+            time.sleep(0.001)
+        gate.set()
+        first.result(5)
+        assert [f.result(5) for f in futures] == [f"{s * SAMPLE_RATE} samples" for s in (1, 5, 12)]
+    finally:
+        client.close()
+        server.stop()
+    # One decode for all three, each clip as sent (no bucket padding)
+    assert backend.batches[1:] == [[SAMPLE_RATE, 5 * SAMPLE_RATE, 12 * SAMPLE_RATE]]
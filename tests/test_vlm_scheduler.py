@@ -0,0 +1,97 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+
+from metrics import MetricsRegistry
+from vlm_scheduler import AMBIENT, INTERACTIVE, PLANNING, DeadlineExceeded, Superseded, VlmScheduler
+
+
+def _blocker(sched, model="moondream"):
+    """Occupies the model's only slot until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        return "blocker"
+    future = sched.submit(model, work, INTERACTIVE)
+    assert started.wait(5)
+    return future, release
+
+
+def test_priority_order_with_one_slot():
+    sched = VlmScheduler()
+    blocker, release = _blocker(sched)
+    order = []
+    futures = [sched.submit("moondream", lambda p=p: order.append(p), p) for p in (AMBIENT, PLANNING, INTERACTIVE)]
+    assert sched.pending() == 3
+    release.set()
+    for f in futures + [blocker]:
+        f.result(5)
+    assert order == [INTERACTIVE, PLANNING, AMBIENT]
+    sched.shutdown()
+
+
+def test_deadline_drop_and_coalescing():
+    reg = MetricsRegistry()
+    sched = VlmScheduler(metrics=reg)
+    blocker, release = _blocker(sched)
+
+    expired = sched.submit("moondream", lambda: "late", AMBIENT, timeout=0.05)
+    with pytest.raises(DeadlineExceeded):
+        expired.result(5)  # Reported while the slot is still busy
+
+    first = sched.submit("moondream", lambda: "old caption", AMBIENT, coalesce_key="ambient")
+    second = sched.submit("moondream", lambda: "new caption", AMBIENT, coalesce_key="ambient")
+    with pytest.raises(Superseded):
+        first.result(5)
+    release.set()
+    assert second.result(5) == "new caption"
+    assert blocker.result(5) == "blocker"
+    assert reg.get("vlm_dropped_total").value == 1
+    assert reg.get("vlm_coalesced_total").value == 1
+    sched.shutdown()
+
+
+def test_models_have_independent_caps_and_class_limits():
+    sched = VlmScheduler(max_in_flight={"moondream": 2}, class_limits={AMBIENT: 1})
+    gate = threading.Event()
+    running = []
+    lock = threading.Lock()
+
+    def work(tag):
+        with lock:
+            running.append(tag)
+        gate.wait(5)
+        return tag
+    a1 = sched.submit("moondream", lambda: work("a1"), AMBIENT)
+    a2 = sched.submit("moondream", lambda: work("a2"), AMBIENT)
+    plan = sched.submit("llama3", lambda: work("plan"), PLANNING)
+    for _ in range(200):
+        if len(running) == 2:
+            break
+        threading.Event().wait(0.01)
+    # One ambient (class limit) + the LLM call on its own model; a2 waits
+    assert sorted(running) == ["a1", "plan"]
+    assert sched.pending("moondream") == 1 and sched.in_flight() == 2
+    gate.set()
+    assert [f.result(5) for f in (a1, a2, plan)] == ["a1", "a2", "plan"]
+    sched.shutdown()
+    with pytest.raises(RuntimeError):
+        sched.submit("moondream", lambda: None)
+
+
+def test_total_cap_spans_models():
+    # llama3, moondream and the fallback VLM all run on one Ollama: one slot between them
+    sched = VlmScheduler(default_in_flight=1, total_in_flight=1)
+    blocker, release = _blocker(sched, model="llama3")
+    click = sched.submit("moondream", lambda: "click", INTERACTIVE)
+    threading.Event().wait(0.05)
+    assert not click.done() and sched.in_flight() == 1
+    release.set()
+    assert blocker.result(5) == "blocker" and click.result(5) == "click"
+    sched.shutdown()
@@ -1,17 +1,21 @@
-import mmap
 import struct
 import time
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../glazyr"))
+from shm_backend import open_segment
+from shm_layout import VISUAL_CORTEX_SHM_NAME, VISUAL_CORTEX_SHM_SIZE
 
 # Named Shared Memory
-MAPPING_NAME = "Local\\NeuralChromium_VisualCortex"
+MAPPING_NAME = VISUAL_CORTEX_SHM_NAME
 FRAME_SIZE = 1920 * 1080 * 4 # Approx
-TOTAL_SIZE = 32 * 1024 * 1024
+TOTAL_SIZE = VISUAL_CORTEX_SHM_SIZE
 
 def read_visual_cortex():
     try:
         # Open existing named shared memory
-        shm = mmap.mmap(-1, TOTAL_SIZE, tagname=MAPPING_NAME, access=mmap.ACCESS_READ)
+        shm = open_segment(MAPPING_NAME, TOTAL_SIZE, readonly=True, create=False)
         
         # Read Header
         # struct VisualCortexHeader {
@@ -0,0 +1,367 @@
+"""
+Build analytics from ninja's own bookkeeping instead of build.log percentages.
+
+Reads <out>/.ninja_log (one line per finished edge: start/end ms, output) or a
+Chrome-trace JSON of the build (--trace; "X" events, name = output) and reports:
+
+  wall / cpu      wall-clock span and summed edge time
+  parallelism     average and over time (concurrent edges per bucket)
+  weighted time   each edge's duration split by how many edges ran alongside
+                  it: the wall-clock time a directory/target is really costing
+  critical path   estimated: from the last edge to finish, repeatedly step to
+                  the edge that finished latest before the current one started
+                  (ninja starts an edge as soon as its last input is done;
+                  .ninja_log has no dependency edges to do better)
+  ETA             RateEta: remaining steps / recent [current/total] rate
+
+.ninja_log keeps several builds; a new one starts where end times go backwards.
+--build picks one (-1 = latest, -2 = the one before).
+
+Usage:
+    python build_analytics.py out/AgentDebug
+    python build_analytics.py out/AgentDebug --json > build.json
+    python build_analytics.py diff out/AgentDebug@-2 out/AgentDebug
+    python build_analytics.py diff before.json after.json
+"""
+
+import argparse
+import bisect
+import collections
+import json
+import os
+import time
+
+from log_tailer import PROGRESS_RE
+
+NINJA_LOG = ".ninja_log"
+
+
+class Edge:
+    def __init__(self, start_ms, end_ms, outputs):
+        self.start = start_ms / 1000.0
+        self.end = end_ms / 1000.0
+        self.outputs = outputs
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def output(self):
+        return self.outputs[0]
+
+
+# --- Loading ---
+
+def read_ninja_log(path):
+    """-> list of builds, each a list of Edge (outputs of one command grouped)."""
+    builds = [collections.OrderedDict()]
+    last_end = -1
+    with open(path, encoding="utf-8", errors="replace") as f:
+        header = f.readline()
+        if not header.startswith("# ninja log v"):
+            raise ValueError(f"{path} is not a .ninja_log")
+        for line in f:
+            parts = line.rstrip("\r\n").split("\t")
+            if len(parts) < 5:
+                continue
+            start, end, output, cmdhash = int(parts[0]), int(parts[1]), parts[3], parts[4]
+            if end < last_end:
+                builds.append(collections.OrderedDict())
+            last_end = end
+            builds[-1].setdefault((start, end, cmdhash), []).append(output)
+    return [[Edge(s, e, outs) for (s, e, _), outs in b.items()] for b in builds if b]
+
+
+def read_trace(path):
+    """Chrome trace JSON (list or {"traceEvents": [...]}) -> one build of Edges."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    events = data.get("traceEvents", []) if isinstance(data, dict) else data
+    edges = [Edge(e["ts"] / 1000.0, (e["ts"] + e.get("dur", 0)) / 1000.0, [e.get("name", "?")])
+             for e in events if e.get("ph") == "X"]
+    if not edges:
+        raise ValueError(f"{path} has no complete ('X') trace events")
+    origin = min(e.start for e in edges)
+    for e in edges:
+        e.start, e.end = e.start - origin, e.end - origin
+    return [edges]
+
+
+def load_edges(source, build=-1, trace=None):
+    """source: an out/ dir, a .ninja_log, or either with an @<build index> suffix."""
+    if trace:
+        return read_trace(trace)[0]
+    if "@" in os.path.basename(source):
+        source, _, index = source.rpartition("@")
+        build = int(index)
+    path = os.path.join(source, NINJA_LOG) if os.path.isdir(source) else source
+    builds = read_ninja_log(path)
+    if not builds:
+        raise ValueError(f"{path} has no finished edges")
+    return builds[build]
+
+
+# --- Grouping ---
+
+def _parts(output):
+    parts = output.replace("\\", "/").split("/")
+    if parts[0] in ("obj", "gen") and len(parts) > 1:
+        parts = parts[1:]
+    return parts
+
+
+def group_of(output, depth=2):
+    """obj/components/viz/service/x.o -> components/viz (at depth 2)."""
+    dirs = _parts(output)[:-1]
+    return "/".join(dirs[:depth]) or "(root)"
+
+
+def target_of(output):
+    """GN puts objects at obj/<dir>/<target>/<file>.o; links/stamps are their own target."""
+    parts = output.replace("\\", "/").split("/")
+    if parts[0] == "obj" and len(parts) > 2 and not output.endswith(".stamp"):
+        return "/".join(parts[1:-1])
+    return output
+
+
+# --- Analysis ---
+
+def _segments(edges):
+    """Sweep: [(t0, t1, running edges)] over the build."""
+    points = sorted({e.start for e in edges} | {e.end for e in edges})
+    delta = collections.Counter()
+    for e in edges:
+        if e.end > e.start:
+            delta[e.start] += 1
+            delta[e.end] -= 1
+    running, segments = 0, []
+    for t0, t1 in zip(points, points[1:]):
+        running += delta[t0]
+        segments.append((t0, t1, running))
+    return segments
+
+
+def weighted_times(edges, segments=None):
+    """Seconds per edge (same order): each segment's length shared by the edges running in it."""
+    segments = _segments(edges) if segments is None else segments
+    times, cumulative = [], [0.0]
+    for t0, t1, n in segments:
+        times.append(t0)
+        cumulative.append(cumulative[-1] + ((t1 - t0) / n if n else 0.0))
+    times.append(segments[-1][1] if segments else 0.0)
+
+    def at(t):
+        return cumulative[bisect.bisect_left(times, t)]
+    return [at(e.end) - at(e.start) for e in edges]
+
+
+def critical_path(edges):
+    by_end = sorted(edges, key=lambda e: e.end)
+    ends = [e.end for e in by_end]
+    path = []
+    i = len(by_end) - 1
+    while i >= 0:
+        path.append(by_end[i])
+        # Never step to itself or forward (zero-length edges share start and end)
+        i = min(bisect.bisect_right(ends, by_end[i].start), i) - 1
+    return path[::-1]
+
+
+def timeline(segments, start, wall, buckets=60):
+    bucket = max(1.0, wall / buckets)
+    load = [0.0] * (int(wall // bucket) + 1)
+    last = len(load) - 1
+    for t0, t1, n in segments:
+        a, b = t0 - start, t1 - start
+        if not n or b <= a:
+            continue
+        # Clip the segment to each bucket it touches once (the last bucket takes any rounding spill)
+        for i in range(min(int(a // bucket), last), min(int(b // bucket), last) + 1):
+            hi = b if i == last else min(b, (i + 1) * bucket)
+            overlap = hi - max(a, i * bucket)
+            if overlap > 0:
+                load[i] += n * overlap
+    return {"bucket_s": bucket, "concurrency": [round(x / bucket, 2) for x in load]}
+
+
+def analyze(edges, depth=2, top=15):
+    if not edges:
+        raise ValueError("no edges to analyze")
+    segments = _segments(edges)
+    weighted = weighted_times(edges, segments)
+    start, end = min(e.start for e in edges), max(e.end for e in edges)
+    wall = end - start
+    cpu = sum(e.duration for e in edges)
+
+    def rollup(key):
+        acc = collections.defaultdict(lambda: {"edges": 0, "cpu_s": 0.0, "weighted_s": 0.0})
+        for e, w in zip(edges, weighted):
+            row = acc[key(e.output)]
+            row["edges"] += 1
+            row["cpu_s"] += e.duration
+            row["weighted_s"] += w
+        rows = [dict(name=name, **{k: round(v, 3) for k, v in row.items()}) for name, row in acc.items()]
+        return sorted(rows, key=lambda r: -r["weighted_s"])
+
+    path = critical_path(edges)
+    return {
+        "edges": len(edges),
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "avg_parallelism": round(cpu / wall, 2) if wall else 0.0,
+        "critical_path": {
+            "seconds": round(sum(e.duration for e in path), 3),
+            "edges": [{"output": e.output, "start_s": round(e.start - start, 3), "duration_s": round(e.duration, 3)}
+                      for e in path],
+        },
+        "groups": rollup(lambda out: group_of(out, depth)),
+        "targets": rollup(target_of)[:top],
+        "slowest": [{"output": e.output, "duration_s": round(e.duration, 3)}
+                    for e in sorted(edges, key=lambda e: -e.duration)[:top]],
+        "timeline": timeline(segments, start, wall),
+    }
+
+
+def diff(before, after, top=15):
+    """Two analyze() reports -> totals and the groups that moved most."""
+    def delta(key):
+        return {"before": before[key], "after": after[key], "delta": round(after[key] - before[key], 3)}
+    a = {g["name"]: g for g in before["groups"]}
+    b = {g["name"]: g for g in after["groups"]}
+    groups = []
+    for name in set(a) | set(b):
+        was, now = a.get(name, {}).get("weighted_s", 0.0), b.get(name, {}).get("weighted_s", 0.0)
+        groups.append({"name": name, "before_s": was, "after_s": now, "delta_s": round(now - was, 3)})
+    groups.sort(key=lambda g: -abs(g["delta_s"]))
+    return {
+        "wall_s": delta("wall_s"),
+        "cpu_s": delta("cpu_s"),
+        "edges": delta("edges"),
+        "critical_path_s": {"before": before["critical_path"]["seconds"], "after": after["critical_path"]["seconds"],
+                            "delta": round(after["critical_path"]["seconds"] - before["critical_path"]["seconds"], 3)},
+        "groups": groups[:top],
+    }
+
+
+class RateEta:
+    """ETA from the recent [current/total] rate (build.log), not the average since start."""
+
+    def __init__(self, window=120.0, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.samples = collections.deque()  # (t, current)
+        self.total = 0
+
+    def observe(self, current, total, t=None):
+        t = self.clock() if t is None else t
+        if self.samples and current < self.samples[-1][1]:
+            self.samples.clear()  # New build
+        self.samples.append((t, current))
+        self.total = total
+        while len(self.samples) > 2 and t - self.samples[0][0] > self.window:
+            self.samples.popleft()
+
+    def observe_line(self, line):
+        match = PROGRESS_RE.search(line)
+        if match:
+            self.observe(int(match.group(1)), int(match.group(2)))
+
+    def rate(self):
+        if len(self.samples) < 2:
+            return None
+        (t0, c0), (t1, c1) = self.samples[0], self.samples[-1]
+        return (c1 - c0) / (t1 - t0) if t1 > t0 and c1 > c0 else None
+
+    def eta(self):
+        """Seconds left, or None until there's a rate to go on."""
+        rate = self.rate()
+        if rate is None:
+            return None
+        return max(0.0, (self.total - self.samples[-1][1]) / rate)
+
+
+class AnalyticsCache:
+    """analyze() of the latest build in out_dir, recomputed only when .ninja_log changes."""
+
+    def __init__(self, out_dir, depth=2, top=15):
+        self.path = os.path.join(out_dir, NINJA_LOG)
+        self.depth = depth
+        self.top = top
+        self._key = None
+        self._report = None
+
+    def report(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return {"error": f"{self.path} not found"}
+        key = (st.st_mtime_ns, st.st_size)
+        if key != self._key:
+            try:
+                self._report = analyze(load_edges(self.path), self.depth, self.top)
+            except ValueError as e:
+                self._report = {"error": str(e)}
+            self._key = key
+        return self._report
+
+
+# --- CLI ---
+
+def _load_report(source, args):
+    if source.endswith(".json") and not args.trace:
+        with open(source, encoding="utf-8") as f:
+            return json.load(f)
+    return analyze(load_edges(source, args.build, args.trace), args.depth, args.top)
+
+
+def print_report(r):
+    print(f"Edges: {r['edges']}   Wall: {r['wall_s']:.1f}s   CPU: {r['cpu_s']:.1f}s   "
+          f"Parallelism: {r['avg_parallelism']:.1f}x")
+    cp = r["critical_path"]
+    print(f"\nCritical path (estimated): {cp['seconds']:.1f}s over {len(cp['edges'])} edges")
+    for e in cp["edges"][-10:]:
+        print(f"  {e['start_s']:9.1f}s  {e['duration_s']:8.2f}s  {e['output']}")
+    print("\nWeighted time by directory:")
+    for g in r["groups"][:15]:
+        print(f"  {g['weighted_s']:9.1f}s  cpu {g['cpu_s']:9.1f}s  {g['edges']:6d} edges  {g['name']}")
+    print("\nTop targets:")
+    for t in r["targets"]:
+        print(f"  {t['weighted_s']:9.1f}s  cpu {t['cpu_s']:9.1f}s  {t['name']}")
+
+
+def print_diff(d):
+    for key in ("wall_s", "cpu_s", "critical_path_s", "edges"):
+        v = d[key]
+        print(f"{key:16s} {v['before']:>10} -> {v['after']:>10}  ({v['delta']:+})")
+    print("\nBiggest movers (weighted seconds):")
+    for g in d["groups"]:
+        print(f"  {g['delta_s']:+9.1f}s  {g['before_s']:9.1f}s -> {g['after_s']:9.1f}s  {g['name']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Critical path and per-target cost from .ninja_log")
+    parser.add_argument("source", nargs="+", help="out dir or .ninja_log ([path@build]); 'diff A B' to compare")
+    parser.add_argument("--build", type=int, default=-1, help="which build in .ninja_log (-1 = latest)")
+    parser.add_argument("--trace", help="Chrome-trace JSON of the build instead of .ninja_log")
+    parser.add_argument("--depth", type=int, default=2, help="directory depth for grouping")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.source[0] == "diff":
+        if len(args.source) != 3:
+            parser.error("diff needs two sources")
+        result = diff(_load_report(args.source[1], args), _load_report(args.source[2], args), args.top)
+        printer = print_diff
+    else:
+        result = _load_report(args.source[0], args)
+        printer = print_report
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        printer(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
+import argparse
 import http.server
-import socketserver
 import os
 import json
-import re
-import time
+
+from build_analytics import AnalyticsCache, RateEta
+from log_tailer import LogTailer
 
 PORT = 8000
+KEEPALIVE = 15  # Seconds between SSE comments on a quiet log (keeps proxies from closing the stream)
 LOG_FILE = os.path.join("out", "AgentDebug", "build.log")
 # Adjust path if running from src root
 if not os.path.exists(LOG_FILE):
@@ -89,6 +91,22 @@ HTML_TEMPLATE = """
             font-size: 0.9em;
             color: #ccc;
         }
+        .panels {
+            display: flex;
+            gap: 20px;
+            margin-bottom: 20px;
+        }
+        .panel {
+            flex: 1;
+            background-color: var(--panel-bg);
+            border: 1px solid var(--border-color);
+            padding: 10px 15px;
+            font-size: 0.85em;
+            color: #ccc;
+            white-space: pre;
+            overflow: hidden;
+        }
+        .panel h2 { margin: 0 0 8px 0; font-size: 1em; color: var(--text-color); }
         .log-line { margin-bottom: 2px; }
         .log-line.error { color: var(--error-color); }
         .log-line.ninja { color: #888; }
@@ -111,6 +129,12 @@ HTML_TEMPLATE = """
         <div id="progress-text" class="progress-text">0%</div>
     </div>
 
+    <div class="panels">
+        <div class="panel"><h2>Weighted time by directory</h2><div id="groups">-</div></div>
+        <div class="panel"><h2>Critical path</h2><div id="critical">-</div></div>
+        <div class="panel"><h2>Parallelism</h2><div id="parallelism">-</div></div>
+    </div>
+
     <div id="log-window"></div>
 
     <script>
@@ -118,35 +142,68 @@ HTML_TEMPLATE = """
         const progressBar = document.getElementById('progress-bar');
         const progressText = document.getElementById('progress-text');
         const logWindow = document.getElementById('log-window');
+        let lastStatus = null;
 
-        function fetchStatus() {
-            fetch('/status')
-                .then(response => response.json())
-                .then(data => {
-                    // Update Status
-                    statusDisplay.textContent = data.status;
-                    statusDisplay.className = 'status ' + data.status.toLowerCase();
-
-                    // Update Progress
-                    const pct = data.percentage + '%';
-                    progressBar.style.width = pct;
-                    progressText.textContent = `${data.current} / ${data.total} (${pct})`;
-
-                    // Update Logs
-                    logWindow.innerHTML = data.logs.join('\\n');
-                    logWindow.scrollTop = logWindow.scrollHeight;
-                })
-                .catch(err => console.error(err));
+        function fmtTime(s) {
+            return s >= 3600 ? `${(s / 3600).toFixed(1)}h` : s >= 60 ? `${Math.round(s / 60)}m` : `${Math.round(s)}s`;
         }
 
-        setInterval(fetchStatus, 2000);
-        fetchStatus();
+        function renderAnalytics(a) {
+            if (a.error) {
+                document.getElementById('groups').textContent = a.error;
+                return;
+            }
+            document.getElementById('groups').textContent = a.groups.slice(0, 8)
+                .map(g => `${fmtTime(g.weighted_s).padStart(6)}  ${g.name}`).join('\\n');
+            const cp = a.critical_path;
+            document.getElementById('critical').textContent = `${fmtTime(cp.seconds)} of ${fmtTime(a.wall_s)} wall\\n` +
+                cp.edges.slice(-6).map(e => `${fmtTime(e.duration_s).padStart(6)}  ${e.output}`).join('\\n');
+            const c = a.timeline.concurrency, max = Math.max(1, ...c), bars = '▁▂▃▄▅▆▇█';
+            document.getElementById('parallelism').textContent =
+                `avg ${a.avg_parallelism}x, cpu ${fmtTime(a.cpu_s)}\\n` +
+                c.map(x => bars[Math.min(7, Math.floor(x / max * 8))]).join('');
+        }
+
+        function fetchAnalytics() {
+            fetch('/analytics').then(r => r.json()).then(renderAnalytics).catch(err => console.error(err));
+        }
+
+        function render(data) {
+            // Update Status
+            statusDisplay.textContent = data.status;
+            statusDisplay.className = 'status ' + data.status.toLowerCase();
+
+            // Update Progress
+            const pct = data.percentage + '%';
+            progressBar.style.width = pct;
+            const eta = data.eta_seconds == null ? '' : `, ETA ${fmtTime(data.eta_seconds)}`;
+            progressText.textContent = `${data.current} / ${data.total} (${pct}${eta})`;
+
+            // Update Logs
+            logWindow.innerHTML = data.logs.join('\\n');
+            logWindow.scrollTop = logWindow.scrollHeight;
+
+            // .ninja_log analytics only change meaningfully when a build starts or ends
+            if (data.status !== lastStatus) {
+                lastStatus = data.status;
+                fetchAnalytics();
+            }
+        }
+
+        // Server pushes a new state whenever build.log grows (EventSource reconnects on its own)
+        const events = new EventSource('/events');
+        events.onmessage = (e) => render(JSON.parse(e.data));
+        events.onerror = (err) => console.error(err);
     </script>
 </body>
 </html>
 """
 
-class BuildHandler(http.server.SimpleHTTPRequestHandler):
+class BuildHandler(http.server.BaseHTTPRequestHandler):
+    tailer = None     # Shared LogTailer, set in make_server()
+    eta = None        # RateEta fed by the tailer
+    analytics = None  # AnalyticsCache over the build's .ninja_log
+
     def do_GET(self):
         if self.path == '/':
             self.send_response(200)
@@ -158,88 +215,73 @@ class BuildHandler(http.server.SimpleHTTPRequestHandler):
             self.send_header('Content-type', 'application/json')
             self.end_headers()
             self.wfile.write(json.dumps(self.get_build_status()).encode('utf-8'))
+        elif self.path == '/analytics':
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(self.analytics.report()).encode('utf-8'))
+        elif self.path == '/events':
+            self.stream_events()
         else:
             self.send_error(404)
 
     def get_build_status(self):
-        status = "UNKNOWN"
-        current = 0
-        total = 0
-        percentage = 0
-        logs = []
-
-        if not os.path.exists(LOG_FILE):
-             return {
-                "status": "NO LOG FOUND",
-                "current": 0,
-                "total": 0,
-                "percentage": 0,
-                "logs": ["Waiting for build.log..."]
-            }
+        return self.with_eta(self.tailer.state())
+
+    def with_eta(self, state):
+        eta = self.eta.eta() if state["status"] == "RUNNING" else None
+        return dict(state, eta_seconds=None if eta is None else round(eta))
 
+    def stream_events(self):
+        """Server-Sent Events: one `data:` message per log change, all clients share one tailer."""
+        self.send_response(200)
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        version = None
         try:
-            with open(LOG_FILE, 'r') as f:
-                # Read specific chunk relevant for tail
-                # A robust implementation would be more efficient, but for <50MB logs this is ok
-                # We'll seek to end - 10KB
-                f.seek(0, 2)
-                fsize = f.tell()
-                f.seek(max(fsize - 20000, 0), 0)
-                lines = f.read().splitlines()
-                
-                # Parse last lines for progress
-                # Ninja format: [123/456] ...
-                prog_re = re.compile(r'\[(\d+)/(\d+)\]')
-                
-                for line in reversed(lines):
-                    match = prog_re.search(line)
-                    if match:
-                        current = int(match.group(1))
-                        total = int(match.group(2))
-                        if total > 0:
-                            percentage = round((current / total) * 100, 1)
-                        break
-                
-                # Determine status
-                last_lines = lines[-20:]
-                logs = []
-                for l in last_lines:
-                    # Simple color coding for HTML
-                    cls = "log-line"
-                    if "FAILED" in l or "error:" in l or "steps failed" in l:
-                        status = "FAILED"
-                        cls += " error"
-                    elif "Building" in l or "[" in l:
-                        status = "RUNNING"
-                        cls += " ninja"
-                    elif "Build Succeeded" in l:
-                        status = "SUCCESS"
-                        percentage = 100
-                        current = total
-                    
-                    logs.append(f'<div class="{cls}">{l}</div>')
-                
-                if status == "UNKNOWN":
-                    # Fallback check
-                    if any("steps failed" in l for l in lines):
-                         status = "FAILED"
-                    elif any("Build Succeeded" in l for l in lines):
-                         status = "SUCCESS"
-                    else:
-                         status = "IDLE/RUNNING"
-
-        except Exception as e:
-            logs.append(f"Error reading log: {str(e)}")
-
-        return {
-            "status": status,
-            "current": current,
-            "total": total,
-            "percentage": percentage,
-            "logs": logs
-        }
+            while True:
+                latest, state = self.tailer.wait(version, timeout=KEEPALIVE)
+                if latest != version:
+                    version = latest
+                    self.wfile.write(f"data: {json.dumps(self.with_eta(state))}\n\n".encode('utf-8'))
+                else:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Browser tab closed
+
+    def log_message(self, format, *args):
+        pass  # One line per SSE reconnect is just noise
+
+
+def make_server(log_file, port=PORT, host=""):
+    eta = RateEta()
+    tailer = LogTailer(log_file, initial_bytes=1 << 20, on_line=eta.observe_line).start()
+    analytics = AnalyticsCache(os.path.dirname(log_file) or ".")
+    handler = type("Handler", (BuildHandler,), {"tailer": tailer, "eta": eta, "analytics": analytics})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Neural-Chromium build dashboard")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--log", default=LOG_FILE)
+    args = parser.parse_args()
+
+    server = make_server(args.log, args.port)
+    print(f"Serving Build Dashboard at http://localhost:{args.port}")
+    print(f"Monitoring: {args.log}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.RequestHandlerClass.tailer.stop()
+        server.server_close()
+
 
 if __name__ == "__main__":
-    print(f"Serving Build Dashboard at http://localhost:{PORT}")
-    print(f"Monitoring: {LOG_FILE}")
-    http.server.test(HandlerClass=BuildHandler, port=PORT)
+    main()
@@ -0,0 +1,190 @@
+"""
+Incremental build.log tailer shared by build_dashboard.py and monitor_build.py.
+
+Keeps a byte offset into the log and only reads what was appended since the
+last poll (one os.stat when nothing changed), parsing each new line once:
+ninja progress ([current/total]), status, FAILED lines and the last N lines.
+A log that shrinks or is replaced (new build) is re-read from the start.
+
+Watchers block on wait(version) instead of re-reading the file themselves, so
+any number of dashboard clients cost one reader.
+
+Usage:
+    tailer = LogTailer("out/AgentDebug/build.log").start()
+    version, state = tailer.wait(0, timeout=15)
+"""
+
+import collections
+import html
+import os
+import re
+import threading
+import time
+
+PROGRESS_RE = re.compile(r'\[(\d+)/(\d+)\]')
+
+
+def classify_line(line):
+    """-> (status or None, css class), same rules the dashboard always used."""
+    if "FAILED" in line or "error:" in line or "steps failed" in line:
+        return "FAILED", "error"
+    if "Build Succeeded" in line:
+        return "SUCCESS", ""
+    if "Building" in line or "[" in line:
+        return "RUNNING", "ninja"
+    return None, ""
+
+
+class LogTailer:
+    def __init__(self, path, tail_lines=20, max_failures=50, initial_bytes=None, poll_interval=0.5,
+                 on_line=None):
+        """
+        initial_bytes: when attaching to an existing log, parse only its last N bytes
+                       (None = the whole file; progress is always in the tail anyway).
+        on_line: optional callable(line) run on the polling thread for every new line.
+        """
+        self.path = path
+        self.initial_bytes = initial_bytes
+        self.poll_interval = poll_interval
+        self.on_line = on_line
+        self.tail_lines = tail_lines
+        self.max_failures = max_failures
+        self.version = 0
+        self.bytes_read = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._snapshot = None
+        self._reset()
+
+    def _reset(self):
+        self.offset = None  # Not attached yet
+        self.ident = None   # (st_dev, st_ino) of the file we're reading
+        self.partial = b""
+        self.current = self.total = 0
+        self.status = "IDLE/RUNNING"
+        self.lines = collections.deque(maxlen=self.tail_lines)  # (text, css class)
+        self.failures = collections.deque(maxlen=self.max_failures)
+
+    # --- Reading ---
+
+    def poll(self):
+        """Reads whatever was appended. Returns True if the state changed."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            if self.offset is None:
+                return False
+            with self._cond:  # Log deleted: forget the old build
+                self._reset()
+                self._changed()
+            return True
+
+        ident = (st.st_dev, st.st_ino)
+        restarted = self.offset is not None and (ident != self.ident or st.st_size < self.offset)
+        if self.offset is not None and not restarted and st.st_size == self.offset:
+            return False
+
+        with open(self.path, 'rb') as f:
+            with self._cond:
+                if restarted:
+                    self._reset()
+                attached = self.offset is None
+                if attached:
+                    self.offset = 0
+                    if self.initial_bytes is not None and st.st_size > self.initial_bytes:
+                        self.offset = st.st_size - self.initial_bytes
+                        f.seek(self.offset)
+                        f.readline()  # Skip the torn first line
+                        self.offset = f.tell()
+                    self.ident = ident
+                f.seek(self.offset)
+                data = f.read()
+                self.offset += len(data)
+                self.bytes_read += len(data)
+                new_lines = self._feed(data)
+                changed = bool(new_lines) or restarted or attached
+                if changed:
+                    self._changed()
+        if self.on_line:
+            for line in new_lines:
+                self.on_line(line)
+        return changed
+
+    def _feed(self, data):
+        chunks = (self.partial + data).split(b"\n")
+        self.partial = chunks.pop()  # Incomplete last line, finished by a later write
+        lines = [c.rstrip(b"\r").decode("utf-8", "replace") for c in chunks]
+        for line in lines:
+            match = PROGRESS_RE.search(line)
+            if match:
+                self.current, self.total = int(match.group(1)), int(match.group(2))
+            status, cls = classify_line(line)
+            if status:
+                self.status = status
+            if status == "SUCCESS":
+                self.current = self.total
+            if cls == "error":
+                self.failures.append(line)
+            self.lines.append((line, cls))
+        return lines
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
+        self._cond.notify_all()
+
+    # --- State ---
+
+    def state(self):
+        """Same shape as the dashboard's /status JSON (plus failures and version)."""
+        with self._cond:
+            if self._snapshot is None:
+                if self.offset is None:
+                    self._snapshot = {"status": "NO LOG FOUND", "current": 0, "total": 0, "percentage": 0,
+                                      "logs": ["Waiting for build.log..."], "failures": [], "version": self.version}
+                else:
+                    percentage = round(self.current / self.total * 100, 1) if self.total else 0
+                    if self.status == "SUCCESS":
+                        percentage = 100
+                    self._snapshot = {
+                        "status": self.status,
+                        "current": self.current,
+                        "total": self.total,
+                        "percentage": percentage,
+                        "logs": [f'<div class="log-line {cls}">{html.escape(text)}</div>' for text, cls in self.lines],
+                        "failures": list(self.failures),
+                        "version": self.version,
+                    }
+            return self._snapshot
+
+    def wait(self, version, timeout=None):
+        """Blocks until the state is newer than `version` (or timeout). -> (version, state)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version != version or not self._running, timeout)
+        return self.version, self.state()
+
+    # --- Background polling ---
+
+    def start(self):
+        self._running = True
+        self.poll()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="log-tailer")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self):
+        while self._running:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Log tailer error: {e}")
+            time.sleep(self.poll_interval)
@@ -0,0 +1,300 @@
+"""
+Overlay-aware incremental rebuild planner.
+
+Maps the overlay files that changed (chrome/, components/, content/, gpu/,
+media/, build/) to the ninja outputs that actually depend on them, reports the
+expected rebuild size, and builds only those outputs (plus an optional relink
+target) instead of `autoninja -C out/AgentDebug chrome`.
+
+  sources   .cc/.mm/.c -> their object files via `ninja -t query`
+  headers   reverse index of the deps log (`ninja -t deps`), restricted to
+            overlay paths and cached in <out>/.rebuild_planner_cache.json;
+            rebuilt only when .ninja_deps / build.ninja change
+  gn        BUILD.gn/*.gni/build/ changes make ninja re-run gn: flagged, and
+            the plan falls back to the relink target
+  size      edges from `ninja -n` (dry run) and CPU seconds estimated from
+            the last build's .ninja_log timings
+
+Changed files default to overlay files whose content differs from the copy in
+--src; --since REF uses `git diff` instead (files deleted since REF are left
+out: there is nothing to copy or compile), or pass paths explicitly. --sync
+copies changed files into --src first (fresh mtimes, so ninja sees them).
+
+Usage:
+    python tools/rebuild_planner.py --src ../chromium/src                  # plan only
+    python tools/rebuild_planner.py --src ../chromium/src --sync --run     # copy, then build
+    python tools/rebuild_planner.py --src ../chromium/src --since HEAD~1 --link chrome --run
+"""
+
+import argparse
+import filecmp
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+from build_analytics import NINJA_LOG, read_ninja_log
+from log_tailer import PROGRESS_RE
+
+OVERLAY_DIRS = ("chrome", "components", "content", "gpu", "media", "build")
+SOURCE_EXTS = (".cc", ".cpp", ".c", ".mm", ".m", ".S", ".asm", ".rs")
+GN_EXTS = (".gn", ".gni")
+CACHE_FILE = ".rebuild_planner_cache.json"
+CACHE_VERSION = 1
+
+OVERLAY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_command(args, cwd=None):
+    return subprocess.run(args, cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+def overlay_files(root=OVERLAY_ROOT):
+    """Overlay-relative paths ('/'-separated) of every file under OVERLAY_DIRS."""
+    files = []
+    for top in OVERLAY_DIRS:
+        for dirpath, _, names in os.walk(os.path.join(root, top)):
+            for name in names:
+                if name.endswith((".pyc", ".pyo")):
+                    continue
+                files.append(os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/"))
+    return sorted(files)
+
+
+def changed_vs_src(files, root, src):
+    """Overlay files missing from src or with different content."""
+    changed = []
+    for rel in files:
+        dst = os.path.join(src, rel)
+        if not os.path.exists(dst) or not filecmp.cmp(os.path.join(root, rel), dst, shallow=False):
+            changed.append(rel)
+    return changed
+
+
+def changed_since(ref, root=OVERLAY_ROOT, run=run_command):
+    out = run(["git", "diff", "--name-only", "--diff-filter=d", ref, "--", *OVERLAY_DIRS], cwd=root)
+    return sorted(line.strip() for line in out.splitlines() if line.strip())
+
+
+def sync(files, root, src):
+    for rel in files:
+        dst = os.path.join(src, rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copyfile(os.path.join(root, rel), dst)  # copyfile, not copy2: the new mtime is what ninja checks
+
+
+def is_gn_change(rel):
+    return rel.endswith(GN_EXTS) or rel.startswith("build/")
+
+
+# --- ninja tool output ---
+
+def parse_query(text):
+    """`ninja -t query` -> list of outputs (of every queried node)."""
+    outputs, section = [], None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not line.startswith(" "):
+            section = None
+        elif stripped.endswith(":") and line.startswith("  ") and not line.startswith("    "):
+            section = stripped[:-1]
+        elif section == "outputs" and stripped:
+            outputs.append(stripped)
+    return outputs
+
+
+def parse_deps(text, keep=None):
+    """`ninja -t deps` -> {input: [outputs]}; keep(input) filters which inputs are indexed."""
+    reverse = {}
+    output = None
+    for line in text.splitlines():
+        if not line.strip():
+            output = None
+        elif not line.startswith(" "):
+            output = line.split(":", 1)[0]
+        elif output is not None:
+            dep = line.strip()
+            if keep is None or keep(dep):
+                reverse.setdefault(dep, []).append(output)
+    return reverse
+
+
+def dry_run_edges(text):
+    """Edges `ninja -n` would run (its last [n/total])."""
+    totals = [int(m.group(2)) for m in PROGRESS_RE.finditer(text)]
+    return max(totals) if totals else 0
+
+
+class RebuildPlanner:
+    def __init__(self, src, out_dir, ninja="ninja", root=OVERLAY_ROOT, run=run_command):
+        self.src = src
+        self.out_dir = out_dir
+        self.build_dir = os.path.join(src, out_dir)
+        self.ninja = ninja
+        self.root = root
+        self.run = run
+        self.cache_path = os.path.join(self.build_dir, CACHE_FILE)
+
+    def ninja_path(self, rel):
+        """Overlay-relative path -> how ninja names it (relative to the build dir)."""
+        return os.path.relpath(os.path.join(self.src, rel), self.build_dir).replace(os.sep, "/")
+
+    def _ninja(self, *args):
+        return self.run([self.ninja, "-C", self.build_dir, *args])
+
+    # --- Cached header index ---
+
+    def _graph_key(self):
+        key = []
+        for name in (".ninja_deps", "build.ninja"):
+            try:
+                st = os.stat(os.path.join(self.build_dir, name))
+                key.append([name, st.st_mtime_ns, st.st_size])
+            except OSError:
+                key.append([name, None, None])
+        return key
+
+    def header_index(self):
+        """{ninja path of an overlay file: [outputs]} from the deps log, cached."""
+        key = self._graph_key()
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("version") == CACHE_VERSION and cache.get("key") == key:
+                return cache["reverse"]
+        except (OSError, ValueError):
+            pass
+        prefixes = tuple(self.ninja_path(d) + "/" for d in OVERLAY_DIRS)
+        reverse = parse_deps(self._ninja("-t", "deps"), keep=lambda dep: dep.startswith(prefixes))
+        try:
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "key": key, "reverse": reverse}, f)
+        except OSError:
+            pass  # Read-only out dir: just don't cache
+        return reverse
+
+    # --- Planning ---
+
+    def plan(self, changed, link=None):
+        mapped, unmapped = {}, []
+        sources = [rel for rel in changed if rel.endswith(SOURCE_EXTS)]
+        headers = [rel for rel in changed if not rel.endswith(SOURCE_EXTS) and not is_gn_change(rel)]
+        gn = [rel for rel in changed if is_gn_change(rel)]
+
+        for rel in sources:
+            try:
+                outputs = parse_query(self._ninja("-t", "query", self.ninja_path(rel)))
+            except subprocess.CalledProcessError:
+                outputs = []  # Not in the build graph (new file, or not built for this config)
+            mapped[rel] = outputs
+        if headers:
+            index = self.header_index()
+            for rel in headers:
+                mapped[rel] = index.get(self.ninja_path(rel), [])
+        for rel, outputs in list(mapped.items()):
+            if not outputs:
+                unmapped.append(rel)
+                del mapped[rel]
+
+        targets = sorted({o for outputs in mapped.values() for o in outputs})
+        if link and (targets or gn or unmapped):
+            targets.append(link)
+        return {
+            "changed": list(changed),
+            "mapped": mapped,
+            "unmapped": unmapped,
+            "gn_changes": gn,
+            "targets": targets,
+        }
+
+    def estimate(self, plan):
+        """Adds rebuild size: dry-run edge count and CPU seconds from the last build's timings."""
+        plan = dict(plan)
+        if not plan["targets"]:
+            plan.update(edges=0, cpu_s=0.0)
+            return plan
+        try:
+            plan["edges"] = dry_run_edges(self._ninja("-n", *plan["targets"]))
+        except subprocess.CalledProcessError:
+            plan["edges"] = None
+        durations = {}
+        try:
+            for build in read_ninja_log(os.path.join(self.build_dir, NINJA_LOG)):
+                for edge in build:
+                    for output in edge.outputs:
+                        durations[output] = edge.duration
+        except (OSError, ValueError):
+            pass
+        known = [durations[t] for t in plan["targets"] if t in durations]
+        plan["cpu_s"] = round(sum(known), 1)
+        plan["timed_targets"] = len(known)
+        return plan
+
+    def build(self, targets, log_file=None):
+        """Runs ninja on just these targets, echoing (and optionally appending to build.log for the dashboard)."""
+        args = [self.ninja, "-C", self.build_dir, *targets]
+        log = open(log_file, "a", encoding="utf-8") if log_file else None
+        try:
+            proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            for line in proc.stdout:
+                sys.stdout.write(line)
+                if log:
+                    log.write(line)
+                    log.flush()
+            return proc.wait()
+        finally:
+            if log:
+                log.close()
+
+
+def print_plan(plan):
+    print(f"Changed overlay files: {len(plan['changed'])}")
+    for rel, outputs in plan["mapped"].items():
+        print(f"  {rel} -> {len(outputs)} output(s)")
+    for rel in plan["unmapped"]:
+        print(f"  {rel} -> not in the build graph (new file or not built in this config)")
+    if plan["gn_changes"]:
+        print(f"⚠️ GN/toolchain changes ({', '.join(plan['gn_changes'])}): ninja will re-run gn; expect a wider rebuild")
+    print(f"Targets: {len(plan['targets'])}")
+    if "edges" in plan:
+        edges = "unknown" if plan["edges"] is None else plan["edges"]
+        timed = plan.get("timed_targets", 0)
+        print(f"Expected rebuild: {edges} edges, ~{plan['cpu_s']:.0f}s CPU ({timed} targets timed in .ninja_log)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build only what the changed overlay files affect")
+    parser.add_argument("files", nargs="*", help="overlay-relative paths (default: files that differ from --src)")
+    parser.add_argument("--src", required=True, help="Chromium src checkout the overlay is applied to")
+    parser.add_argument("--out", default=os.path.join("out", "AgentDebug"), help="build dir, relative to --src")
+    parser.add_argument("--since", help="git ref: changed = `git diff --name-only REF` in the overlay")
+    parser.add_argument("--sync", action="store_true", help="copy changed files into --src first")
+    parser.add_argument("--link", help="also (re)build this target, e.g. chrome")
+    parser.add_argument("--ninja", default="ninja")
+    parser.add_argument("--run", action="store_true", help="build the planned targets")
+    parser.add_argument("--log", help="append ninja output here too (e.g. <out>/build.log for the dashboard)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    planner = RebuildPlanner(args.src, args.out, ninja=args.ninja)
+    if args.files:
+        changed = [f.replace(os.sep, "/") for f in args.files]
+    elif args.since:
+        changed = changed_since(args.since)
+    else:
+        changed = changed_vs_src(overlay_files(), OVERLAY_ROOT, args.src)
+    if args.sync:
+        sync(changed, OVERLAY_ROOT, args.src)
+
+    plan = planner.estimate(planner.plan(changed, link=args.link))
+    if args.json:
+        print(json.dumps(plan, indent=2))
+    else:
+        print_plan(plan)
+    if args.run and plan["targets"]:
+        sys.exit(planner.build(plan["targets"], args.log))
+
+
+if __name__ == "__main__":
+    main()